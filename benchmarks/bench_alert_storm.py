@@ -0,0 +1,100 @@
+"""
+Benchmark: volumen de alertas hacia n8n con tráfico simulado
+Antes: una alerta por lectura > 4500 mg/L (IF "¿Alta Concentración?").
+Después: una alerta por transición ALERT_START del motor con histéresis.
+"""
+
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bench_utils import require_model, save_results
+
+import numpy as np
+
+import api_model
+from alert_engine import AlertEngine
+from api_model import SensorData, build_feature_matrix, score_features
+from sensor_simulator import INTERVAL_SECONDS, NUM_POZAS, generate_sensor_reading
+
+SIM_HOURS = 24
+SEED = 42
+
+
+def simulator_traffic(hours):
+    """Lecturas como las de continuous_monitoring, con timestamps simulados"""
+    random.seed(SEED)
+    start = datetime(2025, 1, 1)
+    days = {f"POZA_{i+1}": random.uniform(120, 170) for i in range(NUM_POZAS)}
+    readings = []
+    for tick in range(int(hours * 3600 / INTERVAL_SECONDS)):
+        for poza_id in days:
+            reading = generate_sensor_reading(poza_id, days[poza_id])
+            reading['timestamp'] = start + timedelta(seconds=tick * INTERVAL_SECONDS)
+            readings.append(SensorData(**reading))
+            # Avance lento: ~1 día de evaporación cada 6 h de simulación
+            days[poza_id] = min(days[poza_id] + INTERVAL_SECONDS / 21600, 180)
+    X = build_feature_matrix(readings)
+    predictions, _ = score_features(X)
+    return [(r.poza_id, r.timestamp, p) for r, p in zip(readings, predictions.tolist())]
+
+
+def hovering_traffic(hours, n_pozas=5):
+    """Concentración oscilando alrededor del umbral (peor caso de tormenta)"""
+    rng = np.random.default_rng(SEED)
+    start = datetime(2025, 1, 1)
+    level = np.full(n_pozas, 4450.0)
+    traffic = []
+    for tick in range(int(hours * 3600 / INTERVAL_SECONDS)):
+        level += rng.normal(0, 5, n_pozas)
+        noisy = level + rng.normal(0, 80, n_pozas)
+        ts = start + timedelta(seconds=tick * INTERVAL_SECONDS)
+        traffic.extend((f"POZA_{i+1}", ts, float(noisy[i])) for i in range(n_pozas))
+    return traffic
+
+
+def run(traffic):
+    engine = AlertEngine()
+    start = time.perf_counter()
+    for poza_id, ts, value in traffic:
+        engine.update(poza_id, ts, value)
+    elapsed = time.perf_counter() - start
+    counters = engine.snapshot()['counters']
+    return {
+        'readings': len(traffic),
+        'alerts_before': counters['threshold_crossings'],
+        'alerts_after': counters['alert_start'],
+        'clears_after': counters['alert_clear'],
+        'suppressed': counters['suppressed'],
+        'update_us': elapsed / len(traffic) * 1e6
+    }
+
+
+def main():
+    require_model()
+    api_model.load_model()
+
+    print("=" * 70)
+    print(f"BENCHMARK - TORMENTA DE ALERTAS ({SIM_HOURS} h simuladas, tick {INTERVAL_SECONDS} s)")
+    print("=" * 70)
+
+    results = {
+        'simulator': run(simulator_traffic(SIM_HOURS)),
+        'hovering': run(hovering_traffic(SIM_HOURS))
+    }
+    for name, r in results.items():
+        reduction = 1 - (r['alerts_after'] + r['clears_after']) / max(r['alerts_before'], 1)
+        r['webhook_reduction'] = reduction
+        print(f"\nEscenario: {name} ({r['readings']:,} lecturas)")
+        print(f"   Alertas antes (lectura > umbral):   {r['alerts_before']:,}")
+        print(f"   Alertas después (ALERT_START):      {r['alerts_after']:,}  (+{r['clears_after']} ALERT_CLEAR, {r['suppressed']} suprimidas)")
+        print(f"   Reducción de ejecuciones de alerta: {reduction:.1%}")
+        print(f"   Costo por lectura:                  {r['update_us']:.2f} µs")
+
+    save_results('alert_storm', results)
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,116 @@
+"""
+Benchmark: scoring offline por lotes vs una lectura por request HTTP
+- Archivo sintético grande (sample_data.csv repetido con ruido).
+- Lecturas/s con 1, 2, 4... workers y eficiencia respecto de los núcleos
+  disponibles (en una máquina de 1 núcleo no hay escalado que medir).
+- La salida ordenada con N workers es idéntica a la de 1 worker.
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from bench_utils import DATA_DIR, ML_MODEL_DIR, require_model, save_results
+
+os.environ['PREDICTION_JOURNAL'] = '0'
+os.environ['ALERT_WEBHOOK_URL'] = '0'
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import api_model
+from batch_score import batch_score
+
+ARCHIVE_ROWS = 200_000
+HTTP_ROWS = 500
+CHUNK_ROWS = 25_000
+
+
+def build_archive(path, n_rows, seed=0):
+    """Archivo de lecturas con la distribución de sample_data.csv"""
+    df = pd.read_csv(os.path.join(DATA_DIR, 'sample_data.csv'))
+    rng = np.random.default_rng(seed)
+    archive = df.iloc[rng.integers(0, len(df), size=n_rows)].reset_index(drop=True)
+    for column in ('temperature_c', 'humidity_percent', 'days_evaporation'):
+        archive[column] = (archive[column] * rng.normal(1.0, 0.02, n_rows)).round(2)
+    archive.to_csv(path, index=False)
+    return archive
+
+
+def http_rows_per_s(archive):
+    """Línea base: una lectura por POST /predict"""
+    logging.disable(logging.INFO)
+    readings = archive.drop(columns=['timestamp', 'li_concentration_mg_l', 'quality_status'])
+    readings = readings.head(HTTP_ROWS).to_dict('records')
+    with TestClient(api_model.app) as client:
+        start = time.perf_counter()
+        for reading in readings:
+            assert client.post('/predict', json=reading).status_code == 200
+        elapsed = time.perf_counter() - start
+    return len(readings) / elapsed
+
+
+def main():
+    require_model()
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, cores})
+
+    print("=" * 70)
+    print(f"BENCHMARK - SCORING OFFLINE ({ARCHIVE_ROWS:,} lecturas, {cores} núcleos)")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'archive.csv')
+        archive = build_archive(input_path, ARCHIVE_ROWS)
+        http_rate = http_rows_per_s(archive)
+
+        reports, outputs = {}, {}
+        for workers in worker_counts:
+            output_path = os.path.join(tmp, f'scored_{workers}.csv')
+            reports[workers] = batch_score(
+                input_path, output_path,
+                model_path=os.path.join(ML_MODEL_DIR, 'model.pkl'),
+                metadata_path=os.path.join(ML_MODEL_DIR, 'model_metadata.pkl'),
+                workers=workers, chunk_rows=CHUNK_ROWS, store_dir=os.path.join(tmp, 'store')
+            )
+            outputs[workers] = pd.read_csv(output_path)['li_predicted_mg_l'].to_numpy()
+
+        partitioned = batch_score(
+            input_path, os.path.join(tmp, 'parts'),
+            model_path=os.path.join(ML_MODEL_DIR, 'model.pkl'),
+            metadata_path=os.path.join(ML_MODEL_DIR, 'model_metadata.pkl'),
+            workers=cores, chunk_rows=CHUNK_ROWS, partitioned=True, store_dir=os.path.join(tmp, 'store')
+        )
+
+    base = reports[1]['rows_per_s']
+    print(f"\n{'Modo':<32} {'Lecturas/s':>12} {'Speedup':>10} {'Eficiencia':>12}")
+    print("-" * 70)
+    print(f"{'HTTP, 1 lectura por request':<32} {http_rate:>12,.0f} {http_rate / base:>10.2f}x {'':>12}")
+    for workers, report in reports.items():
+        speedup = report['rows_per_s'] / base
+        efficiency = speedup / min(workers, cores)
+        label = f"Por lotes, {workers} worker(s)"
+        print(f"{label:<32} {report['rows_per_s']:>12,.0f} {speedup:>10.2f}x {efficiency:>12.0%}")
+    label = f"Particionado, {cores} worker(s)"
+    print(f"{label:<32} {partitioned['rows_per_s']:>12,.0f} {partitioned['rows_per_s'] / base:>10.2f}x")
+    print(f"\nMAE contra el valor real: {reports[1]['mae_mg_l']} mg/L")
+    print("=" * 70)
+
+    identical = all(np.array_equal(outputs[1], output, equal_nan=True) for output in outputs.values())
+    save_results('batch_score', {
+        'rows': ARCHIVE_ROWS,
+        'cores': cores,
+        'chunk_rows': CHUNK_ROWS,
+        'http_rows_per_s': http_rate,
+        'batch': {str(workers): report for workers, report in reports.items()},
+        'partitioned': partitioned,
+        'ordered_output_identical': identical
+    })
+    return identical and all(report['rows'] == ARCHIVE_ROWS for report in reports.values())
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,170 @@
+"""
+Benchmark: scoring masivo en JSON vs MessagePack vs Arrow IPC
+Parseo + validación, scoring (features, modelo y armado de la respuesta) y
+serialización de la respuesta para 1k, 100k y 1M lecturas, por el mismo
+camino que /predict/batch (JSON con SensorData por lectura) y /predict/bulk
+(columnas directo a la matriz de features). El costo del modelo es el mismo
+en los tres formatos y se informa aparte. /predict/batch acepta hasta 10k
+lecturas: para lotes mayores JSON se mide con la misma validación por
+lectura, sin el límite.
+
+    python benchmarks/bench_bulk_formats.py          # 1k, 100k y 1M filas
+    python benchmarks/bench_bulk_formats.py --quick  # sin 1M
+"""
+
+import gc
+import logging
+import os
+import sys
+import time
+
+from bench_utils import require_model, save_results
+
+os.environ['PREDICTION_JOURNAL'] = '0'
+os.environ['ALERT_WEBHOOK_URL'] = '0'
+
+import numpy as np
+from pydantic import TypeAdapter
+
+import api_model
+import bulk_codec
+from fast_json import FastJSONResponse, dumps, loads
+from bench_n8n_pipeline import simulator_readings
+
+SIZES = [1_000, 100_000, 1_000_000]
+REPEAT = {1_000: 10, 100_000: 2, 1_000_000: 1}
+COLUMNS = ('poza_id', 'timestamp') + bulk_codec.NUMERIC_FIELDS
+
+# Validación de BatchSensorData.readings sin el tope de 10k lecturas
+SENSOR_LIST = TypeAdapter(list[api_model.SensorData])
+
+
+def build_bodies(n) -> dict:
+    """Mismo lote serializado en cada formato (las lecturas se repiten pasadas las 100k)"""
+    base = simulator_readings(min(n, 100_000))
+    readings = (base * (n // len(base) + 1))[:n]
+    columns = {key: [reading.get(key) for reading in readings] for key in COLUMNS}
+
+    bodies = {'json': dumps({'readings': readings})}
+    del readings
+    if 'msgpack' in bulk_codec.available_formats():
+        bodies['msgpack'] = bulk_codec._msgpack().packb(columns)
+    if 'arrow' in bulk_codec.available_formats():
+        pa = bulk_codec._arrow()
+        table = pa.table(columns)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        bodies['arrow'] = sink.getvalue().to_pybytes()
+    return bodies
+
+
+def run_json(body) -> dict:
+    """Camino de /predict/batch (format=columnar)"""
+    timings = {}
+    start = time.perf_counter()
+    readings = SENSOR_LIST.validate_python(loads(body)['readings'])
+    timings['parse_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    X = api_model.build_feature_matrix(readings)
+    predictions, intervals, model_version = api_model.score_readings(readings, X, 'full')
+    warnings = [api_model.validate_input_ranges(data) for data in readings]
+    columns = api_model.build_prediction_columns(readings, X, predictions, intervals, warnings, 'full', model_version)
+    timings['score_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    body = FastJSONResponse({
+        'count': len(readings), 'model_version': model_version,
+        'columns': api_model.columns_to_columnar(columns)
+    }).body
+    timings['encode_s'] = time.perf_counter() - start
+    timings['response_bytes'] = len(body)
+    return timings
+
+
+def run_bulk(body, fmt) -> dict:
+    """Camino de /predict/bulk"""
+    timings = {}
+    start = time.perf_counter()
+    batch = bulk_codec.decode(body, fmt)
+    timings['parse_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = api_model.score_bulk(batch)
+    timings['score_s'] = time.perf_counter() - start
+    assert result['rejected'] == 0
+
+    start = time.perf_counter()
+    response = bulk_codec.encode(result, fmt)
+    timings['encode_s'] = time.perf_counter() - start
+    timings['response_bytes'] = len(response)
+    return timings
+
+
+def model_seconds(n) -> float:
+    """Solo el modelo (predicción + intervalos), común a todos los formatos"""
+    from bench_utils import sample_feature_matrix
+    X = sample_feature_matrix(n)
+    start = time.perf_counter()
+    api_model.score_features(X, 'full')
+    return time.perf_counter() - start
+
+
+def median_run(func, repeat) -> dict:
+    runs = []
+    for _ in range(repeat):
+        runs.append(func())
+        gc.collect()
+    return {key: float(np.median([run[key] for run in runs])) for key in runs[0]}
+
+
+def main():
+    require_model()
+    logging.disable(logging.INFO)
+    api_model.load_model()
+    sizes = [n for n in SIZES if '--quick' not in sys.argv or n < 1_000_000]
+
+    print("=" * 86)
+    print(f"BENCHMARK - FORMATOS DE SCORING MASIVO (JSON vs {', '.join(bulk_codec.available_formats())})")
+    print("=" * 86)
+
+    results = {}
+    for n in sizes:
+        bodies = build_bodies(n)
+        model_s = model_seconds(n)
+        results[n] = {'model_s': model_s}
+        print(f"\n{n:,} filas (modelo: {model_s:.2f} s en todos los formatos)")
+        print(f"{'Formato':<10} {'Request':>10} {'Parseo':>10} {'Scoring':>10} {'Respuesta':>10} "
+              f"{'Total':>10} {'Sin modelo':>11} {'Resp. (MB)':>11}")
+        print("-" * 86)
+        for fmt, body in bodies.items():
+            run = (lambda: run_json(body)) if fmt == 'json' else (lambda: run_bulk(body, fmt))
+            timings = median_run(run, REPEAT[n])
+            timings['request_bytes'] = len(body)
+            timings['total_s'] = timings['parse_s'] + timings['score_s'] + timings['encode_s']
+            timings['overhead_s'] = timings['total_s'] - model_s
+            results[n][fmt] = timings
+            print(f"{fmt:<10} {len(body) / 1024**2:>7.1f} MB {timings['parse_s']:>8.3f} s "
+                  f"{timings['score_s']:>8.3f} s {timings['encode_s']:>8.3f} s {timings['total_s']:>8.3f} s "
+                  f"{timings['overhead_s']:>9.3f} s {timings['response_bytes'] / 1024**2:>11.1f}")
+        del bodies
+        gc.collect()
+
+    print("\nParseo + validación respecto de JSON:")
+    for n in sizes:
+        speedups = [f"{fmt} {results[n]['json']['parse_s'] / results[n][fmt]['parse_s']:.0f}x"
+                    for fmt in results[n] if fmt not in ('json', 'model_s')]
+        print(f"   {n:>9,} filas: {' | '.join(speedups)}")
+    print("=" * 86)
+
+    save_results('bulk_formats', {str(n): result for n, result in results.items()})
+    # Los formatos columnares deben ganarle a JSON desde 100k filas
+    return all(
+        results[n][fmt]['total_s'] < results[n]['json']['total_s']
+        for n in sizes if n >= 100_000 for fmt in results[n] if fmt not in ('json', 'model_s')
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,173 @@
+"""
+Benchmark: ingesta directa (/ingest) vs doble salto simulador -> n8n -> /predict
+Mide saltos HTTP, bytes en la red y latencia por lectura. Las alertas de
+/ingest se reciben con el workflow de alertas (v2) ejecutado localmente.
+
+El doble salto se ejecuta en proceso (LocalWorkflowExecutor), así que su
+latencia no incluye la red ni el overhead propio de n8n: el ahorro real es mayor.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench_utils import require_model, save_results, summarize
+
+# Configuración de la API antes de importarla (se lee al importar el módulo)
+CALLBACK_PORT = 8765
+os.environ['ALERT_WEBHOOK_URL'] = f"http://127.0.0.1:{CALLBACK_PORT}/webhook/lithium-alert"
+os.environ['PREDICTION_JOURNAL'] = '0'
+
+from fastapi.testclient import TestClient
+
+import api_model
+from alert_engine import AlertEngine
+from n8n_local_executor import ALERT_WORKFLOW_PATH, LocalWorkflowExecutor
+from bench_n8n_pipeline import simulator_readings
+
+N_READINGS = 2000
+
+
+def compact_size(payload) -> int:
+    """Bytes de un cuerpo JSON compacto (como lo envían n8n y el simulador)"""
+    return len(json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+
+def reset_alert_engine():
+    """Mismo punto de partida para ambos caminos"""
+    engine = api_model.ALERT_ENGINE
+    api_model.ALERT_ENGINE = AlertEngine(
+        engine.enter_threshold, engine.exit_threshold, engine.min_dwell_s, engine.cooldown_s
+    )
+
+
+def start_alert_receiver(executor):
+    """Servidor HTTP local que ejecuta el workflow de alertas por cada callback"""
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            result = executor.execute(body)
+            received.append(result)
+            self.send_response(result.status_code)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', CALLBACK_PORT), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, received
+
+
+def two_hop(readings):
+    """Simulador -> webhook n8n -> /predict (workflow v1 en proceso)"""
+    reset_alert_engine()
+    latencies, bytes_total, alerts = [], 0, 0
+    with LocalWorkflowExecutor(api_mode='inprocess') as executor:
+        for reading in readings:
+            request_body = dict(reading)
+            start = time.perf_counter()
+            result = executor.execute(request_body)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            response_size = compact_size(result.body)
+            # Hop 1: simulador <-> webhook
+            bytes_total += compact_size(reading) + response_size
+            if 'API - Predict' in result.path:
+                # Hop 2: nodo HTTP <-> /predict (lectura validada + respuesta)
+                bytes_total += compact_size(request_body) + response_size
+            alerts += 'Formatear Alerta' in result.path
+    return latencies, bytes_total, alerts
+
+
+def direct(readings):
+    """Simulador -> /ingest (un salto); alertas a n8n en background"""
+    reset_alert_engine()
+    latencies, bytes_total = [], 0
+    with TestClient(api_model.app) as client:
+        for reading in readings:
+            body = json.dumps(reading, separators=(',', ':')).encode('utf-8')
+            start = time.perf_counter()
+            response = client.post('/ingest', content=body, headers={'Content-Type': 'application/json'})
+            latencies.append((time.perf_counter() - start) * 1000)
+            bytes_total += len(body) + len(response.content)
+
+        # Esperar a que el notificador drene antes de cerrar
+        deadline = time.time() + 10
+        while api_model.ALERT_NOTIFIER.stats()['queue_depth'] and time.time() < deadline:
+            time.sleep(0.05)
+        notifier = api_model.ALERT_NOTIFIER.stats()
+        alerts = api_model.ALERT_ENGINE.snapshot()['counters']['alert_start']
+    return latencies, bytes_total, alerts, notifier
+
+
+def main():
+    require_model()
+    logging.disable(logging.INFO)
+
+    readings = simulator_readings(N_READINGS)
+    for reading in readings[::50]:
+        reading['ph'] = 15.0
+
+    print("=" * 70)
+    print(f"BENCHMARK - INGESTA DIRECTA VS N8N -> API ({N_READINGS:,} lecturas)")
+    print("=" * 70)
+
+    alert_executor = LocalWorkflowExecutor(ALERT_WORKFLOW_PATH, api_mode='http').__enter__()
+    server, received = start_alert_receiver(alert_executor)
+    try:
+        # Calentamiento de ambos caminos
+        two_hop(readings[:20])
+        direct(readings[:20])
+        received.clear()
+
+        hop_latency, hop_bytes, hop_alerts = two_hop(readings)
+        direct_latency, direct_bytes, direct_alerts, notifier = direct(readings)
+    finally:
+        server.shutdown()
+        alert_executor.__exit__(None, None, None)
+
+    n = len(readings)
+    valid = n - len(readings[::50])
+    before, after = summarize(hop_latency), summarize(direct_latency)
+    results = {
+        'readings': n,
+        'hops_per_reading_before': (n + valid) / n,
+        'hops_per_reading_after': 1.0,
+        'bytes_per_reading_before': hop_bytes / n,
+        'bytes_per_reading_after': direct_bytes / n,
+        'latency_before': before,
+        'latency_after': after,
+        'alerts_before': hop_alerts,
+        'alerts_after': direct_alerts,
+        'callbacks_received': len(received),
+        'notifier': notifier
+    }
+
+    print(f"\n{'Métrica':<28} {'n8n -> API':>12} {'/ingest':>12} {'Ahorro':>10}")
+    print("-" * 70)
+    rows = [
+        ('Saltos HTTP por lectura', results['hops_per_reading_before'], 1.0, '{:>12.2f}'),
+        ('Bytes por lectura', results['bytes_per_reading_before'], results['bytes_per_reading_after'], '{:>12.0f}'),
+        ('Latencia media (ms)', before['mean_ms'], after['mean_ms'], '{:>12.3f}'),
+        ('Latencia p50 (ms)', before['p50_ms'], after['p50_ms'], '{:>12.3f}'),
+        ('Latencia p99 (ms)', before['p99_ms'], after['p99_ms'], '{:>12.3f}'),
+    ]
+    for label, old, new, fmt in rows:
+        print(f"{label:<28} {fmt.format(old)} {fmt.format(new)} {1 - new / old:>10.1%}")
+    print(f"\nAlertas (ALERT_START):       {hop_alerts} vía workflow | {direct_alerts} vía /ingest")
+    print(f"Callbacks recibidos por n8n: {len(received)} (fallidos: {notifier['failed']}, descartados: {notifier['dropped']})")
+    print("=" * 70)
+
+    save_results('direct_ingest', results)
+    return hop_alerts == direct_alerts == len(received)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
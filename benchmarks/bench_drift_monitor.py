@@ -0,0 +1,109 @@
+"""
+Benchmark: monitor de drift de inputs
+- Costo por actualización (request individual y batch de 1000 lecturas).
+- Memoria constante: el estado no crece con la cantidad de lecturas.
+- Detección: un stream con la distribución de entrenamiento vs uno con
+  humedad y temperatura corridas.
+"""
+
+import os
+import sys
+
+from bench_utils import ML_MODEL_DIR, measure, require_model, sample_feature_matrix, save_results
+
+import joblib
+import numpy as np
+
+from drift_monitor import DriftMonitor, PSI_SIGNIFICANT
+
+N_POZAS = 10
+STREAM_ROWS = 20_000
+
+
+def state_bytes(monitor) -> int:
+    """Bytes de los arrays de estado (global + pozas)"""
+    scopes = [monitor.global_stats, *monitor._pozas.values()]
+    return sum(
+        getattr(stats, field).nbytes
+        for stats in scopes
+        for field in ('n', 'mean', 'm2', 'decile_counts', 'sketch_counts', 'out_of_range')
+    )
+
+
+def main():
+    require_model()
+    metadata = joblib.load(os.path.join(ML_MODEL_DIR, 'model_metadata.pkl'))
+    snapshot = metadata.get('drift_snapshot')
+    if snapshot is None:
+        print("❌ La metadata no tiene drift_snapshot (reentrenar con python train_model.py)")
+        return False
+
+    X = sample_feature_matrix(STREAM_ROWS)
+    pozas = [f'POZA_{i % N_POZAS + 1}' for i in range(STREAM_ROWS)]
+
+    print("=" * 70)
+    print(f"BENCHMARK - MONITOR DE DRIFT ({len(snapshot['feature_names'])} features, {N_POZAS} pozas)")
+    print("=" * 70)
+
+    # 1. Costo por actualización
+    monitor = DriftMonitor(snapshot)
+    single = measure(lambda: monitor.update(X[:1], pozas[:1]), repeat=2000)
+    batch = measure(lambda: monitor.update(X[:1000], pozas[:1000]), repeat=50)
+    report = measure(lambda: monitor.summary(), repeat=20)
+    print(f"\n{'Operación':<32} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    print("-" * 70)
+    print(f"{'update (1 lectura)':<32} {single['p50_ms']:>10.3f} {single['p99_ms']:>10.3f}")
+    print(f"{'update (1000 lecturas)':<32} {batch['p50_ms']:>10.3f} {batch['p99_ms']:>10.3f}")
+    print(f"{'summary (global + pozas)':<32} {report['p50_ms']:>10.3f} {report['p99_ms']:>10.3f}")
+
+    # 2. Memoria constante
+    monitor = DriftMonitor(snapshot)
+    monitor.update(X[:1000], pozas[:1000])
+    bytes_1k = state_bytes(monitor)
+    for start in range(1000, STREAM_ROWS, 1000):
+        monitor.update(X[start:start + 1000], pozas[start:start + 1000])
+    bytes_all = state_bytes(monitor)
+    print(f"\nEstado: {bytes_1k / 1024:.1f} KB con 1,000 lecturas, "
+          f"{bytes_all / 1024:.1f} KB con {STREAM_ROWS:,}")
+
+    # 3. Detección: stream sin cambios vs corrido
+    feature_names = snapshot['feature_names']
+    stable = DriftMonitor(snapshot)
+    stable.update(X, pozas)
+    shifted_X = X.copy()
+    for name, delta in (('humidity_percent', -8.0), ('temperature_c', 6.0)):
+        shifted_X[:, feature_names.index(name)] += delta
+    shifted = DriftMonitor(snapshot)
+    shifted.update(shifted_X, pozas)
+
+    stable_report, shifted_report = stable.report(), shifted.report()
+    print(f"\n{'Feature':<22} {'PSI estable':>12} {'PSI corrido':>12} {'Estado':>15}")
+    print("-" * 70)
+    for name in ('humidity_percent', 'temperature_c', 'ph'):
+        before = stable_report['features'][name]
+        after = shifted_report['features'][name]
+        print(f"{name:<22} {before['psi']:>12.4f} {after['psi']:>12.4f} {after['status']:>15}")
+    print("=" * 70)
+
+    detected = all(
+        shifted_report['features'][name]['psi'] >= PSI_SIGNIFICANT
+        for name in ('humidity_percent', 'temperature_c')
+    )
+
+    save_results('drift_monitor', {
+        'latency_update_1': single,
+        'latency_update_1000': batch,
+        'latency_summary': report,
+        'state_bytes_1k': bytes_1k,
+        'state_bytes_all': bytes_all,
+        'stable_max_psi': stable_report['max_psi'],
+        'shifted_psi': {
+            name: shifted_report['features'][name]['psi']
+            for name in ('humidity_percent', 'temperature_c')
+        }
+    })
+    return bytes_1k == bytes_all and detected
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,156 @@
+"""
+Benchmark: gateway de campo con lotes NDJSON comprimidos vs una lectura por request
+Simula 12 h de operación (3 pozas, una lectura cada 10 s) detrás de un enlace
+satelital (256 kbps, RTT 600 ms) con un corte de 6 h, contra la API real
+(uvicorn en otro proceso) y /ingest/batch. El tiempo de las lecturas es
+virtual; el costo de cada envío es el tiempo real del request más el del
+enlace modelado.
+
+Por encoding: bytes HTTP por lectura (subida y bajada), compresión, latencia
+de envío, demora de entrega por lectura y tiempo de drenado del backlog
+acumulado durante el corte. La referencia es /ingest con una lectura por
+request.
+"""
+
+import sys
+import time
+
+from bench_utils import api_server, require_model, save_results, summarize
+
+import requests
+
+from bench_n8n_pipeline import simulator_readings
+from sensor_simulator import INTERVAL_SECONDS, NUM_POZAS, FieldGateway, SimulatedLink, http_bytes
+
+PORT = 8767
+SERVER_ENV = {'PREDICTION_JOURNAL': '0', 'ALERT_WEBHOOK_URL': '0'}
+
+SIMULATED_HOURS = 12
+OUTAGE = {'outage_every_s': 10 * 3600, 'outage_s': 6 * 3600}  # Arriba 0-4 h, caído 4-10 h, arriba 10-12 h
+SATELLITE = {'bandwidth_bps': 256_000, 'rtt_s': 0.6}
+BATCH_SIZE = 500
+MAX_DELAY_S = 300
+DIRECT_SAMPLE = 300
+
+
+def available_encodings():
+    try:
+        import zstandard  # noqa: F401
+        return ['identity', 'gzip', 'zstd']
+    except ImportError:
+        return ['identity', 'gzip']
+
+
+def link_seconds(up, down):
+    return SATELLITE['rtt_s'] + (up + down) * 8 / SATELLITE['bandwidth_bps']
+
+
+def direct_ingest_reference(base_url, readings) -> dict:
+    """Una lectura por request a /ingest (sin buffer ni compresión)"""
+    up_total = down_total = 0
+    latencies = []
+    with requests.Session() as session:
+        for reading in readings:
+            start = time.perf_counter()
+            response = session.post(f"{base_url}/ingest", json=reading, timeout=10)
+            assert response.status_code == 200, response.text
+            up, down = http_bytes(response)
+            latencies.append((time.perf_counter() - start + link_seconds(up, down)) * 1000)
+            up_total += up
+            down_total += down
+    n = len(readings)
+    return {
+        'readings': n,
+        'wire_bytes_per_reading': (up_total + down_total) / n,
+        'up_bytes_per_reading': up_total / n,
+        'down_bytes_per_reading': down_total / n,
+        'request_ms': summarize(latencies),
+        'link_s_per_reading': link_seconds(up_total / n, down_total / n)
+    }
+
+
+def run_gateway(base_url, encoding, readings) -> dict:
+    """12 h virtuales: lecturas cada INTERVAL_SECONDS, corte de enlace y drenado"""
+    now = [0.0]
+    clock = lambda: now[0]
+    link = SimulatedLink(**OUTAGE, **SATELLITE, sleep=False, clock=clock)
+    gateway = FieldGateway(
+        url=f"{base_url}/ingest/batch", encoding=encoding, batch_size=BATCH_SIZE,
+        max_delay_s=MAX_DELAY_S, link=link, clock=clock
+    )
+    start = time.perf_counter()
+    for i in range(0, len(readings), NUM_POZAS):
+        for reading in readings[i:i + NUM_POZAS]:
+            gateway.add(reading)
+        gateway.pump()
+        now[0] += INTERVAL_SECONDS
+    # Fin de la simulación: vaciar lo que quede en el buffer
+    while gateway.backlog and gateway.flush():
+        pass
+    stats = gateway.stats()
+    gateway.close()
+    stats['wall_s'] = time.perf_counter() - start
+    n = max(stats['readings'], 1)
+    stats['wire_bytes_per_reading'] = (stats['wire_up_bytes'] + stats['wire_down_bytes']) / n
+    stats['up_bytes_per_reading'] = stats['wire_up_bytes'] / n
+    return stats
+
+
+def main():
+    require_model()
+    n_readings = SIMULATED_HOURS * 3600 // INTERVAL_SECONDS * NUM_POZAS
+    readings = simulator_readings(n_readings)
+
+    print("=" * 80)
+    print(f"BENCHMARK - GATEWAY DE CAMPO ({n_readings:,} lecturas en {SIMULATED_HOURS} h simuladas, "
+          f"corte de {OUTAGE['outage_s'] // 3600} h, enlace {SATELLITE['bandwidth_bps'] // 1000} kbps / "
+          f"RTT {SATELLITE['rtt_s'] * 1000:.0f} ms)")
+    print("=" * 80)
+
+    with api_server(PORT, SERVER_ENV) as base_url:
+        direct = direct_ingest_reference(base_url, readings[:DIRECT_SAMPLE])
+
+    results = {}
+    for encoding in available_encodings():
+        # API nueva por encoding: el estado de alertas arranca limpio en cada corrida
+        with api_server(PORT, SERVER_ENV) as base_url:
+            results[encoding] = run_gateway(base_url, encoding, readings)
+
+    print(f"\n{'Envío':<18} {'B/lectura':>10} {'Subida':>8} {'Compr.':>7} {'Lotes':>6} "
+          f"{'Envío p50':>10} {'Envío p99':>10} {'Entrega p99':>12}")
+    print("-" * 80)
+    print(f"{'/ingest (1 x req)':<18} {direct['wire_bytes_per_reading']:>10.0f} "
+          f"{direct['up_bytes_per_reading']:>8.0f} {'-':>7} {'-':>6} "
+          f"{direct['request_ms']['p50_ms']:>8.0f} ms {direct['request_ms']['p99_ms']:>7.0f} ms {'-':>12}")
+    for encoding, stats in results.items():
+        print(f"{'lote ' + encoding:<18} {stats['wire_bytes_per_reading']:>10.1f} "
+              f"{stats['up_bytes_per_reading']:>8.1f} x{stats['compression_ratio']:>5.1f} {stats['batches']:>6} "
+              f"{stats['flush_ms']['p50']:>8.0f} ms {stats['flush_ms']['p99']:>7.0f} ms "
+              f"{stats['delivery_delay_s']['p99'] / 60:>8.0f} min")
+
+    print(f"\n{'Drenado tras el corte':<18} {'Backlog':>10} {'Lotes':>8} {'Tiempo':>10}")
+    print("-" * 80)
+    for encoding, stats in results.items():
+        for drain in stats['drains']:
+            print(f"{encoding:<18} {drain['backlog']:>10,} {drain['batches']:>8} {drain['drain_s']:>8.1f} s")
+    backlog = max((d['backlog'] for s in results.values() for d in s['drains']), default=0)
+    print(f"{'/ingest (1 x req)':<18} {backlog:>10,} {backlog:>8} "
+          f"{backlog * direct['link_s_per_reading']:>8.0f} s (estimado)")
+
+    lost = {encoding: stats['readings'] - stats['delivered'] for encoding, stats in results.items()}
+    savings = direct['wire_bytes_per_reading'] / results['gzip']['wire_bytes_per_reading']
+    print(f"\ngzip: {savings:.0f}x menos bytes por lectura que /ingest | "
+          f"lecturas perdidas: {', '.join(f'{e}={n}' for e, n in lost.items())}")
+    print("=" * 80)
+
+    save_results('gateway_upload', {
+        'readings': n_readings, 'outage': OUTAGE, 'link': SATELLITE, 'batch_size': BATCH_SIZE,
+        'direct_ingest': direct, 'gateway': results
+    })
+    # Sin pérdidas, con al menos un drenado medido y gzip claramente más liviano
+    return (not any(lost.values()) and all(stats['drains'] for stats in results.values())
+            and savings > 3)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,341 @@
+"""
+Benchmark: costo de una predicción, de la llamada al modelo al HTTP
+- Micro: latencia y throughput de cada camino de predicción (sklearn,
+  bosque aplanado con y sin intervalos, compacto, tier rápido) en lotes de
+  1, 10, 100, 10k y 1M filas.
+- Frío vs caliente: carga del artefacto y primera predicción en un proceso
+  nuevo, contra la predicción en régimen.
+- Un thread vs varios: el mismo trabajo repartido en threads (numpy suelta
+  el GIL) y sklearn con n_jobs=1 vs n_jobs=-1.
+- Handler: el camino completo de /predict en proceso, por etapas
+  (validación, features, predicción, armado, serialización).
+- HTTP: /predict contra un uvicorn real con 1, 8 y 32 requests en vuelo.
+
+Las métricas se comparan con benchmarks/baselines/inference.json (latencia
+más de 30% peor o throughput más de 30% menor marca regresión).
+
+    python benchmarks/bench_inference.py                    # suite completa
+    python benchmarks/bench_inference.py --quick            # sin el lote de 1M filas
+    python benchmarks/bench_inference.py --update-baseline  # reemplazar la línea base
+"""
+
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_utils import (ML_MODEL_DIR, api_server, load_baseline, measure, require_model, sample_feature_matrix,
+                         save_baseline, save_results, summarize)
+
+os.environ['PREDICTION_JOURNAL'] = '0'
+os.environ['ALERT_WEBHOOK_URL'] = '0'
+
+import httpx
+import numpy as np
+import pandas as pd
+
+import api_model
+from packed_forest import PackedForest
+from bench_n8n_pipeline import simulator_readings
+
+BATCH_SIZES = [1, 10, 100, 10_000, 1_000_000]
+REPEAT_BY_BATCH = {1: 300, 10: 200, 100: 100, 10_000: 5, 1_000_000: 1}
+# predict_per_tree arma la matriz filas x árboles completa: con 1M filas son ~800 MB
+MAX_INTERVAL_BATCH = 10_000
+
+THREADS = 4
+HTTP_PORT = 8766
+HTTP_REQUESTS = 600
+HTTP_CONCURRENCY = [1, 8, 32]
+
+# Regresión contra la línea base: peor que la tolerancia relativa y, en
+# latencias, por más de MIN_DELTA_MS (las etapas de microsegundos son ruido)
+TOLERANCE = 1.30
+MIN_DELTA_MS = 0.05
+
+COLD_PROBE = """
+import json, sys, time, warnings
+warnings.filterwarnings('ignore')
+start = time.perf_counter()
+sys.path.insert(0, {ml_model_dir!r})
+import numpy as np
+path, row = sys.argv[1], np.array([json.loads(sys.argv[2])])
+if path == 'sklearn':
+    import joblib
+    model = joblib.load('model.pkl')
+    predict = model.predict
+elif path == 'packed':
+    import joblib
+    from packed_forest import PackedForest
+    predict = PackedForest.from_sklearn(joblib.load('model.pkl')).predict
+elif path == 'compact':
+    from packed_forest import PackedForest
+    predict = PackedForest.load('model_compact.npz').predict
+else:
+    from model_registry import load_forest
+    predict = load_forest('model.pkl').predict
+loaded = time.perf_counter()
+predict(row)
+first = time.perf_counter()
+samples = []
+for _ in range(200):
+    t = time.perf_counter()
+    predict(row)
+    samples.append((time.perf_counter() - t) * 1000)
+print(json.dumps({{
+    'load_ms': (loaded - start) * 1000,
+    'first_predict_ms': (first - loaded) * 1000,
+    'warm_p50_ms': sorted(samples)[len(samples) // 2]
+}}))
+"""
+
+
+def prediction_paths():
+    """Caminos de predicción disponibles: nombre -> (función de X, soporta 1M)"""
+    model, forest = api_model.MODEL, api_model.FOREST
+    feature_cols = api_model.FEATURE_NAMES
+    paths = {
+        'sklearn_dataframe': (lambda X: model.predict(pd.DataFrame(X, columns=feature_cols)), True),
+        'sklearn_numpy': (lambda X: model.predict(X), True),
+        'packed_point': (forest.predict, True),
+        'packed_intervals': (lambda X: api_model.score_forest(forest, X), False),
+    }
+    compact_path = os.path.join(ML_MODEL_DIR, 'model_compact.npz')
+    if os.path.exists(compact_path):
+        paths['compact_point'] = (PackedForest.load(compact_path).predict, True)
+    if api_model.FAST_MODEL is not None:
+        paths['fast_point'] = (api_model.FAST_MODEL.predict, True)
+    return paths
+
+
+def micro_benchmark(batch_sizes):
+    print(f"\n{'Micro (p50 ms | filas/s)':<22}" + "".join(f"{b:>19,}" for b in batch_sizes))
+    print("-" * (22 + 19 * len(batch_sizes)))
+    matrices = {batch: sample_feature_matrix(batch) for batch in batch_sizes}
+    results = {}
+    for name, (predict, large_ok) in prediction_paths().items():
+        cells, results[name] = [], {}
+        for batch in batch_sizes:
+            if batch > MAX_INTERVAL_BATCH and not large_ok:
+                cells.append(f"{'-':>19}")
+                continue
+            X = matrices[batch]
+            stats = measure(lambda: predict(X), repeat=REPEAT_BY_BATCH[batch],
+                            warmup=1 if batch >= 10_000 else 3)
+            stats['rows_per_s'] = batch / (stats['p50_ms'] / 1000)
+            results[name][str(batch)] = stats
+            cells.append(f"{stats['p50_ms']:>11.3f} {_compact_rate(stats['rows_per_s']):>7}")
+        print(f"{name:<22}" + "".join(cells))
+    return results
+
+
+def _compact_rate(rate):
+    return f"{rate / 1e6:.1f}M" if rate >= 1e6 else f"{rate / 1e3:.0f}k" if rate >= 1e3 else f"{rate:.0f}"
+
+
+def cold_vs_warm():
+    row = json.dumps(sample_feature_matrix(1)[0].tolist())
+    print(f"\n{'Frío vs caliente (1 fila)':<26} {'Carga (ms)':>11} {'1ra pred. (ms)':>15} {'Régimen (ms)':>13}")
+    print("-" * 70)
+    results = {}
+    for path in ('sklearn', 'packed', 'compact', 'store_mmap'):
+        if path == 'compact' and not os.path.exists(os.path.join(ML_MODEL_DIR, 'model_compact.npz')):
+            continue
+        proc = subprocess.run(
+            [sys.executable, '-c', COLD_PROBE.format(ml_model_dir=ML_MODEL_DIR), path, row],
+            capture_output=True, text=True, cwd=ML_MODEL_DIR
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr[-2000:])
+        result = results[path] = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{path:<26} {result['load_ms']:>11.1f} {result['first_predict_ms']:>15.2f} "
+              f"{result['warm_p50_ms']:>13.3f}")
+    return results
+
+
+def threading_benchmark():
+    """Mismo trabajo total con 1 thread y con THREADS threads"""
+    forest, model = api_model.FOREST, api_model.MODEL
+    X = sample_feature_matrix(100)
+    calls = 400
+
+    def run(threads):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(lambda _: forest.predict(X), range(calls)))
+        return calls * len(X) / (time.perf_counter() - start)
+
+    run(1)
+    packed = {'1': run(1), str(THREADS): run(THREADS)}
+
+    X_large = sample_feature_matrix(10_000)
+    original = model.n_jobs
+    sklearn = {}
+    for n_jobs in (1, -1):
+        model.n_jobs = n_jobs
+        stats = measure(lambda: model.predict(X_large), repeat=5, warmup=1)
+        sklearn[str(n_jobs)] = len(X_large) / (stats['p50_ms'] / 1000)
+    model.n_jobs = original
+
+    print(f"\nThreads ({os.cpu_count()} núcleos)")
+    print(f"   Bosque aplanado, lotes de 100: {packed['1']:>10,.0f} filas/s (1 thread) | "
+          f"{packed[str(THREADS)]:>10,.0f} filas/s ({THREADS} threads)")
+    print(f"   sklearn, lote de 10k:          {sklearn['1']:>10,.0f} filas/s (n_jobs=1) | "
+          f"{sklearn['-1']:>10,.0f} filas/s (n_jobs=-1)")
+    return {'packed_threads_rows_per_s': packed, 'sklearn_n_jobs_rows_per_s': sklearn}
+
+
+def handler_benchmark():
+    """Camino de /predict en proceso, por etapa y completo"""
+    payloads = simulator_readings(500)
+    readings = [api_model.SensorData.model_validate(p) for p in payloads]
+    loop = asyncio.new_event_loop()
+    cursor = {'i': 0}
+
+    def next_index():
+        cursor['i'] = (cursor['i'] + 1) % len(payloads)
+        return cursor['i']
+
+    def assemble():
+        data = readings[next_index()]
+        X = api_model.build_feature_matrix([data])
+        predictions, intervals, version = api_model.score_readings([data], X, 'full')
+        columns = api_model.build_prediction_columns(
+            [data], X, predictions, intervals, [api_model.validate_input_ranges(data)], 'full', version
+        )
+        return api_model.columns_to_records(columns)[0]
+
+    record = assemble()
+    X_one = api_model.build_feature_matrix([readings[0]])
+    stages = {
+        'validation': lambda: api_model.SensorData.model_validate(payloads[next_index()]),
+        'features': lambda: api_model.build_feature_matrix([readings[next_index()]]),
+        'predict': lambda: api_model.score_readings([readings[0]], X_one, 'full'),
+        'assembly': assemble,
+        'serialization': lambda: api_model.FastJSONResponse(record).body,
+        'handler_total': lambda: loop.run_until_complete(api_model.predict_concentration(
+            api_model.SensorData.model_validate(payloads[next_index()])
+        )),
+    }
+    results = {name: measure(func, repeat=2000, warmup=20) for name, func in stages.items()}
+    loop.close()
+
+    print(f"\n{'Handler /predict en proceso':<28} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    print("-" * 70)
+    for name, stats in results.items():
+        print(f"{name:<28} {stats['p50_ms']:>10.4f} {stats['p99_ms']:>10.4f}")
+    return results
+
+
+def http_benchmark():
+    """/predict contra uvicorn en otro proceso, con N requests concurrentes"""
+    with api_server(HTTP_PORT) as base_url:
+        return asyncio.run(_http_levels(base_url, simulator_readings(HTTP_REQUESTS)))
+
+
+async def _http_levels(base_url, payloads):
+    results = {}
+    print(f"\n{'HTTP /predict':<16} {'req/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    print("-" * 70)
+    async with httpx.AsyncClient(base_url=base_url, limits=httpx.Limits(max_connections=64)) as client:
+        for payload in payloads[:50]:
+            await client.post('/predict', json=payload)
+
+        for concurrency in HTTP_CONCURRENCY:
+            latencies, queue = [], list(payloads)
+
+            async def worker():
+                while queue:
+                    payload = queue.pop()
+                    start = time.perf_counter()
+                    response = await client.post('/predict', json=payload)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    assert response.status_code == 200
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+            stats = summarize(latencies)
+            stats['requests_per_s'] = len(latencies) / elapsed
+            results[str(concurrency)] = stats
+            print(f"{'c=' + str(concurrency):<16} {stats['requests_per_s']:>10,.0f} "
+                  f"{stats['p50_ms']:>10.2f} {stats['p99_ms']:>10.2f}")
+    return results
+
+
+def flatten_metrics(report) -> dict:
+    """Métricas comparables con la línea base (sufijo _per_s: más es mejor)"""
+    metrics = {}
+    for path, batches in report['micro'].items():
+        for batch, stats in batches.items():
+            metrics[f'micro.{path}.{batch}.p50_ms'] = stats['p50_ms']
+    for stage, stats in report['handler'].items():
+        metrics[f'handler.{stage}.p50_ms'] = stats['p50_ms']
+    for concurrency, stats in report['http'].items():
+        metrics[f'http.c{concurrency}.p50_ms'] = stats['p50_ms']
+        metrics[f'http.c{concurrency}.requests_per_s'] = stats['requests_per_s']
+    return metrics
+
+
+def compare_baseline(metrics, baseline) -> list[str]:
+    regressions = []
+    for key, value in metrics.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        if key.endswith('_per_s'):
+            worse = value < reference / TOLERANCE
+        else:
+            worse = value > reference * TOLERANCE and value - reference > MIN_DELTA_MS
+        if worse:
+            regressions.append(f"{key}: {value:.4g} vs {reference:.4g}")
+    return regressions
+
+
+def main():
+    require_model()
+    quick = '--quick' in sys.argv
+    batch_sizes = [b for b in BATCH_SIZES if not quick or b <= 10_000]
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    logging.disable(logging.INFO)
+    api_model.load_model()
+
+    print("=" * 70)
+    print(f"BENCHMARK - INFERENCIA ({os.cpu_count()} núcleos)")
+    print("=" * 70)
+
+    report = {
+        'cores': os.cpu_count(),
+        'micro': micro_benchmark(batch_sizes),
+        'cold_warm': cold_vs_warm(),
+        'threads': threading_benchmark(),
+        'handler': handler_benchmark(),
+        'http': http_benchmark(),
+    }
+    metrics = flatten_metrics(report)
+
+    baseline = load_baseline('inference')
+    regressions = compare_baseline(metrics, baseline['metrics']) if baseline else []
+    if baseline is None:
+        print("\n⚠️  Sin línea base (--update-baseline para crearla)")
+    elif regressions:
+        print(f"\n❌ Regresiones contra la línea base ({baseline['cores']} núcleos):")
+        for line in regressions:
+            print(f"   {line}")
+    else:
+        print(f"\n✅ Sin regresiones contra la línea base (tolerancia ±{TOLERANCE - 1:.0%})")
+    print("=" * 70)
+
+    save_results('inference', {**report, 'metrics': metrics, 'regressions': regressions})
+    if '--update-baseline' in sys.argv:
+        save_baseline('inference', {'cores': report['cores'], 'metrics': metrics})
+    return not regressions
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
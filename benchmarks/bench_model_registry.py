@@ -0,0 +1,165 @@
+"""
+Benchmark: registro multi-modelo con ruteo por poza
+- Deduplicación: 20 ids de modelo sobre 4 artefactos distintos.
+- Memoria compartida: N workers con 20 modelos distintos, arrays mapeados
+  (mmap) vs copia privada por worker (PSS de cada proceso).
+- Ruteo: costo del lookup por poza y del scoring agrupado por modelo.
+"""
+
+import copy
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+from bench_utils import ML_MODEL_DIR, measure, require_model, sample_feature_matrix, save_results
+
+import joblib
+import numpy as np
+
+from model_registry import ModelRegistry
+from packed_forest import PackedForest
+
+N_MODELS = 20
+N_ARTIFACTS_DEDUP = 4
+N_WORKERS = 4
+TREES_PER_MODEL = 60
+BATCH_ROWS = 1000
+
+
+def build_artifacts(directory, n):
+    """n modelos distintos: subconjuntos de árboles del modelo entrenado"""
+    model = joblib.load(os.path.join(ML_MODEL_DIR, 'model.pkl'))
+    paths = []
+    for i in range(n):
+        sub = copy.copy(model)
+        start = (i * 7) % (len(model.estimators_) - TREES_PER_MODEL)
+        sub.estimators_ = model.estimators_[start:start + TREES_PER_MODEL] + model.estimators_[i:i + 1]
+        sub.n_estimators = len(sub.estimators_)
+        path = os.path.join(directory, f'model_{i:02d}.npz')
+        PackedForest.from_sklearn(sub).save(path)
+        paths.append(path)
+    return paths
+
+
+def _pss_kb():
+    """PSS y RSS del proceso actual (kB)"""
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key] = int(rest.split()[0])
+    return values
+
+
+def _worker(paths, store_dir, mmap, X, barrier, results):
+    """Cargar el registro, usar todos los modelos y reportar memoria"""
+    before = _pss_kb()
+    registry = ModelRegistry(store_dir, mmap=mmap)
+    for i, path in enumerate(paths):
+        registry.register(f'm{i}', path)
+    for entry in registry:
+        entry.forest.predict(X)
+    # Medir con todos los workers cargados (PSS reparte páginas compartidas)
+    barrier.wait()
+    after = _pss_kb()
+    results.put({key: after[key] - before[key] for key in after})
+    barrier.wait()
+
+
+def worker_memory(paths, store_dir, mmap, X):
+    ctx = mp.get_context('spawn')
+    barrier = ctx.Barrier(N_WORKERS)
+    results = ctx.Queue()
+    workers = [
+        ctx.Process(target=_worker, args=(paths, store_dir, mmap, X, barrier, results))
+        for _ in range(N_WORKERS)
+    ]
+    for w in workers:
+        w.start()
+    samples = [results.get() for _ in workers]
+    for w in workers:
+        w.join()
+    return {
+        'pss_kb_total': sum(s['Pss'] for s in samples),
+        'rss_kb_per_worker': max(s['Rss'] for s in samples)
+    }
+
+
+def main():
+    require_model()
+    X = sample_feature_matrix(BATCH_ROWS)
+
+    print("=" * 70)
+    print(f"BENCHMARK - REGISTRO DE MODELOS ({N_MODELS} modelos, {N_WORKERS} workers)")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = build_artifacts(tmp, N_MODELS)
+        store_dir = os.path.join(tmp, 'store')
+
+        # 1. Deduplicación: 20 ids -> 4 artefactos
+        registry = ModelRegistry(store_dir)
+        for i in range(N_MODELS):
+            registry.register(f'poza-model-{i}', paths[i % N_ARTIFACTS_DEDUP])
+        totals = registry.memory_report()['totals']
+        print(f"\nDeduplicación ({N_MODELS} ids, {totals['unique_artifacts']} artefactos):")
+        print(f"   Sin dedup:  {totals['naive_bytes'] / 1024**2:8.1f} MB")
+        print(f"   Con dedup:  {totals['unique_bytes'] / 1024**2:8.1f} MB")
+
+        # 2. Memoria por worker: mmap compartido vs copia privada
+        shared = worker_memory(paths, store_dir, True, X[:100])
+        private = worker_memory(paths, store_dir, False, X[:100])
+        print(f"\nMemoria de {N_MODELS} modelos distintos en {N_WORKERS} workers (PSS total):")
+        print(f"   Copia privada:  {private['pss_kb_total'] / 1024:8.1f} MB")
+        print(f"   mmap compartido:{shared['pss_kb_total'] / 1024:8.1f} MB "
+              f"({1 - shared['pss_kb_total'] / private['pss_kb_total']:.1%} menos)")
+
+        # 3. Ruteo: lookup O(1) y scoring agrupado vs un solo modelo
+        registry = ModelRegistry(store_dir)
+        for i, path in enumerate(paths):
+            registry.register(f'm{i}', path)
+            registry.set_route(f'POZA_{i}', f'm{i}')
+        pozas = [f'POZA_{i % N_MODELS}' for i in range(BATCH_ROWS)]
+
+        start = time.perf_counter()
+        for _ in range(100):
+            for poza_id in pozas:
+                registry.route(poza_id)
+        lookup_ns = (time.perf_counter() - start) / (100 * BATCH_ROWS) * 1e9
+
+        single = registry.get('m0').forest
+
+        def grouped():
+            groups = {}
+            for i, poza_id in enumerate(pozas):
+                groups.setdefault(registry.route(poza_id), []).append(i)
+            out = np.empty(BATCH_ROWS)
+            for entry, rows in groups.items():
+                out[rows] = entry.forest.predict(X[rows])
+            return out
+
+        one_model = measure(lambda: single.predict(X), repeat=20)
+        routed = measure(grouped, repeat=20)
+        print(f"\nRuteo ({BATCH_ROWS} lecturas repartidas en {N_MODELS} modelos):")
+        print(f"   Lookup por poza:           {lookup_ns:8.0f} ns")
+        print(f"   Un solo modelo (p50):      {one_model['p50_ms']:8.2f} ms")
+        print(f"   Agrupado por modelo (p50): {routed['p50_ms']:8.2f} ms")
+        print("=" * 70)
+
+    save_results('model_registry', {
+        'dedup': totals,
+        'workers': N_WORKERS,
+        'memory_shared': shared,
+        'memory_private': private,
+        'route_lookup_ns': lookup_ns,
+        'latency_single_model': one_model,
+        'latency_routed': routed
+    })
+    return shared['pss_kb_total'] < private['pss_kb_total']
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,99 @@
+"""
+Benchmark: pipeline completo del workflow n8n ejecutado en proceso
+Simulador -> Webhook -> Validar Datos -> IF -> /predict (ASGI) -> IF -> Log/Alerta -> respuesta
+Reporta throughput, latencia extremo a extremo y desglose por nodo.
+"""
+
+import logging
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bench_utils import require_model, save_results, summarize
+
+from n8n_local_executor import LocalWorkflowExecutor, node_timing_summary
+from sensor_simulator import INTERVAL_SECONDS, NUM_POZAS, generate_sensor_reading
+
+N_READINGS = 2000
+SEED = 42
+
+
+def simulator_readings(n):
+    """Lecturas como las de continuous_monitoring, con timestamps simulados"""
+    random.seed(SEED)
+    start = datetime(2025, 1, 1)
+    days = {f"POZA_{i+1}": random.uniform(30, 150) for i in range(NUM_POZAS)}
+    readings = []
+    while len(readings) < n:
+        ts = start + timedelta(seconds=len(readings) // NUM_POZAS * INTERVAL_SECONDS)
+        for poza_id in days:
+            reading = generate_sensor_reading(poza_id, days[poza_id])
+            reading['timestamp'] = ts.isoformat()
+            readings.append(reading)
+            days[poza_id] = days[poza_id] + random.uniform(0.5, 2)
+            if days[poza_id] >= 179:
+                days[poza_id] = random.uniform(30, 60)
+    return readings[:n]
+
+
+def main():
+    require_model()
+    # Sin logs por request (httpx / api_model) durante la medición
+    logging.disable(logging.INFO)
+
+    readings = simulator_readings(N_READINGS)
+    # Una lectura inválida cada 50 para ejercitar la rama de error
+    for reading in readings[::50]:
+        reading['ph'] = 15.0
+
+    print("=" * 70)
+    print(f"BENCHMARK - PIPELINE N8N EN PROCESO ({N_READINGS:,} lecturas)")
+    print("=" * 70)
+
+    with LocalWorkflowExecutor(api_mode='inprocess') as executor:
+        for warning in executor.drift:
+            print(f"⚠️  {warning}")
+        for reading in readings[:20]:
+            executor.execute(dict(reading))
+
+        results = []
+        start = time.perf_counter()
+        for reading in readings:
+            results.append(executor.execute(dict(reading)))
+        elapsed = time.perf_counter() - start
+
+    latency = summarize([r.total_ms for r in results])
+    nodes = node_timing_summary(results)
+    statuses = {}
+    for r in results:
+        statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+    errors = sum(1 for r in results if 'Responder Error' in r.path)
+    alerts = sum(1 for r in results if 'Formatear Alerta' in r.path)
+
+    print(f"\nThroughput:      {len(results) / elapsed:,.0f} lecturas/s")
+    print(f"Latencia e2e:    media {latency['mean_ms']:.3f} ms | p50 {latency['p50_ms']:.3f} ms | p99 {latency['p99_ms']:.3f} ms")
+    print(f"Respuestas:      {statuses} | {errors} inválidas | {alerts} alertas")
+
+    print(f"\n{'Nodo':<26} {'Ejecuciones':>11} {'Media (ms)':>11} {'p99 (ms)':>10} {'% tiempo':>9}")
+    print("-" * 70)
+    total = sum(s['mean_ms'] * s['count'] for s in nodes.values())
+    for name, s in nodes.items():
+        share = s['mean_ms'] * s['count'] / total
+        print(f"{name:<26} {s['count']:>11,} {s['mean_ms']:>11.3f} {s['p99_ms']:>10.3f} {share:>9.1%}")
+    print("=" * 70)
+
+    save_results('n8n_pipeline', {
+        'readings': len(results),
+        'throughput_per_s': len(results) / elapsed,
+        'latency': latency,
+        'status_codes': statuses,
+        'invalid': errors,
+        'alerts': alerts,
+        'nodes': nodes
+    })
+    return all(code == 200 for code in statuses)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,71 @@
+"""
+Benchmark: costo de los intervalos de predicción por árbol
+Compara la predicción puntual contra predicción + P10/P50/P90 en lote 1 y 1000
+"""
+
+import os
+
+from bench_utils import ML_MODEL_DIR, measure, require_model, sample_feature_matrix, save_results
+
+import joblib
+import pandas as pd
+
+from packed_forest import PackedForest, interval_summary
+
+# Sobrecosto máximo aceptado de los intervalos sobre la predicción puntual
+MAX_OVERHEAD = 0.20
+BATCH_SIZES = [1, 1000]
+
+
+def main():
+    model = joblib.load(require_model())
+    metadata = joblib.load(os.path.join(ML_MODEL_DIR, 'model_metadata.pkl'))
+    feature_cols = metadata['feature_cols']
+    forest = PackedForest.from_sklearn(model)
+
+    print("=" * 70)
+    print("BENCHMARK - INTERVALOS DE PREDICCIÓN POR ÁRBOL")
+    print("=" * 70)
+    print(f"Árboles: {forest.n_trees} | Nodos: {forest.node_count} | Profundidad: {forest.max_depth}")
+
+    results = {'max_overhead': MAX_OVERHEAD, 'batches': {}}
+    ok = True
+
+    for batch in BATCH_SIZES:
+        X = sample_feature_matrix(batch)
+        X_df = pd.DataFrame(X, columns=feature_cols)
+        repeat = 200 if batch == 1 else 30
+
+        sklearn_point = measure(lambda: model.predict(X_df), repeat=repeat)
+        packed_point = measure(lambda: forest.predict(X), repeat=repeat)
+        packed_interval = measure(lambda: interval_summary(forest.predict_per_tree(X)), repeat=repeat)
+
+        # El presupuesto se mide contra la predicción puntual que usaba la API
+        # (sklearn); el sobrecosto sobre PackedForest puntual es informativo
+        overhead = packed_interval['p50_ms'] / packed_point['p50_ms'] - 1
+        vs_sklearn = packed_interval['p50_ms'] / sklearn_point['p50_ms'] - 1
+        ok = ok and vs_sklearn <= MAX_OVERHEAD
+
+        print(f"\nLote de {batch} fila(s) (p50 ms)")
+        print(f"   {'sklearn predict (DataFrame)':<34} {sklearn_point['p50_ms']:>9.3f}")
+        print(f"   {'PackedForest predict':<34} {packed_point['p50_ms']:>9.3f}")
+        print(f"   {'PackedForest + P10/P50/P90':<34} {packed_interval['p50_ms']:>9.3f}")
+        print(f"   Intervalos vs sklearn predict:    {vs_sklearn * 100:+.1f}%")
+        print(f"   Intervalos vs PackedForest:       {overhead * 100:+.1f}%")
+
+        results['batches'][str(batch)] = {
+            'sklearn_point': sklearn_point,
+            'packed_point': packed_point,
+            'packed_interval': packed_interval,
+            'interval_overhead': overhead,
+            'interval_vs_sklearn': vs_sklearn
+        }
+
+    results['within_budget'] = ok
+    print("\n" + ("✅" if ok else "❌") + f" Sobrecosto dentro del presupuesto ({MAX_OVERHEAD:.0%})")
+    save_results('prediction_intervals', results)
+    return ok
+
+
+if __name__ == "__main__":
+    main()
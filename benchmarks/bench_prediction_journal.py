@@ -0,0 +1,108 @@
+"""
+Benchmark: throughput del journal de predicciones
+Mide el costo de encolar en el request y la tasa sostenida del writer SQLite
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from bench_utils import save_results
+
+import numpy as np
+
+from api_model import SensorData
+from prediction_journal import PredictionJournal, DROP_NEWEST
+
+# Tasa mínima sostenida requerida (registros/seg)
+TARGET_RATE = 50_000
+N_RECORDS = 500_000
+BATCH_ROWS = 100           # Lecturas por request (/predict/batch)
+
+
+def _records(n):
+    """Lotes sintéticos con la misma forma que encola la API (un registro por request)"""
+    data = SensorData(
+        poza_id="POZA_1", days_evaporation=87.5, temperature_c=24.5, humidity_percent=18.2,
+        ph=7.8, conductivity_ms_cm=98.3, density_g_cm3=1.182, mg_li_ratio=5.2, ca_li_ratio=1.3
+    )
+    readings = [data] * BATCH_ROWS
+    X = np.tile(np.arange(12, dtype=np.float64), (BATCH_ROWS, 1))
+    predictions = 3298.0 + np.arange(BATCH_ROWS) % 100
+    return [
+        (time.time(), readings, X, predictions, predictions * 0.93, predictions * 1.09,
+         ["ALTA"] * BATCH_ROWS, ["Bueno"] * BATCH_ROWS, "RandomForestRegressor")
+        for _ in range(n // BATCH_ROWS)
+    ]
+
+
+def bench_sustained(path, n):
+    """Encolar n registros (en lotes) a la máxima velocidad y medir hasta que se escriben"""
+    journal = PredictionJournal(path, max_queue=n + 1).start()
+    records = _records(n)
+
+    start = time.perf_counter()
+    for record in records:
+        journal.record(record)
+    enqueue_s = time.perf_counter() - start
+
+    journal.stop(timeout=120)
+    total_s = time.perf_counter() - start
+
+    return {
+        'records': n,
+        'batch_rows': BATCH_ROWS,
+        'enqueue_us_per_batch': enqueue_s / len(records) * 1e6,
+        'enqueue_rate': n / enqueue_s,
+        'end_to_end_rate': journal.written / total_s,
+        'written': journal.written,
+        'batches': journal.batches,
+        'dropped': journal.dropped
+    }
+
+
+def bench_overflow(path, n):
+    """Cola chica sin writer activo: la política descarta, el request no espera"""
+    journal = PredictionJournal(path, max_queue=1000, overflow_policy=DROP_NEWEST)
+    records = _records(n)
+    start = time.perf_counter()
+    for record in records:
+        journal.record(record)
+    elapsed = time.perf_counter() - start
+    return {
+        'records': n,
+        'max_queue': 1000,
+        'dropped': journal.dropped,
+        'enqueue_us_per_batch': elapsed / len(records) * 1e6
+    }
+
+
+def main():
+    print("=" * 70)
+    print("BENCHMARK - JOURNAL DE PREDICCIONES")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sustained = bench_sustained(os.path.join(tmp, 'journal.db'), N_RECORDS)
+        overflow = bench_overflow(os.path.join(tmp, 'overflow.db'), 100_000)
+
+    ok = sustained['end_to_end_rate'] >= TARGET_RATE and sustained['written'] == N_RECORDS
+
+    print(f"\nSostenido ({N_RECORDS:,} registros en lotes de {BATCH_ROWS})")
+    print(f"   Encolar:              {sustained['enqueue_us_per_batch']:.2f} µs/lote")
+    print(f"   Tasa de encolado:     {sustained['enqueue_rate']:,.0f} reg/s")
+    print(f"   Tasa extremo a extremo (hasta commit): {sustained['end_to_end_rate']:,.0f} reg/s")
+    print(f"   Escritos: {sustained['written']:,} en {sustained['batches']} lotes")
+    print(f"\nOverflow (cola de 1000, drop_newest)")
+    print(f"   Descartados: {overflow['dropped']:,} de {overflow['records']:,}")
+    print(f"   Encolar con cola llena: {overflow['enqueue_us_per_batch']:.2f} µs/lote")
+
+    print("\n" + ("✅" if ok else "❌") + f" Objetivo {TARGET_RATE:,} reg/s")
+    save_results('prediction_journal', {'target_rate': TARGET_RATE, 'sustained': sustained,
+                                        'overflow': overflow, 'within_budget': ok})
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,227 @@
+"""
+Benchmark: servidor pre-fork (ml_model/serve.py) de 1 a N workers
+Throughput y latencia de /predict con 1..N workers sobre el mismo socket,
+memoria por worker (RSS, PSS y privada, de /proc/<pid>/smaps_rollup) con y
+sin gc.freeze, y errores durante una recarga del modelo (SIGHUP) con carga.
+La carga la generan procesos cliente aparte, con requests concurrentes
+durante un tiempo fijo.
+
+    python benchmarks/bench_prefork.py           # 1..max(CPUs, 2) workers
+    python benchmarks/bench_prefork.py --quick   # 1 y 2 workers, corridas cortas
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bench_utils import ML_MODEL_DIR, require_model, save_results, summarize
+
+import httpx
+
+from bench_n8n_pipeline import simulator_readings
+
+PORT = 8768
+SERVER_ENV = {'PREDICTION_JOURNAL': '0', 'ALERT_WEBHOOK_URL': '0'}
+CPUS = os.cpu_count() or 1
+CONCURRENCY = 32
+CLIENT_PROCESSES = max(1, min(CPUS // 2, 8))
+DURATION_S = 3 if '--quick' in sys.argv else 8
+WORKER_COUNTS = [1, 2] if '--quick' in sys.argv else list(range(1, max(CPUS, 2) + 1))
+
+
+class PreforkProcess:
+    """serve.py en otro proceso; listo cuando el padre informa todos los workers arriba"""
+
+    def __init__(self, workers, freeze=True):
+        args = [sys.executable, 'serve.py', f'--workers={workers}', f'--port={PORT}', '--host=127.0.0.1']
+        if not freeze:
+            args.append('--no-freeze')
+        self.process = subprocess.Popen(
+            args, cwd=ML_MODEL_DIR, env={**os.environ, **SERVER_ENV},
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        for line in self.process.stdout:
+            if 'workers listos' in line:
+                break
+        else:
+            raise RuntimeError("serve.py terminó sin levantar los workers")
+        # Vaciar stdout en background para que el padre nunca se bloquee escribiendo
+        threading.Thread(target=self.process.stdout.read, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{PORT}"
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def worker_pids(self) -> list[int]:
+        with open(f'/proc/{self.pid}/task/{self.pid}/children') as f:
+            return [int(pid) for pid in f.read().split()]
+
+    def close(self):
+        self.process.send_signal(signal.SIGTERM)
+        self.process.wait(60)
+
+
+def smaps(pid) -> dict:
+    """RSS, PSS y memoria privada (KB) de un proceso"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss_kb': values['Rss'],
+        'pss_kb': values['Pss'],
+        'private_kb': values['Private_Clean'] + values['Private_Dirty'],
+        'shared_kb': values['Shared_Clean'] + values['Shared_Dirty']
+    }
+
+
+def memory_report(server) -> dict:
+    workers = [smaps(pid) for pid in server.worker_pids()]
+    parent = smaps(server.pid)
+    n = len(workers)
+    return {
+        'parent': parent,
+        'workers': n,
+        'worker_rss_kb': sum(w['rss_kb'] for w in workers) / n,
+        'worker_pss_kb': sum(w['pss_kb'] for w in workers) / n,
+        'worker_private_kb': sum(w['private_kb'] for w in workers) / n,
+        'total_pss_kb': parent['pss_kb'] + sum(w['pss_kb'] for w in workers),
+        # N procesos independientes: cada uno con su propia copia (todo privado)
+        'independent_kb': n * max(w['rss_kb'] for w in workers)
+    }
+
+
+def client_load(args) -> dict:
+    """Proceso cliente: `concurrency` requests en vuelo durante `duration_s`"""
+    base_url, concurrency, duration_s, seed = args
+    readings = simulator_readings(200)
+    payloads = readings[seed % 200:] + readings[:seed % 200]
+
+    async def run():
+        latencies, errors = [], []
+        deadline = time.perf_counter() + duration_s
+        async with httpx.AsyncClient(base_url=base_url, limits=httpx.Limits(max_connections=concurrency)) as client:
+            async def worker(offset):
+                i = offset
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        response = await client.post('/predict', json=payloads[i % len(payloads)], timeout=30)
+                        ok = response.status_code == 200
+                    except httpx.HTTPError:
+                        ok = False
+                    if ok:
+                        latencies.append((time.perf_counter() - start) * 1000)
+                    else:
+                        errors.append(time.perf_counter())
+                    i += concurrency
+            await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+        return {'latencies': latencies, 'errors': len(errors)}
+
+    return asyncio.run(run())
+
+
+def drive_load(base_url, duration_s=DURATION_S, during=None) -> dict:
+    """Carga desde CLIENT_PROCESSES procesos; `during()` corre a mitad de la carga (p. ej. SIGHUP)"""
+    per_client = max(1, CONCURRENCY // CLIENT_PROCESSES)
+    with ProcessPoolExecutor(CLIENT_PROCESSES) as pool:
+        start = time.perf_counter()
+        futures = [pool.submit(client_load, (base_url, per_client, duration_s, i * 37)) for i in range(CLIENT_PROCESSES)]
+        if during is not None:
+            time.sleep(duration_s / 3)
+            during()
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+    latencies = [ms for result in results for ms in result['latencies']]
+    stats = summarize(latencies) if latencies else {'n': 0, 'p50_ms': None, 'p99_ms': None}
+    stats['requests_per_s'] = len(latencies) / elapsed
+    stats['errors'] = sum(result['errors'] for result in results)
+    return stats
+
+
+def warmup(base_url):
+    with httpx.Client(base_url=base_url) as client:
+        for payload in simulator_readings(100):
+            client.post('/predict', json=payload)
+
+
+def main():
+    require_model()
+    print("=" * 92)
+    print(f"BENCHMARK - SERVIDOR PRE-FORK ({CPUS} CPUs, {CLIENT_PROCESSES} procesos cliente, "
+          f"{CONCURRENCY} requests en vuelo, {DURATION_S} s por corrida)")
+    print("=" * 92)
+
+    results = {'cpus': CPUS, 'scaling': {}, 'freeze': {}}
+    print(f"\n{'Workers':<8} {'req/s':>8} {'x1':>6} {'p50 (ms)':>9} {'p99 (ms)':>9} {'Errores':>8} "
+          f"{'RSS/worker':>11} {'PSS/worker':>11} {'Priv/worker':>12} {'PSS total':>10} {'N indep.':>10}")
+    print("-" * 92)
+    for workers in WORKER_COUNTS:
+        server = PreforkProcess(workers)
+        try:
+            warmup(server.base_url)
+            stats = drive_load(server.base_url)
+            stats['memory'] = memory_report(server)
+        finally:
+            server.close()
+        results['scaling'][workers] = stats
+        memory = stats['memory']
+        speedup = stats['requests_per_s'] / results['scaling'][WORKER_COUNTS[0]]['requests_per_s']
+        print(f"{workers:<8} {stats['requests_per_s']:>8,.0f} {speedup:>5.2f}x {stats['p50_ms']:>9.1f} "
+              f"{stats['p99_ms']:>9.1f} {stats['errors']:>8} "
+              f"{memory['worker_rss_kb'] / 1024:>8.1f} MB {memory['worker_pss_kb'] / 1024:>8.1f} MB "
+              f"{memory['worker_private_kb'] / 1024:>9.1f} MB {memory['total_pss_kb'] / 1024:>7.1f} MB "
+              f"{memory['independent_kb'] / 1024:>7.1f} MB")
+
+    # gc.freeze: memoria privada por worker después de la misma carga
+    workers = WORKER_COUNTS[-1]
+    print(f"\n{'gc.freeze':<10} {'Priv/worker':>12} {'PSS total':>10}   ({workers} workers, tras {DURATION_S} s de carga)")
+    print("-" * 92)
+    for freeze in (True, False):
+        server = PreforkProcess(workers, freeze=freeze)
+        try:
+            warmup(server.base_url)
+            drive_load(server.base_url)
+            memory = memory_report(server)
+        finally:
+            server.close()
+        results['freeze']['on' if freeze else 'off'] = memory
+        print(f"{'sí' if freeze else 'no':<10} {memory['worker_private_kb'] / 1024:>9.1f} MB "
+              f"{memory['total_pss_kb'] / 1024:>7.1f} MB")
+
+    # Recarga del modelo con carga: la generación nueva reemplaza a la anterior sin errores
+    server = PreforkProcess(workers)
+    try:
+        warmup(server.base_url)
+        before = set(server.worker_pids())
+        reload = drive_load(server.base_url, duration_s=max(DURATION_S, 20),
+                            during=lambda: server.process.send_signal(signal.SIGHUP))
+        replaced = not (before & set(server.worker_pids()))
+    finally:
+        server.close()
+    results['reload'] = {**reload, 'workers_replaced': replaced}
+    print(f"\nRecarga (SIGHUP) con carga: {reload['requests_per_s']:,.0f} req/s, p99 {reload['p99_ms']:.1f} ms, "
+          f"errores {reload['errors']}, workers reemplazados: {'sí' if replaced else 'no'}")
+    print("=" * 92)
+
+    save_results('prefork', results)
+    # Sin errores (tampoco en la recarga), modelo compartido entre workers y, con más de una CPU, escala
+    scaling = results['scaling']
+    top = max(w for w in WORKER_COUNTS if w <= max(CPUS, 1))
+    scales = CPUS < 2 or scaling[top]['requests_per_s'] >= 1.5 * scaling[1]['requests_per_s']
+    multi = scaling[WORKER_COUNTS[-1]]['memory']
+    shared = multi['total_pss_kb'] < multi['independent_kb']
+    return (all(stats['errors'] == 0 for stats in scaling.values()) and reload['errors'] == 0
+            and replaced and shared and scales)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
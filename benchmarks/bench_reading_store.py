@@ -0,0 +1,188 @@
+"""
+Benchmark: historial de lecturas (ml_model/reading_store.py)
+Mide el costo de encolar un lote en el request, la tasa de ingesta del
+writer y la latencia de consultas por poza y rango a medida que crece la
+base (por defecto hasta 10M filas; --rows=100000000 para el objetivo de 100M,
+--quick para una corrida chica).
+
+    python benchmarks/bench_reading_store.py [--quick] [--rows=N]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from bench_utils import save_results, summarize
+
+import numpy as np
+
+from bulk_codec import ReadingColumns
+from reading_store import READING_FIELDS, ReadingStore
+
+N_POZAS = 100
+INTERVAL_S = 10            # Una lectura por poza cada 10 s
+CHUNK_ROWS = 100_000       # Filas por lote encolado
+QUERIES = 200              # Consultas por ventana y tamaño
+T0 = 1_735_689_600         # 2025-01-01 UTC
+# Presupuesto de latencia p99 con la base llena: 1 h es casi solo la búsqueda en el índice,
+# 1 día (8.640 filas) suma armar las filas en Python (~3 µs por fila)
+P99_BUDGET_MS = {'1h': 20, '1d': 100}
+
+WINDOWS = {
+    '1h': 3600 * 1000,
+    '1d': 86400 * 1000,
+    '10k_filas': 10_000 * INTERVAL_S * 1000
+}
+
+
+def target_rows():
+    for arg in sys.argv[1:]:
+        if arg.startswith('--rows='):
+            return int(float(arg.split('=', 1)[1]))
+    return 200_000 if '--quick' in sys.argv else 10_000_000
+
+
+def checkpoints(total):
+    """Tamaños donde se miden las consultas: potencias de 10 desde 100k hasta `total`"""
+    sizes = [n for n in (100_000, 1_000_000, 10_000_000, 100_000_000) if n < total]
+    return sizes + [total]
+
+
+def chunk(offset, rows, rng):
+    """Lote con la forma que encola la API: lecturas intercaladas de todas las pozas, en orden de tiempo"""
+    index = np.arange(offset, offset + rows)
+    poza_ids = [f"POZA_{k:03d}" for k in (index % N_POZAS).tolist()]
+    timestamps = T0 + (index // N_POZAS) * float(INTERVAL_S)
+    X = rng.random((rows, len(READING_FIELDS))) * 100
+    readings = ReadingColumns(poza_ids, timestamps, dict(zip(READING_FIELDS, X.T)))
+    predictions = rng.random(rows) * 5000
+    return poza_ids, timestamps, readings, predictions, predictions * 0.9, predictions * 1.1, 'RandomForestRegressor'
+
+
+def grow(store, rng, start, stop):
+    """Encolar filas hasta `stop` sin desbordar la cola y esperar a que se escriban"""
+    enqueue_s = 0.0
+    begin = time.perf_counter()
+    for offset in range(start, stop, CHUNK_ROWS):
+        while store.queued_rows > store.max_queue // 2:
+            time.sleep(0.01)
+        record = chunk(offset, min(CHUNK_ROWS, stop - offset), rng)
+        t = time.perf_counter()
+        store.record(record)
+        enqueue_s += time.perf_counter() - t
+    while store.queued_rows or store.written < stop:
+        store._wakeup.set()
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - begin
+    return {
+        'rows': stop - start,
+        'rows_per_s': (stop - start) / elapsed,
+        'enqueue_us_per_batch': enqueue_s / max(1, -(-(stop - start) // CHUNK_ROWS)) * 1e6
+    }
+
+
+def bench_queries(store, rows, rng):
+    """Latencia de consultas en pozas y ventanas al azar dentro del historial escrito"""
+    span_ms = rows // N_POZAS * INTERVAL_S * 1000
+    results = {}
+    for name, window_ms in WINDOWS.items():
+        samples, counts = [], []
+        for _ in range(QUERIES):
+            poza_id = f"POZA_{rng.integers(N_POZAS):03d}"
+            start_ms = T0 * 1000 + int(rng.integers(0, max(1, span_ms - window_ms)))
+            t = time.perf_counter()
+            result = store.query(poza_id, start_ms, start_ms + window_ms, limit=10_000)
+            samples.append((time.perf_counter() - t) * 1000)
+            counts.append(result['count'])
+        results[name] = {**summarize(samples), 'rows_mean': float(np.mean(counts))}
+    return results
+
+
+def bench_endpoint(store, rows, rng):
+    """GET /readings extremo a extremo (consulta + JSON) con TestClient"""
+    import logging
+
+    from fastapi.testclient import TestClient
+
+    import api_model
+
+    logging.disable(logging.INFO)
+    api_model.STORE = store
+    client = TestClient(api_model.app)
+    span_ms = rows // N_POZAS * INTERVAL_S * 1000
+    results = {}
+    try:
+        for name, window_ms in (('1h', WINDOWS['1h']), ('1d', WINDOWS['1d'])):
+            for fmt in ('records', 'columnar'):
+                samples = []
+                for _ in range(50):
+                    start_ms = T0 * 1000 + int(rng.integers(0, max(1, span_ms - window_ms)))
+                    t = time.perf_counter()
+                    response = client.get('/readings/POZA_007', params={
+                        'start': start_ms, 'end': start_ms + window_ms, 'format': fmt
+                    })
+                    samples.append((time.perf_counter() - t) * 1000)
+                    assert response.status_code == 200, response.text
+                results[f"{name}_{fmt}"] = {**summarize(samples), 'bytes': len(response.content)}
+    finally:
+        api_model.STORE = None
+    return results
+
+
+def main():
+    total = target_rows()
+    rng = np.random.default_rng(0)
+
+    print("=" * 78)
+    print(f"BENCHMARK - HISTORIAL DE LECTURAS ({total:,} filas, {N_POZAS} pozas)")
+    print("=" * 78)
+
+    report = {'target_rows': total, 'n_pozas': N_POZAS, 'sizes': []}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'readings.db')
+        store = ReadingStore(path, max_rows=4 * CHUNK_ROWS).start()
+        written = 0
+        for size in checkpoints(total):
+            ingest = grow(store, rng, written, size)
+            written = size
+            # Con el writer quieto: volcar el WAL para medir el archivo real
+            with sqlite3.connect(path) as conn:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            db_bytes = os.path.getsize(path)
+            queries = bench_queries(store, size, rng)
+            report['sizes'].append({'rows': size, 'ingest': ingest, 'db_bytes': db_bytes,
+                                    'bytes_per_row': db_bytes / size, 'queries': queries})
+
+            print(f"\n{size:>12,} filas  ingesta {ingest['rows_per_s']:>9,.0f} filas/s  "
+                  f"encolar {ingest['enqueue_us_per_batch']:.1f} µs/lote  "
+                  f"disco {db_bytes / 1e6:,.0f} MB ({db_bytes / size:.0f} B/fila)")
+            for name, stats in queries.items():
+                print(f"   {name:<10} {stats['rows_mean']:>7,.0f} filas   "
+                      f"p50 {stats['p50_ms']:7.2f} ms   p99 {stats['p99_ms']:7.2f} ms")
+
+        endpoint = bench_endpoint(store, written, rng)
+        print("\nGET /readings (consulta + JSON)")
+        for name, stats in endpoint.items():
+            print(f"   {name:<14} p50 {stats['p50_ms']:7.2f} ms   p99 {stats['p99_ms']:7.2f} ms   "
+                  f"{stats['bytes'] / 1e3:,.0f} KB")
+        report['endpoint'] = endpoint
+        store.close_readers()
+        store.stop()
+
+    largest = report['sizes'][-1]
+    ok = store.dropped == 0 and all(
+        largest['queries'][name]['p99_ms'] <= budget for name, budget in P99_BUDGET_MS.items()
+    )
+    if total < 100_000_000:
+        print(f"\n   Hasta {total:,} filas; --rows=100000000 mide el objetivo de 100M "
+              f"(~{100_000_000 * largest['bytes_per_row'] / 1e9:.0f} GB en disco)")
+    print("\n" + ("✅" if ok else "❌") + " p99 " + ", ".join(f"{name} ≤ {ms} ms" for name, ms in P99_BUDGET_MS.items()))
+    report['within_budget'] = ok
+    save_results('reading_store', report)
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,127 @@
+"""
+Benchmark: peso de la serialización en el costo de una predicción
+Compara el camino anterior (modelos Pydantic + validación de response_model +
+json) contra el camino rápido (columnas + orjson), en lote de 1 y 1000
+"""
+
+import json
+import sys
+
+from bench_utils import measure, require_model, save_results
+
+from pydantic import TypeAdapter
+
+import api_model
+from api_model import (
+    BatchPredictionResponse, PredictionInterval, PredictionResponse, SensorData,
+    build_feature_matrix, build_prediction_columns, columns_to_columnar, columns_to_records,
+    determine_confidence, determine_quality_status, generate_recommendation,
+    model_version_for, score_features, validate_input_ranges
+)
+from fast_json import dumps, orjson
+
+BATCH_SIZES = [1, 1000]
+
+
+def _readings(n):
+    return [
+        SensorData(
+            poza_id=f"POZA_{i % 5 + 1}", days_evaporation=30 + (i * 7) % 150,
+            temperature_c=5 + i % 25, humidity_percent=5 + i % 35, ph=7.8,
+            conductivity_ms_cm=98.3, density_g_cm3=1.182,
+            mg_li_ratio=5.2 if i % 3 else None, ca_li_ratio=1.3
+        )
+        for i in range(n)
+    ]
+
+
+def legacy_serialize(readings, predictions, intervals, warnings, adapter, batch):
+    """Camino anterior: un PredictionResponse por fila, re-validación y json.dumps"""
+    results = []
+    for i, data in enumerate(readings):
+        prediction = float(predictions[i])
+        quality_status = determine_quality_status(prediction, data.mg_li_ratio)
+        interval = None
+        if intervals is not None:
+            interval = PredictionInterval(**{
+                f'{field}_mg_l': round(float(intervals[field][i]), 2)
+                for field in ('p10', 'p50', 'p90', 'spread', 'std')
+            })
+        results.append(PredictionResponse(
+            poza_id=data.poza_id,
+            timestamp=data.timestamp,
+            predicted_concentration_mg_l=round(prediction, 2),
+            prediction_interval=interval,
+            confidence=determine_confidence(warnings[i], data.mg_li_ratio),
+            quality_status=quality_status,
+            recommendation=generate_recommendation(prediction, quality_status),
+            warnings=warnings[i],
+            model_version=model_version_for('full')
+        ))
+    content = BatchPredictionResponse(count=len(results), predictions=results) if batch else results[0]
+
+    # Lo que hace FastAPI con response_model: validar, volcar a JSON-compatible y json.dumps
+    validated = adapter.validate_python(content, from_attributes=True)
+    payload = adapter.dump_python(validated, mode='json')
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_serialize(readings, X, predictions, intervals, warnings, batch, columnar=False):
+    """Camino nuevo: columnas + orjson, sin re-validar"""
+    columns = build_prediction_columns(readings, X, predictions, intervals, warnings)
+    if columnar:
+        return dumps({'count': len(readings), 'columns': columns_to_columnar(columns)})
+    records = columns_to_records(columns)
+    return dumps({'count': len(records), 'predictions': records} if batch else records[0])
+
+
+def main():
+    require_model()
+    api_model.load_model()
+    api_model.JOURNAL = None
+
+    print("=" * 70)
+    print("BENCHMARK - SERIALIZACIÓN DE RESPUESTAS")
+    print(f"Encoder rápido: {'orjson' if orjson is not None else 'json (orjson no instalado)'}")
+    print("=" * 70)
+
+    results = {}
+    for n in BATCH_SIZES:
+        batch = n > 1
+        readings = _readings(n)
+        adapter = TypeAdapter(BatchPredictionResponse if batch else PredictionResponse)
+        repeat = 300 if n == 1 else 20
+
+        def score():
+            X = build_feature_matrix(readings)
+            predictions, intervals = score_features(X)
+            warnings = [validate_input_ranges(data) for data in readings]
+            return X, predictions, intervals, warnings
+
+        X, predictions, intervals, warnings = score()
+        scoring = measure(score, repeat=repeat)
+        legacy = measure(lambda: legacy_serialize(readings, predictions, intervals, warnings, adapter, batch), repeat=repeat)
+        fast = measure(lambda: fast_serialize(readings, X, predictions, intervals, warnings, batch), repeat=repeat)
+        row = {'scoring': scoring, 'legacy': legacy, 'fast': fast}
+        if batch:
+            row['columnar'] = measure(
+                lambda: fast_serialize(readings, X, predictions, intervals, warnings, batch, columnar=True),
+                repeat=repeat
+            )
+
+        print(f"\nLote de {n} (p50 ms)")
+        print(f"   {'Scoring (features + modelo)':<34} {scoring['p50_ms']:>9.3f}")
+        for key, label in (('legacy', 'Pydantic + validación + json'), ('fast', 'Columnas + orjson'),
+                           ('columnar', 'Columnar + orjson')):
+            if key in row:
+                share = row[key]['p50_ms'] / (row[key]['p50_ms'] + scoring['p50_ms'])
+                row[f'{key}_share'] = share
+                print(f"   {label:<34} {row[key]['p50_ms']:>9.3f}   ({share:.0%} del total)")
+        results[str(n)] = row
+
+    save_results('response_serialization', results)
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
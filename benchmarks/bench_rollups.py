@@ -0,0 +1,204 @@
+"""
+Benchmark: agregados por hora y día del historial de lecturas (ml_model/rollups.py)
+Costo de mantenerlos al insertar (ingesta con y sin agregados) y resumen de un
+año de una poza desde los agregados contra agregar las lecturas crudas. Verifica
+que los buckets compactados coinciden con el recálculo crudo, también después
+de lecturas tardías y reenviadas (--quick: 30 días en vez de un año).
+
+    python benchmarks/bench_rollups.py [--quick]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from bench_utils import save_results, summarize
+
+import numpy as np
+
+from bulk_codec import ReadingColumns
+from reading_store import READING_FIELDS, ReadingStore
+from rollups import RESOLUTIONS
+
+N_POZAS = 10
+INTERVAL_S = 60            # Una lectura por poza por minuto
+DAYS = 30 if '--quick' in sys.argv else 365
+CHUNK_ROWS = 50_000
+REPEAT = 5
+T0 = 1_735_689_600         # 2025-01-01 UTC
+# El resumen desde los agregados tiene que ser al menos esta cantidad de veces más rápido
+MIN_SPEEDUP = 10
+
+
+def chunk(offset, rows, rng):
+    """Lote como lo encola la API: todas las pozas intercaladas, en orden de tiempo"""
+    index = np.arange(offset, offset + rows)
+    poza_ids = [f"POZA_{k:02d}" for k in (index % N_POZAS).tolist()]
+    timestamps = T0 + (index // N_POZAS) * float(INTERVAL_S)
+    X = rng.random((rows, len(READING_FIELDS))) * 100
+    readings = ReadingColumns(poza_ids, timestamps, dict(zip(READING_FIELDS, X.T)))
+    predictions = rng.random(rows) * 5000
+    return poza_ids, timestamps, readings, predictions, None, None, 'RandomForestRegressor'
+
+
+def ingest(path, total, rollups):
+    """Llenar un historial y medir filas/s hasta que todo queda escrito (y compactado)"""
+    store = ReadingStore(path, max_rows=4 * CHUNK_ROWS, rollups=rollups).start()
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    for offset in range(0, total, CHUNK_ROWS):
+        while store.queued_rows > store.max_queue // 2:
+            time.sleep(0.01)
+        store.record(chunk(offset, min(CHUNK_ROWS, total - offset), rng))
+    store.stop(timeout=600)
+    elapsed = time.perf_counter() - start
+    return store, {'rows': store.written, 'rows_per_s': store.written / elapsed, 'seconds': elapsed,
+                   'compacted_buckets': store.compacted, 'dropped': store.dropped}
+
+
+def timed(func, *args):
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, summarize(samples)
+
+
+def matches(summary, raw):
+    """Los buckets exactos de los agregados coinciden con el recálculo desde las lecturas crudas"""
+    columns, reference = summary['columns'], raw['columns']
+    if columns['bucket_ms'] != reference['bucket_ms']:
+        return False
+    exact = np.array(columns['exact'])
+    return all(
+        np.allclose(np.array(columns[name])[exact], np.array(reference[name])[exact])
+        for name in columns if name not in ('bucket_ms', 'exact')
+    )
+
+
+def bench_queries(store, start_ms, end_ms):
+    """Resumen de la ventana por hora y por día: agregados vs GROUP BY sobre las lecturas crudas"""
+    conn = store._reader()
+    poza = conn.execute("SELECT id FROM pozas WHERE poza_id = 'POZA_03'").fetchone()[0]
+    results = {}
+    for resolution in RESOLUTIONS:
+        summary, rollup_stats = timed(store.summary, 'POZA_03', resolution, start_ms, end_ms)
+        raw, raw_stats = timed(store.rollups.raw, conn, poza, resolution, start_ms, end_ms)
+        results[resolution] = {
+            'buckets': summary['count'], 'readings': summary['totals']['n'],
+            'exact_buckets': sum(summary['columns']['exact']),
+            'rollup': rollup_stats, 'raw_scan': raw_stats,
+            'speedup': raw_stats['p50_ms'] / rollup_stats['p50_ms'],
+            'matches_raw': matches(summary, raw)
+        }
+    return results
+
+
+def bench_late_data(path):
+    """Lecturas tardías y reenviadas en un día ya compactado: quedan sin compactar y el writer las corrige"""
+    store = ReadingStore(path, grace_s=3600).start()
+    day = T0 + (DAYS // 2) * 86400
+    poza_ids = ['POZA_03'] * 3
+    # Una lectura nueva fuera de la grilla de minutos y dos reenvíos con otros valores
+    timestamps = np.array([day + 30.0, day + 60.0, day + 120.0])
+    readings = ReadingColumns(poza_ids, timestamps, {field: np.full(3, 500.0) for field in READING_FIELDS})
+    record = (poza_ids, timestamps, readings, np.full(3, 9000.0), None, None, 'RandomForestRegressor')
+    store.record(record)
+    store.stop()
+    start_ms, stop_ms = day * 1000, (day + 86400) * 1000
+    conn = store._reader()
+    poza = conn.execute("SELECT id FROM pozas WHERE poza_id = 'POZA_03'").fetchone()[0]
+    summary = store.summary('POZA_03', 'day', start_ms, stop_ms)
+    raw = store.rollups.raw(conn, poza, 'day', start_ms, stop_ms)
+    store.close_readers()
+    return {
+        'late_rows': store.late_rows,
+        'compacted_buckets': store.compacted,
+        'readings_in_day': summary['totals']['n'],
+        'expected_readings': 86400 // INTERVAL_S + 1,
+        'exact': all(summary['columns']['exact']),
+        'matches_raw': matches(summary, raw)
+    }
+
+
+def bench_endpoint(store, start_ms, end_ms):
+    """GET /readings/{poza_id}/summary de un año por hora (consulta + JSON)"""
+    import logging
+
+    from fastapi.testclient import TestClient
+
+    import api_model
+
+    logging.disable(logging.INFO)
+    api_model.STORE = store
+    client = TestClient(api_model.app)
+    results = {}
+    try:
+        for resolution in RESOLUTIONS:
+            samples = []
+            for _ in range(REPEAT):
+                start = time.perf_counter()
+                response = client.get('/readings/POZA_03/summary', params={
+                    'start': start_ms, 'end': end_ms, 'resolution': resolution, 'format': 'columnar'
+                })
+                samples.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, response.text
+            results[resolution] = {**summarize(samples), 'bytes': len(response.content)}
+    finally:
+        api_model.STORE = None
+    return results
+
+
+def main():
+    total = N_POZAS * DAYS * 86400 // INTERVAL_S
+    start_ms, end_ms = T0 * 1000, (T0 + DAYS * 86400) * 1000
+
+    print("=" * 78)
+    print(f"BENCHMARK - AGREGADOS POR HORA Y DÍA ({N_POZAS} pozas, {DAYS} días, {total:,} lecturas)")
+    print("=" * 78)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _, plain = ingest(os.path.join(tmp, 'plain.db'), total, rollups=False)
+        path = os.path.join(tmp, 'readings.db')
+        store, with_rollups = ingest(path, total, rollups=True)
+        overhead = with_rollups['rows_per_s'] / plain['rows_per_s'] - 1
+        print("\nIngesta")
+        print(f"   Sin agregados:  {plain['rows_per_s']:>9,.0f} filas/s")
+        print(f"   Con agregados:  {with_rollups['rows_per_s']:>9,.0f} filas/s "
+              f"({overhead:+.0%}, {with_rollups['compacted_buckets']:,} buckets compactados)")
+
+        queries = bench_queries(store, start_ms, end_ms)
+        print(f"\nResumen de {DAYS} días de una poza (p50 de {REPEAT})")
+        for resolution, result in queries.items():
+            print(f"   {resolution:<5} {result['buckets']:>6,} buckets   agregados {result['rollup']['p50_ms']:8.2f} ms   "
+                  f"lecturas crudas {result['raw_scan']['p50_ms']:8.1f} ms   {result['speedup']:6.0f}x   "
+                  f"{'✓' if result['matches_raw'] else '✗'} igual al recálculo")
+
+        endpoint = bench_endpoint(store, start_ms, end_ms)
+        print("\nGET /readings/{poza_id}/summary (consulta + JSON)")
+        for resolution, stats in endpoint.items():
+            print(f"   {resolution:<5} p50 {stats['p50_ms']:7.2f} ms   p99 {stats['p99_ms']:7.2f} ms   "
+                  f"{stats['bytes'] / 1e3:,.0f} KB")
+        store.close_readers()
+
+        late = bench_late_data(path)
+        print("\nLecturas tardías (1 nueva + 2 reenvíos en un día ya compactado)")
+        print(f"   Tardías: {late['late_rows']}   buckets recompactados: {late['compacted_buckets']}   "
+              f"lecturas del día: {late['readings_in_day']:,} (esperadas {late['expected_readings']:,})")
+
+    ok = (
+        with_rollups['dropped'] == 0
+        and all(result['matches_raw'] and result['speedup'] >= MIN_SPEEDUP for result in queries.values())
+        and late['exact'] and late['matches_raw'] and late['readings_in_day'] == late['expected_readings']
+    )
+    print("\n" + ("✅" if ok else "❌") + f" Agregados exactos y ≥{MIN_SPEEDUP}x más rápidos que el recálculo")
+    save_results('rollups', {'n_pozas': N_POZAS, 'days': DAYS, 'rows': total,
+                             'ingest': {'plain': plain, 'rollups': with_rollups, 'overhead': overhead},
+                             'queries': queries, 'endpoint': endpoint, 'late_data': late, 'within_budget': ok})
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
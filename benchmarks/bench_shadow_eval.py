@@ -0,0 +1,100 @@
+"""
+Benchmark: latencia de /predict con y sin modelo en sombra
+Tráfico a ritmo fijo (como sensores reales, con tiempo ocioso entre
+lecturas); los modos se intercalan por bloques para que el ruido de la
+máquina afecte a ambos por igual.
+"""
+
+import logging
+import os
+import sys
+import time
+
+from bench_utils import ML_MODEL_DIR, require_model, save_results, summarize
+
+os.environ['PREDICTION_JOURNAL'] = '0'
+os.environ['ALERT_WEBHOOK_URL'] = '0'
+
+from fastapi.testclient import TestClient
+
+import api_model
+from shadow_eval import ShadowEvaluator, load_candidate
+from bench_n8n_pipeline import simulator_readings
+
+CANDIDATE = 'model_fast.pkl'
+REQUESTS_PER_MODE = 2000
+BLOCK = 250
+RATE_PER_S = 200
+
+
+def paced_block(client, readings, latencies):
+    """Enviar un bloque a RATE_PER_S lecturas por segundo"""
+    interval = 1.0 / RATE_PER_S
+    next_send = time.perf_counter()
+    for reading in readings:
+        now = time.perf_counter()
+        if now < next_send:
+            time.sleep(next_send - now)
+        next_send += interval
+        start = time.perf_counter()
+        response = client.post('/predict', json=reading)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+
+
+def main():
+    require_model()
+    candidate_path = os.path.join(ML_MODEL_DIR, CANDIDATE)
+    if not os.path.exists(candidate_path):
+        print(f"❌ Candidato no encontrado: {CANDIDATE} (python train_model.py --distill)")
+        return False
+    logging.disable(logging.INFO)
+
+    readings = simulator_readings(REQUESTS_PER_MODE)
+
+    print("=" * 70)
+    print(f"BENCHMARK - MODELO EN SOMBRA ({REQUESTS_PER_MODE:,} requests por modo, {RATE_PER_S} req/s)")
+    print("=" * 70)
+
+    with TestClient(api_model.app) as client:
+        shadow = ShadowEvaluator(
+            load_candidate(candidate_path), api_model.determine_quality_status, name=CANDIDATE
+        ).start()
+
+        paced_block(client, readings[:100], [])
+        latencies = {'primary_only': [], 'with_shadow': []}
+        for start in range(0, REQUESTS_PER_MODE, BLOCK):
+            block = readings[start:start + BLOCK]
+            api_model.SHADOW = None
+            paced_block(client, block, latencies['primary_only'])
+            api_model.SHADOW = shadow
+            paced_block(client, block, latencies['with_shadow'])
+        api_model.SHADOW = None
+
+        time.sleep(0.5)
+        shadow.stop()
+        stats = shadow.stats()
+
+    before, after = summarize(latencies['primary_only']), summarize(latencies['with_shadow'])
+    print(f"\n{'Latencia /predict':<22} {'Sin sombra':>12} {'Con sombra':>12} {'Diferencia':>12}")
+    print("-" * 70)
+    for key, label in (('mean_ms', 'Media (ms)'), ('p50_ms', 'p50 (ms)'), ('p99_ms', 'p99 (ms)')):
+        print(f"{label:<22} {before[key]:>12.3f} {after[key]:>12.3f} {after[key] - before[key]:>+12.3f}")
+
+    print(f"\nSombra ({CANDIDATE}): {stats['scored']:,} evaluadas, {stats['dropped']:,} descartadas")
+    print(f"   bias {stats['bias_mg_l']} mg/L | MAE {stats['mae_mg_l']} mg/L | "
+          f"desacuerdo de calidad {stats['quality_disagreement_rate']:.1%}")
+    print("=" * 70)
+
+    save_results('shadow_eval', {
+        'rate_per_s': RATE_PER_S,
+        'latency_primary_only': before,
+        'latency_with_shadow': after,
+        'p99_delta_ms': after['p99_ms'] - before['p99_ms'],
+        'shadow': stats
+    })
+    return stats['scored'] == stats['enqueued']
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,201 @@
+"""
+Benchmark: tiempo de import y de primera predicción (arranque en frío)
+Cada medición corre en un proceso nuevo (imports sin caché de sys.modules):
+- API: import de api_model, startup (carga del modelo) y primer /predict,
+  con model.pkl y con el artefacto compacto.
+- Entrenamiento: import de train_model y train_model.main (tiempo hasta el
+  artefacto y total, con y sin gráficos) en un directorio temporal, sin
+  tocar los artefactos del repo.
+- Simulador: import y primera lectura por el workflow en proceso (--local).
+
+Los presupuestos (STARTUP_BUDGETS_MS y HEAVY_MODULES) los verifica
+test_startup_budget.py.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from bench_utils import DATA_DIR, ML_MODEL_DIR, SCRIPTS_DIR, require_model, save_results
+
+REPEAT = 5
+
+# Presupuestos (ms, mediana) con margen para máquinas lentas de CI
+STARTUP_BUDGETS_MS = {
+    'api_import': 1000,
+    'api_first_prediction_compact': 1500,
+    'api_first_prediction': 4000,
+    'train_import': 1000,
+    'simulator_import': 200,
+    'simulator_first_reading': 2500,
+}
+
+# Dependencias pesadas que no deben cargarse en cada camino
+HEAVY_MODULES = {
+    'api_import': ('pandas', 'sklearn', 'joblib', 'matplotlib'),
+    'api_first_prediction_compact': ('pandas', 'sklearn', 'matplotlib'),
+    'train_import': ('sklearn', 'matplotlib', 'seaborn'),
+    'simulator_import': ('requests', 'numpy', 'fastapi'),
+}
+
+_PRELUDE = f"""
+import json, os, sys, time
+start = time.perf_counter()
+sys.path[:0] = [{ML_MODEL_DIR!r}, {SCRIPTS_DIR!r}]
+os.environ.setdefault('PREDICTION_JOURNAL', '0')
+os.environ.setdefault('ALERT_WEBHOOK_URL', '0')
+import logging
+logging.disable(logging.INFO)
+"""
+
+_REPORT = """
+print(json.dumps({'timings': timings, 'modules': sorted({name.split('.')[0] for name in sys.modules})}))
+"""
+
+PROBES = {
+    'api_import': """
+import api_model
+timings = {'import_ms': (time.perf_counter() - start) * 1000}
+""",
+    'api_first_prediction': """
+import api_model
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(api_model.app) as client:
+    ready = time.perf_counter()
+    response = client.post('/predict', json={
+        'poza_id': 'POZA_1', 'days_evaporation': 90, 'temperature_c': 20, 'humidity_percent': 20,
+        'ph': 7.6, 'conductivity_ms_cm': 100, 'density_g_cm3': 1.18
+    })
+    assert response.status_code == 200
+    done = time.perf_counter()
+timings = {
+    'import_ms': (imported - start) * 1000,
+    'startup_ms': (ready - imported) * 1000,
+    'first_predict_ms': (done - ready) * 1000,
+    'total_ms': (done - start) * 1000
+}
+""",
+    'train_import': """
+import train_model
+timings = {'import_ms': (time.perf_counter() - start) * 1000}
+""",
+    'train_main': """
+import contextlib, io
+import train_model
+imported = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    pipeline = train_model.main(plots=os.environ.get('TRAIN_PLOTS', '1') == '1')
+timings = {
+    'import_ms': (imported - start) * 1000,
+    'time_to_artifact_ms': pipeline['time_to_artifact_s'] * 1000,
+    'total_ms': (time.perf_counter() - start) * 1000
+}
+""",
+    'simulator_import': """
+import sensor_simulator
+timings = {'import_ms': (time.perf_counter() - start) * 1000}
+""",
+    'simulator_first_reading': """
+import sensor_simulator
+imported = time.perf_counter()
+from n8n_local_executor import LocalWorkflowExecutor
+with LocalWorkflowExecutor() as executor:
+    result = sensor_simulator.send_sensor_data(
+        sensor_simulator.generate_sensor_reading('POZA_1', 90), None, executor
+    )
+    assert result['success']
+    done = time.perf_counter()
+timings = {'import_ms': (imported - start) * 1000, 'total_ms': (done - start) * 1000}
+""",
+}
+
+# Métrica comparada contra el presupuesto de cada escenario
+BUDGET_METRIC = {
+    'api_import': ('api_import', 'import_ms', {}),
+    'api_first_prediction': ('api_first_prediction', 'total_ms', {}),
+    'api_first_prediction_compact': ('api_first_prediction', 'total_ms', {'MODEL_COMPACT': '1'}),
+    'train_import': ('train_import', 'import_ms', {}),
+    'simulator_import': ('simulator_import', 'import_ms', {}),
+    'simulator_first_reading': ('simulator_first_reading', 'total_ms', {}),
+}
+
+
+def run_probe(name, env=None, cwd=None) -> dict:
+    """Ejecutar un escenario en un proceso nuevo y devolver tiempos y módulos cargados"""
+    proc = subprocess.run(
+        [sys.executable, '-c', _PRELUDE + PROBES[name] + _REPORT],
+        capture_output=True, text=True, cwd=cwd or ML_MODEL_DIR,
+        env={**os.environ, **(env or {})}
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{name} falló:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def measure_scenario(scenario, repeat=REPEAT) -> dict:
+    """Mediana de `repeat` arranques en frío de un escenario con presupuesto"""
+    probe, metric, env = BUDGET_METRIC[scenario]
+    runs = [run_probe(probe, env) for _ in range(repeat)]
+    timings = {key: statistics.median(run['timings'][key] for run in runs) for key in runs[0]['timings']}
+    return {
+        'metric': metric,
+        'value_ms': timings[metric],
+        'budget_ms': STARTUP_BUDGETS_MS[scenario],
+        'timings': timings,
+        'modules': runs[0]['modules']
+    }
+
+
+def measure_train_main(plots=True) -> dict:
+    """train_model.main en un árbol temporal (escribe sus artefactos ahí)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, 'ml_model'))
+        os.makedirs(os.path.join(tmp, 'data'))
+        os.symlink(os.path.join(DATA_DIR, 'sample_data.csv'), os.path.join(tmp, 'data', 'sample_data.csv'))
+        env = {'TRAIN_PLOTS': '1' if plots else '0'}
+        return run_probe('train_main', env, cwd=os.path.join(tmp, 'ml_model'))['timings']
+
+
+def main():
+    require_model()
+
+    print("=" * 70)
+    print(f"BENCHMARK - ARRANQUE EN FRÍO (mediana de {REPEAT} procesos)")
+    print("=" * 70)
+
+    results, ok = {}, True
+    print(f"\n{'Escenario':<32} {'Medido (ms)':>12} {'Presupuesto':>12}  Pesados cargados")
+    print("-" * 70)
+    for scenario in STARTUP_BUDGETS_MS:
+        result = results[scenario] = measure_scenario(scenario)
+        loaded = [m for m in HEAVY_MODULES.get(scenario, ()) if m in result['modules']]
+        within = result['value_ms'] <= result['budget_ms'] and not loaded
+        ok &= within
+        print(f"{'✅' if within else '❌'} {scenario:<29} {result['value_ms']:>12.0f} "
+              f"{result['budget_ms']:>12}  {', '.join(loaded) or '-'}")
+
+    for scenario in ('api_first_prediction', 'api_first_prediction_compact'):
+        timings = results[scenario]['timings']
+        print(f"\n{scenario}: import {timings['import_ms']:.0f} ms | startup {timings['startup_ms']:.0f} ms | "
+              f"primer /predict {timings['first_predict_ms']:.1f} ms")
+
+    train = {'plots': measure_train_main(), 'no_plots': measure_train_main(plots=False)}
+    print(f"\n{'train_model.main':<32} {'Artefacto (s)':>14} {'Total (s)':>10}")
+    for mode, timings in train.items():
+        print(f"   {mode:<29} {timings['time_to_artifact_ms'] / 1000:>14.2f} {timings['total_ms'] / 1000:>10.2f}")
+    print("=" * 70)
+
+    save_results('startup', {
+        'repeat': REPEAT,
+        'scenarios': {name: {k: v for k, v in r.items() if k != 'modules'} for name, r in results.items()},
+        'train_main': train
+    })
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
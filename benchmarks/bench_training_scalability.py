@@ -0,0 +1,206 @@
+"""
+Benchmark: escalabilidad del entrenamiento
+Barre n_samples, n_estimators, max_depth y n_jobs (un eje por vez sobre una
+configuración base) con datos del generador sintético. Cada fit corre en un
+proceso nuevo para medir su pico de memoria (RSS).
+
+Por configuración: tiempo de fit, pico de RSS, tamaño del modelo, nodos y
+R² out-of-bag y de test. Los resultados se comparan contra la línea base
+guardada en benchmarks/baselines/training_scalability.json: un fit más lento
+que la tolerancia o una caída de R² marca regresión.
+
+    python benchmarks/bench_training_scalability.py                    # barrido estándar
+    python benchmarks/bench_training_scalability.py --full             # agrega 100k y 200k filas
+    python benchmarks/bench_training_scalability.py --update-baseline  # reemplazar la línea base
+"""
+
+import contextlib
+import io
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+
+from bench_utils import load_baseline, save_baseline, save_results
+
+import numpy as np
+
+BASE_CONFIG = {'n_samples': 20_000, 'n_estimators': 100, 'max_depth': 15, 'n_jobs': -1}
+SWEEPS = {
+    'n_samples': [1_000, 5_000, 20_000, 50_000],
+    'n_estimators': [25, 50, 100, 200],
+    'max_depth': [5, 10, 15, None],
+    'n_jobs': [1, 2, 4, -1],
+}
+FULL_SAMPLES = [100_000, 200_000]
+
+# Regresión: fit más lento que baseline * tolerancia, o R² de test más bajo
+TIME_TOLERANCE = 1.30
+R2_TOLERANCE = 0.01
+
+# Proyección para dimensionar hardware (Fase 2)
+PROJECTED_SAMPLES = [1_000_000, 5_000_000]
+
+
+def config_id(config) -> str:
+    return (f"n{config['n_samples']}_est{config['n_estimators']}_"
+            f"depth{config['max_depth']}_jobs{config['n_jobs']}")
+
+
+def sweep_configs(full=False) -> list[dict]:
+    """Configuraciones únicas: la base variando un eje por vez"""
+    sweeps = dict(SWEEPS, n_samples=SWEEPS['n_samples'] + (FULL_SAMPLES if full else []))
+    configs = {}
+    for axis, values in sweeps.items():
+        for value in values:
+            config = dict(BASE_CONFIG, **{axis: value})
+            configs[config_id(config)] = config
+    return list(configs.values())
+
+
+def build_dataset(path, n_samples):
+    """Features y target del generador sintético (se guarda para los procesos hijos)"""
+    from synthetic_data_generator import generate_brine_data
+    from train_model import feature_engineering, prepare_train_test
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        np.random.seed(42)
+        df = feature_engineering(generate_brine_data(n_samples))
+        _, _, _, _, feature_cols = prepare_train_test(df.head(100))
+    np.savez(path, X=df[feature_cols].to_numpy(dtype=np.float64),
+             y=df['li_concentration_mg_l'].to_numpy(dtype=np.float64))
+
+
+def _fit_worker(data_path, config, results):
+    """Proceso hijo: un fit con oob, medición de tiempo, memoria y tamaño"""
+    import pickle
+    import resource
+    import time
+
+    from sklearn.model_selection import train_test_split
+    from train_model import train_model
+
+    data = np.load(data_path)
+    X, y = data['X'][:config['n_samples']], data['y'][:config['n_samples']]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    params = {key: config[key] for key in ('n_estimators', 'max_depth', 'n_jobs')}
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        model, validation = train_model(X_train, y_train, validation='oob', params=params)
+    total = time.perf_counter() - start
+
+    results.put({
+        'config': config,
+        'fit_s': validation['fit_seconds'],
+        'train_s': total,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'fit_rss_mb': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024,
+        'model_bytes': len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+        'node_count': int(sum(tree.tree_.node_count for tree in model.estimators_)),
+        'oob_r2': validation['r2'],
+        'test_r2': float(model.score(X_test, y_test))
+    })
+
+
+def run_config(data_path, config) -> dict:
+    ctx = mp.get_context('spawn')
+    results = ctx.Queue()
+    process = ctx.Process(target=_fit_worker, args=(data_path, config, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def compare_baseline(results, baseline) -> list[str]:
+    """Configuraciones más lentas o menos precisas que la línea base"""
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get('results', {}).get(key)
+        if reference is None:
+            continue
+        if result['fit_s'] > reference['fit_s'] * TIME_TOLERANCE:
+            regressions.append(f"{key}: fit {result['fit_s']:.2f} s vs {reference['fit_s']:.2f} s")
+        if result['test_r2'] < reference['test_r2'] - R2_TOLERANCE:
+            regressions.append(f"{key}: R² {result['test_r2']:.3f} vs {reference['test_r2']:.3f}")
+    return regressions
+
+
+def power_law(xs, ys):
+    """Ajuste y = a * x^k en escala log-log (exponente de escalado)"""
+    k, log_a = np.polyfit(np.log(xs), np.log(ys), 1)
+    return float(np.exp(log_a)), float(k)
+
+
+def print_axis(results, axis, values):
+    print(f"\n{axis:<14} {'Fit (s)':>9} {'RSS pico':>10} {'Modelo':>10} {'Nodos':>10} {'R² OOB':>8} {'R² test':>8}")
+    print("-" * 75)
+    for value in values:
+        result = results[config_id(dict(BASE_CONFIG, **{axis: value}))]
+        label = 'None' if value is None else f"{value:,}"
+        print(f"{label:<14} {result['fit_s']:>9.2f} {result['peak_rss_mb']:>8.0f} MB "
+              f"{result['model_bytes'] / 1024**2:>7.1f} MB {result['node_count']:>10,} "
+              f"{result['oob_r2']:>8.3f} {result['test_r2']:>8.3f}")
+
+
+def main():
+    full = '--full' in sys.argv
+    update_baseline = '--update-baseline' in sys.argv
+    configs = sweep_configs(full)
+    max_samples = max(config['n_samples'] for config in configs)
+
+    print("=" * 75)
+    print(f"BENCHMARK - ESCALABILIDAD DEL ENTRENAMIENTO ({len(configs)} configuraciones, "
+          f"{os.cpu_count()} núcleos)")
+    print("=" * 75)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, 'dataset.npz')
+        build_dataset(data_path, max_samples)
+        results = {config_id(config): run_config(data_path, config) for config in configs}
+
+    sample_values = sorted({config['n_samples'] for config in configs})
+    print_axis(results, 'n_samples', sample_values)
+    for axis in ('n_estimators', 'max_depth', 'n_jobs'):
+        print_axis(results, axis, SWEEPS[axis])
+
+    # Curvas de escalado con n_samples y proyección
+    rows = [results[config_id(dict(BASE_CONFIG, n_samples=n))] for n in sample_values]
+    time_a, time_k = power_law(sample_values, [r['fit_s'] for r in rows])
+    size_a, size_k = power_law(sample_values, [r['model_bytes'] for r in rows])
+    print(f"\nEscalado con n_samples: fit ~ n^{time_k:.2f}, tamaño del modelo ~ n^{size_k:.2f}")
+    for n in PROJECTED_SAMPLES:
+        print(f"   Proyección {n:>10,} filas: fit ~{time_a * n ** time_k / 60:6.1f} min "
+              f"({os.cpu_count()} núcleos), modelo ~{size_a * n ** size_k / 1024**2:7.0f} MB")
+
+    # Comparación con la línea base
+    baseline = load_baseline('training_scalability') or {}
+    regressions = compare_baseline(results, baseline)
+    if not baseline:
+        print("\n⚠️  Sin línea base (--update-baseline para crearla)")
+    elif regressions:
+        print(f"\n❌ Regresiones contra la línea base ({baseline.get('machine', '?')}):")
+        for line in regressions:
+            print(f"   {line}")
+    else:
+        print(f"\n✅ Sin regresiones contra la línea base (tolerancia +{TIME_TOLERANCE - 1:.0%} en tiempo, "
+              f"{R2_TOLERANCE} en R²)")
+    print("=" * 75)
+
+    report = {
+        'machine': f"{os.cpu_count()} núcleos",
+        'base_config': BASE_CONFIG,
+        'results': results,
+        'scaling': {'fit_exponent': time_k, 'model_size_exponent': size_k},
+        'regressions': regressions
+    }
+    save_results('training_scalability', report)
+    if update_baseline:
+        save_baseline('training_scalability', {key: value for key, value in report.items() if key != 'regressions'})
+    return not regressions
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,68 @@
+"""
+Benchmark: costo de validar el bosque (out-of-bag vs k-fold vs sin validación)
+Tiempo total de train_model por modo y tamaño de dataset, y qué tan cerca
+queda el R² de validación del R² del split de test.
+"""
+
+import contextlib
+import io
+import sys
+import time
+
+from bench_utils import save_results
+
+import numpy as np
+
+from synthetic_data_generator import generate_brine_data
+from train_model import VALIDATION_MODES, feature_engineering, prepare_train_test, train_model
+
+SIZES = (1_000, 10_000)
+
+
+def build_dataset(n_samples):
+    """Split train/test sobre datos del generador sintético"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        np.random.seed(42)
+        df = feature_engineering(generate_brine_data(n_samples))
+        X_train, X_test, y_train, y_test, _ = prepare_train_test(df)
+    return X_train, X_test, y_train, y_test
+
+
+def main():
+    print("=" * 70)
+    print("BENCHMARK - VALIDACIÓN DEL ENTRENAMIENTO")
+    print("=" * 70)
+
+    results = {}
+    for n_samples in SIZES:
+        X_train, X_test, y_train, y_test = build_dataset(n_samples)
+        print(f"\n{n_samples:,} filas")
+        print(f"{'Modo':<10} {'Total (s)':>10} {'Fit (s)':>10} {'Valid. (s)':>11} {'R² valid.':>10} {'R² test':>9}")
+        print("-" * 70)
+        for mode in VALIDATION_MODES:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                model, validation = train_model(X_train, y_train, validation=mode)
+            total = time.perf_counter() - start
+            test_r2 = float(model.score(X_test, y_test))
+            r2 = validation.get('r2')
+            results[f'{n_samples}_{mode}'] = {
+                'rows': n_samples, 'mode': mode, 'total_s': total, 'test_r2': test_r2, **validation
+            }
+            print(f"{mode:<10} {total:>10.2f} {validation['fit_seconds']:>10.2f} "
+                  f"{validation['validation_seconds']:>11.2f} {r2 if r2 is not None else float('nan'):>10.3f} "
+                  f"{test_r2:>9.3f}")
+
+    print("=" * 70)
+    save_results('training_validation', results)
+
+    # OOB debe ser más barato que k-fold y estimar el R² de test razonablemente
+    return all(
+        results[f'{n}_oob']['total_s'] < results[f'{n}_kfold']['total_s']
+        and abs(results[f'{n}_oob']['r2'] - results[f'{n}_oob']['test_r2']) < 0.05
+        for n in SIZES
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
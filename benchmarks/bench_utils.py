@@ -0,0 +1,128 @@
+"""
+Utilidades compartidas por los benchmarks
+Rutas del repo, carga del modelo entrenado y medición de latencias
+"""
+
+import os
+import sys
+import time
+import json
+import statistics
+import subprocess
+import contextlib
+import urllib.error
+import urllib.request
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+ML_MODEL_DIR = os.path.join(REPO_DIR, 'ml_model')
+DATA_DIR = os.path.join(REPO_DIR, 'data')
+SCRIPTS_DIR = os.path.join(REPO_DIR, 'scripts')
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+
+# Los módulos del modelo se importan como scripts planos desde ml_model/
+for path in (ML_MODEL_DIR, SCRIPTS_DIR, DATA_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def require_model():
+    """Verificar que existe un modelo entrenado"""
+    model_path = os.path.join(ML_MODEL_DIR, 'model.pkl')
+    if not os.path.exists(model_path):
+        print("❌ Modelo no encontrado. Entrenar primero:")
+        print("   cd ml_model && python train_model.py")
+        sys.exit(1)
+    return model_path
+
+
+def sample_feature_matrix(n_rows, seed=0):
+    """Matriz de features (n_rows x n_features) muestreada de sample_data.csv"""
+    import contextlib
+    import io
+    import numpy as np
+    import pandas as pd
+    import joblib
+    from train_model import feature_engineering
+
+    metadata = joblib.load(os.path.join(ML_MODEL_DIR, 'model_metadata.pkl'))
+    df = pd.read_csv(os.path.join(DATA_DIR, 'sample_data.csv'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        df_features = feature_engineering(df)
+    X = df_features[metadata['feature_cols']].to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    return X[rng.integers(0, len(X), size=n_rows)]
+
+
+def measure(func, repeat=50, warmup=3):
+    """Ejecutar `func` varias veces y devolver estadísticas de latencia (ms)"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def summarize(samples_ms):
+    """Resumen p50/p99/media de una lista de latencias en ms"""
+    ordered = sorted(samples_ms)
+    return {
+        'n': len(ordered),
+        'mean_ms': statistics.fmean(ordered),
+        'p50_ms': ordered[len(ordered) // 2],
+        'p99_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+    }
+
+
+def save_results(name, results):
+    """Guardar resultados como JSON en benchmarks/results/"""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f'{name}.json')
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"\n💾 Resultados guardados: {path}")
+    return path
+
+
+def load_baseline(name):
+    """Línea base versionada en benchmarks/baselines/ (None si no existe)"""
+    path = os.path.join(BASELINES_DIR, f'{name}.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(name, baseline):
+    """Reemplazar la línea base (correr en la máquina de referencia)"""
+    os.makedirs(BASELINES_DIR, exist_ok=True)
+    path = os.path.join(BASELINES_DIR, f'{name}.json')
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, default=str)
+    print(f"💾 Línea base actualizada: {path}")
+    return path
+
+
+@contextlib.contextmanager
+def api_server(port, env=None):
+    """API real (uvicorn) en otro proceso; devuelve la URL base cuando /health responde"""
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api_model:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=ML_MODEL_DIR, env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(200):
+            try:
+                with urllib.request.urlopen(f"{base_url}/health", timeout=1):
+                    break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.05)
+        yield base_url
+    finally:
+        server.terminate()
+        server.wait(10)
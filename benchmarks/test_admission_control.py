@@ -0,0 +1,332 @@
+"""
+Tests del control de admisión (ml_model/admission.py)
+Token buckets por cliente y por poza, orden y descarte por prioridad, y el
+p99 del tráfico prioritario (/health y /predict) con backfill a 3x la
+capacidad de la API, contra una línea base sin backfill medida en la misma
+corrida. La carga es de lazo abierto (llegadas a tasa fija, la latencia se
+mide desde la llegada prevista) sobre la app en proceso. Corren con pytest o
+directamente:
+
+    python benchmarks/test_admission_control.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+
+from bench_utils import require_model, summarize
+
+os.environ['PREDICTION_JOURNAL'] = '0'
+os.environ['ALERT_WEBHOOK_URL'] = '0'
+
+import httpx
+from fastapi.testclient import TestClient
+
+import api_model
+from admission import (
+    BACKFILL, BATCH, CRITICAL, EVICTED, INTERACTIVE, QUEUE_FULL,
+    Overloaded, PriorityLimiter, RateLimiter, classify
+)
+from bench_n8n_pipeline import simulator_readings
+from fast_json import dumps
+
+# Lecturas por request de backfill (/predict/batch). Lotes grandes: con lotes chicos a 3x son cientos
+# de llegadas por segundo y su costo fijo (cliente y 429 en el mismo proceso) satura el CPU por sí solo
+BACKFILL_BATCH = 1000
+PRIORITY_RPS = 10         # /health y /predict, cada uno
+DURATION_S = 4
+P99_BUDGET_SERVICES = 15  # p99 a 3x: el de la línea base sin backfill más 15 backfills de espera como mucho
+MIN_SHED_RATIO = 1 / 3    # A 3x se descartan ~2/3 del backfill con 429; un tercio deja margen al ruido del servicio medido
+UNBOUNDED_FACTOR = 5      # Sin admisión el p99 debe ser varias veces peor (el test detecta la regresión)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket():
+    """Ráfaga de `burst`, después 1/rate por request y Retry-After exacto"""
+    clock = FakeClock()
+    limiter = RateLimiter(rate=2, burst=3, clock=clock)
+    assert [limiter.check('P1') for _ in range(3)] == [0, 0, 0]
+    assert limiter.check('P1') == 0.5
+    assert limiter.check('P2') == 0, "Cada clave tiene su bucket"
+    clock.now = 0.5
+    assert limiter.check('P1') == 0
+    assert limiter.check('P1') == 0.5
+    assert limiter.limited == 2 and limiter.limited_by_key == {'P1': 2}
+    assert RateLimiter(rate=0, burst=1).check('P1') == 0, "rate 0 desactiva el límite"
+
+
+def test_classify():
+    """Prioridad por ruta; X-Priority solo la baja"""
+    assert classify('/health') == CRITICAL
+    assert classify('/alerts/POZA-001') == CRITICAL
+    assert classify('/predict') == INTERACTIVE
+    assert classify('/ingest/batch') == BATCH
+    assert classify('/predict', BACKFILL) == BACKFILL
+    assert classify('/predict/bulk', CRITICAL) == BATCH
+    assert classify('/predict', 'urgente') == INTERACTIVE
+
+
+def test_priority_queue():
+    """La cola atiende primero la mayor prioridad, descarta backfill antes y desplaza al peor"""
+
+    async def scenario():
+        limiter = PriorityLimiter(max_inflight=1, max_queue=4, queue_timeout_s=5)
+        await limiter.acquire(INTERACTIVE)
+        order = []
+
+        async def waiter(priority, name):
+            try:
+                await limiter.acquire(priority)
+                order.append(name)
+                limiter.release(0.01)
+            except Overloaded as e:
+                order.append(f"{name}:{e.reason}")
+
+        tasks = [asyncio.create_task(waiter(BACKFILL, 'backfill-1'))]
+        await asyncio.sleep(0)
+        # La cola admite 1 backfill (25% de 4); el segundo se descarta al llegar
+        tasks.append(asyncio.create_task(waiter(BACKFILL, 'backfill-2')))
+        await asyncio.sleep(0)
+        assert order == [f"backfill-2:{QUEUE_FULL}"]
+        for i in range(3):
+            tasks.append(asyncio.create_task(waiter(INTERACTIVE, f"interactive-{i}")))
+        await asyncio.sleep(0)
+        # Cola llena (4): un interactivo más desplaza al backfill en espera
+        tasks.append(asyncio.create_task(waiter(INTERACTIVE, 'interactive-3')))
+        await asyncio.sleep(0)
+        limiter.release(0.01)
+        await asyncio.gather(*tasks)
+        assert order == [
+            f"backfill-2:{QUEUE_FULL}", f"backfill-1:{EVICTED}",
+            'interactive-0', 'interactive-1', 'interactive-2', 'interactive-3'
+        ], order
+        assert limiter.inflight == 0 and limiter.queue_depth == 0
+        assert limiter.shed[BACKFILL] == {QUEUE_FULL: 1, 'queue_timeout': 0, EVICTED: 1}
+
+    asyncio.run(scenario())
+
+
+def test_rate_limits_http():
+    """429 con Retry-After por poza y por cliente; /health no se limita y los contadores se exponen"""
+    require_model()
+    reading = simulator_readings(1)[0]
+    controller = api_model.ADMISSION
+    saved = controller.enabled, controller.client_limit, controller.poza_limit
+    controller.enabled = True
+    controller.client_limit = RateLimiter(rate=1, burst=10)
+    controller.poza_limit = RateLimiter(rate=1, burst=3)
+    try:
+        with TestClient(api_model.app) as client:
+            codes = [client.post('/predict', json=reading).status_code for _ in range(5)]
+            assert codes == [200, 200, 200, 429, 429], codes
+            response = client.post('/ingest', json=reading)
+            assert response.status_code == 429 and response.json()['reason'] == 'poza_rate'
+            assert int(response.headers['Retry-After']) >= 1
+
+            other = {**reading, 'poza_id': 'POZA-OTRA'}
+            codes = [client.post('/predict', json=other).status_code for _ in range(6)]
+            assert codes[:4] == [200, 200, 200, 429] and codes[-1] == 429, codes
+            assert client.post('/predict', json=other).json()['reason'] == 'client_rate'
+            assert all(client.get('/health').status_code == 200 for _ in range(20))
+
+            stats = client.get('/admission').json()
+            assert stats['poza_limit']['top_limited'][reading['poza_id']] == 3
+            assert stats['client_limit']['limited'] >= 2
+    finally:
+        controller.enabled, controller.client_limit, controller.poza_limit = saved
+
+
+def test_client_key_ignores_spoofed_header():
+    """X-Client-Id solo vale desde un proxy de confianza: de otro origen el límite es por IP"""
+    controller = api_model.ADMISSION
+    saved = controller.enabled, controller.client_limit, controller.trusted_proxies
+    controller.enabled = True
+    try:
+        with TestClient(api_model.app) as client:
+            controller.client_limit = RateLimiter(rate=1, burst=2)
+            codes = [client.get('/', headers={'X-Client-Id': f'gw-{k}'}).status_code for k in range(4)]
+            assert codes == [200, 200, 429, 429], codes
+            assert controller.client_limit.limited_by_key == {'testclient': 2}
+
+            # TestClient conecta como 'testclient': tratarlo como el proxy
+            controller.client_limit = RateLimiter(rate=1, burst=2)
+            controller.trusted_proxies = frozenset({'testclient'})
+            codes = [client.get('/', headers={'X-Client-Id': f'gw-{k}'}).status_code for k in range(4)]
+            assert codes == [200] * 4, codes
+            codes = [client.get('/', headers={'X-Client-Id': 'gw-0'}).status_code for _ in range(2)]
+            assert codes == [200, 429], codes
+    finally:
+        controller.enabled, controller.client_limit, controller.trusted_proxies = saved
+
+
+async def open_loop(client, backfill_rps, body, readings, duration_s):
+    """Llegadas a tasa fija por clase; latencia desde la llegada prevista (sin coordinated omission)"""
+    loop = asyncio.get_running_loop()
+    latencies = {CRITICAL: [], INTERACTIVE: []}
+    statuses = Counter()
+    tasks = []
+
+    async def call(kind, intended, method, url, **kwargs):
+        response = await client.request(method, url, **kwargs)
+        statuses[(kind, response.status_code)] += 1
+        if kind in latencies:
+            latencies[kind].append((loop.time() - intended) * 1000)
+
+    def backfill(k):
+        return ('POST', '/predict/batch'), {
+            'content': body, 'headers': {'Content-Type': 'application/json', 'X-Priority': BACKFILL}
+        }
+
+    def health(k):
+        return ('GET', '/health'), {}
+
+    def predict(k):
+        return ('POST', '/predict'), {'json': readings[k % len(readings)]}
+
+    async def generator(kind, rate, make):
+        start = loop.time()
+        k = 0
+        while k / rate < duration_s:
+            intended = start + k / rate
+            delay = intended - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            (method, url), kwargs = make(k)
+            tasks.append(asyncio.create_task(call(kind, intended, method, url, **kwargs)))
+            k += 1
+
+    generators = [generator(CRITICAL, PRIORITY_RPS, health), generator(INTERACTIVE, PRIORITY_RPS, predict)]
+    if backfill_rps > 0:
+        generators.append(generator(BACKFILL, backfill_rps, backfill))
+    await asyncio.gather(*generators)
+    await asyncio.gather(*tasks)
+    return {kind: summarize(samples) for kind, samples in latencies.items()}, statuses
+
+
+def run_load(load_factor, admission=True):
+    """Backfill a `load_factor` x la capacidad medida (0 = solo el tráfico prioritario), más el prioritario"""
+    readings = simulator_readings(BACKFILL_BATCH)
+    body = dumps({'readings': readings})
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=api_model.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://api') as client:
+            headers = {'Content-Type': 'application/json', 'X-Priority': BACKFILL}
+            # Calentamiento de las tres rutas antes de medir
+            for _ in range(3):
+                await client.post('/predict/batch', content=body, headers=headers)
+                await client.get('/health')
+                await client.post('/predict', json=readings[0])
+            start = time.perf_counter()
+            for _ in range(10):
+                await client.post('/predict/batch', content=body, headers=headers)
+            service_s = (time.perf_counter() - start) / 10
+
+            # Solo el límite de concurrencia: la carga mide capacidad, no los límites por cliente o poza
+            controller = api_model.ADMISSION
+            saved = controller.enabled, controller.limiter, controller.client_limit, controller.poza_limit
+            controller.limiter = PriorityLimiter()
+            controller.client_limit = controller.poza_limit = RateLimiter(rate=0, burst=1)
+            controller.enabled = admission
+            try:
+                latencies, statuses = await open_loop(
+                    client, load_factor / service_s, body, readings, DURATION_S
+                )
+            finally:
+                controller.enabled, controller.limiter, controller.client_limit, controller.poza_limit = saved
+            return service_s, latencies, statuses
+
+    return asyncio.run(scenario())
+
+
+def report(label, service_s, latencies, statuses):
+    shed = statuses[(BACKFILL, 429)]
+    served = statuses[(BACKFILL, 200)]
+    print(f"   {label:<22} backfill {served:>4} ok / {shed:>4} 429 | "
+          f"/health p99 {latencies[CRITICAL]['p99_ms']:>7.1f} ms | "
+          f"/predict p99 {latencies[INTERACTIVE]['p99_ms']:>7.1f} ms "
+          f"(servicio backfill {service_s * 1000:.1f} ms)")
+
+
+def test_priority_p99_at_3x_capacity():
+    """A 3x la capacidad el backfill se descarta con 429 y el p99 prioritario no se dispara"""
+    require_model()
+    if api_model.MODEL is None:
+        api_model.load_model()
+
+    base = run_load(0)
+    report('sin backfill', *base)
+    overload = run_load(3.0)
+    report('3x, con admisión', *overload)
+    unbounded = run_load(3.0, admission=False)
+    report('3x, sin admisión', *unbounded)
+
+    _, base_latencies, _ = base
+    service_s, latencies, statuses = overload
+    _, unbounded_latencies, _ = unbounded
+    for kind in (CRITICAL, INTERACTIVE):
+        assert statuses[(kind, 200)] == latencies[kind]['n'], f"{kind}: requests prioritarios rechazados"
+        budget = base_latencies[kind]['p99_ms'] + P99_BUDGET_SERVICES * service_s * 1000
+        assert latencies[kind]['p99_ms'] <= budget, (
+            f"{kind}: p99 {latencies[kind]['p99_ms']:.1f} ms > {budget:.1f} ms"
+        )
+        assert unbounded_latencies[kind]['p99_ms'] > UNBOUNDED_FACTOR * latencies[kind]['p99_ms']
+    shed, offered = statuses[(BACKFILL, 429)], statuses[(BACKFILL, 429)] + statuses[(BACKFILL, 200)]
+    assert shed >= MIN_SHED_RATIO * offered, f"A 3x la capacidad solo {shed}/{offered} backfills descartados"
+
+
+def run_all_tests():
+    """Ejecutar todos los tests"""
+    print("\n" + "#"*60)
+    print("# TESTS DE CONTROL DE ADMISIÓN")
+    print("#"*60)
+
+    tests = [
+        ("Token bucket", test_token_bucket),
+        ("Clasificación por ruta", test_classify),
+        ("Cola con prioridades", test_priority_queue),
+        ("Límites por poza y cliente (HTTP)", test_rate_limits_http),
+        ("X-Client-Id solo desde proxies de confianza", test_client_key_ignores_spoofed_header),
+        ("p99 prioritario a 3x la capacidad", test_priority_p99_at_3x_capacity)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            results.append((name, "PASS"))
+        except AssertionError as e:
+            print(f"\nFAIL en {name}: {str(e)}")
+            results.append((name, "FAIL"))
+        except Exception as e:
+            print(f"\nERROR en {name}: {str(e)}")
+            results.append((name, "ERROR"))
+
+    # Resumen
+    print("\n" + "#"*60)
+    print("# RESUMEN DE TESTS")
+    print("#"*60)
+    for name, status in results:
+        symbol = "✓" if status == "PASS" else "✗"
+        print(f"{symbol} {name}: {status}")
+
+    passed = sum(1 for _, status in results if status == "PASS")
+    total = len(results)
+    print(f"\nTotal: {passed}/{total} tests pasaron")
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.INFO)
+    sys.exit(0 if run_all_tests() else 1)
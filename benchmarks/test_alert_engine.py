@@ -0,0 +1,102 @@
+"""
+Tests del motor de alertas por poza (ml_model/alert_engine.py)
+Histéresis, dwell y cooldown, incluida una alerta suprimida por cooldown que
+persiste: tiene que notificar cuando el cooldown vence. Corren con pytest o
+directamente:
+
+    python benchmarks/test_alert_engine.py
+"""
+
+import sys
+
+import bench_utils  # noqa: F401  (rutas de ml_model/)
+
+from alert_engine import ALERT, ALERT_CLEAR, ALERT_START, NORMAL, AlertEngine
+
+T0 = 1_735_689_600
+
+
+def run(engine, readings):
+    """Procesar (segundos desde T0, concentración) y devolver las transiciones con su instante"""
+    transitions = []
+    for offset, concentration in readings:
+        _, transition = engine.update('POZA_1', T0 + offset, concentration)
+        if transition is not None:
+            transitions.append((offset, transition))
+    return transitions
+
+
+def test_start_and_clear():
+    """Entra tras el dwell, la histéresis no sale entre umbrales y sale bajo exit_threshold"""
+    engine = AlertEngine(enter_threshold=4500, exit_threshold=4300, min_dwell_s=30, cooldown_s=1800)
+    transitions = run(engine, [(0, 4600), (20, 4600), (40, 4600), (60, 4400), (120, 4000)])
+    assert transitions == [(40, ALERT_START), (120, ALERT_CLEAR)], transitions
+    assert engine.state_of('POZA_1')['state'] == NORMAL
+
+
+def test_suppressed_alert_that_clears_stays_silent():
+    """Reentrada breve dentro del cooldown: ni ALERT_START ni ALERT_CLEAR"""
+    engine = AlertEngine(min_dwell_s=30, cooldown_s=1800)
+    transitions = run(engine, [(0, 4600), (30, 4600), (60, 4000), (120, 4600), (150, 4600), (180, 4000)])
+    assert transitions == [(30, ALERT_START), (60, ALERT_CLEAR)], transitions
+    assert engine.suppressed == 1
+
+
+def test_suppressed_alert_notifies_after_cooldown():
+    """START a 4600, CLEAR a 4000 y 200 minutos a 4600: un solo ALERT_START al vencer el cooldown"""
+    engine = AlertEngine(min_dwell_s=30, cooldown_s=1800)
+    readings = [(0, 4600), (30, 4600), (60, 4000)]
+    readings += [(120 + 60 * minute, 4600) for minute in range(200)]
+    transitions = run(engine, readings)
+
+    assert transitions[:2] == [(30, ALERT_START), (60, ALERT_CLEAR)], transitions
+    assert len(transitions) == 3, transitions
+    offset, transition = transitions[2]
+    assert transition == ALERT_START
+    # Primera lectura con el cooldown cumplido desde el primer ALERT_START
+    assert 30 + 1800 <= offset < 30 + 1800 + 60, offset
+    state = engine.state_of('POZA_1')
+    assert state['state'] == ALERT and state['notified'] is True, state
+
+
+def run_all_tests():
+    """Ejecutar todos los tests"""
+    print("\n" + "#"*60)
+    print("# TESTS DEL MOTOR DE ALERTAS")
+    print("#"*60)
+
+    tests = [
+        ("Inicio y fin con histéresis", test_start_and_clear),
+        ("Alerta suprimida que se despeja", test_suppressed_alert_that_clears_stays_silent),
+        ("Alerta suprimida que persiste notifica", test_suppressed_alert_notifies_after_cooldown)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            results.append((name, "PASS"))
+        except AssertionError as e:
+            print(f"\nFAIL en {name}: {str(e)}")
+            results.append((name, "FAIL"))
+        except Exception as e:
+            print(f"\nERROR en {name}: {str(e)}")
+            results.append((name, "ERROR"))
+
+    # Resumen
+    print("\n" + "#"*60)
+    print("# RESUMEN DE TESTS")
+    print("#"*60)
+    for name, status in results:
+        symbol = "✓" if status == "PASS" else "✗"
+        print(f"{symbol} {name}: {status}")
+
+    passed = sum(1 for _, status in results if status == "PASS")
+    total = len(results)
+    print(f"\nTotal: {passed}/{total} tests pasaron")
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
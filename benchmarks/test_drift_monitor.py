@@ -0,0 +1,113 @@
+"""
+Tests del monitor de drift (ml_model/drift_monitor.py): se alimenta con los
+valores como llegaron, así un ratio opcional faltante no cuenta en su
+feature en lugar de sumar el 7.0/1.5 que imputa el modelo.
+Corren con pytest o directamente:
+
+    python benchmarks/test_drift_monitor.py
+"""
+
+import math
+import os
+import sys
+
+from bench_utils import require_model, sample_feature_matrix
+
+os.environ['PREDICTION_JOURNAL'] = '0'
+os.environ['ALERT_WEBHOOK_URL'] = '0'
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import api_model
+from drift_monitor import MIN_SAMPLES, DriftMonitor
+
+
+def test_missing_values_skipped():
+    """Un NaN no entra en n, media ni deciles de su feature; el resto de la fila sí cuenta"""
+    require_model()
+    if api_model.MODEL is None:
+        api_model.load_model()
+    monitor = DriftMonitor(api_model.MODEL_METADATA['drift_snapshot'])
+    names = monitor.feature_names
+    mg_li, ca_li = names.index('mg_li_ratio'), names.index('ca_li_ratio')
+
+    X = sample_feature_matrix(200)
+    X[:120, mg_li] = np.nan
+    X[:, ca_li] = np.nan
+    monitor.update(X, ['P1'] * 200)
+
+    stats = monitor.global_stats
+    assert stats.rows == 200 and stats.n[0] == 200 and stats.n[mg_li] == 80 and stats.n[ca_li] == 0
+    assert math.isclose(stats.mean[mg_li], X[120:, mg_li].mean())
+    assert stats.decile_counts[mg_li].sum() == 80 and stats.sketch_counts[ca_li].sum() == 0
+
+    report = monitor.report()
+    assert report['n'] == 200 and report['features']['mg_li_ratio']['n'] == 80
+    assert report['features']['ca_li_ratio'] == {'n': 0, 'status': 'insuficiente'}
+    assert report['max_psi_feature'] != 'ca_li_ratio'
+
+
+def test_drift_sees_raw_ratios():
+    """Lecturas sin ratios por /predict no mueven la feature del ratio en /drift"""
+    require_model()
+    reading = {
+        'poza_id': 'POZA_DRIFT', 'days_evaporation': 120.0, 'temperature_c': 22.0, 'humidity_percent': 20.0,
+        'ph': 7.5, 'conductivity_ms_cm': 95.0, 'density_g_cm3': 1.2
+    }
+    with TestClient(api_model.app) as client:
+        assert api_model.DRIFT is not None, "La metadata no tiene drift_snapshot (reentrenar)"
+        saved = api_model.DRIFT
+        api_model.DRIFT = DriftMonitor(saved.snapshot)
+        try:
+            for _ in range(MIN_SAMPLES):
+                assert client.post('/predict', json=reading).status_code == 200
+            assert client.post('/predict', json={**reading, 'mg_li_ratio': 4.0}).status_code == 200
+            features = client.get('/drift/POZA_DRIFT').json()['features']
+        finally:
+            api_model.DRIFT = saved
+    assert features['ph']['n'] == MIN_SAMPLES + 1 and features['ph']['mean'] == 7.5, features['ph']
+    assert features['mg_li_ratio'] == {'n': 1, 'status': 'insuficiente'}, features['mg_li_ratio']
+    assert features['ca_li_ratio'] == {'n': 0, 'status': 'insuficiente'}, features['ca_li_ratio']
+
+
+def run_all_tests():
+    """Ejecutar todos los tests"""
+    print("\n" + "#"*60)
+    print("# TESTS DEL MONITOR DE DRIFT")
+    print("#"*60)
+
+    tests = [
+        ("Valores faltantes fuera de la feature", test_missing_values_skipped),
+        ("/drift con los ratios como llegaron", test_drift_sees_raw_ratios)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            results.append((name, "PASS"))
+        except AssertionError as e:
+            print(f"\nFAIL en {name}: {str(e)}")
+            results.append((name, "FAIL"))
+        except Exception as e:
+            print(f"\nERROR en {name}: {str(e)}")
+            results.append((name, "ERROR"))
+
+    # Resumen
+    print("\n" + "#"*60)
+    print("# RESUMEN DE TESTS")
+    print("#"*60)
+    for name, status in results:
+        symbol = "✓" if status == "PASS" else "✗"
+        print(f"{symbol} {name}: {status}")
+
+    passed = sum(1 for _, status in results if status == "PASS")
+    total = len(results)
+    print(f"\nTotal: {passed}/{total} tests pasaron")
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
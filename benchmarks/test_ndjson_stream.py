@@ -0,0 +1,145 @@
+"""
+Tests de la lectura en streaming de lotes NDJSON (ml_model/ndjson_stream.py):
+un cuerpo chico con mucha compresión ("zip bomb") se corta apenas supera el
+tope descomprimido, sin inflar el chunk entero en memoria.
+Corren con pytest o directamente:
+
+    python benchmarks/test_ndjson_stream.py
+"""
+
+import gzip
+import os
+import sys
+import tracemalloc
+import zlib
+
+from bench_utils import require_model
+
+os.environ['PREDICTION_JOURNAL'] = '0'
+os.environ['ALERT_WEBHOOK_URL'] = '0'
+
+from fastapi.testclient import TestClient
+
+import api_model
+from ndjson_stream import NDJSONStreamDecoder, PayloadTooLarge, zstandard
+
+MB = 1024 * 1024
+BOMB_MB = 256
+MAX_PEAK_MB = 32
+
+
+def gzip_bomb(expanded_mb=BOMB_MB):
+    """Cuerpo gzip de `expanded_mb` MB de saltos de línea (pesa ~250 KB comprimido)"""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    block = b'\n' * MB
+    body = b''.join(compressor.compress(block) for _ in range(expanded_mb))
+    return body + compressor.flush()
+
+
+def peak_mb(func):
+    """Pico de memoria asignada (MB) mientras corre `func`"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / MB
+    finally:
+        tracemalloc.stop()
+
+
+def test_decoder_roundtrip_in_small_chunks():
+    """Un lote gzip válido partido en chunks chicos da las mismas líneas"""
+    lines = [b'{"poza_id": "POZA_%d"}' % i for i in range(1000)]
+    body = gzip.compress(b'\n'.join(lines) + b'\n')
+    decoder = NDJSONStreamDecoder('gzip', max_bytes=MB)
+    decoded = []
+    for start in range(0, len(body), 97):
+        decoded.extend(decoder.feed(body[start:start + 97]))
+    decoded.extend(decoder.close())
+    assert decoded == lines
+    assert decoder.compressed_bytes == len(body)
+
+
+def test_decoder_stops_at_cap():
+    """El decoder corta al cruzar el tope y nunca infla más de tope + 1 bytes"""
+    body = gzip_bomb()
+    for encoding, payload in [('gzip', body)] + (
+        [('zstd', zstandard.ZstdCompressor().compress(b'\n' * (BOMB_MB * MB)))] if zstandard is not None else []
+    ):
+        decoder = NDJSONStreamDecoder(encoding, max_bytes=4 * MB)
+
+        def feed():
+            try:
+                decoder.feed(payload)
+            except PayloadTooLarge:
+                return
+            raise AssertionError(f"{encoding}: se esperaba PayloadTooLarge")
+
+        peak = peak_mb(feed)
+        print(f"   {encoding}: {len(payload) / 1024:.0f} KB -> pico {peak:.1f} MB")
+        assert decoder.decompressed_bytes == 4 * MB + 1, (encoding, decoder.decompressed_bytes)
+        assert peak < MAX_PEAK_MB, (encoding, peak)
+
+
+def test_ingest_batch_bomb_rejected():
+    """/ingest/batch responde 413 a un cuerpo chico que descomprime a 256 MB, con memoria acotada"""
+    require_model()
+    body = gzip_bomb()
+    saved = api_model.INGEST_BATCH_MAX_BYTES
+    api_model.INGEST_BATCH_MAX_BYTES = 8 * MB
+    try:
+        with TestClient(api_model.app) as client:
+            responses = []
+            peak = peak_mb(lambda: responses.append(client.post(
+                '/ingest/batch', content=body,
+                headers={'Content-Type': 'application/x-ndjson', 'Content-Encoding': 'gzip'}
+            )))
+    finally:
+        api_model.INGEST_BATCH_MAX_BYTES = saved
+
+    response = responses[0]
+    print(f"   {len(body) / 1024:.0f} KB gzip -> HTTP {response.status_code}, pico {peak:.1f} MB")
+    assert response.status_code == 413, response.text
+    assert peak < MAX_PEAK_MB, peak
+
+
+def run_all_tests():
+    """Ejecutar todos los tests"""
+    print("\n" + "#"*60)
+    print("# TESTS DE LOTES NDJSON EN STREAMING")
+    print("#"*60)
+
+    tests = [
+        ("Lote gzip en chunks chicos", test_decoder_roundtrip_in_small_chunks),
+        ("Decoder corta en el tope", test_decoder_stops_at_cap),
+        ("Zip bomb rechazada con 413", test_ingest_batch_bomb_rejected)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            results.append((name, "PASS"))
+        except AssertionError as e:
+            print(f"\nFAIL en {name}: {str(e)}")
+            results.append((name, "FAIL"))
+        except Exception as e:
+            print(f"\nERROR en {name}: {str(e)}")
+            results.append((name, "ERROR"))
+
+    # Resumen
+    print("\n" + "#"*60)
+    print("# RESUMEN DE TESTS")
+    print("#"*60)
+    for name, status in results:
+        symbol = "✓" if status == "PASS" else "✗"
+        print(f"{symbol} {name}: {status}")
+
+    passed = sum(1 for _, status in results if status == "PASS")
+    total = len(results)
+    print(f"\nTotal: {passed}/{total} tests pasaron")
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
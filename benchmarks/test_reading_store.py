@@ -0,0 +1,198 @@
+"""
+Tests del historial de lecturas (ml_model/reading_store.py) y sus agregados
+(ml_model/rollups.py): un campo faltante (los ratios Mg/Li y Ca/Li son
+opcionales) se guarda como NULL y no entra en mínimo, máximo ni media; una
+base que no se puede abrir se cuenta en las stats sin tirar el writer.
+Corren con pytest o directamente:
+
+    python benchmarks/test_reading_store.py
+"""
+
+import math
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from bench_utils import require_model
+
+os.environ['PREDICTION_JOURNAL'] = '0'
+os.environ['ALERT_WEBHOOK_URL'] = '0'
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import api_model
+from reading_store import INSERT_SQL, READING_FIELDS, ROLLUP_FIELDS, SCHEMA, ReadingStore
+from rollups import Rollups
+
+T0 = 1_735_689_600
+HOUR_MS = 3_600_000
+RATIOS = ('mg_li_ratio', 'ca_li_ratio')
+
+
+def reading(offset_s, mg_li=None, ca_li=None, prediction=4000.0):
+    """Fila de readings (poza 1) con los ratios opcionales"""
+    values = dict.fromkeys(READING_FIELDS, 1.0)
+    values.update(mg_li_ratio=mg_li, ca_li_ratio=ca_li)
+    return (1, (T0 + offset_s) * 1000, *values.values(), prediction, None, None, 1)
+
+
+def rollup_db(rows):
+    """Base en memoria con las lecturas crudas y sus agregados mantenidos al insertar"""
+    rollups = Rollups(ROLLUP_FIELDS)
+    conn = sqlite3.connect(':memory:')
+    conn.executescript(SCHEMA + rollups.schema)
+    conn.executemany(INSERT_SQL, rows)
+    values = np.array([row[:2 + len(ROLLUP_FIELDS)] for row in rows], dtype=np.float64)
+    rollups.update(conn, values[:, 0].astype(np.int64), values[:, 1].astype(np.int64), values[:, 2:])
+    return conn, rollups
+
+
+def test_rollups_ignore_missing_ratios():
+    """Media, mínimo y máximo de un ratio solo sobre las lecturas que lo traen"""
+    rows = [reading(0, 4.0, 1.0), reading(60), reading(120, 6.0), reading(180)]
+    conn, rollups = rollup_db(rows)
+    summary = rollups.query(conn, 1, 'hour', T0 * 1000, T0 * 1000 + HOUR_MS, RATIOS + ('ph',))
+    columns, totals = summary['columns'], summary['totals']
+
+    assert columns['n'] == [4]
+    assert columns['mg_li_ratio_n'] == [2] and columns['mg_li_ratio_mean'] == [5.0], columns
+    assert columns['mg_li_ratio_min'] == [4.0] and columns['mg_li_ratio_max'] == [6.0], columns
+    assert columns['ca_li_ratio_n'] == [1] and columns['ca_li_ratio_mean'] == [1.0], columns
+    assert columns['ph_n'] == [4] and columns['ph_mean'] == [1.0], columns
+    assert totals['n'] == 4 and totals['mg_li_ratio_mean'] == 5.0, totals
+
+
+def test_bucket_without_values_is_null():
+    """Un bucket sin ningún ratio informa None; uno posterior con ratio no hereda el NULL"""
+    rows = [reading(0), reading(60), reading(HOUR_MS // 1000, 7.5)]
+    conn, rollups = rollup_db(rows)
+    # Un segundo lote en la primera hora sin ratios y otro con ratio (upsert sobre el bucket)
+    late = [reading(120), reading(180, 3.0)]
+    conn.executemany(INSERT_SQL, late)
+    values = np.array([row[:2 + len(ROLLUP_FIELDS)] for row in late], dtype=np.float64)
+    rollups.update(conn, values[:, 0].astype(np.int64), values[:, 1].astype(np.int64), values[:, 2:])
+
+    summary = rollups.query(conn, 1, 'hour', T0 * 1000, T0 * 1000 + 2 * HOUR_MS, RATIOS)
+    columns = summary['columns']
+    assert columns['n'] == [4, 1]
+    assert columns['mg_li_ratio_n'] == [1, 1] and columns['mg_li_ratio_mean'] == [3.0, 7.5], columns
+    assert columns['ca_li_ratio_n'] == [0, 0], columns
+    assert columns['ca_li_ratio_mean'] == [None, None] and columns['ca_li_ratio_min'] == [None, None], columns
+    assert summary['totals']['ca_li_ratio_mean'] is None
+
+    # La compactación desde las lecturas crudas da lo mismo
+    assert rollups.compact(conn, T0 * 1000 + 3 * HOUR_MS + 86_400_000) > 0
+    compacted = rollups.query(conn, 1, 'hour', T0 * 1000, T0 * 1000 + 2 * HOUR_MS, RATIOS)
+    raw = rollups.raw(conn, 1, 'hour', T0 * 1000, T0 * 1000 + 2 * HOUR_MS, RATIOS)
+    for name, values in raw['columns'].items():
+        assert compacted['columns'][name] == values, name
+    day = rollups.query(conn, 1, 'day', T0 * 1000, T0 * 1000 + HOUR_MS, RATIOS)
+    assert day['columns']['mg_li_ratio_n'] == [2] and math.isclose(day['columns']['mg_li_ratio_mean'][0], 5.25)
+    assert day['columns']['ca_li_ratio_mean'] == [None]
+
+
+def test_missing_ratios_stored_as_null():
+    """Una lectura sin ratios vuelve de /readings con null, no con los 7.0/1.5 que imputa el modelo"""
+    require_model()
+    import msgpack
+
+    data = {
+        'poza_id': 'POZA_NULL', 'days_evaporation': 120.0, 'temperature_c': 22.0, 'humidity_percent': 20.0,
+        'ph': 7.5, 'conductivity_ms_cm': 95.0, 'density_g_cm3': 1.2
+    }
+    bulk = {field: [value] * 2 for field, value in data.items()}
+    bulk['timestamp'] = ['2025-01-01T00:02:00', '2025-01-01T00:03:00']
+    bulk['mg_li_ratio'] = [float('nan'), 6.0]
+
+    with tempfile.TemporaryDirectory() as tmp, TestClient(api_model.app) as client:
+        store = ReadingStore(os.path.join(tmp, 'readings.db')).start()
+        api_model.STORE = store
+        try:
+            assert client.post('/predict', json={**data, 'timestamp': '2025-01-01T00:00:00'}).status_code == 200
+            assert client.post('/predict', json={
+                **data, 'timestamp': '2025-01-01T00:01:00', 'mg_li_ratio': 4.0, 'ca_li_ratio': 1.0
+            }).status_code == 200
+            response = client.post('/predict/bulk', content=msgpack.packb(bulk),
+                                   headers={'Content-Type': 'application/msgpack'})
+            assert response.status_code == 200, response.text
+            store.stop()
+
+            columns = client.get('/readings/POZA_NULL', params={
+                'start': 0, 'end': 4_102_444_800_000, 'format': 'columnar'
+            }).json()['columns']
+            assert columns['mg_li_ratio'] == [None, 4.0, None, 6.0], columns['mg_li_ratio']
+            assert columns['ca_li_ratio'] == [None, 1.0, None, None], columns['ca_li_ratio']
+            assert columns['ph'] == [7.5] * 4
+
+            totals = store.summary('POZA_NULL', 'day', 0, 4_102_444_800_000)['totals']
+            assert totals['n'] == 4 and totals['mg_li_ratio_n'] == 2 and totals['mg_li_ratio_mean'] == 5.0, totals
+            assert totals['ca_li_ratio_mean'] == 1.0, totals
+        finally:
+            api_model.STORE = None
+            store.stop()
+            store.close_readers()
+
+
+def test_unopenable_db_counted():
+    """Si la base no se puede abrir el writer no muere: cuenta el error en stats y sigue encolando"""
+    with tempfile.TemporaryDirectory() as tmp:
+        # Un directorio en lugar de un archivo: sqlite3.connect falla
+        store = ReadingStore(tmp).start()
+        try:
+            deadline = time.monotonic() + 5
+            while store.stats()['connect_errors'] == 0 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            store.record((['P1'], [T0 * 1000], [[1.0]] * len(READING_FIELDS), [4000.0], None, None, 1))
+            stats = store.stats()
+            assert stats['connect_errors'] == 1 and stats['running'], stats
+            assert stats['queue_depth'] == 1 and stats['written'] == 0, stats
+        finally:
+            store.stop()
+        assert store.stats()['connect_errors'] == 2, "Al detenerse reintenta una vez para drenar la cola"
+
+
+def run_all_tests():
+    """Ejecutar todos los tests"""
+    print("\n" + "#"*60)
+    print("# TESTS DEL HISTORIAL DE LECTURAS")
+    print("#"*60)
+
+    tests = [
+        ("Agregados sin los ratios faltantes", test_rollups_ignore_missing_ratios),
+        ("Bucket sin valores en NULL", test_bucket_without_values_is_null),
+        ("Ratios faltantes guardados como NULL", test_missing_ratios_stored_as_null),
+        ("Base que no se puede abrir", test_unopenable_db_counted)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            results.append((name, "PASS"))
+        except AssertionError as e:
+            print(f"\nFAIL en {name}: {str(e)}")
+            results.append((name, "FAIL"))
+        except Exception as e:
+            print(f"\nERROR en {name}: {str(e)}")
+            results.append((name, "ERROR"))
+
+    # Resumen
+    print("\n" + "#"*60)
+    print("# RESUMEN DE TESTS")
+    print("#"*60)
+    for name, status in results:
+        symbol = "✓" if status == "PASS" else "✗"
+        print(f"{symbol} {name}: {status}")
+
+    passed = sum(1 for _, status in results if status == "PASS")
+    total = len(results)
+    print(f"\nTotal: {passed}/{total} tests pasaron")
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
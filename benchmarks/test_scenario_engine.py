@@ -0,0 +1,183 @@
+"""
+Tests del motor de escenarios del simulador (scripts/scenario_engine.py)
+Reproducción exacta con la misma semilla, procesos de llegada, ciclo diario,
+bombeos y cosechas, backlog y reenvío tras un corte, y un escenario con
+corte contra la API real (uvicorn en otro proceso) vía el gateway de campo.
+Corren con pytest o directamente:
+
+    python benchmarks/test_scenario_engine.py
+"""
+
+import statistics
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from bench_utils import api_server, require_model
+
+from scenario_engine import load_profile, run_scenario
+
+PORT = 8769
+SERVER_ENV = {'PREDICTION_JOURNAL': '0', 'ALERT_WEBHOOK_URL': '0'}
+
+
+def replay(profile, **kwargs):
+    """Escenario sin red que además devuelve las lecturas en el orden de entrega"""
+    readings = []
+
+    def send(reading):
+        readings.append(reading)
+        return {'success': True, 'data': {}}
+
+    report = run_scenario(load_profile({'speed': 0, **profile}, **kwargs), sink='direct', send=send, verbose=False)
+    return report, readings
+
+
+def test_exact_replay():
+    """La misma semilla da exactamente las mismas lecturas; otra semilla, otras"""
+    profile = {'duration_h': 6, 'arrivals': {'process': 'bursty', 'gap_s': 1800},
+               'outages': [{'at_h': 2, 'duration_min': 30}], 'events': [{'type': 'pump', 'at_h': 1}]}
+    first, readings = replay(profile)
+    second, again = replay(profile)
+    assert readings == again
+    assert first['fingerprint'] == second['fingerprint']
+    assert first['buckets'] == second['buckets']
+    other, _ = replay(profile, seed=43)
+    assert other['fingerprint'] != first['fingerprint']
+
+    # Las llegadas no dependen del clima: cambiarlo no mueve los instantes
+    warmer, warmer_readings = replay({**profile, 'weather': {'temperature_c': {'mean': 20}}})
+    assert [r['timestamp'] for r in warmer_readings] == [r['timestamp'] for r in readings]
+
+
+def test_arrival_processes():
+    """Cadencia fija exacta, Poisson con la media pedida y ráfagas más dispersas"""
+    expected = 24 * 3600 / 10 * 3
+    fixed, _ = replay({'arrivals': {'process': 'fixed'}})
+    assert fixed['offered'] == expected
+    assert fixed['offered_per_min']['peak'] == 18
+
+    poisson, poisson_readings = replay({'arrivals': {'process': 'poisson'}})
+    assert abs(poisson['offered'] - expected) < 0.03 * expected, poisson['offered']
+
+    bursty, bursty_readings = replay({'arrivals': {'process': 'bursty', 'burst_factor': 10}})
+    assert bursty['bursts'] > 0
+    assert bursty['offered'] > poisson['offered']
+    assert bursty['offered_per_min']['peak'] > 3 * poisson['offered_per_min']['peak']
+
+    def dispersion(readings):
+        per_minute = Counter(r['timestamp'][:16] for r in readings)
+        counts = list(per_minute.values())
+        return statistics.variance(counts) / statistics.fmean(counts)
+
+    # Poisson: varianza ≈ media por minuto; con ráfagas, mucho mayor
+    assert 0.8 < dispersion(poisson_readings) < 1.2
+    assert dispersion(bursty_readings) > 5
+
+
+def test_diurnal_cycle_and_events():
+    """Temperatura con máximo a la tarde, humedad de noche; bombeo y cosecha reinician los días"""
+    _, readings = replay({
+        'duration_h': 48,
+        'evaporation': {'days_per_day': 30, 'start_days': [100, 100]},
+        'events': [{'type': 'pump', 'poza': 'POZA_2', 'at_h': 12, 'days': 40}]
+    })
+    by_hour = defaultdict(lambda: defaultdict(list))
+    for reading in readings:
+        hour = datetime.fromisoformat(reading['timestamp']).hour
+        by_hour[hour]['temperature_c'].append(reading['temperature_c'])
+        by_hour[hour]['humidity_percent'].append(reading['humidity_percent'])
+    mean = {hour: {name: statistics.fmean(values) for name, values in series.items()} for hour, series in by_hour.items()}
+    assert mean[15]['temperature_c'] > mean[3]['temperature_c'] + 15
+    assert mean[5]['humidity_percent'] > mean[17]['humidity_percent'] + 15
+
+    poza_2 = [(r['timestamp'], r['days_evaporation']) for r in readings if r['poza_id'] == 'POZA_2']
+    before = [days for ts, days in poza_2 if ts < '2025-01-15T12:00']
+    after = [days for ts, days in poza_2 if '2025-01-15T12:00' <= ts < '2025-01-15T12:10']
+    assert before[-1] > 110 and 40 <= after[0] < 41, (before[-1], after[0])
+    # Al completar el ciclo las pozas se cosechan solas
+    report, harvested = replay({'duration_h': 48, 'evaporation': {'days_per_day': 60, 'start_days': [100, 100]}})
+    assert any(event['type'] == 'harvest' for event in report['events'])
+    assert max(r['days_evaporation'] for r in harvested) < 180
+
+
+def test_outage_backlog_replay():
+    """Durante el corte no se entrega nada; al volver se reenvía el backlog y no se pierde ninguna lectura"""
+    report, readings = replay({'duration_h': 4, 'outages': [{'at_h': 1, 'duration_min': 60}],
+                               'report_every_min': 30})
+    assert report['offered'] == report['delivered'] == len(readings)
+    assert report['backlog'] == 0
+    [outage] = report['outages']
+    offered_during = sum(b['offered'] for b in report['buckets'][2:4])
+    assert outage['duration_min'] == 60 and outage['backlog'] == offered_during
+    assert outage['replay_s'] is not None
+    delivered = [b['delivered'] for b in report['buckets']]
+    assert delivered[2] == delivered[3] == 0, delivered
+    assert delivered[4] >= outage['backlog'], "El backlog se reenvía al volver el enlace"
+    assert report['delivered_per_min']['peak'] >= outage['backlog']
+    # El orden de entrega es el de generación
+    assert [r['timestamp'] for r in readings] == sorted(r['timestamp'] for r in readings)
+
+
+def test_gateway_against_api():
+    """Escenario con ráfagas y corte contra /ingest/batch: todo se entrega y el drenado queda registrado"""
+    require_model()
+    profile = load_profile({
+        'duration_h': 3, 'speed': 0, 'arrivals': {'process': 'bursty', 'gap_s': 1800},
+        'outages': [{'at_h': 1, 'duration_min': 45}], 'gateway': {'batch_size': 500, 'max_delay_s': 60}
+    })
+    with api_server(PORT, SERVER_ENV) as base_url:
+        report = run_scenario(profile, sink='gateway', url=f"{base_url}/ingest/batch", verbose=False)
+    stats = report['sink_stats']
+    assert report['delivered'] + report['rejected'] == report['offered'], stats
+    assert report['rejected'] == 0 and report['backlog'] == 0
+    [outage] = report['outages']
+    assert outage['backlog'] > 0 and outage['replay_s'] is not None
+    assert len(stats['drains']) == 1 and stats['drains'][0]['backlog'] >= outage['backlog']
+    print(f"   {report['offered']} lecturas en {report['real_s']:.1f} s; corte de {outage['duration_min']} min, "
+          f"backlog {outage['backlog']} reenviado en {outage['replay_real_s']} s reales")
+
+
+def run_all_tests():
+    """Ejecutar todos los tests"""
+    print("\n" + "#"*60)
+    print("# TESTS DEL MOTOR DE ESCENARIOS")
+    print("#"*60)
+
+    tests = [
+        ("Reproducción exacta con semilla", test_exact_replay),
+        ("Procesos de llegada", test_arrival_processes),
+        ("Ciclo diario y eventos", test_diurnal_cycle_and_events),
+        ("Backlog y reenvío tras un corte", test_outage_backlog_replay),
+        ("Gateway contra la API real", test_gateway_against_api)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            results.append((name, "PASS"))
+        except AssertionError as e:
+            print(f"\nFAIL en {name}: {str(e)}")
+            results.append((name, "FAIL"))
+        except Exception as e:
+            print(f"\nERROR en {name}: {str(e)}")
+            results.append((name, "ERROR"))
+
+    # Resumen
+    print("\n" + "#"*60)
+    print("# RESUMEN DE TESTS")
+    print("#"*60)
+    for name, status in results:
+        symbol = "✓" if status == "PASS" else "✗"
+        print(f"{symbol} {name}: {status}")
+
+    passed = sum(1 for _, status in results if status == "PASS")
+    total = len(results)
+    print(f"\nTotal: {passed}/{total} tests pasaron")
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
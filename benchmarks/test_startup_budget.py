@@ -0,0 +1,102 @@
+"""
+Tests de presupuesto de arranque en frío
+Verifican que los entry points no vuelvan a cargar dependencias pesadas al
+importarse y que import / primera predicción se mantengan bajo presupuesto
+(STARTUP_BUDGETS_MS en bench_startup.py). Corren con pytest o directamente:
+
+    python benchmarks/test_startup_budget.py
+"""
+
+import sys
+
+from bench_startup import HEAVY_MODULES, measure_scenario
+
+REPEAT = 3
+
+
+def check_budget(scenario):
+    """Mediana bajo presupuesto y sin módulos pesados prohibidos"""
+    result = measure_scenario(scenario, repeat=REPEAT)
+    loaded = [m for m in HEAVY_MODULES.get(scenario, ()) if m in result['modules']]
+    print(f"   {scenario}: {result['value_ms']:.0f} ms (presupuesto {result['budget_ms']} ms)"
+          f"{' | cargados: ' + ', '.join(loaded) if loaded else ''}")
+    assert not loaded, f"{scenario} carga {loaded}"
+    assert result['value_ms'] <= result['budget_ms'], (
+        f"{scenario}: {result['value_ms']:.0f} ms > {result['budget_ms']} ms"
+    )
+
+
+def test_api_import():
+    """api_model se importa sin pandas, joblib ni sklearn"""
+    check_budget('api_import')
+
+
+def test_api_first_prediction_compact():
+    """Con el artefacto compacto la API arranca y predice sin sklearn ni pandas"""
+    check_budget('api_first_prediction_compact')
+
+
+def test_api_first_prediction():
+    """Arranque con model.pkl y primer /predict"""
+    check_budget('api_first_prediction')
+
+
+def test_train_import():
+    """train_model se importa sin sklearn, matplotlib ni seaborn"""
+    check_budget('train_import')
+
+
+def test_simulator_import():
+    """El simulador se importa sin requests"""
+    check_budget('simulator_import')
+
+
+def test_simulator_first_reading():
+    """Primera lectura por el workflow en proceso (--local)"""
+    check_budget('simulator_first_reading')
+
+
+def run_all_tests():
+    """Ejecutar todos los tests"""
+    print("\n" + "#"*60)
+    print("# TESTS DE ARRANQUE EN FRÍO")
+    print("#"*60)
+
+    tests = [
+        ("Import API", test_api_import),
+        ("Primera predicción (compacto)", test_api_first_prediction_compact),
+        ("Primera predicción (model.pkl)", test_api_first_prediction),
+        ("Import entrenamiento", test_train_import),
+        ("Import simulador", test_simulator_import),
+        ("Primera lectura simulador", test_simulator_first_reading)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            results.append((name, "PASS"))
+        except AssertionError as e:
+            print(f"\nFAIL en {name}: {str(e)}")
+            results.append((name, "FAIL"))
+        except Exception as e:
+            print(f"\nERROR en {name}: {str(e)}")
+            results.append((name, "ERROR"))
+
+    # Resumen
+    print("\n" + "#"*60)
+    print("# RESUMEN DE TESTS")
+    print("#"*60)
+    for name, status in results:
+        symbol = "✓" if status == "PASS" else "✗"
+        print(f"{symbol} {name}: {status}")
+
+    passed = sum(1 for _, status in results if status == "PASS")
+    total = len(results)
+    print(f"\nTotal: {passed}/{total} tests pasaron")
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
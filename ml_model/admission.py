@@ -0,0 +1,365 @@
+"""
+Control de admisión de la API: límites por cliente y por poza, y concurrencia con prioridades
+Ante sobrecarga descarta temprano el tráfico de menor prioridad con 429 y
+Retry-After en lugar de encolarlo sin límite
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from typing import Optional
+
+from fast_json import FastJSONResponse
+
+# Clases de prioridad, de mayor a menor
+CRITICAL = 'critical'        # /health, /alerts, /admission y /admin: no pasan por los límites
+INTERACTIVE = 'interactive'  # /predict, /ingest y consultas
+BATCH = 'batch'              # /predict/batch, /predict/bulk, /ingest/batch
+BACKFILL = 'backfill'        # Re-envíos de histórico (solo con el header X-Priority)
+PRIORITIES = (CRITICAL, INTERACTIVE, BATCH, BACKFILL)
+_RANK = {priority: rank for rank, priority in enumerate(PRIORITIES)}
+
+CRITICAL_PREFIXES = ('/health', '/alerts', '/admission', '/admin')
+BATCH_ROUTES = frozenset({'/predict/batch', '/predict/bulk', '/ingest/batch'})
+
+# Fracción de la cola de espera que puede ocupar cada clase: las de menor
+# prioridad se descartan antes y una de mayor prioridad desplaza a la peor
+QUEUE_SHARE = {INTERACTIVE: 1.0, BATCH: 0.5, BACKFILL: 0.25}
+
+# Motivos de rechazo
+CLIENT_RATE = 'client_rate'
+POZA_RATE = 'poza_rate'
+QUEUE_FULL = 'queue_full'
+QUEUE_TIMEOUT = 'queue_timeout'
+EVICTED = 'evicted'
+
+MAX_RETRY_AFTER_S = 60
+
+
+def classify(path: str, requested: Optional[str] = None) -> str:
+    """
+    Prioridad de un request según la ruta; el header X-Priority solo puede
+    bajarla (un cliente no se promueve a sí mismo)
+    """
+    if path.startswith(CRITICAL_PREFIXES):
+        priority = CRITICAL
+    elif path in BATCH_ROUTES:
+        priority = BATCH
+    else:
+        priority = INTERACTIVE
+    if requested in _RANK and _RANK[requested] > _RANK[priority]:
+        return requested
+    return priority
+
+
+def retry_after_header(seconds: float) -> str:
+    """Retry-After en segundos enteros (mínimo 1)"""
+    return str(min(MAX_RETRY_AFTER_S, max(1, math.ceil(seconds))))
+
+
+def rejection_response(reason: str, retry_after_s: float, message: str) -> FastJSONResponse:
+    """429 con Retry-After y el motivo del rechazo"""
+    retry_after = retry_after_header(retry_after_s)
+    return FastJSONResponse(
+        {"status": "error", "message": message, "reason": reason, "retry_after": int(retry_after)},
+        status_code=429, headers={'Retry-After': retry_after}
+    )
+
+
+class TokenBucket:
+    """Bucket de `burst` tokens que se recarga a `rate` tokens por segundo"""
+
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, rate: float, burst: float, now: float, cost: float = 1.0) -> float:
+        """Consumir `cost` tokens: 0 si alcanzan, si no los segundos hasta que alcancen"""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / rate
+
+
+class RateLimiter:
+    """
+    Token bucket por clave (cliente o poza). `rate` <= 0 desactiva el límite.
+
+    Los buckets llenos se descartan cuando hay más de `max_keys` (equivalen
+    a uno nuevo), así la memoria queda acotada con muchas claves.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 10_000, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = max(float(burst), 1.0)
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = {}
+        self.checked = 0
+        self.limited = 0
+        self.limited_by_key = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def check(self, key) -> float:
+        """0 si el request entra; si no, segundos hasta que haya un token"""
+        if self.rate <= 0:
+            return 0.0
+        now = self.clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._evict(now)
+            bucket = self._buckets[key] = TokenBucket(self.burst, now)
+        self.checked += 1
+        wait = bucket.take(self.rate, self.burst, now)
+        if wait:
+            self.limited += 1
+            if key in self.limited_by_key or len(self.limited_by_key) < self.max_keys:
+                self.limited_by_key[key] = self.limited_by_key.get(key, 0) + 1
+        return wait
+
+    def _evict(self, now: float):
+        full = [
+            key for key, bucket in self._buckets.items()
+            if bucket.tokens + (now - bucket.updated) * self.rate >= self.burst
+        ]
+        for key in full:
+            del self._buckets[key]
+
+    def stats(self, top: int = 10) -> dict:
+        """Contadores y las claves más limitadas"""
+        offenders = sorted(self.limited_by_key.items(), key=lambda item: item[1], reverse=True)[:top]
+        return {
+            'enabled': self.enabled,
+            'rate_per_s': self.rate,
+            'burst': self.burst,
+            'keys': len(self._buckets),
+            'checked': self.checked,
+            'limited': self.limited,
+            'top_limited': dict(offenders)
+        }
+
+
+class Overloaded(Exception):
+    """Request descartado por el límite de concurrencia"""
+
+    def __init__(self, reason: str, retry_after_s: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+class PriorityLimiter:
+    """
+    Hasta `max_inflight` requests en proceso; el resto espera en una cola
+    acotada (`max_queue`) que atiende primero a la clase de mayor prioridad.
+
+    Cada clase puede ocupar solo QUEUE_SHARE de la cola, así backfill y
+    lotes se descartan antes que el tráfico interactivo; con la cola llena,
+    un request de mayor prioridad desplaza al último de la peor clase. Nadie
+    espera más de `queue_timeout_s`. El Retry-After sugerido sale del tiempo
+    de servicio medido (EWMA) y la cola actual.
+    """
+
+    def __init__(self, max_inflight: int = 2, max_queue: int = 64, queue_timeout_s: float = 5.0):
+        self.max_inflight = max(int(max_inflight), 1)
+        self.max_queue = max(int(max_queue), 0)
+        self.queue_timeout_s = float(queue_timeout_s)
+
+        self.inflight = 0
+        self._waiters = []  # Heap de [rank, seq, future]
+        self._seq = itertools.count()
+        self.service_s = 0.0
+
+        self.admitted = {priority: 0 for priority in PRIORITIES}
+        self.queued = {priority: 0 for priority in PRIORITIES}
+        self.shed = {priority: {QUEUE_FULL: 0, QUEUE_TIMEOUT: 0, EVICTED: 0} for priority in PRIORITIES}
+        self.max_queue_depth = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after_s(self) -> float:
+        """Tiempo estimado hasta vaciar lo que ya está en proceso y en cola"""
+        return (self.queue_depth + self.inflight) * self.service_s / self.max_inflight
+
+    async def acquire(self, priority: str):
+        """Esperar un lugar; Overloaded si el request se descarta"""
+        if self.inflight < self.max_inflight and not self._waiters:
+            self.inflight += 1
+            self.admitted[priority] += 1
+            return
+
+        rank = _RANK[priority]
+        if len(self._waiters) >= self.max_queue * QUEUE_SHARE[priority]:
+            worst = max(self._waiters, default=None)
+            if len(self._waiters) < self.max_queue or worst is None or worst[0] <= rank:
+                self.shed[priority][QUEUE_FULL] += 1
+                raise Overloaded(QUEUE_FULL, self.retry_after_s())
+            # Cola llena: el último de la peor clase deja su lugar
+            self._waiters.remove(worst)
+            heapq.heapify(self._waiters)
+            self.shed[PRIORITIES[worst[0]]][EVICTED] += 1
+            worst[2].set_exception(Overloaded(EVICTED, self.retry_after_s()))
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [rank, next(self._seq), future])
+        self.queued[priority] += 1
+        self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+
+        try:
+            await asyncio.wait((future,), timeout=self.queue_timeout_s)
+        except asyncio.CancelledError:
+            # Cliente desconectado mientras esperaba: devolver el lugar si ya se lo habían pasado
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self._handoff()
+            future.cancel()
+            raise
+        if not future.done():
+            future.cancel()
+            self._waiters = [entry for entry in self._waiters if entry[2] is not future]
+            heapq.heapify(self._waiters)
+            self.shed[priority][QUEUE_TIMEOUT] += 1
+            raise Overloaded(QUEUE_TIMEOUT, self.retry_after_s())
+        future.result()  # Overloaded si fue desplazado
+        self.admitted[priority] += 1
+
+    def release(self, elapsed_s: float):
+        """Liberar el lugar (pasa directo al próximo en la cola) y actualizar el tiempo de servicio"""
+        self.service_s = elapsed_s if not self.service_s else 0.9 * self.service_s + 0.1 * elapsed_s
+        self._handoff()
+
+    def _handoff(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.inflight -= 1
+
+    def stats(self) -> dict:
+        return {
+            'max_inflight': self.max_inflight,
+            'max_queue': self.max_queue,
+            'queue_timeout_s': self.queue_timeout_s,
+            'inflight': self.inflight,
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'service_ms': round(self.service_s * 1000, 3),
+            'retry_after_s': int(retry_after_header(self.retry_after_s())),
+            'priorities': {
+                priority: {
+                    'admitted': self.admitted[priority],
+                    'queued': self.queued[priority],
+                    'shed': dict(self.shed[priority]),
+                } for priority in PRIORITIES
+            }
+        }
+
+
+def client_key(scope, client_id: Optional[str], trusted_proxies=frozenset()) -> str:
+    """
+    Clave del límite por cliente: la IP del peer de la conexión. X-Client-Id
+    solo se respeta si el peer es un proxy de confianza (que lo fija él);
+    de cualquier otro origen se ignora, si no un cliente lo falsearía para
+    estrenar un bucket por request.
+    """
+    peer = scope['client'][0] if scope.get('client') else '-'
+    if client_id and peer in trusted_proxies:
+        return client_id
+    return peer
+
+
+class AdmissionController:
+    """
+    Límites por cliente (IP del peer, o X-Client-Id detrás de un proxy de
+    confianza) y por poza, más el límite de concurrencia con prioridades. El
+    tráfico crítico no se limita.
+    """
+
+    def __init__(self, enabled: bool = True, client_limit: Optional[RateLimiter] = None,
+                 poza_limit: Optional[RateLimiter] = None, limiter: Optional[PriorityLimiter] = None,
+                 trusted_proxies=()):
+        self.enabled = enabled
+        self.client_limit = client_limit or RateLimiter(0, 1)
+        self.poza_limit = poza_limit or RateLimiter(0, 1)
+        self.limiter = limiter or PriorityLimiter()
+        self.trusted_proxies = frozenset(trusted_proxies)
+
+    def check_client(self, client) -> Optional[FastJSONResponse]:
+        """429 si el cliente excedió su límite"""
+        wait = self.client_limit.check(client)
+        if wait:
+            return rejection_response(CLIENT_RATE, wait, f"Límite de requests del cliente {client} excedido")
+        return None
+
+    def check_poza(self, poza_id) -> Optional[FastJSONResponse]:
+        """429 si la poza excedió su límite (lecturas individuales de /predict e /ingest)"""
+        if not self.enabled:
+            return None
+        wait = self.poza_limit.check(poza_id)
+        if wait:
+            return rejection_response(POZA_RATE, wait, f"Límite de lecturas de la poza {poza_id} excedido")
+        return None
+
+    def stats(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'trusted_proxies': sorted(self.trusted_proxies),
+            'concurrency': self.limiter.stats(),
+            'client_limit': self.client_limit.stats(),
+            'poza_limit': self.poza_limit.stats()
+        }
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI: clasifica, aplica el límite del cliente y espera un lugar por prioridad"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        controller = self.controller
+        if scope['type'] != 'http' or not controller.enabled:
+            return await self.app(scope, receive, send)
+
+        requested = client = None
+        for name, value in scope['headers']:
+            if name == b'x-priority':
+                requested = value.decode('latin-1').strip().lower()
+            elif name == b'x-client-id':
+                client = value.decode('latin-1')
+        priority = classify(scope['path'], requested)
+        if priority == CRITICAL:
+            controller.limiter.admitted[CRITICAL] += 1
+            return await self.app(scope, receive, send)
+
+        rejection = controller.check_client(client_key(scope, client, controller.trusted_proxies))
+        if rejection is not None:
+            return await rejection(scope, receive, send)
+
+        limiter = controller.limiter
+        try:
+            await limiter.acquire(priority)
+        except Overloaded as e:
+            response = rejection_response(e.reason, e.retry_after_s, "API sobrecargada, reintentar más tarde")
+            return await response(scope, receive, send)
+        # Los handlers calculan sin ceder el loop: sin esta pausa los requests ya
+        # recibidos esperan en el loop, fuera de la vista del límite de concurrencia
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - start)
@@ -0,0 +1,168 @@
+"""
+Motor de alertas por poza con histéresis, tiempo mínimo de permanencia y cooldown
+Emite transiciones de estado (inicio / fin de alerta), no cruces de umbral crudos
+"""
+
+from datetime import datetime
+from typing import Optional
+
+# Estados por poza
+NORMAL = 'NORMAL'
+PENDING = 'PENDING'     # Sobre el umbral de entrada, esperando el dwell mínimo
+ALERT = 'ALERT'
+
+# Transiciones emitidas
+ALERT_START = 'ALERT_START'
+ALERT_CLEAR = 'ALERT_CLEAR'
+
+
+class PozaAlertState:
+    """Estado O(1) de una poza"""
+
+    __slots__ = ('state', 'since', 'last_start', 'notified', 'last_seen')
+
+    def __init__(self):
+        self.state = NORMAL
+        self.since = None         # Inicio del estado actual (epoch s)
+        self.last_start = None    # Última ALERT_START emitida (epoch s)
+        self.notified = False     # La alerta actual se notificó (no fue suprimida)
+        self.last_seen = None     # Timestamp de la última lectura (epoch s)
+
+
+class AlertEngine:
+    """
+    Máquina de estados de alerta por poza.
+
+    - NORMAL -> PENDING cuando la concentración supera `enter_threshold`.
+    - PENDING -> ALERT si se mantiene >= `exit_threshold` durante `min_dwell_s`;
+      emite ALERT_START salvo que no haya pasado `cooldown_s` desde la última
+      (en ese caso la alerta queda suprimida y no emite ALERT_CLEAR al salir).
+    - ALERT suprimida: cada lectura >= `exit_threshold` vuelve a mirar el
+      cooldown y emite ALERT_START cuando se cumple, así una condición que
+      persiste más que el cooldown termina notificando.
+    - PENDING/ALERT -> NORMAL cuando baja de `exit_threshold` (ALERT emite
+      ALERT_CLEAR si había notificado).
+
+    El tiempo es el timestamp de la lectura, no el reloj del servidor, así
+    el comportamiento es reproducible con tráfico simulado o re-enviado.
+    """
+
+    def __init__(self, enter_threshold=4500.0, exit_threshold=4300.0, min_dwell_s=30.0, cooldown_s=1800.0):
+        if exit_threshold > enter_threshold:
+            raise ValueError("exit_threshold debe ser <= enter_threshold")
+
+        self.enter_threshold = float(enter_threshold)
+        self.exit_threshold = float(exit_threshold)
+        self.min_dwell_s = float(min_dwell_s)
+        self.cooldown_s = float(cooldown_s)
+
+        self._pozas = {}
+        self.readings = 0
+        self.threshold_crossings = 0
+        self.transitions = {ALERT_START: 0, ALERT_CLEAR: 0}
+        self.suppressed = 0
+
+    def update(self, poza_id: str, timestamp, concentration: float) -> tuple[str, Optional[str]]:
+        """Procesar una lectura; devuelve (estado, transición o None)"""
+        now = _epoch(timestamp)
+        poza = self._pozas.get(poza_id)
+        if poza is None:
+            poza = self._pozas[poza_id] = PozaAlertState()
+
+        # Lecturas fuera de orden no hacen retroceder el reloj de la poza
+        if poza.last_seen is not None and now < poza.last_seen:
+            now = poza.last_seen
+        poza.last_seen = now
+
+        self.readings += 1
+        if concentration > self.enter_threshold:
+            self.threshold_crossings += 1
+
+        transition = None
+        if poza.state == NORMAL:
+            if concentration > self.enter_threshold:
+                poza.state, poza.since = PENDING, now
+                transition = self._maybe_start(poza, now)
+
+        elif poza.state == PENDING:
+            if concentration < self.exit_threshold:
+                poza.state, poza.since = NORMAL, now
+            else:
+                transition = self._maybe_start(poza, now)
+
+        elif concentration < self.exit_threshold:
+            poza.state, poza.since = NORMAL, now
+            if poza.notified:
+                transition = ALERT_CLEAR
+            poza.notified = False
+
+        elif not poza.notified:
+            transition = self._notify(poza, now)
+
+        if transition is not None:
+            self.transitions[transition] += 1
+        return poza.state, transition
+
+    def _maybe_start(self, poza: PozaAlertState, now: float) -> Optional[str]:
+        """PENDING -> ALERT si se cumplió el dwell; decide si notificar"""
+        if now - poza.since < self.min_dwell_s:
+            return None
+
+        poza.state, poza.since = ALERT, now
+        poza.notified = False
+        transition = self._notify(poza, now)
+        if transition is None:
+            self.suppressed += 1
+        return transition
+
+    def _notify(self, poza: PozaAlertState, now: float) -> Optional[str]:
+        """ALERT sin notificar: emitir ALERT_START si ya pasó el cooldown"""
+        if poza.last_start is not None and now - poza.last_start < self.cooldown_s:
+            return None
+
+        poza.last_start = now
+        poza.notified = True
+        return ALERT_START
+
+    def state_of(self, poza_id: str) -> dict:
+        """Estado actual de una poza"""
+        poza = self._pozas.get(poza_id)
+        if poza is None:
+            return {'poza_id': poza_id, 'state': NORMAL}
+        return {
+            'poza_id': poza_id,
+            'state': poza.state,
+            'since': _iso(poza.since),
+            'last_alert_start': _iso(poza.last_start),
+            'notified': poza.notified
+        }
+
+    def snapshot(self) -> dict:
+        """Estado de todas las pozas y contadores"""
+        return {
+            'config': {
+                'enter_threshold': self.enter_threshold,
+                'exit_threshold': self.exit_threshold,
+                'min_dwell_s': self.min_dwell_s,
+                'cooldown_s': self.cooldown_s
+            },
+            'counters': {
+                'readings': self.readings,
+                'threshold_crossings': self.threshold_crossings,
+                'alert_start': self.transitions[ALERT_START],
+                'alert_clear': self.transitions[ALERT_CLEAR],
+                'suppressed': self.suppressed
+            },
+            'pozas': [self.state_of(poza_id) for poza_id in self._pozas]
+        }
+
+
+def _epoch(timestamp) -> float:
+    """Timestamp de lectura (datetime o epoch) a segundos"""
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    return float(timestamp)
+
+
+def _iso(epoch: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(epoch).isoformat() if epoch is not None else None
@@ -0,0 +1,122 @@
+"""
+Notificador asíncrono de alertas hacia n8n
+El request solo encola; un thread de fondo hace el POST al webhook de alertas
+"""
+
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+
+from fast_json import dumps
+
+
+class AlertNotifier:
+    """
+    Envío de alertas (ALERT_START) al webhook de n8n fuera del request.
+
+    `notify` agrega el payload a una deque acotada; si está llena se descarta
+    la alerta más vieja y se cuenta. El sender reintenta `max_retries` veces
+    con backoff ante errores de red o HTTP >= 500.
+    """
+
+    def __init__(self, url, max_queue=1_000, timeout=2.0, max_retries=2, backoff=0.5):
+        self.url = url
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self._queue = deque(maxlen=max_queue)
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.last_error = None
+        self.last_latency_ms = 0.0
+
+    def start(self):
+        """Arrancar el sender de fondo"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='alert-notifier', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Enviar lo pendiente (hasta `timeout`) y cerrar el sender"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def notify(self, payload: dict):
+        """Encolar una alerta (hot path: sin I/O)"""
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+        self._queue.append(payload)
+        self.enqueued += 1
+        self._wakeup.set()
+
+    def stats(self) -> dict:
+        """Contadores del notificador"""
+        return {
+            'url': self.url,
+            'running': self._thread is not None,
+            'queue_depth': len(self._queue),
+            'enqueued': self.enqueued,
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'last_error': self.last_error,
+            'last_latency_ms': round(self.last_latency_ms, 3)
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self._drain()
+        self._drain()
+
+    def _drain(self):
+        queue = self._queue
+        while queue:
+            try:
+                payload = queue.popleft()
+            except IndexError:
+                break
+            if self._send(payload):
+                self.sent += 1
+            else:
+                self.failed += 1
+
+    def _send(self, payload: dict) -> bool:
+        """POST con reintentos; True si n8n aceptó la alerta"""
+        body = dumps(payload)
+        for attempt in range(self.max_retries + 1):
+            request = urllib.request.Request(
+                self.url, data=body, method='POST',
+                headers={'Content-Type': 'application/json'}
+            )
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout):
+                    pass
+                self.last_latency_ms = (time.perf_counter() - start) * 1000
+                return True
+            except urllib.error.HTTPError as e:
+                self.last_error = f"HTTP {e.code}"
+                if e.code < 500:
+                    return False
+            except (urllib.error.URLError, OSError) as e:
+                self.last_error = str(getattr(e, 'reason', e))
+            if attempt < self.max_retries and not self._stop.is_set():
+                time.sleep(self.backoff * (2 ** attempt))
+        return False
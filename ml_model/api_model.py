@@ -3,15 +3,35 @@ API FastAPI para servir modelo predictivo de concentración de litio
 Galan Lithium - Hombre Muerto West
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from typing import Optional
-import joblib
-import pandas as pd
+import numpy as np
 from datetime import datetime
+import asyncio
+import hmac
 import logging
 import os
+import threading
+import time
+
+from packed_forest import PackedForest, interval_summary
+from prediction_journal import PredictionJournal, reading_values
+from reading_store import ReadingStore, ROLLUP_FIELDS
+from rollups import RESOLUTIONS
+from fast_json import FastJSONResponse, loads
+from alert_engine import AlertEngine, ALERT_START
+from alert_notifier import AlertNotifier
+from model_registry import ModelRegistry, load_forest
+from shadow_eval import ShadowEvaluator, load_candidate
+from drift_monitor import DriftMonitor
+from ndjson_stream import NDJSONStreamDecoder, PayloadTooLarge
+import bulk_codec
+from bulk_codec import NUMERIC_FIELDS, ReadingColumns
+from admission import AdmissionController, AdmissionMiddleware, PriorityLimiter, RateLimiter
+import profiling
 
 # Configuración de logging
 logging.basicConfig(
@@ -24,6 +44,95 @@ logger = logging.getLogger(__name__)
 MODEL = None
 MODEL_METADATA = None
 FEATURE_NAMES = None
+FOREST = None  # Árboles aplanados para predicción por árbol (intervalos)
+FAST_MODEL = None  # Surrogate destilado (tier "fast") aplanado, opcional
+TIER_INFO = {}
+
+# Tiers de servicio: "full" (Random Forest) y "fast" (surrogate destilado)
+MODEL_TIERS = ('full', 'fast')
+DEFAULT_TIER = os.environ.get('MODEL_TIER', 'full')
+
+# Journal de predicciones: PREDICTION_JOURNAL=<ruta .db> o "0" para desactivar
+JOURNAL = None
+JOURNAL_PATH = os.environ.get(
+    'PREDICTION_JOURNAL',
+    os.path.join(os.path.dirname(__file__), '..', 'logs', 'prediction_journal.db')
+)
+
+# Historial por poza y rango de tiempo (GET /readings/{poza_id}): READING_STORE=1 (logs/readings.db)
+# o <ruta .db>; apagado por defecto. El journal es la auditoría completa (features, confianza, cada
+# reenvío); el historial, la serie deduplicada por poza y timestamp para consultas por rango
+STORE = None
+STORE_PATH = os.environ.get('READING_STORE', '0')
+if STORE_PATH == '1':
+    STORE_PATH = os.path.join(os.path.dirname(__file__), '..', 'logs', 'readings.db')
+READINGS_MAX_ROWS = int(os.environ.get('READINGS_MAX_ROWS', 100_000))  # Tope de filas por consulta
+# Agregados por hora y día (GET /readings/{poza_id}/summary) y gracia antes de compactar un bucket
+READING_ROLLUPS = os.environ.get('READING_ROLLUPS', '1') != '0'
+ROLLUP_GRACE_S = float(os.environ.get('ROLLUP_GRACE_S', 3600))
+
+# Motor de alertas por poza (histéresis, dwell y cooldown configurables)
+ALERT_ENGINE = AlertEngine(
+    enter_threshold=float(os.environ.get('ALERT_ENTER_MG_L', 4500)),
+    exit_threshold=float(os.environ.get('ALERT_EXIT_MG_L', 4300)),
+    min_dwell_s=float(os.environ.get('ALERT_MIN_DWELL_S', 30)),
+    cooldown_s=float(os.environ.get('ALERT_COOLDOWN_S', 1800))
+)
+
+# Callbacks de alerta a n8n desde /ingest: ALERT_WEBHOOK_URL=<url> o "0" para desactivar
+ALERT_NOTIFIER = None
+ALERT_WEBHOOK_URL = os.environ.get('ALERT_WEBHOOK_URL', 'http://localhost:5678/webhook/lithium-alert')
+
+# Registro de modelos por poza: MODEL_REGISTRY=<manifiesto .json> (relativo a ml_model/)
+REGISTRY = None
+REGISTRY_PATH = os.environ.get('MODEL_REGISTRY')
+
+# Modelo candidato evaluado en sombra: SHADOW_MODEL=<artefacto .pkl/.npz> (relativo a ml_model/)
+SHADOW = None
+SHADOW_MODEL_PATH = os.environ.get('SHADOW_MODEL')
+
+# Monitor de drift de inputs (requiere el snapshot de entrenamiento en la metadata)
+DRIFT = None
+
+# Lotes NDJSON comprimidos (/ingest/batch): tope descomprimido y errores informados
+INGEST_BATCH_MAX_BYTES = int(os.environ.get('INGEST_BATCH_MAX_MB', '64')) * 1024 * 1024
+INGEST_BATCH_MAX_ERRORS = 100
+
+# Tope de filas por request de /predict/bulk
+BULK_MAX_ROWS = int(os.environ.get('BULK_MAX_ROWS', 2_000_000))
+
+# Filas por pasada del bosque: acota la matriz filas x árboles de los intervalos
+SCORE_CHUNK_ROWS = 50_000
+
+# Desde este tamaño de lote confianza, calidad y recomendación se calculan vectorizadas
+VECTORIZED_LABELS_MIN_ROWS = 256
+
+# Control de admisión (ADMISSION=1 lo activa; apagado por defecto): límites por cliente
+# (IP del peer) y por poza en requests/s (0 = sin límite) y concurrencia con prioridades.
+# X-Client-Id solo cuenta si llega desde ADMISSION_TRUSTED_PROXIES (IPs separadas por coma)
+ADMISSION = AdmissionController(
+    enabled=os.environ.get('ADMISSION', '0') == '1',
+    client_limit=RateLimiter(
+        rate=float(os.environ.get('ADMISSION_CLIENT_RPS', 100)),
+        burst=float(os.environ.get('ADMISSION_CLIENT_BURST', 200))
+    ),
+    poza_limit=RateLimiter(
+        rate=float(os.environ.get('ADMISSION_POZA_RPS', 2)),
+        burst=float(os.environ.get('ADMISSION_POZA_BURST', 20))
+    ),
+    limiter=PriorityLimiter(
+        max_inflight=int(os.environ.get('ADMISSION_MAX_INFLIGHT', 2)),
+        max_queue=int(os.environ.get('ADMISSION_MAX_QUEUE', 64)),
+        queue_timeout_s=float(os.environ.get('ADMISSION_QUEUE_TIMEOUT_S', 5))
+    ),
+    trusted_proxies=[ip.strip() for ip in os.environ.get('ADMISSION_TRUSTED_PROXIES', '').split(',') if ip.strip()]
+)
+
+# Endpoints /admin (profiling y memoria): ADMIN_TOKEN=<token> los habilita, header X-Admin-Token
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# MODEL_COMPACT=1 sirve el artefacto compacto de compact_model.py en lugar de model.pkl
+USE_COMPACT_MODEL = os.environ.get('MODEL_COMPACT', '0') == '1'
 
 # Rangos válidos de features (del entrenamiento)
 # Actualizados con datos climáticos reales de Salar del Hombre Muerto
@@ -38,30 +147,109 @@ VALID_RANGES = {
     'ca_li_ratio': (0.5, 3)
 }
 
+# Validación dura de /ingest: la misma que el nodo "Validar Datos" del workflow de n8n
+REQUIRED_FIELDS = [
+    'poza_id',
+    'days_evaporation',
+    'temperature_c',
+    'humidity_percent',
+    'ph',
+    'conductivity_ms_cm',
+    'density_g_cm3'
+]
+HARD_RANGES = {
+    'days_evaporation': (0, 365),
+    'temperature_c': (-15, 35),
+    'humidity_percent': (0, 100),
+    'ph': (0, 14),
+    'conductivity_ms_cm': (0, 200),
+    'density_g_cm3': (1.0, 1.5)
+}
+
 
 def load_model():
     """Cargar modelo y metadata al inicio"""
-    global MODEL, MODEL_METADATA, FEATURE_NAMES
+    global MODEL, MODEL_METADATA, FEATURE_NAMES, FOREST, FAST_MODEL, TIER_INFO, REGISTRY, DRIFT
+    
+    # joblib (y sklearn al deserializar un .pkl) solo se importan al cargar
+    import joblib
     
     try:
         model_path = os.path.join(os.path.dirname(__file__), 'model.pkl')
         metadata_path = os.path.join(os.path.dirname(__file__), 'model_metadata.pkl')
         
-        if not os.path.exists(model_path):
-            logger.error(f"Modelo no encontrado en: {model_path}")
-            raise FileNotFoundError("Modelo no encontrado")
-        
-        MODEL = joblib.load(model_path)
-        logger.info("Modelo cargado exitosamente")
-        
         if os.path.exists(metadata_path):
             MODEL_METADATA = joblib.load(metadata_path)
             FEATURE_NAMES = MODEL_METADATA.get('feature_cols', [])
             logger.info(f"Metadata cargada. Features: {len(FEATURE_NAMES)}")
         else:
+            MODEL_METADATA = None
             logger.warning("Metadata no encontrada, usando features por defecto")
             FEATURE_NAMES = list(VALID_RANGES.keys())
         
+        # Artefacto compacto (.npz): carga sin unpickle de sklearn
+        compact_info = (MODEL_METADATA or {}).get('compact')
+        if USE_COMPACT_MODEL and compact_info:
+            model_path = os.path.join(os.path.dirname(__file__), compact_info['file'])
+        
+        if not os.path.exists(model_path):
+            logger.error(f"Modelo no encontrado en: {model_path}")
+            raise FileNotFoundError("Modelo no encontrado")
+        
+        if model_path.endswith('.npz'):
+            MODEL = FOREST = PackedForest.load(model_path)
+            logger.info(f"Modelo compacto cargado: {FOREST.n_trees} árboles, {FOREST.node_count} nodos")
+        else:
+            MODEL = joblib.load(model_path)
+            logger.info("Modelo cargado exitosamente")
+            
+            try:
+                FOREST = PackedForest.from_sklearn(MODEL)
+                logger.info(f"Bosque aplanado: {FOREST.n_trees} árboles, {FOREST.node_count} nodos")
+            except (ValueError, AttributeError) as e:
+                FOREST = None
+                logger.warning(f"Intervalos de predicción no disponibles: {str(e)}")
+        
+        # Tier rápido: solo si la metadata actual declara un surrogate
+        FAST_MODEL = None
+        surrogate_info = (MODEL_METADATA or {}).get('surrogate')
+        fast_path = None
+        if surrogate_info:
+            fast_path = os.path.join(os.path.dirname(__file__), surrogate_info['file'])
+            if os.path.exists(fast_path):
+                # Vía el store de modelos: sin unpickle de sklearn en los arranques siguientes
+                FAST_MODEL = load_forest(fast_path)
+                logger.info(f"Modelo rápido cargado: {surrogate_info['model_type']}")
+            else:
+                logger.warning(f"Modelo rápido no encontrado en: {fast_path}")
+        
+        # Drift contra la distribución de entrenamiento guardada por save_model
+        snapshot = (MODEL_METADATA or {}).get('drift_snapshot')
+        if snapshot and snapshot['feature_names'] == list(FEATURE_NAMES):
+            DRIFT = DriftMonitor(snapshot)
+        else:
+            DRIFT = None
+            logger.warning("Monitor de drift no disponible: reentrenar para generar el snapshot")
+        
+        # Modelos por poza (el modelo principal atiende a las pozas sin ruta)
+        REGISTRY = None
+        if REGISTRY_PATH:
+            registry_path = os.path.join(os.path.dirname(__file__), REGISTRY_PATH)
+            REGISTRY = ModelRegistry.from_manifest(registry_path)
+            invalid = [entry.model_id for entry in REGISTRY if entry.forest.n_features != len(FEATURE_NAMES)]
+            if invalid:
+                raise ValueError(f"Modelos del registro con features incompatibles: {invalid}")
+            totals = REGISTRY.memory_report()['totals']
+            logger.info(
+                f"Registro de modelos: {totals['models']} modelos, "
+                f"{totals['unique_artifacts']} artefactos únicos, {totals['unique_bytes'] / 1024:.0f} KB"
+            )
+        
+        TIER_INFO = {
+            'full': profile_tier('full', model_path),
+            'fast': profile_tier('fast', fast_path) if FAST_MODEL is not None else {'available': False}
+        }
+        
         return True
         
     except Exception as e:
@@ -72,13 +260,45 @@ def load_model():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gestión del ciclo de vida de la aplicación"""
+    global JOURNAL, STORE, ALERT_NOTIFIER, SHADOW
     # Startup
     logger.info("Iniciando API...")
-    load_model()
+    # Ya cargado si lo hizo el proceso (__main__ o el padre pre-fork de serve.py)
+    if MODEL is None:
+        load_model()
+    if JOURNAL_PATH != '0':
+        JOURNAL = PredictionJournal(JOURNAL_PATH, feature_names=FEATURE_NAMES).start()
+        logger.info(f"Journal de predicciones: {JOURNAL_PATH}")
+    if STORE_PATH != '0':
+        STORE = ReadingStore(STORE_PATH, rollups=READING_ROLLUPS, grace_s=ROLLUP_GRACE_S).start()
+        logger.info(f"Historial de lecturas: {STORE_PATH}")
+    if ALERT_WEBHOOK_URL != '0':
+        ALERT_NOTIFIER = AlertNotifier(ALERT_WEBHOOK_URL).start()
+        logger.info(f"Callbacks de alerta: {ALERT_WEBHOOK_URL}")
+    if SHADOW_MODEL_PATH:
+        candidate = load_candidate(os.path.join(os.path.dirname(__file__), SHADOW_MODEL_PATH))
+        if candidate.n_features != len(FEATURE_NAMES):
+            raise ValueError(f"Modelo en sombra con {candidate.n_features} features, se esperaban {len(FEATURE_NAMES)}")
+        SHADOW = ShadowEvaluator(
+            candidate, determine_quality_status, name=os.path.basename(SHADOW_MODEL_PATH)
+        ).start()
+        logger.info(f"Modelo en sombra: {SHADOW_MODEL_PATH}")
     logger.info("API lista para recibir requests")
     yield
     # Shutdown
     logger.info("Cerrando API...")
+    if JOURNAL is not None:
+        JOURNAL.stop()
+        JOURNAL = None
+    if STORE is not None:
+        STORE.stop()
+        STORE = None
+    if ALERT_NOTIFIER is not None:
+        ALERT_NOTIFIER.stop()
+        ALERT_NOTIFIER = None
+    if SHADOW is not None:
+        SHADOW.stop()
+        SHADOW = None
 
 
 # Inicializar FastAPI con lifespan
@@ -90,6 +310,7 @@ app = FastAPI(
     redoc_url="/redoc",
     lifespan=lifespan
 )
+app.add_middleware(AdmissionMiddleware, controller=ADMISSION)
 
 
 class SensorData(BaseModel):
@@ -166,12 +387,33 @@ class SensorData(BaseModel):
     }
 
 
+class PredictionInterval(BaseModel):
+    """Intervalo de predicción a partir de la dispersión entre árboles"""
+    
+    p10_mg_l: float
+    p50_mg_l: float
+    p90_mg_l: float
+    spread_mg_l: float = Field(..., description="Ancho P90 - P10")
+    std_mg_l: float = Field(..., description="Desvío estándar entre árboles")
+
+
+class AlertStatus(BaseModel):
+    """Estado de alerta de la poza después de esta lectura"""
+    
+    state: str = Field(..., description="NORMAL, PENDING o ALERT")
+    transition: Optional[str] = Field(
+        None, description="ALERT_START / ALERT_CLEAR si esta lectura cambió el estado notificado"
+    )
+
+
 class PredictionResponse(BaseModel):
     """Modelo de respuesta de predicción"""
     
     poza_id: str
     timestamp: datetime
     predicted_concentration_mg_l: float
+    prediction_interval: Optional[PredictionInterval] = None
+    alert: Optional[AlertStatus] = None
     confidence: str
     quality_status: str
     recommendation: str
@@ -179,6 +421,19 @@ class PredictionResponse(BaseModel):
     model_version: str
 
 
+class BatchSensorData(BaseModel):
+    """Lote de lecturas para predicción en una sola llamada"""
+    
+    readings: list[SensorData] = Field(..., min_length=1, max_length=10000)
+
+
+class BatchPredictionResponse(BaseModel):
+    """Respuesta de predicción en lote"""
+    
+    count: int
+    predictions: list[PredictionResponse]
+
+
 def validate_input_ranges(data: SensorData) -> list[str]:
     """Validar que los inputs están en rangos conocidos"""
     warnings = []
@@ -198,6 +453,88 @@ def validate_input_ranges(data: SensorData) -> list[str]:
     return warnings
 
 
+def validate_input_ranges_columns(batch: ReadingColumns) -> list[list[str]]:
+    """validate_input_ranges sobre un lote columnar (máscaras por feature; strings solo en las filas afectadas)"""
+    warnings = [[] for _ in range(len(batch))]
+    
+    for feature, (min_val, max_val) in VALID_RANGES.items():
+        values = batch.values[feature]
+        for i in np.flatnonzero((values < min_val) | (values > max_val)).tolist():
+            warnings[i].append(
+                f"{feature}={values[i]:.2f} está fuera del rango de entrenamiento "
+                f"({min_val}-{max_val}). Predicción puede ser menos confiable."
+            )
+    
+    return warnings
+
+
+def _js_number(value) -> str:
+    """Formatear números como los interpola JavaScript (1.0 -> "1")"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def validate_required_and_ranges(payload: dict) -> list[str]:
+    """
+    Validación dura de una lectura cruda (campos requeridos y rangos físicos).
+    
+    Replica el nodo "Validar Datos" de n8n con los mismos mensajes, para que
+    /ingest responda igual que el webhook sin pasar por él.
+    """
+    errors = []
+    
+    for field in REQUIRED_FIELDS:
+        if payload.get(field) is None:
+            errors.append(f"Campo requerido faltante: {field}")
+    
+    for field, (min_val, max_val) in HARD_RANGES.items():
+        value = payload.get(field)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            errors.append(f"{field}={value} no es numérico")
+        elif value < min_val or value > max_val:
+            errors.append(
+                f"{field}={_js_number(value)} fuera de rango "
+                f"[{_js_number(min_val)}, {_js_number(max_val)}]"
+            )
+    
+    return errors
+
+
+def validate_required_and_ranges_columns(batch: ReadingColumns) -> dict[int, list[str]]:
+    """
+    validate_required_and_ranges sobre un lote columnar: mismos mensajes, en
+    el mismo orden, calculados con máscaras por columna. Devuelve los errores
+    de las filas inválidas ({fila: [mensajes]}).
+    """
+    errors = {}
+    
+    for field in REQUIRED_FIELDS:
+        if field == 'poza_id':
+            missing = [i for i, poza_id in enumerate(batch.poza_id) if poza_id is None]
+        else:
+            missing = np.flatnonzero(np.isnan(batch.values[field])).tolist()
+        for i in missing:
+            errors.setdefault(i, []).append(f"Campo requerido faltante: {field}")
+    
+    for field, (min_val, max_val) in HARD_RANGES.items():
+        values = batch.values[field]
+        for i in np.flatnonzero((values < min_val) | (values > max_val)).tolist():
+            errors.setdefault(i, []).append(
+                f"{field}={_js_number(values[i].item())} fuera de rango "
+                f"[{_js_number(min_val)}, {_js_number(max_val)}]"
+            )
+    
+    # SensorData exige poza_id de tipo texto
+    for i, poza_id in enumerate(batch.poza_id):
+        if poza_id is not None and not isinstance(poza_id, str):
+            errors.setdefault(i, []).append("poza_id: Input should be a valid string")
+    
+    return errors
+
+
 def calculate_derived_features(data: dict) -> dict:
     """Calcular features derivadas (feature engineering)"""
     
@@ -250,6 +587,550 @@ def generate_recommendation(concentration: float, quality_status: str) -> str:
         return "Concentración baja. Continuar evaporación, monitorear clima."
 
 
+def build_features(data: SensorData) -> dict:
+    """Armar el diccionario de features (base + derivadas) de una lectura"""
+    
+    features_dict = {
+        'days_evaporation': data.days_evaporation,
+        'temperature_c': data.temperature_c,
+        'humidity_percent': data.humidity_percent,
+        'ph': data.ph,
+        'conductivity_ms_cm': data.conductivity_ms_cm,
+        'density_g_cm3': data.density_g_cm3,
+        'mg_li_ratio': data.mg_li_ratio or 7.0,
+        'ca_li_ratio': data.ca_li_ratio or 1.5
+    }
+    
+    return calculate_derived_features(features_dict)
+
+
+def build_feature_matrix(readings: list[SensorData]) -> np.ndarray:
+    """Construir la matriz de features (n_lecturas x n_features) en el orden del modelo"""
+    
+    if isinstance(readings, ReadingColumns):
+        return build_feature_matrix_columns(readings)
+    
+    rows = [build_features(data) for data in readings]
+    feature_names = FEATURE_NAMES or list(rows[0].keys())
+    
+    # Asegurar que tenemos todas las features
+    missing_features = set(feature_names) - set(rows[0])
+    if missing_features:
+        raise ValueError(f"Features faltantes: {missing_features}")
+    
+    return np.array(
+        [[row[name] for name in feature_names] for row in rows],
+        dtype=np.float64
+    )
+
+
+def build_feature_matrix_columns(batch: ReadingColumns) -> np.ndarray:
+    """build_features por columnas: las derivadas se calculan sobre arrays enteros"""
+    
+    features = {field: batch.values[field] for field in VALID_RANGES}
+    # Mismo reemplazo que `or` en build_features (faltante o 0)
+    for field, default in (('mg_li_ratio', 7.0), ('ca_li_ratio', 1.5)):
+        values = features[field]
+        features[field] = np.where(np.isnan(values) | (values == 0), default, values)
+    features = calculate_derived_features(features)
+    
+    feature_names = FEATURE_NAMES or list(features)
+    missing_features = set(feature_names) - set(features)
+    if missing_features:
+        raise ValueError(f"Features faltantes: {missing_features}")
+    
+    return np.column_stack([features[name] for name in feature_names]).astype(np.float64, copy=False)
+
+
+def raw_feature_matrix(readings, X: np.ndarray, feature_names: list[str]) -> np.ndarray:
+    """
+    X con los campos de la lectura tal como llegaron (NaN = faltante) en lugar
+    de los 7.0/1.5 que build_features imputa a los ratios: lo que ve el monitor
+    de drift. Las derivadas no usan los ratios y quedan como están.
+    """
+    
+    raw = X.copy()
+    for field, values in zip(NUMERIC_FIELDS, reading_values(readings)):
+        if field in feature_names:
+            raw[:, feature_names.index(field)] = np.array(values, dtype=np.float64)
+    return raw
+
+
+def resolve_tier(tier: Optional[str]) -> str:
+    """Tier efectivo para un request (si "fast" no está cargado, usa "full")"""
+    
+    tier = tier or DEFAULT_TIER
+    if tier not in MODEL_TIERS:
+        raise ValueError(f"Tier desconocido: {tier}. Opciones: {', '.join(MODEL_TIERS)}")
+    
+    if tier == 'fast' and FAST_MODEL is None:
+        return 'full'
+    return tier
+
+
+def model_version_for(tier: str) -> str:
+    """Versión de modelo reportada en la respuesta según el tier"""
+    
+    if tier == 'fast':
+        return f"{MODEL_METADATA['surrogate']['model_type']} (fast)"
+    return MODEL_METADATA.get('model_type', 'RandomForest') if MODEL_METADATA else 'Unknown'
+
+
+def score_forest(forest: PackedForest, X: np.ndarray) -> tuple[np.ndarray, Optional[dict]]:
+    """
+    Predicción de un bosque aplanado; intervalos por árbol solo para Random Forest.
+    
+    Los lotes grandes se evalúan en bloques de SCORE_CHUNK_ROWS para no armar
+    la matriz filas x árboles completa (1M filas x 100 árboles = 800 MB).
+    """
+    
+    if forest.aggregate == 'sum':
+        return forest.predict(X), None
+    if len(X) <= SCORE_CHUNK_ROWS:
+        intervals = interval_summary(forest.predict_per_tree(X))
+        return intervals['mean'], intervals
+    
+    chunks = [
+        interval_summary(forest.predict_per_tree(X[start:start + SCORE_CHUNK_ROWS]))
+        for start in range(0, len(X), SCORE_CHUNK_ROWS)
+    ]
+    intervals = {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+    return intervals['mean'], intervals
+
+
+def score_features(X: np.ndarray, tier: str = 'full') -> tuple[np.ndarray, Optional[dict]]:
+    """
+    Predecir sobre la matriz de features.
+    
+    Con el bosque aplanado se obtiene la matriz de predicciones por árbol en
+    una sola pasada; la media es la predicción puntual y los cuantiles dan
+    el intervalo. Sin él, se usa MODEL.predict y no hay intervalos. El tier
+    "fast" usa el surrogate destilado, sin intervalos.
+    """
+    
+    if tier == 'fast':
+        return FAST_MODEL.predict(X), None
+    
+    if FOREST is not None:
+        return score_forest(FOREST, X)
+    
+    # Camino sin bosque aplanado: sklearn espera un DataFrame con nombres de features
+    import pandas as pd
+    features_df = pd.DataFrame(X, columns=FEATURE_NAMES or None)
+    return MODEL.predict(features_df), None
+
+
+def score_readings(readings: list[SensorData], X: np.ndarray, tier: str = 'full'):
+    """
+    Predecir un lote ruteando cada lectura al modelo de su poza.
+    
+    Devuelve (predicciones, intervalos, versión de modelo). Sin registro, o
+    con el tier "fast", es `score_features` con un solo modelo. Con registro
+    las filas se agrupan por modelo (una pasada vectorizada por grupo) y la
+    versión es una lista por lectura.
+    """
+    
+    if REGISTRY is None or tier == 'fast':
+        predictions, intervals = score_features(X, tier)
+        return predictions, intervals, model_version_for(tier)
+    
+    poza_ids = readings.poza_id if isinstance(readings, ReadingColumns) else [data.poza_id for data in readings]
+    groups = {}
+    for i, poza_id in enumerate(poza_ids):
+        groups.setdefault(REGISTRY.route(poza_id), []).append(i)
+    
+    if len(groups) == 1:
+        entry = next(iter(groups))
+        if entry is None:
+            predictions, intervals = score_features(X, tier)
+            return predictions, intervals, model_version_for(tier)
+        predictions, intervals = score_forest(entry.forest, X)
+        return predictions, intervals, [entry.label] * len(readings)
+    
+    n = len(readings)
+    predictions = np.empty(n)
+    intervals = {key: np.empty(n) for key in ('mean',) + INTERVAL_FIELDS}
+    versions = [None] * n
+    for entry, rows in groups.items():
+        index = np.asarray(rows)
+        if entry is None:
+            group_predictions, group_intervals = score_features(X[index], tier)
+            label = model_version_for(tier)
+        else:
+            group_predictions, group_intervals = score_forest(entry.forest, X[index])
+            label = entry.label
+        
+        predictions[index] = group_predictions
+        if intervals is not None and group_intervals is not None:
+            for key, values in intervals.items():
+                values[index] = group_intervals[key]
+        else:
+            # Si algún modelo no da intervalos, el lote se responde sin ellos
+            intervals = None
+        for i in rows:
+            versions[i] = label
+    
+    return predictions, intervals, versions
+
+
+def determine_confidence(warnings: list[str], mg_li_ratio: Optional[float]) -> str:
+    """Determinar confianza a partir de warnings de rango e inputs faltantes"""
+    
+    if warnings:
+        return "BAJA - Inputs fuera de rango de entrenamiento"
+    elif mg_li_ratio is None:
+        return "MEDIA - Sin ratios de impurezas (Mg/Li, Ca/Li)"
+    else:
+        return "ALTA"
+
+
+def prediction_labels(predictions: np.ndarray, mg_li: list, warnings: list[list[str]]) -> tuple[list, list, list]:
+    """
+    Confianza, calidad y recomendación de un lote con np.select (mismos
+    umbrales y textos que determine_confidence, determine_quality_status y
+    generate_recommendation).
+    """
+    
+    c = predictions
+    ratio = np.array(mg_li, dtype=np.float64)
+    no_ratio = np.isnan(ratio)
+    
+    confidence = np.where(
+        np.array([bool(w) for w in warnings]), "BAJA - Inputs fuera de rango de entrenamiento",
+        np.where(no_ratio, "MEDIA - Sin ratios de impurezas (Mg/Li, Ca/Li)", "ALTA")
+    )
+    quality_no_ratio = np.select(
+        [c > 4500, c > 3000, c > 2000], ["Bueno - Alto Li", "Aceptable", "Bajo"], "Muy Bajo"
+    )
+    with np.errstate(invalid='ignore'):
+        quality_ratio = np.select(
+            [(c > 4500) & (ratio < 6), (c > 3000) & (ratio < 10), c > 2000],
+            ["Óptimo", "Bueno", "Aceptable"], "Bajo"
+        )
+    quality_status = np.where(no_ratio, quality_no_ratio, quality_ratio)
+    recommendation = np.select(
+        [c > 4500, c > 3500, c > 2500],
+        [
+            "Concentración óptima alcanzada. Recomendar bombeo a siguiente etapa.",
+            "Concentración buena. Continuar evaporación 1-2 semanas más.",
+            "Concentración en desarrollo. Continuar evaporación."
+        ],
+        "Concentración baja. Continuar evaporación, monitorear clima."
+    )
+    return confidence.tolist(), quality_status.tolist(), recommendation.tolist()
+
+
+INTERVAL_FIELDS = ('p10', 'p50', 'p90', 'spread', 'std')
+
+
+def build_prediction_columns(
+    readings: list[SensorData],
+    X: np.ndarray,
+    predictions: np.ndarray,
+    intervals: Optional[dict],
+    warnings: list[list[str]],
+    tier: str = 'full',
+    model_version=None,
+    live: bool = True
+) -> dict:
+    """
+    Armar el resultado de un lote como columnas (arrays/listas por campo).
+    
+    Es la representación interna de la respuesta: se serializa directo en
+    formato columnar o se convierte a registros con `columns_to_records`.
+    Cada predicción se registra en el journal. `model_version` es un string
+    o una lista por lectura (ruteo por poza); por defecto, la del tier.
+    `readings` puede ser un lote columnar (ReadingColumns, /predict/bulk).
+    
+    `live=False` es scoring offline (/predict/batch, /predict/bulk: backfills
+    y reprocesos): no avanza las alertas por poza ni alimenta drift ni el
+    modelo en sombra, que describen el stream en vivo; `alert_state` y
+    `alert_transition` quedan en None.
+    """
+    
+    values = predictions.tolist()
+    if isinstance(readings, ReadingColumns):
+        poza_ids, timestamps, mg_li = readings.poza_id, readings.timestamp.tolist(), readings.optional('mg_li_ratio')
+    else:
+        poza_ids = [data.poza_id for data in readings]
+        timestamps = [data.timestamp for data in readings]
+        mg_li = [data.mg_li_ratio for data in readings]
+    
+    if len(values) >= VECTORIZED_LABELS_MIN_ROWS:
+        confidence, quality_status, recommendation = prediction_labels(predictions, mg_li, warnings)
+    else:
+        confidence = [determine_confidence(w, mg) for w, mg in zip(warnings, mg_li)]
+        quality_status = [determine_quality_status(p, mg) for p, mg in zip(values, mg_li)]
+        recommendation = [generate_recommendation(p, q) for p, q in zip(values, quality_status)]
+    if model_version is None:
+        model_version = model_version_for(tier)
+    
+    # Estadísticas online de los inputs como llegaron (costo constante por lectura)
+    if DRIFT is not None and live:
+        DRIFT.update(raw_feature_matrix(readings, X, DRIFT.feature_names), poza_ids)
+    
+    # Copia para el modelo en sombra (solo encola; se compara en background)
+    if SHADOW is not None and live and tier == 'full':
+        SHADOW.record(X, predictions, quality_status, mg_li)
+    
+    # Máquina de estados de alerta, en orden de llegada
+    if live:
+        alert_updates = [
+            ALERT_ENGINE.update(poza_id, timestamp, p) for poza_id, timestamp, p in zip(poza_ids, timestamps, values)
+        ]
+    else:
+        alert_updates = [(None, None)] * len(values)
+    
+    # Un solo redondeo vectorizado para predicción e intervalos
+    numeric = [predictions]
+    if intervals is not None:
+        numeric += [intervals[field] for field in INTERVAL_FIELDS]
+    rounded = np.round(np.vstack(numeric), 2)
+    
+    columns = {
+        'poza_id': poza_ids,
+        'timestamp': timestamps,
+        'predicted_concentration_mg_l': rounded[0],
+        'confidence': confidence,
+        'quality_status': quality_status,
+        'recommendation': recommendation,
+        'warnings': warnings,
+        'alert_state': [state for state, _ in alert_updates],
+        'alert_transition': [transition for _, transition in alert_updates],
+        'model_version': model_version
+    }
+    if intervals is not None:
+        columns['interval'] = dict(zip(INTERVAL_FIELDS, rounded[1:]))
+    
+    # Registro en el journal: un registro por lote, las filas se arman en el writer
+    if JOURNAL is not None:
+        JOURNAL.record((
+            time.time(), readings, X, predictions,
+            intervals['p10'] if intervals is not None else None,
+            intervals['p90'] if intervals is not None else None,
+            confidence, quality_status, model_version
+        ))
+    
+    # Historial: un registro por lote, las filas se arman en el writer
+    if STORE is not None:
+        STORE.record((
+            poza_ids, readings.timestamp if isinstance(readings, ReadingColumns) else timestamps, readings, predictions,
+            intervals['p10'] if intervals is not None else None,
+            intervals['p90'] if intervals is not None else None,
+            model_version
+        ))
+    
+    return columns
+
+
+def columns_to_records(columns: dict) -> list[dict]:
+    """Convertir columnas en una lista de dicts con la forma de PredictionResponse"""
+    
+    n = len(columns['poza_id'])
+    interval = columns.get('interval')
+    if interval is not None:
+        keys = [f'{field}_mg_l' for field in INTERVAL_FIELDS]
+        interval_records = [
+            dict(zip(keys, row))
+            for row in zip(*(interval[field].tolist() for field in INTERVAL_FIELDS))
+        ]
+    else:
+        interval_records = [None] * n
+    
+    model_version = columns['model_version']
+    versions = model_version if isinstance(model_version, list) else [model_version] * n
+    return [
+        {
+            'poza_id': poza_id,
+            'timestamp': timestamp,
+            'predicted_concentration_mg_l': predicted,
+            'prediction_interval': prediction_interval,
+            'alert': {'state': alert_state, 'transition': alert_transition} if alert_state is not None else None,
+            'confidence': confidence,
+            'quality_status': quality_status,
+            'recommendation': recommendation,
+            'warnings': warnings,
+            'model_version': version
+        }
+        for poza_id, timestamp, predicted, prediction_interval, alert_state, alert_transition,
+            confidence, quality_status, recommendation, warnings, version in zip(
+                columns['poza_id'],
+                columns['timestamp'],
+                columns['predicted_concentration_mg_l'].tolist(),
+                interval_records,
+                columns['alert_state'],
+                columns['alert_transition'],
+                columns['confidence'],
+                columns['quality_status'],
+                columns['recommendation'],
+                columns['warnings'],
+                versions
+            )
+    ]
+
+
+def columns_to_columnar(columns: dict) -> dict:
+    """Aplanar columnas para la respuesta columnar (intervalos como columnas propias)"""
+    
+    flat = {key: value for key, value in columns.items() if key not in ('interval', 'model_version')}
+    for field, values in (columns.get('interval') or {}).items():
+        flat[f'{field}_mg_l'] = values
+    # Con ruteo por poza la versión es una columna más
+    if isinstance(columns['model_version'], list):
+        flat['model_version'] = columns['model_version']
+    return flat
+
+
+def profile_tier(tier: str, artifact_path: Optional[str], repeat: int = 30) -> dict:
+    """Medir latencia de una fila y tamaño del artefacto de un tier"""
+    
+    reference = SensorData(
+        poza_id="PROFILE",
+        **{feature: (low + high) / 2 for feature, (low, high) in VALID_RANGES.items()}
+    )
+    X = build_feature_matrix([reference])
+    
+    score_features(X, tier)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        score_features(X, tier)
+        samples.append((time.perf_counter() - start) * 1000)
+    
+    return {
+        'available': True,
+        'model_type': model_version_for(tier),
+        'size_bytes': os.path.getsize(artifact_path) if artifact_path else None,
+        'latency_ms_single_row': round(float(np.median(samples)), 4),
+        'prediction_intervals': tier == 'full' and FOREST is not None
+    }
+
+
+def predict_single(data: SensorData, tier: Optional[str] = None) -> dict:
+    """Predicción de una lectura como dict con la forma de PredictionResponse"""
+    
+    effective_tier = resolve_tier(tier)
+    
+    # Validar rangos
+    warnings = validate_input_ranges(data)
+    
+    # Preparar features en el orden del entrenamiento
+    X = build_feature_matrix([data])
+    
+    # Predicción con el modelo de la poza (con intervalos por árbol si el modelo lo permite)
+    predictions, intervals, model_version = score_readings([data], X, effective_tier)
+    
+    columns = build_prediction_columns(
+        [data], X, predictions, intervals, [warnings], effective_tier, model_version
+    )
+    
+    logger.debug(
+        "Predicción: %s | Días: %.1f | Predicción: %.1f mg/L | Confianza: %s",
+        data.poza_id, data.days_evaporation, predictions[0], columns['confidence'][0]
+    )
+    
+    return columns_to_records(columns)[0]
+
+
+def _scatter(values, index: np.ndarray, n: int):
+    """Ubicar los resultados de las filas válidas en un array/lista de n filas (NaN / None en el resto)"""
+    if len(index) == n:
+        return values
+    if isinstance(values, np.ndarray):
+        out = np.full(n, np.nan)
+        out[index] = values
+        return out
+    out = [None] * n
+    for i, value in zip(index.tolist(), values):
+        out[i] = value
+    return out
+
+
+def score_bulk(batch: ReadingColumns, tier: Optional[str] = None) -> dict:
+    """
+    Scoring de un lote columnar (/predict/bulk) sin objetos por lectura.
+    
+    Validación, features y etiquetas se calculan por columna; las filas
+    inválidas no se predicen y se informan en `errors`. Las columnas del
+    resultado quedan alineadas con las filas del request. Es scoring offline
+    (sin alertas, drift ni sombra).
+    """
+    
+    n = len(batch)
+    errors = validate_required_and_ranges_columns(batch)
+    valid = np.setdiff1d(np.arange(n), np.fromiter(errors, dtype=np.intp)) if errors else np.arange(n)
+    readings = batch.take(valid)
+    
+    result = {'count': n, 'accepted': len(valid), 'rejected': len(errors), 'model_version': None,
+              'errors': errors, 'columns': {'predicted_concentration_mg_l': np.full(n, np.nan)}}
+    if not len(valid):
+        return result
+    
+    effective_tier = resolve_tier(tier)
+    X = build_feature_matrix(readings)
+    predictions, intervals, model_version = score_readings(readings, X, effective_tier)
+    columns = build_prediction_columns(
+        readings, X, predictions, intervals, validate_input_ranges_columns(readings),
+        effective_tier, model_version, live=False
+    )
+    
+    output = {'predicted_concentration_mg_l': columns['predicted_concentration_mg_l']}
+    for field, values in (columns.get('interval') or {}).items():
+        output[f'{field}_mg_l'] = values
+    for key in ('confidence', 'quality_status', 'recommendation', 'warnings', 'alert_state', 'alert_transition'):
+        output[key] = columns[key]
+    if isinstance(model_version, list):
+        output['model_version'] = model_version
+    else:
+        result['model_version'] = model_version
+    
+    result['columns'] = {key: _scatter(values, valid, n) for key, values in output.items()}
+    return result
+
+
+def parse_time_ms(value: str) -> int:
+    """Epoch en milisegundos de un número (ya en ms) o un ISO-8601 (naive = hora local, como al ingerir)"""
+    try:
+        return int(float(value))
+    except ValueError:
+        pass
+    try:
+        return round(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() * 1000)
+    except ValueError:
+        raise ValueError(f"Timestamp inválido: {value}. Usar ISO-8601 o epoch en milisegundos")
+
+
+def model_footprint() -> dict:
+    """Memoria de los modelos cargados: nodos por árbol, bytes y tamaño residente"""
+    footprint = {}
+    if FOREST is not None:
+        footprint['forest'] = profiling.forest_footprint(FOREST)
+    if MODEL is not None and not isinstance(MODEL, PackedForest):
+        footprint['sklearn'] = profiling.sklearn_footprint(MODEL)
+    if FAST_MODEL is not None:
+        footprint['fast'] = profiling.forest_footprint(FAST_MODEL)
+    footprint['total_bytes'] = sum(part.get('bytes', 0) for part in footprint.values())
+    footprint['process'] = profiling.process_memory()
+    return footprint
+
+
+def require_admin(request: Request):
+    """404 sin ADMIN_TOKEN configurado, 403 si el header X-Admin-Token no coincide"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Endpoints de administración desactivados (ADMIN_TOKEN)")
+    token = request.headers.get('x-admin-token', '')
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Token de administración inválido")
+
+
+def invalid_data_response(errors: list[str]) -> FastJSONResponse:
+    """Error de validación con el mismo cuerpo que "Responder Error" del workflow"""
+    return FastJSONResponse(
+        {"status": "error", "message": "Datos inválidos", "errors": errors},
+        status_code=400
+    )
+
+
 @app.get("/")
 async def root():
     """Endpoint raíz con información básica"""
@@ -260,6 +1141,18 @@ async def root():
         "endpoints": {
             "health": "/health",
             "predict": "/predict",
+            "predict_batch": "/predict/batch",
+            "predict_bulk": "/predict/bulk",
+            "ingest": "/ingest",
+            "ingest_batch": "/ingest/batch",
+            "models": "/models",
+            "shadow": "/shadow",
+            "drift": "/drift",
+            "admission": "/admission",
+            "readings": "/readings/{poza_id}",
+            "readings_summary": "/readings/{poza_id}/summary",
+            "admin_profile": "/admin/profile",
+            "admin_memory": "/admin/memory",
             "docs": "/docs"
         }
     }
@@ -280,11 +1173,12 @@ async def health_check():
 
 
 @app.post("/predict", response_model=PredictionResponse)
-async def predict_concentration(data: SensorData):
+async def predict_concentration(data: SensorData, tier: Optional[str] = None):
     """
     Predecir concentración de litio en salmuera
     
-    Recibe datos de sensores y devuelve predicción con recomendaciones
+    Recibe datos de sensores y devuelve predicción con recomendaciones.
+    `tier` elige el modelo ("full" o "fast"); por defecto MODEL_TIER.
     """
     
     if MODEL is None:
@@ -293,84 +1187,588 @@ async def predict_concentration(data: SensorData):
             detail="Modelo no disponible. Contactar administrador."
         )
     
+    limited = ADMISSION.check_poza(data.poza_id)
+    if limited is not None:
+        return limited
+    
     try:
-        # Validar rangos
-        warnings = validate_input_ranges(data)
-        
-        # Preparar features
-        features_dict = {
-            'days_evaporation': data.days_evaporation,
-            'temperature_c': data.temperature_c,
-            'humidity_percent': data.humidity_percent,
-            'ph': data.ph,
-            'conductivity_ms_cm': data.conductivity_ms_cm,
-            'density_g_cm3': data.density_g_cm3,
-            'mg_li_ratio': data.mg_li_ratio or 7.0,
-            'ca_li_ratio': data.ca_li_ratio or 1.5
-        }
-        
-        # Calcular features derivadas
-        features_dict = calculate_derived_features(features_dict)
+        # Respuesta armada internamente: se serializa sin re-validar
+        return FastJSONResponse(predict_single(data, tier))
         
-        # Crear DataFrame en el orden correcto
-        features_df = pd.DataFrame([features_dict])
+    except ValueError as ve:
+        logger.error(f"Error de validación: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    
+    except Exception as e:
+        logger.error(f"Error en predicción: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error interno en predicción: {str(e)}"
+        )
+
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(
+    batch: BatchSensorData,
+    tier: Optional[str] = None,
+    format: str = 'records'
+):
+    """
+    Predecir concentración para un lote de lecturas
+    
+    Todas las lecturas se evalúan en una sola pasada vectorizada del modelo.
+    `format=columnar` devuelve un array por campo en lugar de un objeto por
+    lectura (más compacto y rápido de serializar para lotes grandes). Es
+    scoring offline: no avanza las alertas por poza (`alert` queda en null).
+    """
+    
+    if MODEL is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Modelo no disponible. Contactar administrador."
+        )
+    
+    try:
+        if format not in ('records', 'columnar'):
+            raise ValueError(f"Formato desconocido: {format}. Opciones: records, columnar")
         
-        # Asegurar que tenemos todas las features en orden correcto
-        if FEATURE_NAMES:
-            missing_features = set(FEATURE_NAMES) - set(features_df.columns)
-            if missing_features:
-                raise ValueError(f"Features faltantes: {missing_features}")
-            
-            features_df = features_df[FEATURE_NAMES]
+        effective_tier = resolve_tier(tier)
+        X = build_feature_matrix(batch.readings)
+        predictions, intervals, model_version = score_readings(batch.readings, X, effective_tier)
+        warnings = [validate_input_ranges(data) for data in batch.readings]
         
-        # Predicción
-        prediction = MODEL.predict(features_df)[0]
+        columns = build_prediction_columns(
+            batch.readings, X, predictions, intervals, warnings, effective_tier, model_version, live=False
+        )
+        count = len(batch.readings)
         
-        # Determinar confianza
-        if warnings:
-            confidence = "BAJA - Inputs fuera de rango de entrenamiento"
-        elif data.mg_li_ratio is None:
-            confidence = "MEDIA - Sin ratios de impurezas (Mg/Li, Ca/Li)"
-        else:
-            confidence = "ALTA"
+        logger.info(f"Predicción en lote: {count} lecturas")
         
-        # Determinar calidad
-        quality_status = determine_quality_status(prediction, data.mg_li_ratio)
+        if format == 'columnar':
+            return FastJSONResponse({
+                'count': count,
+                'model_version': columns['model_version'] if isinstance(columns['model_version'], str) else None,
+                'columns': columns_to_columnar(columns)
+            })
         
-        # Generar recomendación
-        recommendation = generate_recommendation(prediction, quality_status)
+        return FastJSONResponse({'count': count, 'predictions': columns_to_records(columns)})
         
-        # Logging
-        logger.info(
-            f"Predicción: {data.poza_id} | "
-            f"Días: {data.days_evaporation:.1f} | "
-            f"Predicción: {prediction:.1f} mg/L | "
-            f"Confianza: {confidence}"
+    except ValueError as ve:
+        logger.error(f"Error de validación: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    
+    except Exception as e:
+        logger.error(f"Error en predicción en lote: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error interno en predicción: {str(e)}"
         )
+
+
+@app.post(
+    "/predict/bulk",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {media_type: {} for media_type in bulk_codec.MEDIA_TYPES.values()}
+        }
+    }
+)
+async def predict_bulk(request: Request, tier: Optional[str] = None):
+    """
+    Scoring masivo en formato binario/columnar
+    
+    Acepta `Content-Type: application/msgpack` (mapa {columna: array}; las
+    numéricas pueden ser listas o bytes float64) o
+    `application/vnd.apache.arrow.stream` (record batches), con las mismas
+    columnas que SensorData. Las columnas van directo a la matriz de features
+    sin armar objetos por lectura. Responde en el mismo formato, con una
+    columna por campo de la predicción alineada con las filas del request.
+    """
+    
+    if MODEL is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Modelo no disponible. Contactar administrador."
+        )
+    
+    try:
+        fmt = bulk_codec.format_for(request.headers.get('content-type'))
+    except ValueError as ve:
+        raise HTTPException(status_code=415, detail=str(ve))
+    
+    try:
+        batch = bulk_codec.decode(await request.body(), fmt)
+        if len(batch) > BULK_MAX_ROWS:
+            raise HTTPException(status_code=413, detail=f"Lote de {len(batch)} filas, máximo {BULK_MAX_ROWS}")
+        result = score_bulk(batch, tier)
+        
+        logger.info(f"Predicción bulk ({fmt}): {result['count']} lecturas, {result['rejected']} rechazadas")
         
-        return PredictionResponse(
-            poza_id=data.poza_id,
-            timestamp=data.timestamp,
-            predicted_concentration_mg_l=round(prediction, 2),
-            confidence=confidence,
-            quality_status=quality_status,
-            recommendation=recommendation,
-            warnings=warnings,
-            model_version=MODEL_METADATA.get('model_type', 'RandomForest') if MODEL_METADATA else 'Unknown'
+        return Response(content=bulk_codec.encode(result, fmt), media_type=bulk_codec.MEDIA_TYPES[fmt])
+        
+    except HTTPException:
+        raise
+    
+    except ValueError as ve:
+        logger.error(f"Error de validación: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    
+    except Exception as e:
+        logger.error(f"Error en predicción bulk: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error interno en predicción: {str(e)}"
         )
+
+
+@app.post(
+    "/ingest",
+    response_model=PredictionResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": SensorData.model_json_schema()}}
+        }
+    }
+)
+async def ingest_reading(request: Request, tier: Optional[str] = None):
+    """
+    Ingesta directa de sensores (un solo salto, sin el webhook de n8n)
+    
+    Valida campos requeridos y rangos como "Validar Datos", predice y
+    responde lo mismo que el webhook. Solo las transiciones ALERT_START se
+    envían a n8n (ALERT_WEBHOOK_URL), en background.
+    """
+    
+    if MODEL is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Modelo no disponible. Contactar administrador."
+        )
+    
+    try:
+        payload = loads(await request.body())
+    except ValueError:
+        return invalid_data_response(["JSON inválido"])
+    if not isinstance(payload, dict):
+        return invalid_data_response(["Se esperaba un objeto JSON"])
+    
+    errors = validate_required_and_ranges(payload)
+    if errors:
+        return invalid_data_response(errors)
+    
+    try:
+        data = SensorData(**payload)
+    except ValidationError as ve:
+        return invalid_data_response([
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+            for error in ve.errors()
+        ])
+    
+    limited = ADMISSION.check_poza(data.poza_id)
+    if limited is not None:
+        return limited
+    
+    try:
+        record = predict_single(data, tier)
+        
+        if ALERT_NOTIFIER is not None and record['alert']['transition'] == ALERT_START:
+            ALERT_NOTIFIER.notify(record)
+        
+        return FastJSONResponse(record)
         
     except ValueError as ve:
         logger.error(f"Error de validación: {str(ve)}")
         raise HTTPException(status_code=400, detail=str(ve))
     
     except Exception as e:
-        logger.error(f"Error en predicción: {str(e)}")
+        logger.error(f"Error en ingesta: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error interno en predicción: {str(e)}"
+        )
+
+
+@app.post("/ingest/batch")
+async def ingest_batch(request: Request, tier: Optional[str] = None, details: bool = False):
+    """
+    Ingesta de un lote NDJSON (una lectura por línea) desde un gateway de campo
+    
+    El cuerpo puede venir comprimido (`Content-Encoding: gzip` o `zstd`) y se
+    descomprime en streaming. Cada línea se valida como en /ingest; las
+    válidas se predicen en una sola pasada vectorizada y en el orden del lote.
+    Las alertas usan el timestamp de cada lectura, así un backlog acumulado
+    durante un corte de enlace se evalúa como si hubiera llegado a tiempo.
+    La respuesta es un resumen; `details=true` agrega las predicciones.
+    """
+    
+    if MODEL is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Modelo no disponible. Contactar administrador."
+        )
+    
+    try:
+        decoder = NDJSONStreamDecoder(request.headers.get('content-encoding'), INGEST_BATCH_MAX_BYTES)
+    except ValueError as ve:
+        raise HTTPException(status_code=415, detail=str(ve))
+    
+    readings, rejected, line_number = [], [], 0
+    
+    def accept(lines):
+        nonlocal line_number
+        for line in lines:
+            line_number += 1
+            try:
+                payload = loads(line)
+            except ValueError:
+                rejected.append({'line': line_number, 'errors': ["JSON inválido"]})
+                continue
+            if not isinstance(payload, dict):
+                rejected.append({'line': line_number, 'errors': ["Se esperaba un objeto JSON"]})
+                continue
+            errors = validate_required_and_ranges(payload)
+            if not errors:
+                try:
+                    readings.append(SensorData(**payload))
+                    continue
+                except ValidationError as ve:
+                    errors = [
+                        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                        for error in ve.errors()
+                    ]
+            rejected.append({'line': line_number, 'errors': errors})
+    
+    try:
+        async for chunk in request.stream():
+            accept(decoder.feed(chunk))
+        accept(decoder.close())
+    except PayloadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as ve:
+        return invalid_data_response([str(ve)])
+    
+    try:
+        records = []
+        if readings:
+            effective_tier = resolve_tier(tier)
+            X = build_feature_matrix(readings)
+            predictions, intervals, model_version = score_readings(readings, X, effective_tier)
+            columns = build_prediction_columns(
+                readings, X, predictions, intervals,
+                [validate_input_ranges(data) for data in readings], effective_tier, model_version
+            )
+            records = columns_to_records(columns)
+    
+        alerts = [record for record in records if record['alert']['transition'] == ALERT_START]
+        if ALERT_NOTIFIER is not None:
+            for record in alerts:
+                ALERT_NOTIFIER.notify(record)
+    
+        logger.info(
+            f"Lote NDJSON ({decoder.encoding}): {line_number} líneas, {len(readings)} aceptadas, "
+            f"{decoder.compressed_bytes} → {decoder.decompressed_bytes} bytes"
+        )
+    
+        response = {
+            'count': line_number,
+            'accepted': len(readings),
+            'rejected': len(rejected),
+            'errors': rejected[:INGEST_BATCH_MAX_ERRORS],
+            'alerts': [
+                {key: record[key] for key in ('poza_id', 'timestamp', 'predicted_concentration_mg_l')}
+                for record in alerts
+            ],
+            'bytes': {'received': decoder.compressed_bytes, 'decompressed': decoder.decompressed_bytes}
+        }
+        if details:
+            response['predictions'] = records
+        return FastJSONResponse(response)
+    
+    except ValueError as ve:
+        logger.error(f"Error de validación: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    
+    except Exception as e:
+        logger.error(f"Error en ingesta por lote: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Error interno en predicción: {str(e)}"
         )
 
 
+@app.get("/alerts")
+async def alerts_state():
+    """Estado de alerta de todas las pozas, contadores y callbacks a n8n"""
+    snapshot = ALERT_ENGINE.snapshot()
+    snapshot['notifier'] = ALERT_NOTIFIER.stats() if ALERT_NOTIFIER is not None else {"enabled": False}
+    return snapshot
+
+
+@app.get("/alerts/{poza_id}")
+async def alert_state(poza_id: str):
+    """Estado de alerta de una poza"""
+    return ALERT_ENGINE.state_of(poza_id)
+
+
+@app.get("/admission")
+async def admission_stats():
+    """Límites por cliente y por poza, concurrencia y requests descartados por prioridad"""
+    return ADMISSION.stats()
+
+
+@app.get("/admin/profile")
+async def admin_profile(
+    request: Request,
+    seconds: float = 10,
+    mode: str = 'sample',
+    format: str = 'json',
+    interval_ms: float = 5,
+    top: int = 50
+):
+    """
+    Profiling del tráfico real durante `seconds` (máximo 60) en este proceso
+    
+    `mode=sample` muestrea el stack del event loop cada `interval_ms` y
+    devuelve stacks colapsados (`format=collapsed`: texto para flamegraph.pl
+    o speedscope) o los más frecuentes en JSON; `mode=cprofile` devuelve las
+    funciones con más tiempo acumulado. Requiere X-Admin-Token.
+    """
+    require_admin(request)
+    if mode not in ('sample', 'cprofile'):
+        raise HTTPException(status_code=400, detail=f"mode desconocido: {mode}. Opciones: sample, cprofile")
+    if format not in ('json', 'collapsed') or (format == 'collapsed' and mode != 'sample'):
+        raise HTTPException(status_code=400, detail="format: json, o collapsed con mode=sample")
+    seconds = profiling.clamp_seconds(seconds)
+    
+    try:
+        with profiling.session():
+            if mode == 'sample':
+                # El handler corre en el thread del event loop: ese es el que se muestrea
+                sampler = profiling.StackSampler(threading.get_ident(), interval_ms / 1000).start()
+                try:
+                    await asyncio.sleep(seconds)
+                finally:
+                    sampler.stop()
+                if format == 'collapsed':
+                    return PlainTextResponse(sampler.collapsed())
+                result = sampler.report(top)
+            else:
+                import cProfile
+                profile = cProfile.Profile()
+                profile.enable()
+                try:
+                    await asyncio.sleep(seconds)
+                finally:
+                    profile.disable()
+                result = profiling.cprofile_report(profile, top)
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    return FastJSONResponse({'mode': mode, 'seconds': seconds, 'pid': os.getpid(), **result})
+
+
+@app.get("/admin/memory")
+async def admin_memory(request: Request, seconds: float = 10, top: int = 25, group_by: str = 'lineno'):
+    """
+    Mayores asignaciones de memoria vivas (tracemalloc) en este proceso
+    
+    Si tracemalloc no está activo (PYTHONTRACEMALLOC) se activa solo durante
+    `seconds` y se ven las asignaciones de esa ventana que siguen vivas.
+    `group_by`: lineno, filename o traceback. Requiere X-Admin-Token.
+    """
+    require_admin(request)
+    if group_by not in ('lineno', 'filename', 'traceback'):
+        raise HTTPException(status_code=400, detail="group_by: lineno, filename o traceback")
+    import tracemalloc
+    
+    try:
+        with profiling.session():
+            on_demand = not tracemalloc.is_tracing()
+            if on_demand:
+                tracemalloc.start(25 if group_by == 'traceback' else 1)
+            try:
+                if on_demand:
+                    await asyncio.sleep(profiling.clamp_seconds(seconds))
+                snapshot = tracemalloc.take_snapshot()
+                traced, peak = tracemalloc.get_traced_memory()
+            finally:
+                if on_demand:
+                    tracemalloc.stop()
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    return FastJSONResponse({
+        'tracing': 'on_demand' if on_demand else 'always',
+        'seconds': profiling.clamp_seconds(seconds) if on_demand else None,
+        'traced_bytes': traced,
+        'peak_bytes': peak,
+        'group_by': group_by,
+        'top': profiling.tracemalloc_top(snapshot, group_by, top),
+        'process': profiling.process_memory()
+    })
+
+
+@app.get("/models")
+async def models_registry():
+    """Modelos registrados, ruteo por poza y costo de memoria de cada uno"""
+    
+    if REGISTRY is None:
+        return {"enabled": False}
+    
+    return {"enabled": True, **REGISTRY.memory_report()}
+
+
+@app.get("/shadow")
+async def shadow_stats():
+    """Comparación del modelo en sombra contra el principal (bias, MAE, calidad)"""
+    
+    if SHADOW is None:
+        return {"enabled": False}
+    
+    return {"enabled": True, **SHADOW.stats()}
+
+
+@app.get("/drift")
+async def drift_summary():
+    """Drift de inputs global (por feature) y estado resumido por poza"""
+    
+    if DRIFT is None:
+        return {"enabled": False}
+    
+    return {"enabled": True, **DRIFT.summary()}
+
+
+@app.get("/drift/{poza_id}")
+async def drift_poza(poza_id: str):
+    """Drift de inputs de una poza, por feature"""
+    
+    if DRIFT is None:
+        return {"enabled": False}
+    
+    return {"enabled": True, **DRIFT.report(poza_id)}
+
+
+@app.get("/journal/stats")
+async def journal_stats():
+    """Contadores del journal de predicciones (encolados, escritos, descartados)"""
+    
+    if JOURNAL is None:
+        return {"enabled": False}
+    
+    return {"enabled": True, **JOURNAL.stats()}
+
+
+@app.get("/readings/{poza_id}")
+def readings_range(
+    poza_id: str,
+    start: str,
+    end: Optional[str] = None,
+    limit: int = 10_000,
+    format: str = 'records'
+):
+    """
+    Lecturas y predicciones de una poza con start <= timestamp < end
+    
+    `start` y `end` son ISO-8601 o epoch en milisegundos (`end` por defecto,
+    ahora). Vuelven en orden de timestamp, hasta `limit` filas
+    (`truncated=true` si hay más: seguir desde el último timestamp + 1 ms).
+    `format=columnar` devuelve un array por campo. Es `def` (no `async`): la
+    lectura de SQLite bloquea y FastAPI la corre en su pool de threads, cada
+    uno con su conexión de solo lectura.
+    """
+    
+    if STORE is None:
+        return {"enabled": False, "detail": "Historial desactivado (READING_STORE=1 para activarlo)"}
+    
+    try:
+        if format not in ('records', 'columnar'):
+            raise ValueError(f"Formato desconocido: {format}. Opciones: records, columnar")
+        if not 1 <= limit <= READINGS_MAX_ROWS:
+            raise ValueError(f"limit debe estar entre 1 y {READINGS_MAX_ROWS}")
+        start_ms = parse_time_ms(start)
+        end_ms = parse_time_ms(end) if end is not None else round(time.time() * 1000)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    
+    result = STORE.query(poza_id, start_ms, end_ms, limit)
+    response = {'poza_id': poza_id, 'start_ms': start_ms, 'end_ms': end_ms,
+                'count': result['count'], 'truncated': result['truncated']}
+    columns = result['columns']
+    if format == 'columnar':
+        response['columns'] = columns
+    else:
+        names = list(columns)
+        response['readings'] = [dict(zip(names, row)) for row in zip(*columns.values())]
+    return FastJSONResponse(response)
+
+
+@app.get("/readings/{poza_id}/summary")
+def readings_summary(
+    poza_id: str,
+    start: str,
+    end: Optional[str] = None,
+    resolution: str = 'hour',
+    fields: Optional[str] = None,
+    format: str = 'records'
+):
+    """
+    Mínimo, máximo y media por hora o día de una poza entre start y end
+    
+    Se sirve de los agregados que el historial mantiene al insertar, sin
+    recorrer las lecturas. `start` se alinea al inicio de su bucket (UTC).
+    `fields` elige campos separados por coma (por defecto, los de la lectura
+    y la predicción). Cada campo informa cuántos valores tuvo (`<campo>_n`):
+    los faltantes no entran en la media, y un bucket sin ninguno da null.
+    `exact=false` marca un bucket todavía abierto o con lecturas tardías sin
+    compactar (un reenvío puede contarse dos veces hasta entonces). `totals`
+    resume toda la ventana. Como /readings, corre en el pool de threads.
+    """
+    
+    if STORE is None or STORE.rollups is None:
+        return {"enabled": False, "detail": "Agregados desactivados (sin READING_STORE o con READING_ROLLUPS=0)"}
+    
+    try:
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Resolución desconocida: {resolution}. Opciones: {', '.join(RESOLUTIONS)}")
+        if format not in ('records', 'columnar'):
+            raise ValueError(f"Formato desconocido: {format}. Opciones: records, columnar")
+        selected = [field.strip() for field in fields.split(',')] if fields else list(ROLLUP_FIELDS)
+        unknown = [field for field in selected if field not in ROLLUP_FIELDS]
+        if unknown:
+            raise ValueError(f"Campos sin agregados: {', '.join(unknown)}. Opciones: {', '.join(ROLLUP_FIELDS)}")
+        start_ms = parse_time_ms(start)
+        end_ms = parse_time_ms(end) if end is not None else round(time.time() * 1000)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    
+    result = STORE.summary(poza_id, resolution, start_ms, end_ms, selected)
+    response = {'poza_id': poza_id, 'resolution': resolution, 'start_ms': start_ms, 'end_ms': end_ms,
+                'count': result['count'], 'totals': result['totals']}
+    columns = result['columns']
+    if format == 'columnar':
+        response['columns'] = columns
+    else:
+        names = list(columns)
+        response['buckets'] = [dict(zip(names, row)) for row in zip(*columns.values())]
+    return FastJSONResponse(response)
+
+
+@app.get("/store/stats")
+async def store_stats():
+    """Contadores del historial de lecturas (encoladas, escritas, descartadas, tamaño en disco)"""
+    
+    if STORE is None:
+        return {"enabled": False}
+    
+    size = sum(
+        os.path.getsize(STORE.path + suffix)
+        for suffix in ('', '-wal') if os.path.exists(STORE.path + suffix)
+    )
+    return {"enabled": True, **STORE.stats(), "size_bytes": size}
+
+
 @app.get("/model/info")
 async def model_info():
     """Información sobre el modelo cargado"""
@@ -397,6 +1795,23 @@ async def model_info():
         except:
             pass
         
+        info['artifact'] = 'compact' if isinstance(MODEL, PackedForest) else 'sklearn'
+        
+        # Intervalos por árbol disponibles
+        info['prediction_intervals'] = FOREST is not None
+        if FOREST is not None:
+            info['node_count'] = FOREST.node_count
+        
+        # Registro de modelos por poza (detalle en /models)
+        info['registry'] = REGISTRY.memory_report()['totals'] if REGISTRY is not None else None
+        
+        # Huella en memoria: nodos por árbol, bytes de los arrays y residente
+        info['memory'] = model_footprint()
+        
+        # Tiers de servicio (latencia y tamaño medidos al cargar)
+        info['default_tier'] = DEFAULT_TIER
+        info['tiers'] = TIER_INFO
+        
         # Agregar métricas si existen en metadata - CORREGIDO
         try:
             if MODEL_METADATA:
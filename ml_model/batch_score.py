@@ -0,0 +1,239 @@
+"""
+Scoring offline por lotes de archivos de lecturas (CSV)
+Re-puntúa el histórico sin pasar por HTTP: el archivo se lee en bloques,
+cada bloque se procesa en un pool de procesos (features derivadas y
+predicción vectorizadas) y la salida se escribe en orden o particionada
+"""
+
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from api_model import calculate_derived_features, determine_quality_status
+from model_registry import ModelRegistry
+from packed_forest import interval_summary
+
+DEFAULT_CHUNK_ROWS = 50_000
+TARGET = 'li_concentration_mg_l'
+
+# Columnas mínimas de la lectura (los ratios son opcionales, como en la API)
+BASE_FEATURES = ['days_evaporation', 'temperature_c', 'humidity_percent', 'ph',
+                 'conductivity_ms_cm', 'density_g_cm3']
+RATIO_DEFAULTS = {'mg_li_ratio': 7.0, 'ca_li_ratio': 1.5}
+
+# Estado de cada worker (se carga una vez por proceso en _init_worker)
+_FOREST = None
+_FEATURE_NAMES = None
+_INTERVALS = False
+_OUTPUT_DIR = None
+
+
+def _init_worker(store_dir, sha256, feature_names, intervals, output_dir):
+    """Abrir el bosque desde el store (mmap: los workers comparten las páginas)"""
+    global _FOREST, _FEATURE_NAMES, _INTERVALS, _OUTPUT_DIR
+    from packed_forest import PackedForest
+    _FOREST = PackedForest.load_dir(os.path.join(store_dir, sha256), mmap=True)
+    _FEATURE_NAMES = feature_names
+    _INTERVALS = intervals
+    _OUTPUT_DIR = output_dir
+
+
+def score_chunk(chunk: pd.DataFrame, forest, feature_names, intervals=False) -> pd.DataFrame:
+    """
+    Agregar al bloque las columnas de predicción.
+
+    - `li_predicted_mg_l`: predicción del modelo
+    - `predicted_quality_status`: mismo criterio que la API
+    - `residual_mg_l`: real - predicho (solo si el archivo trae el target)
+    - `li_p10_mg_l` / `li_p90_mg_l`: con `intervals` y un Random Forest
+
+    Las filas sin alguna feature base quedan sin predicción (NaN).
+    """
+    return _score(chunk, forest, feature_names, intervals)[0]
+
+
+def _score(chunk: pd.DataFrame, forest, feature_names, intervals=False):
+    """score_chunk más el residuo sin redondear (None sin target) para MAE/RMSE"""
+    features = chunk[BASE_FEATURES].astype(np.float64)
+    for name, default in RATIO_DEFAULTS.items():
+        features[name] = chunk[name].fillna(default) if name in chunk else default
+    features = calculate_derived_features(features)
+
+    X = features[feature_names].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(X).any(axis=1)
+    prediction = np.full(len(chunk), np.nan)
+    low = high = None
+
+    if valid.any():
+        X_valid = X[valid] if not valid.all() else X
+        if intervals and forest.aggregate == 'mean':
+            summary = interval_summary(forest.predict_per_tree(X_valid))
+            prediction[valid] = summary['mean']
+            low, high = np.full(len(chunk), np.nan), np.full(len(chunk), np.nan)
+            low[valid], high[valid] = summary['p10'], summary['p90']
+        else:
+            prediction[valid] = forest.predict(X_valid)
+
+    mg_li = chunk['mg_li_ratio'].tolist() if 'mg_li_ratio' in chunk else [None] * len(chunk)
+    quality = [
+        determine_quality_status(value, None if ratio is None or ratio != ratio else ratio)
+        if ok else None
+        for value, ratio, ok in zip(prediction.tolist(), mg_li, valid.tolist())
+    ]
+
+    scored = chunk.copy()
+    scored['li_predicted_mg_l'] = np.round(prediction, 2)
+    scored['predicted_quality_status'] = quality
+    if low is not None:
+        scored['li_p10_mg_l'] = np.round(low, 2)
+        scored['li_p90_mg_l'] = np.round(high, 2)
+    residual = None
+    if TARGET in chunk:
+        residual = chunk[TARGET].to_numpy(dtype=np.float64) - prediction
+        scored['residual_mg_l'] = np.round(residual, 2)
+    return scored, residual
+
+
+def _chunk_stats(scored: pd.DataFrame, residual) -> dict:
+    """Conteos y sumas de error del bloque (se combinan en el proceso principal)"""
+    stats = {'rows': len(scored), 'invalid': int(scored['li_predicted_mg_l'].isna().sum())}
+    if residual is not None:
+        # Sin redondear: el CSV lleva 2 decimales, las métricas no
+        residual = residual[~np.isnan(residual)]
+        stats.update(n_residual=len(residual), sum_abs=float(np.abs(residual).sum()),
+                     sum_sq=float((residual ** 2).sum()))
+    return stats
+
+
+def _score_ordered(item):
+    """Worker, salida ordenada: devolver el bloque puntuado al proceso principal"""
+    _, chunk = item
+    scored, residual = _score(chunk, _FOREST, _FEATURE_NAMES, _INTERVALS)
+    return scored, _chunk_stats(scored, residual)
+
+
+def _score_partition(item):
+    """Worker, salida particionada: escribir el bloque en su propio archivo"""
+    index, chunk = item
+    scored, residual = _score(chunk, _FOREST, _FEATURE_NAMES, _INTERVALS)
+    scored.to_csv(os.path.join(_OUTPUT_DIR, f'part-{index:05d}.csv'), index=False)
+    return None, _chunk_stats(scored, residual)
+
+
+def batch_score(input_path, output_path, model_path='model.pkl', metadata_path=None,
+                workers=None, chunk_rows=DEFAULT_CHUNK_ROWS, partitioned=False, intervals=False,
+                store_dir=None) -> dict:
+    """
+    Puntuar `input_path` y escribir en `output_path`.
+
+    Con `partitioned=False` la salida es un único CSV en el orden de entrada
+    (los bloques vuelven en orden con `imap`). Con `partitioned=True`,
+    `output_path` es un directorio y cada worker escribe `part-NNNNN.csv`
+    sin pasar los resultados por el proceso principal.
+
+    El modelo se convierte una vez al store de `ModelRegistry` y cada
+    worker lo abre mapeado en memoria (sin unpickle de sklearn por worker).
+    Sin `metadata_path` se usa el model_metadata.pkl junto al modelo.
+    """
+    workers = workers or os.cpu_count() or 1
+    registry = ModelRegistry(store_dir) if store_dir else ModelRegistry()
+    entry = registry.register('batch', model_path)
+    metadata_path = metadata_path or os.path.join(os.path.dirname(os.path.abspath(model_path)), 'model_metadata.pkl')
+    feature_names = joblib.load(metadata_path)['feature_cols']
+
+    if partitioned:
+        os.makedirs(output_path, exist_ok=True)
+
+    chunks = enumerate(pd.read_csv(input_path, chunksize=chunk_rows))
+    totals = {'rows': 0, 'invalid': 0, 'n_residual': 0, 'sum_abs': 0.0, 'sum_sq': 0.0}
+    start = time.perf_counter()
+
+    ctx = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else 'spawn')
+    with ctx.Pool(workers, _init_worker, (registry.store_dir, entry.sha256, feature_names,
+                                          intervals, output_path if partitioned else None)) as pool:
+        if partitioned:
+            results = pool.imap_unordered(_score_partition, chunks)
+        else:
+            results = pool.imap(_score_ordered, chunks)
+
+        header = True
+        for scored, stats in results:
+            if scored is not None:
+                scored.to_csv(output_path, mode='w' if header else 'a', header=header, index=False)
+                header = False
+            for key, value in stats.items():
+                totals[key] += value
+
+    elapsed = time.perf_counter() - start
+    n = totals['n_residual']
+    return {
+        'input': input_path,
+        'output': output_path,
+        'model': entry.artifact,
+        'workers': workers,
+        'chunk_rows': chunk_rows,
+        'partitioned': partitioned,
+        'rows': totals['rows'],
+        'invalid_rows': totals['invalid'],
+        'seconds': round(elapsed, 3),
+        'rows_per_s': round(totals['rows'] / elapsed, 1) if elapsed else None,
+        'mae_mg_l': round(totals['sum_abs'] / n, 2) if n else None,
+        'rmse_mg_l': round(float(np.sqrt(totals['sum_sq'] / n)), 2) if n else None
+    }
+
+
+def main():
+    """
+    Uso: python batch_score.py <entrada.csv> <salida.csv|directorio>
+         [--workers=N] [--chunk-rows=N] [--model=model.pkl] [--metadata=model_metadata.pkl]
+         [--partitioned] [--intervals]
+
+    --metadata por defecto es el model_metadata.pkl del directorio del modelo.
+    """
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if len(args) != 2:
+        print(main.__doc__.strip())
+        return False
+
+    options = {'model_path': 'model.pkl'}
+    for arg in sys.argv[1:]:
+        if arg.startswith('--workers='):
+            options['workers'] = int(arg.split('=', 1)[1])
+        elif arg.startswith('--chunk-rows='):
+            options['chunk_rows'] = int(arg.split('=', 1)[1])
+        elif arg.startswith('--model='):
+            options['model_path'] = arg.split('=', 1)[1]
+        elif arg.startswith('--metadata='):
+            options['metadata_path'] = arg.split('=', 1)[1]
+        elif arg == '--partitioned':
+            options['partitioned'] = True
+        elif arg == '--intervals':
+            options['intervals'] = True
+
+    if not os.path.exists(options['model_path']):
+        print(f"❌ Modelo no encontrado: {options['model_path']} (python train_model.py)")
+        return False
+
+    print("="*66)
+    print(f"SCORING OFFLINE: {args[0]}")
+    print("="*66)
+
+    report = batch_score(args[0], args[1], **options)
+
+    print(f"✅ {report['rows']:,} lecturas puntuadas en {report['seconds']:.2f} s "
+          f"({report['rows_per_s']:,.0f} lecturas/s, {report['workers']} workers)")
+    if report['invalid_rows']:
+        print(f"⚠️  {report['invalid_rows']:,} lecturas sin predicción (features faltantes)")
+    if report['mae_mg_l'] is not None:
+        print(f"📊 Contra el valor real: MAE {report['mae_mg_l']} mg/L | RMSE {report['rmse_mg_l']} mg/L")
+    print(f"💾 Resultados: {report['output']}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
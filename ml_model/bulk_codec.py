@@ -0,0 +1,227 @@
+"""
+Formatos binarios y columnares para scoring masivo (/predict/bulk)
+MessagePack (mapa de columnas) y Arrow IPC (record batches en stream). Las
+columnas se leen directo a arrays numpy, sin armar un objeto por lectura.
+"""
+
+import importlib.util
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+
+# msgpack y pyarrow son opcionales y se importan al primer uso (pyarrow es pesado
+# y no debe pesar en el arranque de la API); sin la librería el formato responde 415
+_FORMAT_MODULES = {'msgpack': 'msgpack', 'arrow': 'pyarrow'}
+
+MEDIA_TYPES = {
+    'msgpack': 'application/msgpack',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+_CONTENT_TYPES = {
+    'application/msgpack': 'msgpack',
+    'application/x-msgpack': 'msgpack',
+    'application/vnd.apache.arrow.stream': 'arrow',
+}
+
+# Columnas numéricas de una lectura (mismos nombres que SensorData); NaN = faltante
+NUMERIC_FIELDS = (
+    'days_evaporation', 'temperature_c', 'humidity_percent', 'ph',
+    'conductivity_ms_cm', 'density_g_cm3', 'mg_li_ratio', 'ca_li_ratio'
+)
+
+
+def available_formats() -> tuple[str, ...]:
+    """Formatos binarios disponibles en este entorno (sin importar las librerías)"""
+    return tuple(fmt for fmt, module in _FORMAT_MODULES.items() if importlib.util.find_spec(module) is not None)
+
+
+def _msgpack():
+    import msgpack
+    return msgpack
+
+
+def _arrow():
+    import pyarrow as pa
+    import pyarrow.compute
+    import pyarrow.ipc
+    return pa
+
+
+def format_for(content_type: str) -> str:
+    """Formato de un Content-Type; ValueError si no se reconoce o falta la librería"""
+    fmt = _CONTENT_TYPES.get((content_type or '').split(';')[0].strip().lower())
+    if fmt is None or fmt not in available_formats():
+        accepted = ', '.join(MEDIA_TYPES[f] for f in available_formats()) or 'ninguno (instalar msgpack o pyarrow)'
+        raise ValueError(f"Content-Type no soportado: {content_type}. Opciones: {accepted}")
+    return fmt
+
+
+class ReadingColumns:
+    """
+    Lote de lecturas como columnas: `poza_id` (lista), `timestamp` (epoch en
+    segundos, array) y un array float64 por campo numérico (NaN = faltante).
+    """
+
+    def __init__(self, poza_id: list, timestamp: np.ndarray, values: dict):
+        self.poza_id = poza_id
+        self.timestamp = timestamp
+        self.values = values
+
+    def __len__(self):
+        return len(self.poza_id)
+
+    def optional(self, field: str) -> list:
+        """Columna como lista con None en los faltantes (como los Optional de SensorData)"""
+        return [None if value != value else value for value in self.values[field].tolist()]
+
+    def take(self, index: np.ndarray) -> 'ReadingColumns':
+        """Subconjunto de filas (p. ej. solo las válidas)"""
+        if len(index) == len(self):
+            return self
+        return ReadingColumns(
+            [self.poza_id[i] for i in index.tolist()],
+            self.timestamp[index],
+            {field: values[index] for field, values in self.values.items()}
+        )
+
+
+def _numeric_column(name, values, n) -> np.ndarray:
+    """Lista de números (None = faltante) o bytes float64 little-endian"""
+    if isinstance(values, (bytes, bytearray, memoryview)):
+        column = np.frombuffer(values, dtype='<f8')
+    else:
+        try:
+            column = np.asarray(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError(f"La columna {name} no es numérica")
+    if column.shape != (n,):
+        raise ValueError(f"La columna {name} tiene {column.size} valores, se esperaban {n}")
+    return column
+
+
+def _timestamp_column(values, n) -> np.ndarray:
+    """Timestamps como epoch en segundos: números o strings ISO-8601; sin columna, la hora actual"""
+    if values is None:
+        return np.full(n, time.time())
+    if len(values) != n:
+        raise ValueError(f"La columna timestamp tiene {len(values)} valores, se esperaban {n}")
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return np.array([datetime.fromisoformat(value).timestamp() for value in values])
+    except (TypeError, ValueError):
+        raise ValueError("La columna timestamp debe ser epoch (segundos) o ISO-8601")
+
+
+def _columns(poza_id, timestamp, numeric: dict, n: int) -> ReadingColumns:
+    if poza_id is None:
+        poza_id = [None] * n
+    elif len(poza_id) != n:
+        raise ValueError(f"La columna poza_id tiene {len(poza_id)} valores, se esperaban {n}")
+    values = {
+        field: numeric[field] if field in numeric else np.full(n, np.nan)
+        for field in NUMERIC_FIELDS
+    }
+    return ReadingColumns(poza_id, _timestamp_column(timestamp, n), values)
+
+
+def decode_msgpack(body: bytes) -> ReadingColumns:
+    """Mapa {columna: array}; las columnas numéricas pueden ser listas o bytes float64"""
+    msgpack = _msgpack()
+    try:
+        payload = msgpack.unpackb(body, raw=False)
+    except Exception as e:
+        raise ValueError(f"MessagePack inválido: {e}") from e
+    if not isinstance(payload, dict):
+        raise ValueError("Se esperaba un mapa de columnas {nombre: array}")
+
+    lengths = {len(values) // 8 if isinstance(values, bytes) else len(values)
+               for values in payload.values() if isinstance(values, (list, bytes))}
+    if len(lengths) != 1:
+        raise ValueError("Las columnas deben ser arrays del mismo largo")
+    n = lengths.pop()
+    numeric = {
+        field: _numeric_column(field, payload[field], n)
+        for field in NUMERIC_FIELDS if field in payload
+    }
+    return _columns(payload.get('poza_id'), payload.get('timestamp'), numeric, n)
+
+
+def decode_arrow(body: bytes) -> ReadingColumns:
+    """Stream Arrow IPC (uno o más record batches con el mismo esquema)"""
+    pa = _arrow()
+    pc = pa.compute
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except (pa.ArrowInvalid, OSError) as e:
+        raise ValueError(f"Stream Arrow inválido: {e}") from e
+    n = table.num_rows
+    names = set(table.column_names)
+
+    numeric = {}
+    for field in NUMERIC_FIELDS:
+        if field not in names:
+            continue
+        try:
+            column = pc.cast(table.column(field), pa.float64())
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            raise ValueError(f"La columna {field} no es numérica")
+        numeric[field] = column.to_numpy(zero_copy_only=False)
+
+    timestamp = None
+    if 'timestamp' in names:
+        column = table.column('timestamp')
+        if pa.types.is_timestamp(column.type):
+            timestamp = pc.cast(column, pa.timestamp('us')).cast(pa.int64()).to_numpy(zero_copy_only=False) / 1e6
+        else:
+            timestamp = column.to_pylist()
+    poza_id = table.column('poza_id').to_pylist() if 'poza_id' in names else None
+    return _columns(poza_id, timestamp, numeric, n)
+
+
+def decode(body: bytes, fmt: str) -> ReadingColumns:
+    return decode_msgpack(body) if fmt == 'msgpack' else decode_arrow(body)
+
+
+def encode(result: dict, fmt: str) -> bytes:
+    """
+    Respuesta en el formato del request. `result` trae metadatos (count,
+    accepted, rejected, model_version), `errors` {fila: [mensajes]} y
+    `columns` alineadas con las filas del request (NaN / None en las
+    rechazadas).
+    """
+    columns = result['columns']
+    meta = {key: result[key] for key in ('count', 'accepted', 'rejected', 'model_version')}
+
+    if fmt == 'msgpack':
+        return _msgpack().packb({
+            **meta,
+            'errors': [{'row': row, 'errors': errors} for row, errors in sorted(result['errors'].items())],
+            'columns': {
+                name: values.tolist() if isinstance(values, np.ndarray) else values
+                for name, values in columns.items()
+            }
+        }, use_bin_type=True)
+
+    pa = _arrow()
+    arrays = {}
+    for name, values in columns.items():
+        if isinstance(values, np.ndarray):
+            arrays[name] = pa.array(values, mask=np.isnan(values))
+        else:
+            arrays[name] = pa.array(values)
+    errors = [[] for _ in range(meta['count'])] if result['errors'] else None
+    for row, messages in result['errors'].items():
+        errors[row] = messages
+    arrays['errors'] = pa.array(errors, type=pa.list_(pa.string())) if errors is not None else \
+        pa.nulls(meta['count'], type=pa.list_(pa.string()))
+    table = pa.table(arrays).replace_schema_metadata({'result': json.dumps(meta)})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,239 @@
+"""
+Compactación del modelo Random Forest para servir en producción
+Poda hojas casi iguales, guarda umbrales/valores en float32 e índices en el
+entero más chico posible, y compara el artefacto compacto contra model.pkl
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import joblib
+
+from packed_forest import PackedForest
+
+# Diferencia máxima (mg/L) entre hojas de un subárbol para colapsarlo
+DEFAULT_TOLERANCE = 10.0
+COMPACT_MODEL_FILE = 'model_compact.npz'
+
+
+def _float32_floor(threshold: np.ndarray) -> np.ndarray:
+    """
+    Umbral float32 más grande <= umbral float64.
+
+    Los features se comparan en float32, así que `x <= floor32(t)` equivale
+    exactamente a `x <= t`: reducir los umbrales no cambia ninguna decisión.
+    """
+    t32 = threshold.astype(np.float32)
+    rounded_up = t32.astype(np.float64) > threshold
+    t32[rounded_up] = np.nextafter(t32[rounded_up], np.float32(-np.inf))
+    return t32
+
+
+def _prune_tree(tree, tolerance: float, max_depth=None) -> np.ndarray:
+    """
+    Marcar qué nodos quedan como hoja después de podar.
+
+    Un nodo se colapsa si todas las hojas originales de su subárbol difieren
+    a lo sumo `tolerance` (la predicción de cualquier fila cambia menos que
+    eso), o si alcanza `max_depth`. Los hijos siempre tienen id mayor que el
+    padre, así que recorrer en orden inverso procesa hijos antes que padres.
+    """
+    left, right = tree.children_left, tree.children_right
+    value = tree.value[:, 0, 0]
+    n_nodes = tree.node_count
+
+    depth = np.zeros(n_nodes, dtype=np.intp)
+    for node in range(n_nodes):
+        if left[node] != -1:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+
+    is_leaf = left == -1
+    low, high = value.copy(), value.copy()
+    for node in range(n_nodes - 1, -1, -1):
+        if is_leaf[node]:
+            continue
+        l, r = left[node], right[node]
+        low[node] = min(low[l], low[r])
+        high[node] = max(high[l], high[r])
+        if high[node] - low[node] <= tolerance:
+            is_leaf[node] = True
+
+    if max_depth is not None:
+        is_leaf |= depth >= max_depth
+
+    return is_leaf
+
+
+def compact_forest(model, tolerance: float = DEFAULT_TOLERANCE, max_depth=None) -> PackedForest:
+    """Construir un PackedForest compacto desde un RandomForestRegressor"""
+    features, thresholds, rights, values, roots = [], [], [], [], []
+    offset = 0
+    forest_depth = 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        is_leaf = _prune_tree(tree, tolerance, max_depth)
+
+        # Re-numerar en pre-orden: el hijo izquierdo queda en nodo + 1
+        order, parents_right, stack = [], {}, [(0, 0, None)]
+        tree_depth = 0
+        while stack:
+            node, depth, right_of = stack.pop()
+            new_id = offset + len(order)
+            if right_of is not None:
+                parents_right[right_of] = new_id
+            order.append(node)
+            tree_depth = max(tree_depth, depth)
+            if not is_leaf[node]:
+                # La pila es LIFO: el derecho entra primero para salir después
+                stack.append((tree.children_right[node], depth + 1, new_id))
+                stack.append((tree.children_left[node], depth + 1, None))
+
+        order = np.asarray(order)
+        new_ids = np.arange(offset, offset + len(order))
+        leaf = is_leaf[order]
+
+        right = new_ids.copy()
+        for parent_id, child_id in parents_right.items():
+            right[parent_id - offset] = child_id
+
+        features.append(np.where(leaf, 0, tree.feature[order]))
+        thresholds.append(np.where(leaf, -np.inf, tree.threshold[order]))
+        rights.append(right)
+        values.append(tree.value[order, 0, 0])
+        roots.append(offset)
+
+        offset += len(order)
+        forest_depth = max(forest_depth, tree_depth)
+
+    index_type = np.min_scalar_type(offset)
+    return PackedForest(
+        feature=np.concatenate(features).astype(np.min_scalar_type(model.n_features_in_ - 1)),
+        threshold=_float32_floor(np.concatenate(thresholds)),
+        left=None,
+        right=np.concatenate(rights).astype(index_type),
+        value=np.concatenate(values).astype(np.float32),
+        roots=np.asarray(roots, dtype=index_type),
+        max_depth=forest_depth,
+        n_features=model.n_features_in_
+    )
+
+
+def _timed(func, repeat):
+    """Latencia mediana (ms) de `func`"""
+    func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def _scores(y_true, y_pred):
+    """R² y MAPE (%)"""
+    from sklearn.metrics import r2_score
+    y_true = np.asarray(y_true)
+    return r2_score(y_true, y_pred), float(np.mean(np.abs((y_true - y_pred) / y_true)) * 100)
+
+
+def compaction_report(model, model_path, compact, compact_path, X_test, y_test):
+    """Comparar tamaño, carga, latencia y precisión antes/después de compactar"""
+    X = np.asarray(X_test, dtype=np.float64)
+    original = PackedForest.from_sklearn(model)
+
+    r2_before, mape_before = _scores(y_test, model.predict(X_test))
+    r2_after, mape_after = _scores(y_test, compact.predict(X))
+
+    report = {
+        'nodes_before': original.node_count,
+        'nodes_after': compact.node_count,
+        'size_bytes_before': os.path.getsize(model_path),
+        'size_bytes_after': os.path.getsize(compact_path),
+        'memory_bytes_before': original.nbytes,
+        'memory_bytes_after': compact.nbytes,
+        'load_ms_before': _timed(lambda: joblib.load(model_path), repeat=5),
+        'load_ms_after': _timed(lambda: PackedForest.load(compact_path), repeat=20),
+        'latency_ms_1_before': _timed(lambda: original.predict(X[:1]), repeat=200),
+        'latency_ms_1_after': _timed(lambda: compact.predict(X[:1]), repeat=200),
+        'latency_ms_batch_before': _timed(lambda: original.predict(X), repeat=20),
+        'latency_ms_batch_after': _timed(lambda: compact.predict(X), repeat=20),
+        'batch_rows': len(X),
+        'r2_before': r2_before,
+        'r2_after': r2_after,
+        'r2_delta': r2_after - r2_before,
+        'mape_before': mape_before,
+        'mape_after': mape_after,
+        'mape_delta': mape_after - mape_before
+    }
+
+    print("\n" + "="*66)
+    print("COMPACTACIÓN DEL MODELO")
+    print("="*66)
+    print(f"\n{'Métrica':<26} {'Antes':<14} {'Después':<14} {'Cambio':<10}")
+    print("-"*66)
+    rows = [
+        ('Nodos', 'nodes', '{:<14d}'),
+        ('Tamaño en disco (KB)', 'size_bytes', None),
+        ('Memoria arrays (KB)', 'memory_bytes', None),
+        ('Tiempo de carga (ms)', 'load_ms', '{:<14.2f}'),
+        ('Latencia 1 fila (ms)', 'latency_ms_1', '{:<14.3f}'),
+        (f'Latencia {len(X)} filas (ms)', 'latency_ms_batch', '{:<14.3f}'),
+    ]
+    for label, key, fmt in rows:
+        before, after = report[f'{key}_before'], report[f'{key}_after']
+        if fmt is None:
+            before, after, fmt = before / 1024, after / 1024, '{:<14.1f}'
+        change = (after / before - 1) * 100 if before else 0.0
+        print(f"{label:<26} {fmt.format(before)} {fmt.format(after)} {change:+.1f}%")
+    print(f"{'R² (test)':<26} {r2_before:<14.4f} {r2_after:<14.4f} {r2_after - r2_before:+.4f}")
+    print(f"{'MAPE % (test)':<26} {mape_before:<14.2f} {mape_after:<14.2f} {mape_after - mape_before:+.2f}")
+    print("="*66)
+
+    return report
+
+
+def main():
+    """Compactar model.pkl y reportar contra el split de test del entrenamiento"""
+    import contextlib
+    import io
+    from train_model import load_and_prepare_data, feature_engineering, prepare_train_test
+
+    tolerance = DEFAULT_TOLERANCE
+    max_depth = None
+    for arg in sys.argv[1:]:
+        if arg.startswith('--tolerance='):
+            tolerance = float(arg.split('=', 1)[1])
+        elif arg.startswith('--max-depth='):
+            max_depth = int(arg.split('=', 1)[1])
+
+    print("="*66)
+    print(f"COMPACTANDO MODELO (tolerancia={tolerance} mg/L, max_depth={max_depth})")
+    print("="*66)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = feature_engineering(load_and_prepare_data('../data/sample_data.csv'))
+        _, X_test, _, y_test, _ = prepare_train_test(df)
+
+    model = joblib.load('model.pkl')
+    compact = compact_forest(model, tolerance, max_depth)
+    compact.save(COMPACT_MODEL_FILE)
+    print(f"✅ Artefacto compacto guardado: {COMPACT_MODEL_FILE}")
+
+    # Registrar el artefacto en la metadata para que la API lo encuentre
+    metadata = joblib.load('model_metadata.pkl')
+    metadata['compact'] = {
+        'file': COMPACT_MODEL_FILE,
+        'node_count': compact.node_count,
+        'tolerance': tolerance,
+        'max_depth': max_depth
+    }
+    joblib.dump(metadata, 'model_metadata.pkl')
+
+    compaction_report(model, 'model.pkl', compact, COMPACT_MODEL_FILE, X_test, y_test)
+
+
+if __name__ == "__main__":
+    main()
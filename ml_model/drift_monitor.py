@@ -0,0 +1,296 @@
+"""
+Monitor de drift de inputs en streaming
+Estadísticas online de memoria constante por feature (Welford, histograma
+por deciles de entrenamiento y sketch de cuantiles por histograma fino),
+comparadas contra un snapshot de la distribución de entrenamiento
+"""
+
+import numpy as np
+
+# Bins del histograma fino (sketch de cuantiles / KS) y margen del rango
+SKETCH_BINS = 128
+SKETCH_MARGIN = 0.5          # Fracción del rango de entrenamiento agregada a cada lado
+PSI_EPSILON = 1e-4
+MIN_SAMPLES = 50             # Lecturas mínimas antes de calcular scores
+
+# Umbrales usuales de PSI
+PSI_MODERATE = 0.10
+PSI_SIGNIFICANT = 0.25
+
+REPORTED_QUANTILES = (0.05, 0.50, 0.95)
+
+
+def training_snapshot(X_train) -> dict:
+    """
+    Resumen de la distribución de entrenamiento por feature (para la metadata).
+
+    Guarda media/desvío, rango, los deciles como bordes de bins (PSI) con
+    sus proporciones, y la CDF en una grilla fina uniforme (KS y cuantiles).
+    """
+    feature_names = list(X_train.columns)
+    X = np.asarray(X_train, dtype=np.float64)
+
+    decile_edges = np.quantile(X, np.linspace(0.1, 0.9, 9), axis=0).T       # (F, 9)
+    low, high = X.min(axis=0), X.max(axis=0)
+    span = np.where(high > low, high - low, 1.0)
+    sketch_low, sketch_high = low - SKETCH_MARGIN * span, high + SKETCH_MARGIN * span
+
+    decile_props, sketch_cdf = [], []
+    for j in range(X.shape[1]):
+        # Mismo criterio que el monitor: bin = cantidad de bordes < valor
+        bins = np.searchsorted(decile_edges[j], X[:, j], side='left')
+        decile_props.append(np.bincount(bins, minlength=10) / len(X))
+        counts = _sketch_counts(X[:, j], sketch_low[j], sketch_high[j])
+        sketch_cdf.append(np.cumsum(counts) / len(X))
+
+    return {
+        'feature_names': feature_names,
+        'n': len(X),
+        'mean': X.mean(axis=0).tolist(),
+        'std': X.std(axis=0).tolist(),
+        'min': low.tolist(),
+        'max': high.tolist(),
+        'decile_edges': decile_edges.tolist(),
+        'decile_props': np.asarray(decile_props).tolist(),
+        'sketch_low': sketch_low.tolist(),
+        'sketch_high': sketch_high.tolist(),
+        'sketch_cdf': np.asarray(sketch_cdf).tolist()
+    }
+
+
+def _sketch_counts(values, low, high) -> np.ndarray:
+    """Conteos en la grilla fina (+ bins de underflow/overflow en los extremos)"""
+    index = _sketch_index(values, low, high)
+    return np.bincount(index, minlength=SKETCH_BINS + 2)
+
+
+def _sketch_index(values, low, high):
+    width = (high - low) / SKETCH_BINS
+    index = np.floor((values - low) / width).astype(np.intp) + 1
+    return np.clip(index, 0, SKETCH_BINS + 1)
+
+
+class FeatureStats:
+    """
+    Estadísticas online de todas las features para un alcance (global o una poza).
+
+    Memoria fija: 3 arrays (F,) para Welford, (F, 10) para deciles, (F, 130)
+    para el sketch y (F,) para valores fuera del rango de entrenamiento.
+    Cada actualización es vectorizada sobre el bloque de filas. Un NaN
+    (feature opcional que no llegó) no cuenta: `n` es por feature y `rows`
+    las lecturas totales.
+    """
+
+    __slots__ = ('rows', 'n', 'mean', 'm2', 'decile_counts', 'sketch_counts', 'out_of_range')
+
+    def __init__(self, n_features):
+        self.rows = 0
+        self.n = np.zeros(n_features, dtype=np.int64)
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.decile_counts = np.zeros((n_features, 10), dtype=np.int64)
+        self.sketch_counts = np.zeros((n_features, SKETCH_BINS + 2), dtype=np.int64)
+        self.out_of_range = np.zeros(n_features, dtype=np.int64)
+
+    def update(self, X, valid, decile_bins, sketch_bins, outside):
+        """Combinar un bloque (Welford en paralelo, Chan et al.) y sumar conteos, solo valores presentes"""
+        n_b = valid.sum(axis=0)
+        mean_b = _safe_divide(np.where(valid, X, 0.0).sum(axis=0), n_b)
+        m2_b = (np.where(valid, X - mean_b, 0.0) ** 2).sum(axis=0)
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * _safe_divide(n_b, n)
+        self.m2 += m2_b + delta ** 2 * _safe_divide(self.n * n_b, n)
+        self.n = n
+        self.rows += len(X)
+
+        self.decile_counts += decile_bins
+        self.sketch_counts += sketch_bins
+        self.out_of_range += outside
+
+
+class DriftMonitor:
+    """
+    Drift de inputs global y por poza contra el snapshot de entrenamiento.
+
+    `update` recibe la matriz de features de un request con los valores como
+    llegaron (NaN = faltante, sin la imputación del modelo) y los `poza_id`;
+    el costo por fila es constante. Se siguen
+    como máximo `max_pozas` pozas (las lecturas de las siguientes cuentan
+    solo en global).
+
+    Scores por feature: PSI sobre los deciles de entrenamiento, KS (máxima
+    distancia entre CDFs en la grilla fina), corrimiento de la media en
+    desvíos de entrenamiento y fracción fuera del rango visto al entrenar.
+    """
+
+    def __init__(self, snapshot: dict, max_pozas=1000):
+        self.feature_names = snapshot['feature_names']
+        self.snapshot = snapshot
+        self.max_pozas = max_pozas
+
+        self._decile_edges = np.asarray(snapshot['decile_edges'])            # (F, 9)
+        self._train_props = np.asarray(snapshot['decile_props'])             # (F, 10)
+        self._train_cdf = np.asarray(snapshot['sketch_cdf'])                 # (F, B+2)
+        self._train_mean = np.asarray(snapshot['mean'])
+        self._train_std = np.where(np.asarray(snapshot['std']) > 0, snapshot['std'], 1.0)
+        self._train_min = np.asarray(snapshot['min'])
+        self._train_max = np.asarray(snapshot['max'])
+        self._sketch_low = np.asarray(snapshot['sketch_low'])
+        self._sketch_width = (np.asarray(snapshot['sketch_high']) - self._sketch_low) / SKETCH_BINS
+
+        n_features = len(self.feature_names)
+        self._offsets_deciles = np.arange(n_features)[None, :] * 10
+        self._offsets_sketch = np.arange(n_features)[None, :] * (SKETCH_BINS + 2)
+        self.global_stats = FeatureStats(n_features)
+        self._pozas = {}
+        self.untracked_readings = 0
+
+    def update(self, X: np.ndarray, poza_ids: list):
+        """Actualizar estadísticas con un bloque de lecturas (filas de X)"""
+        X = np.asarray(X, dtype=np.float64)
+        valid = ~np.isnan(X)
+        decile_index, sketch_index, outside = self._bin(X, valid)
+
+        self.global_stats.update(*self._counts(X, valid, decile_index, sketch_index, outside))
+
+        # Agrupar por poza (un request individual es un solo grupo)
+        if len(set(poza_ids)) == 1:
+            groups = {poza_ids[0]: slice(None)}
+        else:
+            groups = {}
+            for i, poza_id in enumerate(poza_ids):
+                groups.setdefault(poza_id, []).append(i)
+
+        for poza_id, rows in groups.items():
+            stats = self._pozas.get(poza_id)
+            if stats is None:
+                if len(self._pozas) >= self.max_pozas:
+                    self.untracked_readings += len(X[rows])
+                    continue
+                stats = self._pozas[poza_id] = FeatureStats(len(self.feature_names))
+            stats.update(*self._counts(
+                X[rows], valid[rows], decile_index[rows], sketch_index[rows], outside[rows]
+            ))
+
+    def _bin(self, X, valid):
+        """Bin de decil y de sketch de cada valor, y si cae fuera del rango de entrenamiento"""
+        decile_index = (X[:, :, None] > self._decile_edges[None, :, :]).sum(axis=2)
+        # Un NaN cae en un bin cualquiera: _counts no lo suma
+        filled = np.where(valid, X, self._sketch_low)
+        sketch_index = np.clip(
+            np.floor((filled - self._sketch_low) / self._sketch_width).astype(np.intp) + 1,
+            0, SKETCH_BINS + 1
+        )
+        outside = (X < self._train_min) | (X > self._train_max)
+        return decile_index, sketch_index, outside
+
+    def _counts(self, X, valid, decile_index, sketch_index, outside):
+        n_features = len(self.feature_names)
+        weights = valid.ravel().astype(np.int64)
+        deciles = np.bincount(
+            (decile_index + self._offsets_deciles).ravel(), weights, minlength=n_features * 10
+        ).astype(np.int64).reshape(n_features, 10)
+        sketch = np.bincount(
+            (sketch_index + self._offsets_sketch).ravel(), weights, minlength=n_features * (SKETCH_BINS + 2)
+        ).astype(np.int64).reshape(n_features, SKETCH_BINS + 2)
+        return X, valid, deciles, sketch, outside.sum(axis=0)
+
+    def report(self, poza_id=None) -> dict:
+        """
+        Scores por feature del alcance global o de una poza. Cada feature se
+        evalúa sobre los valores que llegaron (`n`); con menos de MIN_SAMPLES
+        queda 'insuficiente' y no entra en el peor PSI.
+        """
+        stats = self.global_stats if poza_id is None else self._pozas.get(poza_id)
+        if stats is None:
+            return {'poza_id': poza_id, 'n': 0, 'status': 'sin datos', 'features': {}}
+        if stats.rows < MIN_SAMPLES:
+            return {'poza_id': poza_id, 'n': stats.rows, 'status': 'insuficiente', 'features': {}}
+
+        n = stats.n[:, None]
+        live_props = _safe_divide(stats.decile_counts, n)
+        psi = ((live_props - self._train_props) * np.log(
+            (live_props + PSI_EPSILON) / (self._train_props + PSI_EPSILON)
+        )).sum(axis=1)
+        live_cdf = _safe_divide(np.cumsum(stats.sketch_counts, axis=1), n)
+        ks = np.abs(live_cdf - self._train_cdf).max(axis=1)
+        shift = (stats.mean - self._train_mean) / self._train_std
+        std = np.sqrt(stats.m2 / np.maximum(stats.n - 1, 1))
+        quantiles = self._sketch_quantiles(live_cdf)
+
+        features = {}
+        for j, name in enumerate(self.feature_names):
+            if stats.n[j] < MIN_SAMPLES:
+                features[name] = {'n': int(stats.n[j]), 'status': 'insuficiente'}
+                continue
+            features[name] = {
+                'n': int(stats.n[j]),
+                'psi': round(float(psi[j]), 4),
+                'ks': round(float(ks[j]), 4),
+                'status': _psi_status(psi[j]),
+                'mean': round(float(stats.mean[j]), 4),
+                'std': round(float(std[j]), 4),
+                'train_mean': round(float(self._train_mean[j]), 4),
+                'mean_shift_std': round(float(shift[j]), 3),
+                'quantiles': {
+                    f'p{int(q * 100)}': round(float(quantiles[j, k]), 4)
+                    for k, q in enumerate(REPORTED_QUANTILES)
+                },
+                'train_range': [float(self._train_min[j]), float(self._train_max[j])],
+                'out_of_training_range': round(float(stats.out_of_range[j] / stats.n[j]), 4)
+            }
+
+        scored = [name for name in features if 'psi' in features[name]]
+        if not scored:
+            return {'poza_id': poza_id, 'n': stats.rows, 'status': 'insuficiente', 'features': features}
+        worst = max(scored, key=lambda name: features[name]['psi'])
+        return {
+            'poza_id': poza_id,
+            'n': stats.rows,
+            'status': features[worst]['status'],
+            'max_psi': features[worst]['psi'],
+            'max_psi_feature': worst,
+            'features': features
+        }
+
+    def _sketch_quantiles(self, live_cdf) -> np.ndarray:
+        """Cuantiles por interpolación lineal dentro del bin fino correspondiente"""
+        out = np.empty((live_cdf.shape[0], len(REPORTED_QUANTILES)))
+        for k, q in enumerate(REPORTED_QUANTILES):
+            index = (live_cdf < q).sum(axis=1)                       # bin que cruza q
+            previous = np.where(index > 0, live_cdf[np.arange(len(index)), np.maximum(index - 1, 0)], 0.0)
+            current = live_cdf[np.arange(len(index)), np.minimum(index, live_cdf.shape[1] - 1)]
+            fraction = np.divide(q - previous, current - previous, out=np.full(len(index), 0.5),
+                                 where=current > previous)
+            # El bin i (1..B) cubre [low + (i-1)*w, low + i*w)
+            out[:, k] = self._sketch_low + (index - 1 + fraction) * self._sketch_width
+        return out
+
+    def summary(self) -> dict:
+        """Drift global y estado resumido de cada poza"""
+        pozas = []
+        for poza_id in self._pozas:
+            report = self.report(poza_id)
+            pozas.append({key: report.get(key) for key in ('poza_id', 'n', 'status', 'max_psi', 'max_psi_feature')})
+        return {
+            'global': self.report(),
+            'pozas': pozas,
+            'untracked_readings': self.untracked_readings,
+            'thresholds': {'psi_moderate': PSI_MODERATE, 'psi_significant': PSI_SIGNIFICANT,
+                           'min_samples': MIN_SAMPLES}
+        }
+
+
+def _safe_divide(numerator, denominator):
+    """numerator / denominator, 0 donde el denominador es 0 (feature sin valores)"""
+    return np.divide(numerator, denominator, out=np.zeros(np.broadcast(numerator, denominator).shape),
+                     where=denominator > 0)
+
+
+def _psi_status(psi: float) -> str:
+    if psi >= PSI_SIGNIFICANT:
+        return 'significativo'
+    if psi >= PSI_MODERATE:
+        return 'moderado'
+    return 'estable'
@@ -0,0 +1,56 @@
+"""
+Serialización JSON rápida para respuestas de la API
+Usa orjson (con soporte nativo de numpy y datetime) y cae a json estándar
+"""
+
+import json
+from datetime import date, datetime
+
+import numpy as np
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # Sin orjson se usa json estándar (más lento)
+    orjson = None
+
+
+def _json_default(value):
+    """Tipos que json estándar no serializa solo"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    """Serializar a JSON (bytes); arrays numpy se escriben sin pasar por listas"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z)
+    return json.dumps(
+        content, default=_json_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def loads(content):
+    """Parsear JSON (bytes o str)"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class FastJSONResponse(Response):
+    """
+    Respuesta JSON para contenido armado internamente por la API.
+
+    Al devolver un Response, FastAPI no re-valida contra `response_model`
+    (que se mantiene solo para documentar el esquema en /docs).
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,209 @@
+"""
+Registro de modelos versionados con ruteo por poza
+Cada artefacto se convierte una vez a arrays .npy (por hash de contenido) y
+se abre mapeado en memoria: modelos idénticos se cargan una sola vez y los
+workers comparten las páginas físicas de los árboles
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from packed_forest import PackedForest
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(__file__), 'model_store')
+
+
+class ModelEntry:
+    """Modelo registrado: id, versión, artefacto y bosque aplanado"""
+
+    __slots__ = ('model_id', 'version', 'artifact', 'sha256', 'forest', 'model_type')
+
+    def __init__(self, model_id, version, artifact, sha256, forest, model_type):
+        self.model_id = model_id
+        self.version = version
+        self.artifact = artifact
+        self.sha256 = sha256
+        self.forest = forest
+        self.model_type = model_type
+
+    @property
+    def label(self) -> str:
+        """Versión reportada en las respuestas"""
+        return f"{self.model_id}:{self.version}"
+
+
+class ModelRegistry:
+    """
+    Registro de modelos con ruteo O(1) por `poza_id`.
+
+    - `register` carga un artefacto (.pkl de sklearn o .npz compacto). Si
+      otro modelo ya registró un archivo con el mismo contenido (sha256),
+      ambos ids apuntan al mismo PackedForest.
+    - Los arrays se guardan en `store_dir/<sha256>/` como .npy y se abren
+      con mmap de solo lectura: N workers con los mismos modelos usan una
+      sola copia física. Después de la primera conversión, cargar no
+      requiere unpickle de sklearn.
+    - `route` devuelve el modelo asignado a la poza, o None si la poza usa
+      el modelo principal de la API.
+    """
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR, mmap=True):
+        self.store_dir = store_dir
+        self.mmap = mmap
+        self._entries = {}     # model_id -> ModelEntry
+        self._forests = {}     # sha256 -> PackedForest (dedup)
+        self._routes = {}      # poza_id -> ModelEntry
+
+    @classmethod
+    def from_manifest(cls, path, store_dir=DEFAULT_STORE_DIR, mmap=True):
+        """
+        Construir desde un manifiesto JSON:
+        {"models": {"<id>": {"file": "...", "version": "..."}}, "routes": {"<poza_id>": "<id>"}}
+        Las rutas de archivo son relativas al manifiesto.
+        """
+        with open(path) as f:
+            manifest = json.load(f)
+
+        registry = cls(store_dir, mmap)
+        base_dir = os.path.dirname(os.path.abspath(path))
+        for model_id, spec in manifest.get('models', {}).items():
+            registry.register(model_id, os.path.join(base_dir, spec['file']), spec.get('version'))
+        for poza_id, model_id in manifest.get('routes', {}).items():
+            registry.set_route(poza_id, model_id)
+        return registry
+
+    def register(self, model_id, artifact_path, version=None) -> ModelEntry:
+        """Registrar (o reemplazar) un modelo a partir de su artefacto"""
+        sha256 = _file_sha256(artifact_path)
+        forest = self._forests.get(sha256)
+        if forest is None:
+            forest = self._forests[sha256] = self._load_forest(artifact_path, sha256)
+
+        entry = ModelEntry(
+            model_id=model_id,
+            version=version or sha256[:8],
+            artifact=os.path.basename(artifact_path),
+            sha256=sha256,
+            forest=forest,
+            model_type='GradientBoosting' if forest.aggregate == 'sum' else 'RandomForest'
+        )
+        self._entries[model_id] = entry
+
+        # Las pozas ruteadas al id anterior pasan a la nueva versión
+        for poza_id, routed in self._routes.items():
+            if routed.model_id == model_id:
+                self._routes[poza_id] = entry
+        return entry
+
+    def _load_forest(self, artifact_path, sha256) -> PackedForest:
+        return load_forest(artifact_path, self.store_dir, self.mmap, sha256)
+
+    def set_route(self, poza_id: str, model_id: str):
+        """Asignar una poza a un modelo registrado"""
+        if model_id not in self._entries:
+            raise ValueError(f"Modelo no registrado: {model_id}")
+        self._routes[poza_id] = self._entries[model_id]
+
+    def route(self, poza_id: str):
+        """Modelo de la poza (None = modelo principal)"""
+        return self._routes.get(poza_id)
+
+    def get(self, model_id: str) -> ModelEntry:
+        return self._entries[model_id]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries.values())
+
+    def memory_report(self) -> dict:
+        """
+        Costo de memoria por modelo.
+
+        `array_bytes` es el tamaño de los árboles; `private_bytes` lo que ese
+        modelo agrega a cada worker (0 si está mapeado o si comparte artefacto
+        con un modelo listado antes).
+        """
+        routes_per_model = {}
+        for entry in self._routes.values():
+            routes_per_model[entry.model_id] = routes_per_model.get(entry.model_id, 0) + 1
+
+        models, seen = [], set()
+        for entry in self._entries.values():
+            forest = entry.forest
+            duplicate = entry.sha256 in seen
+            seen.add(entry.sha256)
+            models.append({
+                'model_id': entry.model_id,
+                'version': entry.version,
+                'artifact': entry.artifact,
+                'sha256': entry.sha256[:12],
+                'model_type': entry.model_type,
+                'n_trees': forest.n_trees,
+                'node_count': forest.node_count,
+                'array_bytes': forest.nbytes,
+                'mapped': forest.is_mapped,
+                'deduplicated': duplicate,
+                'private_bytes': 0 if duplicate or forest.is_mapped else forest.nbytes,
+                'shared_with': [
+                    other.model_id for other in self._entries.values()
+                    if other.sha256 == entry.sha256 and other.model_id != entry.model_id
+                ],
+                'routed_pozas': routes_per_model.get(entry.model_id, 0)
+            })
+
+        naive = sum(m['array_bytes'] for m in models)
+        unique = sum(forest.nbytes for forest in self._forests.values())
+        return {
+            'models': models,
+            'routes': {poza_id: entry.model_id for poza_id, entry in self._routes.items()},
+            'totals': {
+                'models': len(models),
+                'unique_artifacts': len(self._forests),
+                'naive_bytes': naive,
+                'unique_bytes': unique,
+                'private_bytes_per_worker': sum(m['private_bytes'] for m in models)
+            }
+        }
+
+
+def load_forest(artifact_path, store_dir=DEFAULT_STORE_DIR, mmap=True, sha256=None) -> PackedForest:
+    """
+    Abrir un artefacto desde el store; la primera vez, convertirlo.
+
+    Después de la conversión, cargar un .pkl no requiere importar sklearn
+    ni deserializar el modelo (arranque en frío de la API).
+    """
+    sha256 = sha256 or _file_sha256(artifact_path)
+    directory = os.path.join(store_dir, sha256)
+    if not os.path.exists(os.path.join(directory, 'forest.json')):
+        if artifact_path.endswith('.npz'):
+            forest = PackedForest.load(artifact_path)
+        else:
+            import joblib
+            forest = PackedForest.from_sklearn(joblib.load(artifact_path))
+
+        # Escribir en un directorio temporal y renombrar: otro worker
+        # puede estar convirtiendo el mismo artefacto en paralelo
+        os.makedirs(store_dir, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=store_dir, prefix='.tmp-')
+        forest.save_dir(tmp)
+        try:
+            os.rename(tmp, directory)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    return PackedForest.load_dir(directory, mmap=mmap)
+
+
+def _file_sha256(path, chunk_size=1 << 20) -> str:
+    """Hash de contenido del artefacto"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
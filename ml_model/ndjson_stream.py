@@ -0,0 +1,111 @@
+"""
+Lectura en streaming de lotes NDJSON comprimidos (gzip o zstd)
+El cuerpo se descomprime a medida que llega y se corta en líneas sin
+armar nunca el lote completo en memoria
+"""
+
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd es opcional: sin la librería solo se aceptan gzip e identity
+    zstandard = None
+
+# Tope de bytes descomprimidos por lote (protege contra "zip bombs")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# zstd no acota la salida de un decompress: se le pasa la entrada en tramos
+# tales que, aun a la máxima expansión del formato (bloques RLE de 128 KB con
+# 3 bytes de header), no puedan superar lo que falta hasta el tope
+ZSTD_MAX_RATIO = 128 * 1024 // 3
+ZSTD_MIN_SLICE = 16
+
+
+class PayloadTooLarge(ValueError):
+    """El lote descomprimido supera el tope permitido"""
+
+
+def available_encodings() -> tuple[str, ...]:
+    """Valores de Content-Encoding aceptados en este entorno"""
+    return ('identity', 'gzip') + (('zstd',) if zstandard is not None else ())
+
+
+def _decompressor(encoding: str):
+    if encoding == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == 'zstd' and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj()
+    if encoding == 'identity':
+        return None
+    raise ValueError(f"Content-Encoding no soportado: {encoding}. Opciones: {', '.join(available_encodings())}")
+
+
+class NDJSONStreamDecoder:
+    """
+    Decodificador incremental: `feed(chunk)` devuelve las líneas completas
+    que ya se pueden parsear y `close()` las que queden al final del cuerpo.
+
+    Las líneas vacías se ignoran. Un stream comprimido corrupto o truncado
+    levanta ValueError; superar `max_bytes` descomprimidos, PayloadTooLarge,
+    apenas se cruza el tope (nunca se infla más de lo que falta hasta él).
+    """
+
+    def __init__(self, encoding: str = 'identity', max_bytes: int = DEFAULT_MAX_BYTES):
+        self.encoding = (encoding or 'identity').strip().lower()
+        self.max_bytes = max_bytes
+        self._decompressor = _decompressor(self.encoding)
+        self._tail = b''
+
+        self.compressed_bytes = 0
+        self.decompressed_bytes = 0
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        self.compressed_bytes += len(chunk)
+        return self._split(self._decompress(chunk))
+
+    def close(self) -> list[bytes]:
+        data = b''
+        if self.encoding == 'gzip':
+            data = self._count(self._decompressor.flush(self.max_bytes - self.decompressed_bytes + 1))
+            if not self._decompressor.eof:
+                raise ValueError("Stream gzip truncado")
+        lines = self._split(data)
+        if self._tail.strip():
+            lines.append(self._tail)
+        self._tail = b''
+        return lines
+
+    def _decompress(self, chunk: bytes) -> bytes:
+        """Descomprimir un chunk sin inflar nunca más de lo que falta hasta `max_bytes` (+1)"""
+        if self._decompressor is None:
+            return self._count(chunk)
+        parts = []
+        try:
+            if self.encoding == 'gzip':
+                while chunk:
+                    parts.append(self._count(
+                        self._decompressor.decompress(chunk, self.max_bytes - self.decompressed_bytes + 1)
+                    ))
+                    chunk = self._decompressor.unconsumed_tail
+            else:
+                view = memoryview(chunk)
+                while view:
+                    size = max(ZSTD_MIN_SLICE, (self.max_bytes - self.decompressed_bytes) // ZSTD_MAX_RATIO)
+                    parts.append(self._count(self._decompressor.decompress(view[:size])))
+                    view = view[size:]
+        except (zlib.error, getattr(zstandard, 'ZstdError', zlib.error)) as e:
+            raise ValueError(f"Cuerpo {self.encoding} inválido: {e}") from e
+        return b''.join(parts)
+
+    def _count(self, data: bytes) -> bytes:
+        self.decompressed_bytes += len(data)
+        if self.decompressed_bytes > self.max_bytes:
+            raise PayloadTooLarge(f"Lote mayor a {self.max_bytes // (1024 * 1024)} MB descomprimido")
+        return data
+
+    def _split(self, data: bytes) -> list[bytes]:
+        if not data:
+            return []
+        lines = (self._tail + data).split(b'\n')
+        self._tail = lines.pop()
+        return [line for line in lines if line.strip()]
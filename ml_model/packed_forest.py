@@ -0,0 +1,255 @@
+"""
+Representación aplanada de un Random Forest para inferencia vectorizada
+Todos los árboles se evalúan juntos con numpy, sin loop sobre estimators_
+"""
+
+import json
+import os
+
+import numpy as np
+
+
+# Cuantiles reportados en los intervalos de predicción
+INTERVAL_QUANTILES = (0.10, 0.50, 0.90)
+
+# Arrays de nodos (los que no son None se guardan como .npy en `save_dir`)
+ARRAY_FIELDS = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+
+# Filas procesadas por bloque (acota memoria de la matriz filas x árboles)
+DEFAULT_CHUNK_ROWS = 8192
+
+
+class PackedForest:
+    """
+    Bosque de árboles de regresión guardado como arrays contiguos de nodos.
+
+    Los nodos de todos los árboles se concatenan; cada árbol arranca en
+    `roots[i]`. Las hojas apuntan a sí mismas, de modo que el recorrido
+    avanza `max_depth` pasos para todas las filas y árboles a la vez.
+
+    `aggregate` es "mean" para Random Forest y "sum" para Gradient Boosting
+    (en ese caso `value` ya incluye el learning rate y `bias` la predicción
+    inicial del ensemble).
+
+    En el layout compacto (`left=None`) los nodos están en pre-orden, el
+    hijo izquierdo es implícito (`nodo + 1`) y las hojas tienen umbral -inf
+    con `right` apuntando a sí mismas.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, n_features,
+                 aggregate='mean', bias=0.0):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.aggregate = aggregate
+        self.bias = float(bias)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Construir desde un RandomForestRegressor o GradientBoostingRegressor entrenado"""
+        estimators = getattr(model, 'estimators_', None)
+        if estimators is None or len(estimators) == 0:
+            raise ValueError("El modelo no es un ensemble de árboles entrenado")
+
+        # GradientBoosting guarda los árboles en un array (n_estimators, 1)
+        boosted = hasattr(model, 'learning_rate')
+        if boosted:
+            if not hasattr(model.init_, 'constant_'):
+                raise ValueError("Solo se soporta Gradient Boosting con init constante")
+            estimators = np.ravel(estimators)
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in estimators:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(offset, offset + n_nodes)
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            values.append(tree.value[:, 0, 0] * (model.learning_rate if boosted else 1.0))
+            roots.append(offset)
+
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            n_features=model.n_features_in_,
+            aggregate='sum' if boosted else 'mean',
+            bias=float(np.ravel(model.init_.constant_)[0]) if boosted else 0.0
+        )
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.value)
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria ocupada por los arrays de nodos"""
+        arrays = (getattr(self, name) for name in ARRAY_FIELDS)
+        return sum(a.nbytes for a in arrays if a is not None)
+
+    @property
+    def is_mapped(self) -> bool:
+        """Los arrays están mapeados desde disco (memoria compartida entre procesos)"""
+        return isinstance(self.value.base, np.memmap)
+
+    def save(self, path):
+        """Guardar como artefacto .npz (sin pickle)"""
+        arrays = {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'right': self.right,
+            'value': self.value,
+            'roots': self.roots,
+            'max_depth': np.asarray(self.max_depth),
+            'n_features': np.asarray(self.n_features),
+            'aggregate': np.asarray(self.aggregate),
+            'bias': np.asarray(self.bias)
+        }
+        if self.left is not None:
+            arrays['left'] = self.left
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Cargar un artefacto guardado con `save`"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                feature=data['feature'],
+                threshold=data['threshold'],
+                left=data['left'] if 'left' in data else None,
+                right=data['right'],
+                value=data['value'],
+                roots=data['roots'],
+                max_depth=int(data['max_depth']),
+                n_features=int(data['n_features']),
+                aggregate=str(data['aggregate']),
+                bias=float(data['bias'])
+            )
+
+    def save_dir(self, directory):
+        """
+        Guardar cada array como .npy sin comprimir en `directory`.
+
+        A diferencia del .npz, este layout se puede abrir con `load_dir`
+        mapeado en memoria.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAY_FIELDS:
+            array = getattr(self, name)
+            if array is not None:
+                np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(array))
+        with open(os.path.join(directory, 'forest.json'), 'w') as f:
+            json.dump({
+                'max_depth': self.max_depth,
+                'n_features': self.n_features,
+                'aggregate': self.aggregate,
+                'bias': self.bias
+            }, f)
+
+    @classmethod
+    def load_dir(cls, directory, mmap=True):
+        """
+        Cargar un bosque guardado con `save_dir`.
+
+        Con `mmap=True` los arrays quedan mapeados de solo lectura: todos los
+        procesos que abren el mismo directorio comparten las páginas físicas
+        (page cache) en lugar de tener cada uno su copia.
+        """
+        with open(os.path.join(directory, 'forest.json')) as f:
+            meta = json.load(f)
+        arrays = {}
+        for name in ARRAY_FIELDS:
+            path = os.path.join(directory, f'{name}.npy')
+            if not os.path.exists(path):
+                arrays[name] = None
+            elif mmap:
+                # Vista ndarray sobre el memmap: evita el overhead de la subclase al indexar
+                arrays[name] = np.asarray(np.load(path, mmap_mode='r'))
+            else:
+                arrays[name] = np.load(path)
+        return cls(**arrays, **meta)
+
+    def predict_per_tree(self, X, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> np.ndarray:
+        """Matriz (n_filas, n_árboles) con la predicción de cada árbol"""
+        # sklearn compara los features en float32 contra umbrales float64
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(
+                f"Se esperaban {self.n_features} features, recibido shape {X.shape}"
+            )
+
+        out = np.empty((X.shape[0], self.n_trees), dtype=np.float64)
+        for start in range(0, X.shape[0], chunk_rows):
+            block = X[start:start + chunk_rows]
+            out[start:start + len(block)] = self.value[self._leaves(block)]
+        return out
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Índice de hoja alcanzada por cada fila en cada árbol"""
+        rows = np.arange(X.shape[0])[:, None]
+        # El cursor de nodos va en intp aunque los arrays usen enteros chicos
+        nodes = np.broadcast_to(self.roots.astype(np.intp), (X.shape[0], self.n_trees)).copy()
+
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            left = nodes + 1 if self.left is None else self.left[nodes]
+            nodes = np.where(go_left, left, self.right[nodes])
+
+        return nodes
+
+    def predict(self, X) -> np.ndarray:
+        """Predicción puntual, igual a `predict` del modelo sklearn de origen"""
+        per_tree = self.predict_per_tree(X)
+        if self.aggregate == 'sum':
+            return self.bias + per_tree.sum(axis=1)
+        return per_tree.mean(axis=1)
+
+
+def interval_summary(per_tree: np.ndarray) -> dict:
+    """
+    Resumir la matriz de predicciones por árbol en intervalos por fila.
+
+    Devuelve arrays de largo n_filas: media (predicción puntual), cuantiles
+    P10/P50/P90, ancho P90-P10 y desvío estándar entre árboles. El rango
+    refleja la dispersión del ensemble, no un intervalo calibrado.
+    """
+    # Un solo sort por fila sirve para los tres cuantiles (interpolación
+    # lineal, igual que np.quantile pero ~10x más rápido para 100 árboles)
+    ordered = np.sort(per_tree, axis=1)
+    positions = np.asarray(INTERVAL_QUANTILES) * (ordered.shape[1] - 1)
+    lower = np.floor(positions).astype(np.intp)
+    upper = np.minimum(lower + 1, ordered.shape[1] - 1)
+    weight = positions - lower
+    q = ordered[:, lower] * (1 - weight) + ordered[:, upper] * weight
+
+    return {
+        'mean': per_tree.mean(axis=1),
+        'p10': q[:, 0],
+        'p50': q[:, 1],
+        'p90': q[:, 2],
+        'spread': q[:, 2] - q[:, 0],
+        'std': per_tree.std(axis=1)
+    }
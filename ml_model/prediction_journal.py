@@ -0,0 +1,262 @@
+"""
+Journal estructurado de predicciones
+El request solo encola; un thread de fondo escribe en lotes a SQLite (WAL)
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from bulk_codec import NUMERIC_FIELDS, ReadingColumns
+
+logger = logging.getLogger(__name__)
+
+# Políticas ante cola llena
+DROP_OLDEST = 'drop_oldest'   # Descartar el registro más viejo de la cola
+DROP_NEWEST = 'drop_newest'   # Descartar el registro entrante
+
+# Espera entre intentos de abrir la base si falla (disco lleno, permisos, base bloqueada)
+CONNECT_RETRY_S = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    recorded_at REAL NOT NULL,
+    reading_timestamp TEXT,
+    poza_id TEXT NOT NULL,
+    days_evaporation REAL,
+    temperature_c REAL,
+    humidity_percent REAL,
+    ph REAL,
+    conductivity_ms_cm REAL,
+    density_g_cm3 REAL,
+    mg_li_ratio REAL,
+    ca_li_ratio REAL,
+    features BLOB,
+    predicted_concentration_mg_l REAL NOT NULL,
+    p10_mg_l REAL,
+    p90_mg_l REAL,
+    confidence TEXT,
+    quality_status TEXT,
+    model_version TEXT
+);
+CREATE TABLE IF NOT EXISTS journal_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+INSERT_SQL = "INSERT INTO predictions VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+
+class PredictionJournal:
+    """
+    Journal append-only de predicciones con escritura asíncrona en lotes.
+
+    `record` agrega un lote entero (una tupla por request) a una deque
+    acotada en filas, sin formateo ni I/O en el request: el costo no depende
+    del tamaño del lote. El writer drena la cola cada `flush_interval`
+    segundos, o antes si se acumulan `batch_size` filas, arma las filas y
+    hace un commit por lote. Con la cola llena se aplica `overflow_policy`
+    (a lotes enteros) y se cuentan las filas descartadas.
+
+    Cada registro: (recorded_at, lecturas (lista de SensorData o
+    ReadingColumns), matriz de features, predicciones, p10, p90 (arrays o
+    None), confianzas, estados de calidad, versión de modelo o lista por fila).
+    """
+
+    def __init__(self, path, feature_names=None, max_queue=100_000, batch_size=5_000,
+                 flush_interval=0.25, overflow_policy=DROP_OLDEST):
+        if overflow_policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Política de overflow desconocida: {overflow_policy}")
+
+        self.path = path
+        self.feature_names = list(feature_names or [])
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+
+        self._queue = deque()
+        self._queue_lock = threading.Lock()
+        self.queued_rows = 0
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.dropped_batches = 0
+        self.written = 0
+        self.batches = 0
+        self.write_errors = 0
+        self.connect_errors = 0
+        self.last_batch_ms = 0.0
+
+    def start(self):
+        """Abrir la base y arrancar el writer de fondo"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='prediction-journal', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=10.0):
+        """Drenar la cola y cerrar el writer"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def record(self, record: tuple):
+        """Encolar un lote (hot path: sin I/O ni conversión a filas)"""
+        rows = self._size(record)
+        with self._queue_lock:
+            if self.queued_rows + rows > self.max_queue:
+                if self.overflow_policy == DROP_NEWEST or rows > self.max_queue:
+                    self.dropped += rows
+                    self.dropped_batches += 1
+                    return
+                while self._queue and self.queued_rows + rows > self.max_queue:
+                    dropped = self._size(self._queue.popleft())
+                    self.queued_rows -= dropped
+                    self.dropped += dropped
+                    self.dropped_batches += 1
+            self._queue.append(record)
+            self.queued_rows += rows
+        self.enqueued += rows
+        if self.queued_rows >= self.batch_size:
+            self._wakeup.set()
+
+    def _size(self, record: tuple) -> int:
+        """Filas de un registro encolado"""
+        return len(record[3])
+
+    def stats(self) -> dict:
+        """Contadores del journal"""
+        return {
+            'path': self.path,
+            'running': self._thread is not None,
+            'overflow_policy': self.overflow_policy,
+            'max_queue': self.max_queue,
+            'queue_depth': self.queued_rows,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'dropped_batches': self.dropped_batches,
+            'batches': self.batches,
+            'write_errors': self.write_errors,
+            'connect_errors': self.connect_errors,
+            'last_batch_ms': round(self.last_batch_ms, 3)
+        }
+
+    def _connect(self):
+        # timeout: con serve.py cada worker tiene su writer sobre el mismo archivo
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        conn.execute(
+            "INSERT OR REPLACE INTO journal_meta VALUES ('feature_names', ?)",
+            (','.join(self.feature_names),)
+        )
+        conn.commit()
+        return conn
+
+    def _run(self):
+        conn = None
+        try:
+            while True:
+                stopping = self._stop.is_set()
+                conn = conn or self._open()
+                if conn is not None:
+                    self._drain(conn)
+                if stopping:
+                    break
+                if conn is None:
+                    # Sin base la cola acotada sigue recibiendo (y descartando según la política)
+                    self._stop.wait(CONNECT_RETRY_S)
+                else:
+                    self._wakeup.wait(self.flush_interval)
+                    self._wakeup.clear()
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _open(self):
+        """Conexión del writer, o None (contada y logueada) si la base no se puede abrir"""
+        try:
+            return self._connect()
+        except sqlite3.Error as e:
+            self.connect_errors += 1
+            logger.error(f"No se pudo abrir {self.path}: {str(e)} (reintento en {CONNECT_RETRY_S:.0f} s)")
+            return None
+
+    def _drain(self, conn):
+        """Escribir lo encolado en transacciones de ~`batch_size` filas"""
+        batch = []
+        while self._queue:
+            with self._queue_lock:
+                record = self._queue.popleft()
+                self.queued_rows -= self._size(record)
+            batch.extend(_to_rows(record))
+            if len(batch) >= self.batch_size:
+                self._write(conn, batch)
+                batch = []
+        if batch:
+            self._write(conn, batch)
+
+    def _write(self, conn, batch: list[tuple]):
+        start = time.perf_counter()
+        try:
+            with conn:
+                conn.executemany(INSERT_SQL, batch)
+            self.written += len(batch)
+            self.batches += 1
+        except sqlite3.Error:
+            self.write_errors += 1
+        self.last_batch_ms = (time.perf_counter() - start) * 1000
+
+
+def reading_values(readings, start: int = 0, end: int = None) -> list[list]:
+    """
+    Campos numéricos de readings[start:end] tal como llegaron, sin la
+    imputación de build_features (None = faltante), una lista por campo
+    """
+    if isinstance(readings, ReadingColumns):
+        return [
+            [None if value != value else value for value in readings.values[field][start:end].tolist()]
+            for field in NUMERIC_FIELDS
+        ]
+    readings = readings[start:end]
+    return [[getattr(data, field) for data in readings] for field in NUMERIC_FIELDS]
+
+
+def _to_rows(record: tuple) -> list[tuple]:
+    """Convertir un lote encolado en filas SQL (se ejecuta en el writer)"""
+    recorded_at, readings, X, predictions, p10, p90, confidence, quality_status, model_version = record
+    n = len(predictions)
+    if isinstance(readings, ReadingColumns):
+        poza_ids = readings.poza_id
+        timestamps = [datetime.fromtimestamp(ts).isoformat() for ts in readings.timestamp.tolist()]
+    else:
+        poza_ids = [data.poza_id for data in readings]
+        timestamps = [data.timestamp.isoformat() if data.timestamp else None for data in readings]
+    features = [row.tobytes() for row in np.asarray(X, dtype=np.float64)] if X is not None else [None] * n
+    return list(zip(
+        [recorded_at] * n, timestamps, poza_ids, *reading_values(readings), features,
+        np.asarray(predictions, dtype=np.float64).tolist(),
+        p10.tolist() if p10 is not None else [None] * n,
+        p90.tolist() if p90 is not None else [None] * n,
+        confidence, quality_status,
+        model_version if isinstance(model_version, list) else [model_version] * n
+    ))
@@ -0,0 +1,238 @@
+"""
+Profiling a demanda y memoria del proceso para los endpoints /admin de la API
+Sampler de stacks (stacks colapsados para flame graphs), cProfile sobre el
+loop, top de asignaciones con tracemalloc y huella en memoria de los modelos.
+Nada queda instalado fuera de una medición: con el profiling apagado el
+costo es cero.
+"""
+
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+
+MAX_SECONDS = 60
+DEFAULT_INTERVAL_S = 0.005
+
+# Una medición a la vez por proceso
+_SESSION = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """Ya hay un profiling o snapshot de memoria en curso"""
+
+
+@contextmanager
+def session():
+    if not _SESSION.acquire(blocking=False):
+        raise ProfilerBusy("Ya hay una medición en curso en este proceso")
+    try:
+        yield
+    finally:
+        _SESSION.release()
+
+
+def clamp_seconds(seconds: float) -> float:
+    return min(max(float(seconds), 0.1), MAX_SECONDS)
+
+
+def frame_label(code) -> str:
+    """Nombre de un frame en los stacks colapsados: función (archivo:línea de definición)"""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Muestrea el stack de un thread (el del event loop) cada `interval_s` desde
+    un thread aparte y cuenta stacks colapsados ("raíz;...;hoja").
+
+    El muestreo necesita el GIL: las muestras caen donde el thread observado
+    lo libera (cada switch interval o en código nativo que lo suelta).
+    """
+
+    def __init__(self, thread_id: int, interval_s: float = DEFAULT_INTERVAL_S):
+        self.thread_id = thread_id
+        self.interval_s = max(float(interval_s), 0.001)
+        self.stacks = Counter()
+        self.samples = 0
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> 'StackSampler':
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        labels = self._labels
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            del frame
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        """Formato de flamegraph.pl / speedscope: una línea "stack cantidad" por stack"""
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def report(self, top: int = 50) -> dict:
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return {
+            'samples': self.samples,
+            'interval_ms': self.interval_s * 1000,
+            'top_self': [{'frame': frame, 'samples': count} for frame, count in leaves.most_common(top)],
+            'stacks': dict(self.stacks.most_common(top))
+        }
+
+
+def cprofile_report(profile, top: int = 50, sort: str = 'cumulative') -> dict:
+    """Funciones más costosas de un cProfile.Profile ya detenido"""
+    import pstats
+
+    stats = pstats.Stats(profile)
+    stats.sort_stats(sort)
+    rows = []
+    for func in stats.fcn_list[:top]:
+        filename, line, name = func
+        primitive, ncalls, tottime, cumtime, _ = stats.stats[func]
+        rows.append({
+            'function': name,
+            'file': os.path.basename(filename),
+            'line': line,
+            'ncalls': ncalls,
+            'primitive_calls': primitive,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3)
+        })
+    return {'total_calls': stats.total_calls, 'total_ms': round(stats.total_tt * 1000, 3), 'sort': sort, 'top': rows}
+
+
+def tracemalloc_top(snapshot, group_by: str = 'lineno', top: int = 25) -> list[dict]:
+    """Mayores asignaciones vivas de un snapshot, sin las del propio tracemalloc ni del import"""
+    import tracemalloc
+
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ))
+    rows = []
+    for stat in snapshot.statistics(group_by)[:top]:
+        row = {'size_bytes': stat.size, 'count': stat.count}
+        if group_by == 'traceback':
+            row['traceback'] = stat.traceback.format()
+        else:
+            frame = stat.traceback[0]
+            row['location'] = f"{frame.filename}:{frame.lineno}" if group_by == 'lineno' else frame.filename
+        rows.append(row)
+    return rows
+
+
+def _mapped_files(array) -> set:
+    """Archivos detrás de un array mapeado con np.load(mmap_mode=...)"""
+    base = array
+    while base is not None and not isinstance(base, np.memmap):
+        base = getattr(base, 'base', None)
+    return {os.path.realpath(base.filename)} if base is not None and base.filename else set()
+
+
+def mapped_resident_bytes(paths) -> dict:
+    """Bytes residentes (Rss) y proporcionales (Pss) de los mapeos de `paths` en este proceso; {} fuera de Linux"""
+    if not paths or not os.path.exists('/proc/self/smaps'):
+        return {}
+    totals = {'rss_bytes': 0, 'pss_bytes': 0}
+    current = False
+    with open('/proc/self/smaps') as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            if '-' in parts[0] and len(parts) >= 5:
+                # Encabezado de un mapeo: "inicio-fin permisos offset dev inodo [ruta]"
+                current = len(parts) >= 6 and parts[5] in paths
+            elif current and parts[0] in ('Rss:', 'Pss:'):
+                totals['rss_bytes' if parts[0] == 'Rss:' else 'pss_bytes'] += int(parts[1]) * 1024
+    return totals
+
+
+def forest_footprint(forest) -> dict:
+    """Nodos por árbol, bytes de los arrays y tamaño residente de un PackedForest"""
+    from packed_forest import ARRAY_FIELDS
+
+    nodes = np.diff(np.append(forest.roots, forest.node_count))
+    arrays = [getattr(forest, name) for name in ARRAY_FIELDS if getattr(forest, name) is not None]
+    paths = set().union(*(_mapped_files(array) for array in arrays))
+    footprint = {
+        'n_trees': forest.n_trees,
+        'node_count': forest.node_count,
+        'nodes_per_tree': {
+            'min': int(nodes.min()), 'mean': round(float(nodes.mean()), 1), 'max': int(nodes.max()),
+            'trees': nodes.tolist()
+        },
+        'max_depth': forest.max_depth,
+        'bytes': forest.nbytes,
+        'bytes_per_node': round(forest.nbytes / max(forest.node_count, 1), 1),
+        'mapped': bool(paths)
+    }
+    if paths:
+        # Mapeado desde el store: residente es lo que el kernel tiene en RAM de esos archivos
+        footprint.update(mapped_resident_bytes(paths))
+    else:
+        footprint['rss_bytes'] = forest.nbytes
+    return footprint
+
+
+def sklearn_footprint(model) -> dict:
+    """Nodos por árbol y bytes de los tree_ de un ensemble de sklearn (nodos + valores)"""
+    estimators = np.ravel(getattr(model, 'estimators_', []))
+    nodes, total = [], 0
+    for estimator in estimators:
+        state = estimator.tree_.__getstate__()
+        nodes.append(estimator.tree_.node_count)
+        total += state['nodes'].nbytes + state['values'].nbytes
+    if not nodes:
+        return {'n_trees': 0}
+    return {
+        'n_trees': len(nodes),
+        'node_count': int(sum(nodes)),
+        'nodes_per_tree': {'min': min(nodes), 'mean': round(sum(nodes) / len(nodes), 1), 'max': max(nodes)},
+        'bytes': total,
+        'bytes_per_node': round(total / sum(nodes), 1)
+    }
+
+
+def process_memory() -> dict:
+    """RSS actual y pico del proceso"""
+    memory = {'pid': os.getpid()}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(('VmRSS:', 'VmHWM:', 'RssAnon:', 'RssFile:')):
+                    key, value = line.split(':', 1)
+                    memory[key.lower() + '_bytes'] = int(value.split()[0]) * 1024
+    except OSError:
+        import resource
+        memory['vmhwm_bytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return memory
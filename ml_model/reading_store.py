@@ -0,0 +1,275 @@
+"""
+Historial indexado de lecturas y predicciones por poza
+SQLite con una tabla agrupada por (poza, timestamp): una consulta por rango
+es una búsqueda en el B-tree más una lectura secuencial de las filas. El
+request solo encola el lote; el writer del journal lo inserta en lotes.
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from bulk_codec import NUMERIC_FIELDS
+from prediction_journal import PredictionJournal, reading_values
+from rollups import Rollups
+
+# Valores de la lectura que se guardan, tal como llegan (NULL = faltante, sin imputar)
+READING_FIELDS = NUMERIC_FIELDS
+PREDICTION_FIELDS = ('predicted_concentration_mg_l', 'p10_mg_l', 'p90_mg_l')
+# Campos con agregados por hora y día (rollups.py)
+ROLLUP_FIELDS = READING_FIELDS + ('predicted_concentration_mg_l',)
+
+# WITHOUT ROWID: las filas se guardan en el orden de la clave primaria, así
+# las lecturas de una poza en un rango de tiempo quedan contiguas en disco.
+# poza y model son claves de tablas chicas para no repetir el texto en cada fila.
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS pozas (
+    id INTEGER PRIMARY KEY,
+    poza_id TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS models (
+    id INTEGER PRIMARY KEY,
+    model_version TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS readings (
+    poza INTEGER NOT NULL,
+    ts_ms INTEGER NOT NULL,
+    {', '.join(f'{field} REAL' for field in READING_FIELDS)},
+    predicted_concentration_mg_l REAL NOT NULL,
+    p10_mg_l REAL,
+    p90_mg_l REAL,
+    model INTEGER,
+    PRIMARY KEY (poza, ts_ms)
+) WITHOUT ROWID;
+"""
+
+# Una lectura reenviada (mismo poza y timestamp, p. ej. el backlog de un gateway) reemplaza a la anterior
+INSERT_SQL = f"INSERT OR REPLACE INTO readings VALUES ({', '.join(['?'] * (2 + len(READING_FIELDS) + 4))})"
+
+QUERY_SQL = f"""
+SELECT ts_ms, {', '.join(READING_FIELDS)}, {', '.join(PREDICTION_FIELDS)}, model
+FROM readings WHERE poza = ? AND ts_ms >= ? AND ts_ms < ? ORDER BY ts_ms LIMIT ?
+"""
+
+
+def to_epoch_ms(timestamps) -> list[int]:
+    """Epoch en milisegundos de datetimes (naive = hora local), epoch en segundos o un array numpy de segundos"""
+    if isinstance(timestamps, np.ndarray):
+        return np.round(timestamps * 1000).astype(np.int64).tolist()
+    now = time.time()
+    return [
+        round((ts.timestamp() if isinstance(ts, datetime) else now if ts is None else ts) * 1000)
+        for ts in timestamps
+    ]
+
+
+class ReadingStore(PredictionJournal):
+    """
+    Historial de lecturas y predicciones con consultas por poza y rango de tiempo.
+
+    Reusa la cola acotada en filas y el writer de fondo de PredictionJournal
+    (un registro por lote). Las consultas abren una conexión de solo lectura por thread (WAL:
+    leen mientras el writer inserta).
+
+    Cada registro: (poza_ids, timestamps, lecturas (lista de SensorData o
+    ReadingColumns), predicciones, p10, p90, versión de modelo o lista por
+    fila). Las columnas de READING_FIELDS se toman de las lecturas en el
+    writer, no de la matriz de features: un ratio faltante queda NULL en vez
+    del valor imputado para el modelo.
+
+    Con `rollups` el writer mantiene en la misma transacción los agregados por
+    hora y día (rollups.py). Después de cada drenado compacta los buckets
+    cerrados: los terminados `grace_s` antes del watermark, que es el mayor
+    timestamp escrito (tiempo del evento, no del reloj, así un backfill cierra
+    buckets a medida que avanza), acotado a la hora actual.
+    """
+
+    def __init__(self, path, max_rows=2_000_000, batch_size=20_000, flush_interval=0.5,
+                 rollups=True, grace_s=3600, **kwargs):
+        super().__init__(path, max_queue=max_rows, batch_size=batch_size, flush_interval=flush_interval, **kwargs)
+        self._readers = threading.local()
+        self._poza_keys = {}
+        self._model_keys = {}
+        self.rollups = Rollups(ROLLUP_FIELDS) if rollups else None
+        self.grace_ms = int(grace_s * 1000)
+        self.watermark_ms = None
+        self.late_rows = 0
+        self.compacted = 0
+
+    def _size(self, record: tuple) -> int:
+        return len(record[0])
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        if self.rollups is not None:
+            stats['rollups'] = {'watermark_ms': self.watermark_ms, 'grace_s': self.grace_ms / 1000,
+                                'late_rows': self.late_rows, 'compacted_buckets': self.compacted}
+        return stats
+
+    def _connect(self):
+        # timeout: con serve.py cada worker tiene su writer sobre el mismo archivo
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        # Las pozas se insertan intercaladas en el tiempo, así las hojas de una poza quedan
+        # repartidas por el archivo: con páginas de 64 KB un día de una poza son ~16 lecturas
+        # al disco en vez de ~250. Solo aplica al crear la base
+        conn.execute("PRAGMA page_size=65536")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-65536")
+        conn.executescript(SCHEMA)
+        if self.rollups is not None:
+            conn.executescript(self.rollups.schema)
+            self.watermark_ms = conn.execute("SELECT max(bucket_ms) FROM rollups").fetchone()[0]
+        conn.commit()
+        self._poza_keys = {poza_id: key for key, poza_id in conn.execute("SELECT id, poza_id FROM pozas")}
+        self._model_keys = {version: key for key, version in conn.execute("SELECT id, model_version FROM models")}
+        return conn
+
+    def _key(self, conn, table, column, cache, value):
+        key = cache.get(value)
+        if key is None:
+            conn.execute(f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)", (value,))
+            key = cache[value] = conn.execute(f"SELECT id FROM {table} WHERE {column} = ?", (value,)).fetchone()[0]
+        return key
+
+    def _rows(self, conn, record, start: int, end: int) -> list[tuple]:
+        """Filas SQL de record[start:end] (se ejecuta en el writer)"""
+        poza_ids, timestamps, readings, predictions, p10, p90, versions = record
+        poza_ids = poza_ids[start:end]
+        n = len(poza_ids)
+        pozas = [self._key(conn, 'pozas', 'poza_id', self._poza_keys, poza_id) for poza_id in poza_ids]
+        if isinstance(versions, list):
+            models = [self._key(conn, 'models', 'model_version', self._model_keys, v) for v in versions[start:end]]
+        else:
+            models = [self._key(conn, 'models', 'model_version', self._model_keys, versions)] * n
+        columns = reading_values(readings, start, end)
+        # Mismo redondeo que las respuestas de la API
+        p10 = np.round(p10[start:end], 2).tolist() if p10 is not None else [None] * n
+        p90 = np.round(p90[start:end], 2).tolist() if p90 is not None else [None] * n
+        return list(zip(
+            pozas, to_epoch_ms(timestamps[start:end]), *columns,
+            np.round(predictions[start:end], 2).tolist(), p10, p90, models
+        ))
+
+    def _drain(self, conn):
+        """Insertar lo encolado en transacciones de ~`batch_size` filas (los lotes grandes se parten)"""
+        batch = []
+        while self._queue:
+            with self._queue_lock:
+                record = self._queue.popleft()
+                self.queued_rows -= self._size(record)
+            for start in range(0, len(record[0]), self.batch_size):
+                batch.extend(self._rows(conn, record, start, start + self.batch_size))
+                if len(batch) >= self.batch_size:
+                    self._write(conn, batch)
+                    batch = []
+        if batch:
+            self._write(conn, batch)
+        if self.rollups is not None and self.watermark_ms is not None:
+            self._compact(conn)
+
+    def _write(self, conn, batch: list[tuple]):
+        start = time.perf_counter()
+        try:
+            with conn:
+                conn.executemany(INSERT_SQL, batch)
+                if self.rollups is not None:
+                    self._rollup(conn, batch)
+            self.written += len(batch)
+            self.batches += 1
+        except sqlite3.Error:
+            self.write_errors += 1
+            # Las claves nuevas del lote fallido se revirtieron con la transacción
+            self._poza_keys = {poza_id: key for key, poza_id in conn.execute("SELECT id, poza_id FROM pozas")}
+            self._model_keys = {v: key for key, v in conn.execute("SELECT id, model_version FROM models")}
+        self.last_batch_ms = (time.perf_counter() - start) * 1000
+
+    def _rollup(self, conn, batch: list[tuple]):
+        """Sumar el lote a los agregados (poza, timestamp, campos de la lectura y predicción de cada fila)"""
+        width = 2 + len(ROLLUP_FIELDS)
+        values = np.array([row[:width] for row in batch], dtype=np.float64)
+        ts_ms = values[:, 1].astype(np.int64)
+        if self.watermark_ms is not None:
+            self.late_rows += int(np.count_nonzero(ts_ms < self.watermark_ms - self.grace_ms))
+        self.rollups.update(conn, values[:, 0].astype(np.int64), ts_ms, values[:, 2:])
+        # Un timestamp futuro (reloj de sensor adelantado) no cierra buckets antes de tiempo
+        newest = min(int(ts_ms.max()), round(time.time() * 1000))
+        self.watermark_ms = max(self.watermark_ms or newest, newest)
+
+    def _compact(self, conn, limit: int = 2_000):
+        """Recalcular desde las lecturas crudas los buckets sucios ya cerrados, `limit` por transacción"""
+        while True:
+            try:
+                with conn:
+                    compacted = self.rollups.compact(conn, self.watermark_ms - self.grace_ms, limit)
+            except sqlite3.Error:
+                self.write_errors += 1
+                return
+            self.compacted += compacted
+            # Con lecturas esperando en la cola, el resto queda para el próximo drenado
+            if compacted < limit or self._queue:
+                return
+
+    # --- Consultas ------------------------------------------------------------
+
+    def _reader(self):
+        """Conexión de solo lectura del thread actual (los endpoints corren en el pool de threads)"""
+        conn = getattr(self._readers, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute("PRAGMA mmap_size=1073741824")
+            self._readers.conn = conn
+            self._readers.models = {}
+        return conn
+
+    def query(self, poza_id: str, start_ms: int, end_ms: int, limit: int = 10_000) -> dict:
+        """
+        Lecturas de una poza con start_ms <= timestamp < end_ms, en orden,
+        como columnas. `truncated` indica que hay más filas que `limit`.
+        """
+        columns = {'timestamp_ms': [], **{field: [] for field in READING_FIELDS + PREDICTION_FIELDS},
+                   'model_version': []}
+        try:
+            conn = self._reader()
+            poza = conn.execute("SELECT id FROM pozas WHERE poza_id = ?", (poza_id,)).fetchone()
+        except sqlite3.OperationalError:
+            # Base todavía sin crear (ninguna lectura escrita)
+            return {'count': 0, 'truncated': False, 'columns': columns}
+        if poza is None:
+            return {'count': 0, 'truncated': False, 'columns': columns}
+
+        rows = conn.execute(QUERY_SQL, (poza[0], start_ms, end_ms, limit + 1)).fetchall()
+        truncated = len(rows) > limit
+        rows = rows[:limit]
+        if rows:
+            names = list(columns)
+            for name, values in zip(names, zip(*rows)):
+                columns[name] = list(values)
+            models = self._readers.models
+            missing = set(columns['model_version']) - models.keys()
+            if missing:
+                models.update(conn.execute("SELECT id, model_version FROM models"))
+            columns['model_version'] = [models.get(key) for key in columns['model_version']]
+        return {'count': len(rows), 'truncated': truncated, 'columns': columns}
+
+    def summary(self, poza_id: str, resolution: str, start_ms: int, end_ms: int, fields=None) -> dict:
+        """Agregados por hora o día de una poza (ver Rollups.query)"""
+        empty = self.rollups.summarize([], tuple(fields or ROLLUP_FIELDS))
+        try:
+            conn = self._reader()
+            poza = conn.execute("SELECT id FROM pozas WHERE poza_id = ?", (poza_id,)).fetchone()
+            if poza is None:
+                return empty
+            return self.rollups.query(conn, poza[0], resolution, start_ms, end_ms, fields)
+        except sqlite3.OperationalError:
+            # Base o tabla de agregados todavía sin crear
+            return empty
+
+    def close_readers(self):
+        conn = getattr(self._readers, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._readers.conn = None
@@ -0,0 +1,185 @@
+"""
+Agregados por poza y hora/día del historial de lecturas (tabla readings de reading_store.py)
+count, suma, mínimo y máximo de cada campo por bucket (solo los valores presentes:
+un ratio faltante es NULL y no entra en la media), mantenidos al insertar:
+cada lote suma sus lecturas a los buckets que toca (una fila por poza y bucket),
+así el trabajo por lectura es constante. Un resumen de meses lee cientos o
+miles de buckets en vez de millones de lecturas.
+"""
+
+import numpy as np
+
+# Resolución -> ancho del bucket en ms (alineados a epoch, es decir a UTC)
+RESOLUTIONS = {'hour': 3_600_000, 'day': 86_400_000}
+STATS = ('n', 'min', 'max', 'mean')
+
+
+class Rollups:
+    """
+    Tabla `rollups` (poza, resolución, bucket) -> n (lecturas) y, por cada
+    campo de `fields`, cantidad de valores presentes, suma, mínimo y máximo.
+    La media de un campo es su suma sobre su cantidad, no sobre n.
+
+    `update` corre en la transacción del writer que inserta las lecturas. Una
+    lectura tardía o reenviada se suma igual a su bucket; el reenvío (mismo
+    poza y timestamp) reemplaza la fila cruda pero en el agregado se cuenta dos
+    veces. Por eso todo bucket tocado queda `dirty`, y `compact` recalcula
+    desde las lecturas crudas los buckets ya cerrados (terminados antes del
+    watermark menos la gracia). Un bucket compactado es exacto hasta que llega
+    otra lectura tardía.
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        columns = [f"{field}_{stat}" for field in self.fields for stat in ('n', 'sum', 'min', 'max')]
+        definitions = ', '.join(
+            f"{column} INTEGER NOT NULL" if column.endswith('_n') else f"{column} REAL" for column in columns
+        )
+        self.schema = f"""
+        CREATE TABLE IF NOT EXISTS rollups (
+            poza INTEGER NOT NULL,
+            resolution_ms INTEGER NOT NULL,
+            bucket_ms INTEGER NOT NULL,
+            n INTEGER NOT NULL,
+            {definitions},
+            dirty INTEGER NOT NULL,
+            PRIMARY KEY (poza, resolution_ms, bucket_ms)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS rollups_dirty ON rollups (resolution_ms, bucket_ms) WHERE dirty = 1;
+        """
+        # min()/max() escalares devuelven NULL si algún argumento lo es: coalesce para un bucket
+        # (o un lote) sin valores de ese campo
+        merge = ', '.join(
+            f"{field}_n = {field}_n + excluded.{field}_n, "
+            f"{field}_sum = {field}_sum + excluded.{field}_sum, "
+            f"{field}_min = coalesce(min({field}_min, excluded.{field}_min), {field}_min, excluded.{field}_min), "
+            f"{field}_max = coalesce(max({field}_max, excluded.{field}_max), {field}_max, excluded.{field}_max)"
+            for field in self.fields
+        )
+        self.upsert_sql = f"""
+        INSERT INTO rollups VALUES ({', '.join(['?'] * (4 + len(columns)))}, 1)
+        ON CONFLICT (poza, resolution_ms, bucket_ms) DO UPDATE SET n = n + excluded.n, {merge}, dirty = 1
+        """
+        # count/total/min/max ignoran los NULL (total da 0.0 si no hay valores)
+        aggregates = ', '.join(f"count({field}), total({field}), min({field}), max({field})" for field in self.fields)
+        self.compact_sql = f"""
+        INSERT OR REPLACE INTO rollups
+        SELECT ?, ?, ?, count(*), {aggregates}, 0
+        FROM readings WHERE poza = ? AND ts_ms >= ? AND ts_ms < ?
+        """
+        # Un nivel más grueso se compacta desde los buckets exactos del anterior (24 horas por día,
+        # no 1.440 lecturas); si alguno sigue sucio no se escribe nada y queda para otra pasada
+        merged = ', '.join(
+            f"sum({field}_n), total({field}_sum), min({field}_min), max({field}_max)" for field in self.fields
+        )
+        self.compact_from_rollups_sql = f"""
+        INSERT OR REPLACE INTO rollups
+        SELECT poza, ?, ?, sum(n), {merged}, 0
+        FROM rollups WHERE poza = ? AND resolution_ms = ? AND bucket_ms >= ? AND bucket_ms < ?
+        GROUP BY poza HAVING max(dirty) = 0
+        """
+        self.raw_sql = f"""
+        SELECT ts_ms - ts_ms % ?, count(*), {aggregates}
+        FROM readings WHERE poza = ? AND ts_ms >= ? AND ts_ms < ? GROUP BY 1 ORDER BY 1
+        """
+
+    def update(self, conn, pozas: np.ndarray, ts_ms: np.ndarray, values: np.ndarray):
+        """Sumar un lote (claves de poza, timestamps en ms, matriz n x fields, NaN = faltante) a sus buckets"""
+        for width in RESOLUTIONS.values():
+            buckets = ts_ms - ts_ms % width
+            order = np.lexsort((buckets, pozas))
+            p, b, v = pozas[order], buckets[order], values[order]
+            starts = np.flatnonzero(np.r_[True, (p[1:] != p[:-1]) | (b[1:] != b[:-1])])
+            counts = np.diff(np.r_[starts, len(p)])
+            present = ~np.isnan(v)
+            field_counts = np.add.reduceat(present, starts, dtype=np.float64)
+            mins = np.minimum.reduceat(np.where(present, v, np.inf), starts)
+            maxs = np.maximum.reduceat(np.where(present, v, -np.inf), starts)
+            # Un campo sin valores en el grupo queda NaN, que SQLite guarda como NULL
+            mins[field_counts == 0] = np.nan
+            maxs[field_counts == 0] = np.nan
+            # Columnas intercaladas como en la tabla: cantidad, suma, mínimo y máximo de cada campo
+            aggregates = np.stack([
+                field_counts, np.add.reduceat(np.where(present, v, 0.0), starts), mins, maxs
+            ], axis=2).reshape(len(starts), -1)
+            conn.executemany(self.upsert_sql, (
+                (poza, width, bucket, n, *row) for poza, bucket, n, row in zip(
+                    p[starts].tolist(), b[starts].tolist(), counts.tolist(), aggregates.tolist()
+                )
+            ))
+
+    def compact(self, conn, closed_before_ms: int, limit: int = 2_000) -> int:
+        """Recalcular hasta `limit` buckets sucios terminados antes de `closed_before_ms` (horas desde las lecturas crudas)"""
+        compacted = 0
+        finer = None
+        for width in RESOLUTIONS.values():
+            keys = conn.execute(
+                "SELECT poza, bucket_ms FROM rollups WHERE dirty = 1 AND resolution_ms = ? AND bucket_ms <= ? "
+                "ORDER BY bucket_ms LIMIT ?",
+                (width, closed_before_ms - width, limit - compacted)
+            ).fetchall()
+            if finer is None:
+                conn.executemany(self.compact_sql, [
+                    (poza, width, bucket, poza, bucket, bucket + width) for poza, bucket in keys
+                ])
+            else:
+                conn.executemany(self.compact_from_rollups_sql, [
+                    (width, bucket, poza, finer, bucket, bucket + width) for poza, bucket in keys
+                ])
+            finer = width
+            compacted += len(keys)
+            if compacted >= limit:
+                break
+        return compacted
+
+    def query(self, conn, poza: int, resolution: str, start_ms: int, end_ms: int, fields=None) -> dict:
+        """
+        Buckets de una poza que empiezan en [start_ms, end_ms) (start_ms se
+        alinea al bucket) como columnas bucket_ms, n, exact y <campo>_n/min/max/mean
+        (None si el bucket no tiene valores del campo), más los totales de la ventana.
+        """
+        width = RESOLUTIONS[resolution]
+        fields = tuple(fields or self.fields)
+        columns = ', '.join(f"{field}_n, {field}_sum, {field}_min, {field}_max" for field in fields)
+        rows = conn.execute(
+            f"SELECT bucket_ms, n, dirty, {columns} FROM rollups "
+            "WHERE poza = ? AND resolution_ms = ? AND bucket_ms >= ? AND bucket_ms < ? ORDER BY bucket_ms",
+            (poza, width, start_ms - start_ms % width, end_ms)
+        ).fetchall()
+        return self.summarize(rows, fields)
+
+    def raw(self, conn, poza: int, resolution: str, start_ms: int, end_ms: int, fields=None) -> dict:
+        """Lo mismo que `query` pero agregando las lecturas crudas (referencia y benchmark)"""
+        width = RESOLUTIONS[resolution]
+        rows = conn.execute(self.raw_sql, (width, poza, start_ms - start_ms % width, end_ms)).fetchall()
+        fields = tuple(fields or self.fields)
+        index = [self.fields.index(field) for field in fields]
+        rows = [(row[0], row[1], 0, *(v for i in index for v in row[2 + 4 * i:6 + 4 * i])) for row in rows]
+        return self.summarize(rows, fields)
+
+    @staticmethod
+    def summarize(rows, fields) -> dict:
+        """Filas (bucket_ms, n, dirty, cantidad/suma/min/max por campo) a columnas y totales de la ventana"""
+        columns = {'bucket_ms': [], 'n': [], 'exact': [],
+                   **{f"{field}_{stat}": [] for field in fields for stat in STATS}}
+        totals = {'n': 0}
+        if not rows:
+            return {'count': 0, 'columns': columns, 'totals': totals}
+
+        values = list(zip(*rows))
+        columns['bucket_ms'] = list(values[0])
+        columns['n'] = list(values[1])
+        columns['exact'] = [not dirty for dirty in values[2]]
+        totals['n'] = sum(values[1])
+        for i, field in enumerate(fields):
+            counts, sums, mins, maxs = values[3 + 4 * i:7 + 4 * i]
+            present = [v for v in mins if v is not None]
+            columns[f"{field}_n"] = list(counts)
+            columns[f"{field}_min"] = list(mins)
+            columns[f"{field}_max"] = list(maxs)
+            columns[f"{field}_mean"] = [total / n if n else None for total, n in zip(sums, counts)]
+            totals[f"{field}_n"] = sum(counts)
+            totals[f"{field}_min"] = min(present) if present else None
+            totals[f"{field}_max"] = max(v for v in maxs if v is not None) if present else None
+            totals[f"{field}_mean"] = sum(sums) / totals[f"{field}_n"] if totals[f"{field}_n"] else None
+        return {'count': len(rows), 'columns': columns, 'totals': totals}
@@ -0,0 +1,303 @@
+"""
+Servidor pre-fork de la API: el modelo se carga una sola vez y se comparte entre N workers
+El proceso padre carga el modelo, congela su heap (gc.freeze) para que el GC
+de los workers no escriba sobre esos objetos y las páginas sigan compartidas
+copy-on-write, abre el socket y forkea N workers uvicorn que aceptan sobre
+el mismo socket. El padre los supervisa (reinicia los que se caen, con
+backoff si fallan al arrancar) y con SIGHUP recarga el modelo: levanta una
+generación nueva de workers y, cuando está lista, apaga la anterior con
+shutdown ordenado (termina los requests en curso), sin cortar el servicio.
+
+    python serve.py --workers=4 [--host=0.0.0.0] [--port=8000] [--no-freeze]
+    kill -HUP <pid del padre>    # recargar el modelo después de reentrenar
+
+Estado por worker: alertas (AlertEngine), límites de admisión y drift se
+llevan en cada proceso. Para alertas con histéresis por poza vía /ingest
+usar --workers=1.
+"""
+
+import os
+
+# Un hilo de BLAS/OpenMP por worker: el paralelismo lo dan los procesos
+for _var in ('OPENBLAS_NUM_THREADS', 'OMP_NUM_THREADS', 'MKL_NUM_THREADS'):
+    os.environ.setdefault(_var, '1')
+
+import gc
+import logging
+import select
+import signal
+import socket
+import struct
+import sys
+import time
+
+import uvicorn
+
+import api_model
+
+logger = logging.getLogger('serve')
+
+GRACEFUL_TIMEOUT_S = 30   # Requests en curso al apagar o reemplazar un worker
+READY_TIMEOUT_S = 120     # Arranque de una generación nueva al recargar
+MIN_UPTIME_S = 5          # Un worker que muere antes se considera fallo de arranque
+MAX_BACKOFF_S = 30
+
+# Estado global del modelo en api_model (se restaura si una recarga falla)
+MODEL_GLOBALS = ('MODEL', 'MODEL_METADATA', 'FEATURE_NAMES', 'FOREST', 'FAST_MODEL', 'TIER_INFO', 'REGISTRY', 'DRIFT')
+
+_READY = struct.Struct('i')
+
+
+class _WorkerServer(uvicorn.Server):
+    """uvicorn.Server que avisa al padre (pipe) cuando terminó el lifespan y acepta conexiones"""
+
+    def __init__(self, config, ready_fd):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets=sockets)
+        if not self.should_exit:
+            os.write(self.ready_fd, _READY.pack(os.getpid()))
+
+
+class PreforkServer:
+    """Padre pre-fork: carga, socket compartido, supervisión y recarga de workers"""
+
+    def __init__(self, workers=None, host='0.0.0.0', port=8000, freeze=True, log_level='warning'):
+        self.num_workers = workers or os.cpu_count() or 1
+        self.host = host
+        self.port = port
+        self.freeze = freeze
+        self.log_level = log_level
+
+        self.sock = None
+        self.generation = 0
+        self.workers = {}  # pid -> {'generation', 'started', 'ready'}
+        self.restarts = 0
+        self.reloads = 0
+        self._failures = 0
+        self._next_spawn = 0.0
+        self._ready_r, self._ready_w = os.pipe()
+        os.set_blocking(self._ready_r, False)
+        self._stop = False
+        self._reload = False
+
+    # --- Padre -------------------------------------------------------------
+
+    def load(self):
+        """Cargar el modelo en el padre y congelar el heap antes de forkear"""
+        gc.unfreeze()
+        api_model.load_model()
+        gc.collect()
+        if self.freeze:
+            gc.freeze()
+        logger.info(f"Modelo cargado en el padre ({gc.get_freeze_count():,} objetos congelados)")
+
+    def bind(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        self.sock = sock
+
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+        self.workers[pid] = {'generation': self.generation, 'started': time.monotonic(), 'ready': False}
+        return pid
+
+    def current(self) -> list[int]:
+        return [pid for pid, info in self.workers.items() if info['generation'] == self.generation]
+
+    def serve(self):
+        """Cargar, forkear y supervisar hasta SIGTERM / SIGINT"""
+        self.load()
+        self.bind()
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+
+        for _ in range(self.num_workers):
+            self.spawn()
+        self.wait_ready(self.generation, READY_TIMEOUT_S)
+        print(f"✅ {self.num_workers} workers listos en http://{self.host}:{self.port} "
+              f"(padre {os.getpid()}, gc.freeze {'sí' if self.freeze else 'no'})", flush=True)
+
+        while not self._stop:
+            if self._reload:
+                self._reload = False
+                self.reload()
+            self._reap()
+            self._respawn()
+            self._read_ready(0.5)
+        self.shutdown()
+
+    def wait_ready(self, generation, timeout_s) -> bool:
+        """Esperar que todos los workers de `generation` acepten conexiones"""
+        deadline = time.monotonic() + timeout_s
+        while time.monotonic() < deadline and not self._stop:
+            pending = [pid for pid, info in self.workers.items()
+                       if info['generation'] == generation and not info['ready']]
+            if not pending and len(self.current()) == self.num_workers:
+                return True
+            self._reap()
+            self._respawn()
+            self._read_ready(0.2)
+        return False
+
+    def reload(self):
+        """
+        Recargar el modelo y reemplazar los workers: la generación nueva arranca
+        sobre el mismo socket y, cuando está lista, la anterior termina sus
+        requests y sale. Si la carga o el arranque fallan, sigue la anterior.
+        """
+        saved = {name: getattr(api_model, name) for name in MODEL_GLOBALS}
+        try:
+            self.load()
+        except Exception as e:
+            self._restore(saved)
+            logger.error(f"Recarga cancelada, se mantiene el modelo anterior: {e}")
+            return
+
+        old = self.current()
+        self.generation += 1
+        for _ in range(self.num_workers):
+            self.spawn()
+        if not self.wait_ready(self.generation, READY_TIMEOUT_S):
+            logger.error("La generación nueva no arrancó a tiempo: se mantiene la anterior")
+            for pid in self.current():
+                self._signal(pid, signal.SIGKILL)
+            self.generation -= 1
+            # Antes de reponer un worker de la generación anterior: se forkea con el modelo del padre
+            self._restore(saved)
+            return
+        for pid in old:
+            self._signal(pid, signal.SIGTERM)
+        self.reloads += 1
+        logger.info(f"Modelo recargado: generación {self.generation}, {len(old)} workers anteriores en shutdown")
+
+    def _restore(self, saved: dict):
+        """Volver a los globals del modelo anterior en el padre y congelar de nuevo el heap"""
+        gc.unfreeze()
+        for name, value in saved.items():
+            setattr(api_model, name, value)
+        gc.collect()
+        if self.freeze:
+            gc.freeze()
+
+    def shutdown(self):
+        """SIGTERM a todos los workers y SIGKILL a los que sigan vivos después del timeout"""
+        for pid in list(self.workers):
+            self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT_S + 5
+        while self.workers and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.05)
+        for pid in list(self.workers):
+            self._signal(pid, signal.SIGKILL)
+        self._reap(block=True)
+        self.sock.close()
+
+    def _reap(self, block=False):
+        """Recoger workers terminados; los de la generación actual se reponen"""
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, 0 if block else os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            info = self.workers.pop(pid, None)
+            if info is None or info['generation'] != self.generation or self._stop:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            uptime = time.monotonic() - info['started']
+            logger.warning(f"Worker {pid} terminó (código {code}) tras {uptime:.1f} s: se reinicia")
+            self._failures = self._failures + 1 if uptime < MIN_UPTIME_S else 0
+            if self._failures:
+                self._next_spawn = time.monotonic() + min(MAX_BACKOFF_S, 2 ** (self._failures - 1))
+
+    def _respawn(self):
+        if self._stop or time.monotonic() < self._next_spawn:
+            return
+        while len(self.current()) < self.num_workers:
+            self.spawn()
+            self.restarts += 1
+
+    def _read_ready(self, timeout_s):
+        readable, _, _ = select.select([self._ready_r], [], [], timeout_s)
+        if not readable:
+            return
+        try:
+            data = os.read(self._ready_r, _READY.size * 64)
+        except BlockingIOError:
+            return
+        for (pid,) in _READY.iter_unpack(data[:len(data) - len(data) % _READY.size]):
+            if pid in self.workers:
+                self.workers[pid]['ready'] = True
+
+    def _signal(self, pid, sig):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _on_stop(self, signum, frame):
+        self._stop = True
+
+    def _on_reload(self, signum, frame):
+        self._reload = True
+
+    # --- Worker ------------------------------------------------------------
+
+    def _run_worker(self):
+        """Proceso hijo: uvicorn sobre el socket heredado; nunca vuelve"""
+        code = 1
+        try:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, signal.SIG_DFL)
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            os.close(self._ready_r)
+            config = uvicorn.Config(
+                api_model.app, lifespan='on', log_level=self.log_level,
+                access_log=False, timeout_graceful_shutdown=GRACEFUL_TIMEOUT_S
+            )
+            _WorkerServer(config, self._ready_w).run(sockets=[self.sock])
+            code = 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+        except BaseException:
+            logger.exception("Error en el worker")
+        finally:
+            os._exit(code)
+
+
+def main():
+    """
+    Uso: python serve.py [--workers=N] [--host=0.0.0.0] [--port=8000] [--no-freeze] [--log-level=warning]
+    """
+    options = {}
+    for arg in sys.argv[1:]:
+        if arg.startswith('--workers='):
+            options['workers'] = int(arg.split('=', 1)[1])
+        elif arg.startswith('--host='):
+            options['host'] = arg.split('=', 1)[1]
+        elif arg.startswith('--port='):
+            options['port'] = int(arg.split('=', 1)[1])
+        elif arg.startswith('--log-level='):
+            options['log_level'] = arg.split('=', 1)[1]
+        elif arg == '--no-freeze':
+            options['freeze'] = False
+        else:
+            print(main.__doc__.strip())
+            return False
+
+    PreforkServer(**options).serve()
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
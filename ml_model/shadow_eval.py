@@ -0,0 +1,156 @@
+"""
+Evaluación en sombra de un modelo candidato sobre tráfico real
+El request solo encola sus features; un thread de baja prioridad predice
+con el candidato y acumula las diferencias contra el modelo principal
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from packed_forest import PackedForest
+
+
+def load_candidate(path) -> PackedForest:
+    """Cargar el candidato (.npz compacto o .pkl de sklearn) como bosque aplanado"""
+    if path.endswith('.npz'):
+        return PackedForest.load(path)
+    import joblib
+    return PackedForest.from_sklearn(joblib.load(path))
+
+
+class ShadowEvaluator:
+    """
+    Comparación candidato vs principal fuera del hot path.
+
+    `record` agrega al final de una deque una referencia al bloque de
+    features ya construido por el request (sin copiar). Si la cola supera
+    `max_rows` filas, el bloque se descarta y se cuenta: nunca se hace
+    esperar al request. El worker corre con prioridad baja (nice 19) y
+    procesa en bloques de `chunk_rows` filas para soltar el GIL seguido.
+    La profundidad de la cola es `enqueued - scored`: cada contador lo
+    escribe un solo thread (el request y el worker), sin lock.
+
+    Métricas acumuladas (candidato - principal): bias, MAE, RMSE, diferencia
+    máxima y desacuerdo de `quality_status`.
+    """
+
+    def __init__(self, candidate: PackedForest, quality_fn, name='candidate',
+                 max_rows=50_000, chunk_rows=64, flush_interval=0.1):
+        self.candidate = candidate
+        self.quality_fn = quality_fn
+        self.name = name
+        self.max_rows = max_rows
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+
+        self._queue = deque()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.scored = 0
+        self.worker_ms = 0.0
+        self._sum_diff = 0.0
+        self._sum_abs = 0.0
+        self._sum_sq = 0.0
+        self._max_abs = 0.0
+        self._quality_disagree = 0
+        self._disagreements = {}
+
+    def start(self):
+        """Arrancar el worker de fondo"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='shadow-eval', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Detener el worker (lo pendiente se descarta)"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def record(self, X: np.ndarray, primary: np.ndarray, primary_quality: list, mg_li: list):
+        """Encolar un bloque de lecturas ya predichas (hot path: O(1), sin copias)"""
+        n = len(X)
+        if self.queue_rows + n > self.max_rows:
+            self.dropped += n
+            return
+        self._queue.append((X, primary, primary_quality, mg_li))
+        self.enqueued += n
+
+    @property
+    def queue_rows(self) -> int:
+        """Filas encoladas todavía sin comparar"""
+        return self.enqueued - self.scored
+
+    def stats(self) -> dict:
+        """Métricas de comparación y contadores de la cola"""
+        n = self.scored
+        return {
+            'candidate': self.name,
+            'running': self._thread is not None,
+            'queue_rows': self.queue_rows,
+            'enqueued': self.enqueued,
+            'scored': n,
+            'dropped': self.dropped,
+            'worker_ms': round(self.worker_ms, 3),
+            'bias_mg_l': round(self._sum_diff / n, 3) if n else None,
+            'mae_mg_l': round(self._sum_abs / n, 3) if n else None,
+            'rmse_mg_l': round(float(np.sqrt(self._sum_sq / n)), 3) if n else None,
+            'max_abs_diff_mg_l': round(self._max_abs, 3),
+            'quality_disagreement_rate': round(self._quality_disagree / n, 4) if n else None,
+            'quality_disagreements': [
+                {'primary': primary, 'candidate': candidate, 'count': count}
+                for (primary, candidate), count in sorted(
+                    self._disagreements.items(), key=lambda item: -item[1]
+                )
+            ]
+        }
+
+    def _run(self):
+        # Prioridad baja para el thread (Linux: cada thread tiene su propio tid)
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            while self._queue and not self._stop.is_set():
+                self._score(self._queue.popleft())
+
+    def _score(self, item):
+        X, primary, primary_quality, mg_li = item
+        start = time.perf_counter()
+        for lo in range(0, len(X), self.chunk_rows):
+            hi = lo + self.chunk_rows
+            candidate = self.candidate.predict(X[lo:hi])
+            diff = candidate - primary[lo:hi]
+
+            self._sum_diff += float(diff.sum())
+            self._sum_abs += float(np.abs(diff).sum())
+            self._sum_sq += float((diff ** 2).sum())
+            self._max_abs = max(self._max_abs, float(np.abs(diff).max()))
+
+            for value, quality, ratio in zip(candidate.tolist(), primary_quality[lo:hi], mg_li[lo:hi]):
+                candidate_quality = self.quality_fn(value, ratio)
+                if candidate_quality != quality:
+                    self._quality_disagree += 1
+                    key = (quality, candidate_quality)
+                    self._disagreements[key] = self._disagreements.get(key, 0) + 1
+
+            self.scored += len(candidate)
+            # Ceder el GIL entre bloques para no retrasar requests
+            time.sleep(0)
+        self.worker_ms += (time.perf_counter() - start) * 1000
@@ -6,18 +6,35 @@ Usa Random Forest para predicción robusta y interpretable
 import pandas as pd
 import numpy as np
 import joblib
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
+import os
+import sys
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
-# Configuración de visualización
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (12, 6)
+from packed_forest import PackedForest
+from compact_model import COMPACT_MODEL_FILE, compact_forest, compaction_report
+from drift_monitor import training_snapshot
+
+# Validación del bosque sobre el set de entrenamiento (ver train_model)
+VALIDATION_MODES = ('oob', 'kfold', 'none')
+DEFAULT_VALIDATION = 'oob'
+
+# Puntos máximos del scatter de predicciones (se muestrea por encima de esto)
+PLOT_MAX_POINTS = 5000
+
+# sklearn, matplotlib y seaborn se importan en las funciones que los usan:
+# importar este módulo (p. ej. por feature_engineering) no los carga
+
+
+def _pyplot():
+    """matplotlib con la configuración de visualización (solo al graficar)"""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    
+    sns.set_style("whitegrid")
+    plt.rcParams['figure.figsize'] = (12, 6)
+    return plt
 
 
 def load_and_prepare_data(filepath):
@@ -56,6 +73,8 @@ def feature_engineering(df):
 
 def prepare_train_test(df, target='li_concentration_mg_l', test_size=0.2):
     """Prepara conjuntos de entrenamiento y prueba"""
+    from sklearn.model_selection import train_test_split
+    
     print(f"\n📚 Preparando datos de entrenamiento...")
     
     # Features a usar (excluir columnas no numéricas y target)
@@ -77,43 +96,108 @@ def prepare_train_test(df, target='li_concentration_mg_l', test_size=0.2):
     return X_train, X_test, y_train, y_test, feature_cols
 
 
-def train_model(X_train, y_train):
-    """Entrena el modelo Random Forest"""
+def train_model(X_train, y_train, validation=DEFAULT_VALIDATION, n_folds=5, params=None):
+    """
+    Entrena el modelo Random Forest y lo valida sobre el set de entrenamiento.
+    
+    validation:
+    - "oob": estimaciones out-of-bag del mismo bosque (cada árbol predice las
+      filas que quedaron fuera de su bootstrap). Un solo fit.
+    - "kfold": validación cruzada de `n_folds` fits adicionales, en paralelo
+      (un fold por proceso, cada bosque con un solo thread).
+    - "none": sin validación.
+    
+    `params` reemplaza hiperparámetros del bosque (p. ej. en el benchmark de
+    escalabilidad). Devuelve (modelo, resumen de validación para la metadata).
+    """
+    from sklearn.ensemble import RandomForestRegressor
+    
+    if validation not in VALIDATION_MODES:
+        raise ValueError(f"Validación desconocida: {validation}. Opciones: {', '.join(VALIDATION_MODES)}")
+    
     print("\n🤖 Entrenando modelo Random Forest...")
     
     # Configuración del modelo
-    model = RandomForestRegressor(
+    forest_params = dict(
         n_estimators=100,          # Número de árboles
         max_depth=15,              # Profundidad máxima
         min_samples_split=5,       # Mínimo para dividir
         min_samples_leaf=2,        # Mínimo en hojas
         max_features='sqrt',       # Features por árbol
+        oob_score=validation == 'oob',
         random_state=42,
         n_jobs=-1,                 # Usar todos los cores
         verbose=0
     )
+    forest_params.update(params or {})
+    model = RandomForestRegressor(**forest_params)
     
     # Entrenar
+    start = time.perf_counter()
     model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
     
     print("✅ Modelo entrenado exitosamente")
     
-    # Cross-validation para robustez
-    print("\n🔄 Validación cruzada (5-fold)...")
-    cv_scores = cross_val_score(
-        model, X_train, y_train, 
-        cv=5, 
-        scoring='r2',
-        n_jobs=-1
+    start = time.perf_counter()
+    if validation == 'oob':
+        print("\n🔄 Validación out-of-bag...")
+        summary = _validation_scores(y_train, model.oob_prediction_)
+    elif validation == 'kfold':
+        summary = _kfold_validation(model, X_train, y_train, n_folds)
+    else:
+        summary = {}
+    
+    if summary:
+        print(f"   R²: {summary['r2']:.3f} | RMSE: {summary['rmse']:.2f} mg/L | MAPE: {summary['mape']:.2f}%")
+    
+    return model, {
+        'mode': validation,
+        **summary,
+        'fit_seconds': fit_seconds,
+        'validation_seconds': time.perf_counter() - start
+    }
+
+
+def _validation_scores(y_true, y_pred):
+    """R², RMSE y MAPE de predicciones fuera de muestra"""
+    from sklearn.metrics import mean_squared_error, r2_score
+    
+    y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+    return {
+        'r2': float(r2_score(y_true, y_pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        'mape': float(np.mean(np.abs((y_true - y_pred) / y_true)) * 100)
+    }
+
+
+def _kfold_validation(model, X_train, y_train, n_folds):
+    """Predicciones out-of-fold con los folds ajustados en paralelo"""
+    from sklearn.base import clone
+    from sklearn.metrics import r2_score
+    from sklearn.model_selection import KFold, cross_val_predict
+    
+    print(f"\n🔄 Validación cruzada ({n_folds}-fold)...")
+    
+    # Paralelismo entre folds; dentro de cada fold un solo thread para no
+    # sobre-suscribir los núcleos
+    folds = KFold(n_splits=n_folds)
+    y_pred = cross_val_predict(
+        clone(model).set_params(n_jobs=1), X_train, y_train,
+        cv=folds, n_jobs=min(n_folds, os.cpu_count() or 1)
     )
-    print(f"   R² scores: {cv_scores.round(3)}")
-    print(f"   R² medio: {cv_scores.mean():.3f} (+/- {cv_scores.std():.3f})")
+    y_true = np.asarray(y_train)
+    fold_r2 = np.array([r2_score(y_true[test], y_pred[test]) for _, test in folds.split(X_train)])
+    print(f"   R² scores: {fold_r2.round(3)}")
+    print(f"   R² medio: {fold_r2.mean():.3f} (+/- {fold_r2.std():.3f})")
     
-    return model
+    return {**_validation_scores(y_true, y_pred), 'n_folds': n_folds, 'fold_r2': fold_r2.tolist()}
 
 
 def evaluate_model(model, X_train, X_test, y_train, y_test):
     """Evalúa el rendimiento del modelo"""
+    from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
+    
     print("\n📊 Evaluación del modelo...")
     
     # Predicciones
@@ -172,17 +256,88 @@ def evaluate_model(model, X_train, X_test, y_train, y_test):
     }
 
 
-def plot_feature_importance(model, feature_cols, top_n=10):
+def distill_surrogate(model, X_train, X_test, y_test):
+    """Destila el bosque en un Gradient Boosting poco profundo (tier rápido)"""
+    from sklearn.ensemble import GradientBoostingRegressor
+    from sklearn.metrics import r2_score
+    
+    print("\n⚡ Destilando modelo rápido (surrogate)...")
+    
+    # Targets suaves: el surrogate aprende a imitar al bosque, no a las etiquetas
+    y_soft = model.predict(X_train)
+    
+    surrogate = GradientBoostingRegressor(
+        n_estimators=150,          # Árboles secuenciales
+        max_depth=3,               # Árboles poco profundos (8 hojas)
+        learning_rate=0.1,
+        subsample=0.8,
+        random_state=42
+    )
+    surrogate.fit(X_train.to_numpy(), y_soft)
+    
+    # Comparación contra el bosque en el split de test
+    forest_pred = model.predict(X_test)
+    fast_pred = surrogate.predict(X_test.to_numpy())
+    
+    forest_r2 = r2_score(y_test, forest_pred)
+    fast_r2 = r2_score(y_test, fast_pred)
+    forest_mape = np.mean(np.abs((y_test - forest_pred) / y_test)) * 100
+    fast_mape = np.mean(np.abs((y_test - fast_pred) / y_test)) * 100
+    fidelity_r2 = r2_score(forest_pred, fast_pred)
+    
+    # Latencia de una fila en la forma en que la API sirve cada tier
+    row = X_test.to_numpy()[:1]
+    forest_ms = _single_row_latency_ms(PackedForest.from_sklearn(model).predict, row)
+    fast_ms = _single_row_latency_ms(PackedForest.from_sklearn(surrogate).predict, row)
+    
+    print("\n" + "="*60)
+    print("SURROGATE vs RANDOM FOREST (test)")
+    print("="*60)
+    print(f"\n{'Métrica':<22} {'Forest':<12} {'Surrogate':<12} {'Delta':<10}")
+    print("-"*60)
+    print(f"{'R² Score':<22} {forest_r2:<12.4f} {fast_r2:<12.4f} {fast_r2 - forest_r2:<+10.4f}")
+    print(f"{'MAPE (%)':<22} {forest_mape:<12.2f} {fast_mape:<12.2f} {fast_mape - forest_mape:<+10.2f}")
+    print(f"{'Latencia 1 fila (ms)':<22} {forest_ms:<12.3f} {fast_ms:<12.3f}")
+    print("-"*60)
+    print(f"   Fidelidad (R² surrogate vs forest): {fidelity_r2:.4f}")
+    print("="*60)
+    
+    surrogate_metrics = {
+        'test_r2': fast_r2,
+        'test_mape': fast_mape,
+        'r2_loss_vs_forest': forest_r2 - fast_r2,
+        'mape_increase_vs_forest': fast_mape - forest_mape,
+        'fidelity_r2': fidelity_r2,
+        'latency_ms_single_row': fast_ms,
+        'forest_latency_ms_single_row': forest_ms
+    }
+    
+    return surrogate, surrogate_metrics
+
+
+def _single_row_latency_ms(predict, row, repeat=50):
+    """Latencia mediana (ms) de predecir una fila"""
+    predict(row)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predict(row)
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def plot_feature_importance(feature_cols, feature_importances, top_n=10):
     """Visualiza importancia de features"""
     print(f"\n📊 Visualizando top {top_n} features más importantes...")
     
-    # Obtener importancias
+    # Ordenar importancias
     importances = pd.DataFrame({
         'feature': feature_cols,
-        'importance': model.feature_importances_
+        'importance': feature_importances
     }).sort_values('importance', ascending=False)
     
     # Plot
+    plt = _pyplot()
     plt.figure(figsize=(10, 6))
     top_features = importances.head(top_n)
     plt.barh(range(len(top_features)), top_features['importance'])
@@ -202,12 +357,22 @@ def plot_predictions(y_test, y_pred):
     """Visualiza predicciones vs valores reales"""
     print("\n📊 Visualizando predicciones...")
     
+    y_test, y_pred = np.asarray(y_test), np.asarray(y_pred)
+    low, high = y_test.min(), y_test.max()
+    
+    # Con test sets grandes se grafica una muestra (el costo crece con los puntos)
+    if len(y_test) > PLOT_MAX_POINTS:
+        sample = np.random.default_rng(42).choice(len(y_test), PLOT_MAX_POINTS, replace=False)
+        print(f"   Graficando {PLOT_MAX_POINTS:,} de {len(y_test):,} puntos")
+        y_test, y_pred = y_test[sample], y_pred[sample]
+    
+    plt = _pyplot()
     fig, axes = plt.subplots(1, 2, figsize=(14, 5))
     
     # Scatter plot
     axes[0].scatter(y_test, y_pred, alpha=0.5, s=20)
-    axes[0].plot([y_test.min(), y_test.max()], 
-                 [y_test.min(), y_test.max()], 
+    axes[0].plot([low, high], 
+                 [low, high], 
                  'r--', lw=2, label='Predicción perfecta')
     axes[0].set_xlabel('Concentración Real (mg/L)')
     axes[0].set_ylabel('Concentración Predicha (mg/L)')
@@ -230,7 +395,27 @@ def plot_predictions(y_test, y_pred):
     plt.close()
 
 
-def save_model(model, scaler, feature_cols, metrics):
+def render_report(metadata_path='model_metadata.pkl'):
+    """Graficar a partir de los arrays guardados en la metadata (no necesita el modelo)"""
+    metadata = joblib.load(metadata_path)
+    plot_feature_importance(metadata['feature_cols'], metadata['feature_importances'])
+    plot_predictions(metadata['metrics']['y_test'], metadata['metrics']['y_test_pred'])
+
+
+def start_report_process(metadata_path='model_metadata.pkl'):
+    """Renderizar los gráficos en otro proceso mientras el modelo ya está publicado"""
+    import multiprocessing as mp
+    
+    # spawn: el hijo no hereda los threads de sklearn/joblib del entrenamiento
+    process = mp.get_context('spawn').Process(
+        target=render_report, args=(metadata_path,), name='training-report'
+    )
+    process.start()
+    return process
+
+
+def save_model(model, scaler, feature_cols, metrics, surrogate=None, surrogate_metrics=None,
+               compacted=None, X_train=None, validation=None):
     """Guarda el modelo y metadatos"""
     print("\n💾 Guardando modelo...")
     
@@ -238,22 +423,58 @@ def save_model(model, scaler, feature_cols, metrics):
     joblib.dump(model, 'model.pkl')
     print("   ✅ Modelo guardado: model.pkl")
     
+    # Guardar modelo rápido (tier "fast") si se destiló
+    if surrogate is not None:
+        joblib.dump(surrogate, 'model_fast.pkl')
+        print("   ✅ Modelo rápido guardado: model_fast.pkl")
+    
+    # Guardar artefacto compacto si se generó
+    if compacted is not None:
+        compacted.save(COMPACT_MODEL_FILE)
+        print(f"   ✅ Modelo compacto guardado: {COMPACT_MODEL_FILE}")
+    
     # Guardar scaler si se usó (para futuro)
     # joblib.dump(scaler, 'scaler.pkl')
     
     # Guardar metadatos
     metadata = {
         'feature_cols': feature_cols,
-        'metrics': metrics,
+        # Arrays de numpy: cargar la metadata no requiere importar pandas
+        'metrics': {**metrics, 'y_test': np.asarray(metrics['y_test'])},
         'model_type': 'RandomForestRegressor',
-        'training_date': pd.Timestamp.now().isoformat()
+        'training_date': pd.Timestamp.now().isoformat(),
+        'feature_importances': model.feature_importances_.tolist()
     }
+    if validation is not None:
+        metadata['validation'] = validation
+    if surrogate is not None:
+        metadata['surrogate'] = {
+            'model_type': type(surrogate).__name__,
+            'file': 'model_fast.pkl',
+            'metrics': surrogate_metrics
+        }
+    if compacted is not None:
+        metadata['compact'] = {
+            'file': COMPACT_MODEL_FILE,
+            'node_count': compacted.node_count
+        }
+    # Distribución de entrenamiento para el monitor de drift de la API
+    if X_train is not None:
+        metadata['drift_snapshot'] = training_snapshot(X_train)
     joblib.dump(metadata, 'model_metadata.pkl')
     print("   ✅ Metadata guardado: model_metadata.pkl")
 
 
-def main():
-    """Función principal"""
+def main(distill=False, compact=False, plots=True, validation=DEFAULT_VALIDATION):
+    """
+    Función principal.
+    
+    El modelo se guarda apenas termina el entrenamiento; los gráficos se
+    renderizan después, en otro proceso, a partir de la metadata (o se
+    omiten con plots=False). Devuelve el tiempo hasta el artefacto y el
+    total del pipeline.
+    """
+    pipeline_start = time.perf_counter()
     print("="*60)
     print("ENTRENAMIENTO DE MODELO - PREDICCIÓN DE LITIO")
     print("="*60)
@@ -268,17 +489,35 @@ def main():
     X_train, X_test, y_train, y_test, feature_cols = prepare_train_test(df_features)
     
     # 4. Entrenar modelo
-    model = train_model(X_train, y_train)
+    model, validation_summary = train_model(X_train, y_train, validation)
     
     # 5. Evaluar
     metrics = evaluate_model(model, X_train, X_test, y_train, y_test)
     
-    # 6. Visualizaciones
-    importances = plot_feature_importance(model, feature_cols)
-    plot_predictions(metrics['y_test'], metrics['y_test_pred'])
+    # 6. Destilar modelo rápido (opcional)
+    surrogate, surrogate_metrics = None, None
+    if distill:
+        surrogate, surrogate_metrics = distill_surrogate(model, X_train, X_test, y_test)
+    
+    # 7. Compactar (opcional)
+    compacted = compact_forest(model) if compact else None
+    
+    # 8. Guardar modelo (desde acá el artefacto es desplegable)
+    save_model(model, None, feature_cols, metrics, surrogate, surrogate_metrics, compacted, X_train,
+               validation_summary)
+    time_to_artifact = time.perf_counter() - pipeline_start
     
-    # 7. Guardar modelo
-    save_model(model, None, feature_cols, metrics)
+    # 9. Visualizaciones en segundo plano
+    report = start_report_process() if plots else None
+    
+    if compacted is not None:
+        compaction_report(model, 'model.pkl', compacted, COMPACT_MODEL_FILE, X_test, y_test)
+    
+    if report is not None:
+        report.join()
+        if report.exitcode != 0:
+            print(f"\n⚠️  Falló el renderizado de gráficos (exit code {report.exitcode})")
+    total = time.perf_counter() - pipeline_start
     
     print("\n" + "="*60)
     print("✅ ENTRENAMIENTO COMPLETADO EXITOSAMENTE")
@@ -286,10 +525,27 @@ def main():
     print("\nArchivos generados:")
     print("   • model.pkl")
     print("   • model_metadata.pkl")
-    print("   • feature_importance.png")
-    print("   • predictions_analysis.png")
+    if distill:
+        print("   • model_fast.pkl")
+    if compact:
+        print(f"   • {COMPACT_MODEL_FILE}")
+    if plots:
+        print("   • feature_importance.png")
+        print("   • predictions_analysis.png")
+    print(f"\n⏱️  Tiempo hasta el artefacto: {time_to_artifact:.2f} s | pipeline total: {total:.2f} s")
     print("\n🚀 El modelo está listo para ser usado en producción!")
+    
+    return {'time_to_artifact_s': time_to_artifact, 'total_s': total}
 
 
 if __name__ == "__main__":
-    main()
+    # --distill: entrenar además el modelo rápido (tier "fast" de la API)
+    # --compact: generar además el artefacto compacto (MODEL_COMPACT=1 en la API)
+    # --no-plots: no renderizar gráficos (reentrenamientos headless)
+    # --validation=oob|kfold|none: validación del bosque (por defecto out-of-bag)
+    validation = DEFAULT_VALIDATION
+    for arg in sys.argv[1:]:
+        if arg.startswith('--validation='):
+            validation = arg.split('=', 1)[1]
+    main(distill='--distill' in sys.argv, compact='--compact' in sys.argv,
+         plots='--no-plots' not in sys.argv, validation=validation)
@@ -0,0 +1,468 @@
+"""
+Ejecutor local del workflow de n8n (sin n8n corriendo)
+Carga un workflow de n8n_workflows/ (por defecto workflow_v1_basic.json) y
+recorre su grafo de nodos en Python, con timing por nodo. La llamada a /predict puede ir por HTTP o
+in-process contra la app FastAPI (ASGI).
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+
+WORKFLOW_PATH = os.path.join(
+    os.path.dirname(__file__), '..', 'n8n_workflows', 'workflow_v1_basic.json'
+)
+ALERT_WORKFLOW_PATH = os.path.join(
+    os.path.dirname(__file__), '..', 'n8n_workflows', 'workflow_v2_alert_callback.json'
+)
+ML_MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'ml_model')
+
+EXPRESSION = re.compile(r'^=\{\{(.*)\}\}$', re.DOTALL)
+JSON_PATH = re.compile(r'\$json((?:\.[A-Za-z_][A-Za-z0-9_]*)*)')
+
+
+class WorkflowError(Exception):
+    """Error de ejecución de un nodo (n8n respondería 500)"""
+
+
+# ---------------------------------------------------------------------------
+# Helpers de semántica JavaScript usados por los nodos portados
+# ---------------------------------------------------------------------------
+
+def _js_iso_now() -> str:
+    """new Date().toISOString()"""
+    now = datetime.now(timezone.utc)
+    return now.strftime('%Y-%m-%dT%H:%M:%S.') + f"{now.microsecond // 1000:03d}Z"
+
+
+def _js_number(value):
+    """Coerción numérica de JS para comparaciones (<, >)"""
+    if value is None:
+        return 0.0
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.strip()) if value.strip() else 0.0
+        except ValueError:
+            return math.nan
+    return math.nan
+
+
+def _js_str(value) -> str:
+    """Interpolación `${value}` de JS"""
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (dict, list)):
+        return '[object Object]' if isinstance(value, dict) else ','.join(_js_str(v) for v in value)
+    return str(value)
+
+
+# ---------------------------------------------------------------------------
+# Nodos "Function" portados desde su functionCode (JavaScript)
+# ---------------------------------------------------------------------------
+
+def validar_datos(item: dict) -> dict:
+    """Port de "Validar Datos" """
+    required_fields = [
+        'poza_id',
+        'days_evaporation',
+        'temperature_c',
+        'humidity_percent',
+        'ph',
+        'conductivity_ms_cm',
+        'density_g_cm3'
+    ]
+
+    data = item['body']
+    errors = []
+
+    # Verificar campos requeridos
+    for field in required_fields:
+        if data.get(field) is None:
+            errors.append(f"Campo requerido faltante: {field}")
+
+    # Validar rangos
+    valid_ranges = {
+        'days_evaporation': (0, 365),
+        'temperature_c': (-15, 35),
+        'humidity_percent': (0, 100),
+        'ph': (0, 14),
+        'conductivity_ms_cm': (0, 200),
+        'density_g_cm3': (1.0, 1.5)
+    }
+
+    for field, (min_val, max_val) in valid_ranges.items():
+        # `value !== undefined`: null sí se compara (y JS lo coerciona a 0)
+        if field not in data:
+            continue
+        value = data[field]
+        number = _js_number(value)
+        if number < min_val or number > max_val:
+            errors.append(f"{field}={_js_str(value)} fuera de rango [{_js_str(min_val)}, {_js_str(max_val)}]")
+
+    # Agregar timestamp si no existe
+    if not data.get('timestamp'):
+        data['timestamp'] = _js_iso_now()
+
+    return {
+        'valid': len(errors) == 0,
+        'errors': errors,
+        'data': data,
+        'validation_time': _js_iso_now()
+    }
+
+
+def formatear_alerta(item: dict) -> dict:
+    """Port de "Formatear Alerta" """
+    prediction = item
+    alert = prediction.get('alert') or {}
+    warnings = prediction.get('warnings') or []
+
+    message = (
+        "🚨 ALERTA - Alta Concentración de Litio\n"
+        "\n"
+        f"📍 Poza: {_js_str(prediction.get('poza_id'))}\n"
+        f"⏰ Timestamp: {_js_str(prediction.get('timestamp'))}\n"
+        "\n"
+        "📊 RESULTADOS:\n"
+        f"• Concentración predicha: {_js_str(prediction.get('predicted_concentration_mg_l'))} mg/L\n"
+        f"• Estado de calidad: {_js_str(prediction.get('quality_status'))}\n"
+        f"• Confianza: {_js_str(prediction.get('confidence'))}\n"
+        f"• Estado de alerta: {_js_str(alert.get('state'))} ({_js_str(alert.get('transition'))})\n"
+        "\n"
+        "💡 RECOMENDACIÓN:\n"
+        f"{_js_str(prediction.get('recommendation'))}\n"
+        "\n"
+        "⚠️ ADVERTENCIAS:\n"
+        f"{chr(10).join(warnings) if len(warnings) > 0 else 'Ninguna'}\n"
+        "\n"
+        f"🔧 Modelo: {_js_str(prediction.get('model_version'))}\n"
+        "\n"
+        "---\n"
+        "Sistema de Monitoreo Inteligente - Galan Lithium HMW"
+    )
+
+    return {
+        'subject': f"🚨 ALERTA: {_js_str(prediction.get('poza_id'))} - "
+                   f"Li {_js_str(prediction.get('predicted_concentration_mg_l'))} mg/L",
+        'message': message,
+        'prediction': prediction,
+        'alert_level': 'HIGH',
+        'timestamp': _js_iso_now()
+    }
+
+
+def log_normal(item: dict) -> dict:
+    """Port de "Log Normal" """
+    prediction = item
+    return {
+        'subject': f"📊 Monitor: {_js_str(prediction.get('poza_id'))} - "
+                   f"Li {_js_str(prediction.get('predicted_concentration_mg_l'))} mg/L",
+        'message': "Concentración normal. Continuar evaporación.",
+        'prediction': prediction,
+        'alert_level': 'NORMAL',
+        'timestamp': _js_iso_now()
+    }
+
+
+def extraer_prediccion(item: dict) -> dict:
+    """Port de "Extraer Predicción" (workflow de alertas desde la API)"""
+    return item['body']
+
+
+def log_consola(item: dict, verbose: bool = False) -> dict:
+    """Port de "Log Consola" / "Log Consola Normal" (console.log y pasa el item)"""
+    if verbose:
+        pred = item['prediction']
+        print(f"[{item['alert_level']}] {pred['poza_id']}: "
+              f"{_js_str(pred['predicted_concentration_mg_l'])} mg/L | {pred['quality_status']}")
+    return item
+
+
+# Nombre de nodo -> (función portada, sha1 del functionCode que se portó)
+PORTED_FUNCTIONS = {
+    'Validar Datos': (validar_datos, '9ad5a4001402715fb293285d1958af28a34c2cd9'),
+    'Formatear Alerta': (formatear_alerta, '9cbe7feaa6d18e545ec696d8c7c67e8658bff095'),
+    'Log Consola': (log_consola, '92237156b81768c829db1a6a63da32b6d28cb0db'),
+    'Log Normal': (log_normal, '4726d1f5ec99967c1ee94f9de9313c3afaa18766'),
+    'Log Consola Normal': (log_consola, 'b36e9609811e535d40b86b1044d3162a55a3ab39'),
+    'Extraer Predicción': (extraer_prediccion, 'd7958f1029b5e781f11ef48b4c50a178b5648019'),
+}
+
+
+# ---------------------------------------------------------------------------
+# Expresiones n8n ({{ $json.campo }})
+# ---------------------------------------------------------------------------
+
+def _resolve_path(item: dict, path: str):
+    value = item
+    for key in filter(None, path.split('.')):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def evaluate_expression(expression, item: dict):
+    """Evaluar un parámetro: literal, `={{ $json.a.b }}` u objeto literal con $json"""
+    if not isinstance(expression, str):
+        return expression
+    match = EXPRESSION.match(expression)
+    if match is None:
+        return expression
+
+    inner = match.group(1).strip()
+    path = JSON_PATH.fullmatch(inner)
+    if path is not None:
+        return _resolve_path(item, path.group(1))
+
+    # Objeto literal, p.ej. {{{ "status": "error", "errors": $json.errors }}}
+    literal = JSON_PATH.sub(lambda m: json.dumps(_resolve_path(item, m.group(1))), inner)
+    try:
+        return json.loads(literal)
+    except json.JSONDecodeError as e:
+        raise WorkflowError(f"Expresión no soportada: {expression}") from e
+
+
+def _compare(operation: str, value1, value2) -> bool:
+    """Operaciones del nodo IF (v1)"""
+    if operation in ('equal', None):
+        return value1 == value2
+    if operation == 'notEqual':
+        return value1 != value2
+    if operation == 'larger':
+        return _js_number(value1) > _js_number(value2)
+    if operation == 'largerEqual':
+        return _js_number(value1) >= _js_number(value2)
+    if operation == 'smaller':
+        return _js_number(value1) < _js_number(value2)
+    if operation == 'smallerEqual':
+        return _js_number(value1) <= _js_number(value2)
+    if operation == 'contains':
+        return str(value2) in str(value1)
+    if operation == 'isEmpty':
+        return value1 in (None, '', [], {})
+    if operation == 'isNotEmpty':
+        return value1 not in (None, '', [], {})
+    raise WorkflowError(f"Operación IF no soportada: {operation}")
+
+
+# ---------------------------------------------------------------------------
+# Ejecutor
+# ---------------------------------------------------------------------------
+
+class ExecutionResult:
+    """Resultado de una ejecución: respuesta del webhook y timing por nodo"""
+
+    def __init__(self, status_code, body, node_timings, total_ms, path):
+        self.status_code = status_code
+        self.body = body
+        self.node_timings = node_timings   # [(nodo, ms)] en orden de ejecución
+        self.total_ms = total_ms
+        self.path = path                   # Nombres de nodos ejecutados
+
+
+class LocalWorkflowExecutor:
+    """
+    Ejecuta el workflow de n8n en proceso.
+
+    `api_mode="inprocess"` llama a la app FastAPI vía ASGI (TestClient, con
+    lifespan: carga el modelo al entrar); `api_mode="http"` usa la URL del
+    nodo HTTP tal cual (API corriendo en :8000).
+    """
+
+    def __init__(self, workflow_path=WORKFLOW_PATH, api_mode='inprocess', verbose=False):
+        with open(workflow_path) as f:
+            self.workflow = json.load(f)
+
+        self.nodes = {node['name']: node for node in self.workflow['nodes']}
+        self.connections = self.workflow.get('connections', {})
+        self.api_mode = api_mode
+        self.verbose = verbose
+        self.drift = self._check_ported_functions()
+        self._client = None
+
+        webhooks = [n for n in self.nodes.values() if n['type'] == 'n8n-nodes-base.webhook']
+        if len(webhooks) != 1:
+            raise WorkflowError("El workflow debe tener exactamente un nodo Webhook")
+        self.entry = webhooks[0]['name']
+
+    def __enter__(self):
+        if self.api_mode == 'inprocess':
+            if ML_MODEL_DIR not in sys.path:
+                sys.path.insert(0, ML_MODEL_DIR)
+            from fastapi.testclient import TestClient
+            import api_model
+            self._client = TestClient(api_model.app)
+            self._client.__enter__()
+        else:
+            import requests
+            self._client = requests.Session()
+        return self
+
+    def __exit__(self, *exc):
+        if self.api_mode == 'inprocess':
+            self._client.__exit__(*exc)
+        else:
+            self._client.close()
+        self._client = None
+
+    def _check_ported_functions(self) -> list[str]:
+        """Nodos Function sin port o cuyo JS cambió desde que se portó"""
+        drift = []
+        for name, node in self.nodes.items():
+            if node['type'] != 'n8n-nodes-base.function':
+                continue
+            if name not in PORTED_FUNCTIONS:
+                drift.append(f"{name}: sin port en Python")
+                continue
+            expected = PORTED_FUNCTIONS[name][1]
+            code = node['parameters'].get('functionCode', '')
+            if hashlib.sha1(code.encode()).hexdigest() != expected:
+                drift.append(f"{name}: functionCode cambió desde el port")
+        return drift
+
+    def execute(self, body: dict) -> ExecutionResult:
+        """Ejecutar el workflow para un request al webhook"""
+        if self._client is None:
+            raise WorkflowError("Usar el ejecutor dentro de un bloque `with`")
+
+        start = time.perf_counter()
+        timings, path = [], []
+        response = {'status_code': None, 'body': None}
+
+        # El webhook entrega {headers, params, query, body}
+        stack = [(self.entry, [{'headers': {}, 'params': {}, 'query': {}, 'body': body}])]
+        try:
+            while stack:
+                name, items = stack.pop()
+                node = self.nodes[name]
+
+                node_start = time.perf_counter()
+                outputs = self._run_node(node, items, response)
+                timings.append((name, (time.perf_counter() - node_start) * 1000))
+                path.append(name)
+
+                # Orden v1: se sigue cada rama hasta el final antes de la siguiente
+                for index in reversed(range(len(outputs))):
+                    if not outputs[index]:
+                        continue
+                    targets = self.connections.get(name, {}).get('main', [])
+                    for target in reversed(targets[index] if index < len(targets) else []):
+                        stack.append((target['node'], outputs[index]))
+
+        except WorkflowError as e:
+            response = {'status_code': 500, 'body': {'message': str(e)}}
+
+        if response['status_code'] is None:
+            response = {'status_code': 500, 'body': {'message': 'Workflow terminó sin responder'}}
+
+        return ExecutionResult(
+            response['status_code'], response['body'], timings,
+            (time.perf_counter() - start) * 1000, path
+        )
+
+    def _run_node(self, node: dict, items: list, response: dict) -> list:
+        """Ejecutar un nodo; devuelve lista de salidas (cada una, lista de items)"""
+        node_type = node['type']
+        params = node.get('parameters', {})
+
+        if node_type == 'n8n-nodes-base.webhook':
+            # responseMode "onReceived": n8n responde apenas recibe el request
+            if params.get('responseMode', 'onReceived') == 'onReceived':
+                response['status_code'] = 200
+                response['body'] = {'message': 'Workflow was started'}
+            return [items]
+
+        if node_type == 'n8n-nodes-base.function':
+            func = PORTED_FUNCTIONS[node['name']][0]
+            if func is log_consola:
+                return [[func(item, self.verbose) for item in items]]
+            return [[func(item) for item in items]]
+
+        if node_type == 'n8n-nodes-base.if':
+            true_items, false_items = [], []
+            for item in items:
+                (true_items if self._if_matches(params, item) else false_items).append(item)
+            return [true_items, false_items]
+
+        if node_type == 'n8n-nodes-base.httpRequest':
+            return [[self._http_request(params, item) for item in items]]
+
+        if node_type == 'n8n-nodes-base.respondToWebhook':
+            item = items[0]
+            response['status_code'] = 200
+            response['body'] = evaluate_expression(params.get('responseBody'), item)
+            return [items]
+
+        raise WorkflowError(f"Tipo de nodo no soportado: {node_type}")
+
+    def _if_matches(self, params: dict, item: dict) -> bool:
+        """Nodo IF v1: todas las condiciones (combineOperation 'all' por defecto)"""
+        results = []
+        for conditions in params.get('conditions', {}).values():
+            for condition in conditions:
+                value1 = evaluate_expression(condition.get('value1'), item)
+                value2 = evaluate_expression(condition.get('value2'), item)
+                results.append(_compare(condition.get('operation'), value1, value2))
+        if params.get('combineOperation') == 'any':
+            return any(results)
+        return all(results)
+
+    def _http_request(self, params: dict, item: dict) -> dict:
+        """Nodo HTTP Request (POST con body JSON)"""
+        url = evaluate_expression(params['url'], item)
+        payload = evaluate_expression(params.get('jsonBody'), item)
+        method = params.get('method', 'GET').lower()
+
+        kwargs = {'timeout': 10} if self.api_mode == 'http' else {}
+        result = getattr(self._client, method)(url, json=payload, **kwargs)
+        if result.status_code >= 400:
+            raise WorkflowError(f"HTTP {result.status_code} en {url}: {result.text}")
+        return result.json()
+
+
+def node_timing_summary(results: list) -> dict:
+    """Latencia media y p99 por nodo sobre varias ejecuciones"""
+    per_node = {}
+    for result in results:
+        for name, ms in result.node_timings:
+            per_node.setdefault(name, []).append(ms)
+    summary = {}
+    for name, samples in per_node.items():
+        samples.sort()
+        summary[name] = {
+            'count': len(samples),
+            'mean_ms': sum(samples) / len(samples),
+            'p99_ms': samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        }
+    return summary
+
+
+if __name__ == "__main__":
+    # Ejecución de prueba: una lectura a través del workflow con la API in-process
+    payload = json.loads(sys.argv[1]) if len(sys.argv) > 1 else {
+        "poza_id": "POZA_1", "days_evaporation": 100, "temperature_c": 25,
+        "humidity_percent": 15, "ph": 7.8, "conductivity_ms_cm": 120, "density_g_cm3": 1.2
+    }
+    with LocalWorkflowExecutor(verbose=True) as executor:
+        for warning in executor.drift:
+            print(f"⚠️  {warning}")
+        result = executor.execute(payload)
+    print(f"HTTP {result.status_code} en {result.total_ms:.2f} ms")
+    print(json.dumps(result.body, indent=2, ensure_ascii=False))
+    print("\nTiming por nodo:")
+    for name, ms in result.node_timings:
+        print(f"   {name:<24} {ms:8.3f} ms")
@@ -0,0 +1,511 @@
+"""
+Motor de escenarios del simulador: carga reproducible a partir de un perfil declarativo
+Un perfil (dict o JSON, ver scenario.example.json) describe llegadas de
+lecturas (cadencia fija, Poisson o Poisson con ráfagas), ciclo diario de
+temperatura y humedad, bombeos y cosechas que reinician `days_evaporation`
+y cortes del enlace; durante un corte las lecturas quedan en el buffer y se
+reenvían al volver. Todo corre sobre un reloj virtual acelerado (`speed`
+segundos virtuales por segundo real) y con una semilla: la misma semilla
+genera exactamente las mismas lecturas (`fingerprint` del informe), sea
+cual sea el destino. El informe compara la carga ofrecida con la entregada
+por hora y por minuto, y el backlog y su reenvío después de cada corte.
+
+    python sensor_simulator.py scenario --profile=scenario.example.json --sink=gateway --speed=600
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import random
+import time
+from bisect import bisect_right
+from collections import Counter, deque
+from datetime import datetime, timedelta
+
+from sensor_simulator import (
+    GATEWAY_BATCH_SIZE, GATEWAY_MAX_BUFFER, GATEWAY_MAX_DELAY_S, GATEWAY_URL, INTERVAL_SECONDS, NUM_POZAS,
+    FieldGateway, SimulatedLink, generate_sensor_reading, is_alert, print_gateway_stats
+)
+
+ARRIVAL_PROCESSES = ('fixed', 'poisson', 'bursty')
+EVENT_TYPES = ('pump', 'harvest')
+SINKS = ('dry', 'direct', 'gateway')
+HARVEST_AT_DAYS = 179  # Como continuous_monitoring: al completar el ciclo se cosecha y se reinicia
+
+DEFAULT_PROFILE = {
+    'name': 'default',
+    'seed': 42,
+    'start': '2025-01-15T00:00:00',  # Hora virtual de inicio (timestamps de las lecturas)
+    'duration_h': 24,
+    'speed': 60,                     # Segundos virtuales por segundo real; 0 = sin esperar
+    'pozas': NUM_POZAS,
+    'arrivals': {
+        'process': 'poisson',        # fixed | poisson | bursty
+        'interval_s': INTERVAL_SECONDS,  # Intervalo medio por poza
+        'burst_factor': 10,          # bursty: la tasa se multiplica durante una ráfaga...
+        'burst_s': 120,              # ...de duración media burst_s...
+        'gap_s': 3600                # ...separadas en promedio por gap_s
+    },
+    'weather': {
+        'temperature_c': {'mean': 12, 'amplitude': 12, 'peak_hour': 15, 'noise': 1.0, 'min': -10, 'max': 30},
+        'humidity_percent': {'mean': 20, 'amplitude': 12, 'peak_hour': 5, 'noise': 2.0, 'min': 5, 'max': 40}
+    },
+    'evaporation': {'days_per_day': 1.0, 'start_days': [30, 150]},
+    # [{'type': 'pump' | 'harvest', 'at_h': 6, 'poza': 'POZA_1' | '*', 'days': 30, 'every_h': opcional}]
+    'events': [],
+    # [{'at_h': 8, 'duration_min': 45, 'every_h': opcional}]
+    'outages': [],
+    'gateway': {'batch_size': GATEWAY_BATCH_SIZE, 'max_delay_s': GATEWAY_MAX_DELAY_S},
+    'tick_s': 10,                    # Cada cuánto se intenta enviar aunque no lleguen lecturas
+    'report_every_min': 60
+}
+
+
+def load_profile(profile=None, **overrides) -> dict:
+    """Perfil (dict o ruta a un JSON) sobre DEFAULT_PROFILE; `overrides` con valor None se ignoran"""
+    if isinstance(profile, str):
+        with open(profile) as f:
+            profile = json.load(f)
+    merged = json.loads(json.dumps(DEFAULT_PROFILE))
+    for key, value in {**(profile or {}), **{k: v for k, v in overrides.items() if v is not None}}.items():
+        if key not in merged:
+            raise ValueError(f"Clave desconocida en el perfil: {key}")
+        if isinstance(merged[key], dict) and isinstance(value, dict):
+            for name, inner in value.items():
+                merged[key][name] = {**merged[key][name], **inner} if isinstance(merged[key].get(name), dict) else inner
+        else:
+            merged[key] = value
+
+    if merged['arrivals']['process'] not in ARRIVAL_PROCESSES:
+        raise ValueError(f"Proceso de llegadas desconocido: {merged['arrivals']['process']}. "
+                         f"Opciones: {', '.join(ARRIVAL_PROCESSES)}")
+    for event in merged['events']:
+        if event.get('type') not in EVENT_TYPES:
+            raise ValueError(f"Evento desconocido: {event.get('type')}. Opciones: {', '.join(EVENT_TYPES)}")
+    return merged
+
+
+def expand_schedule(items, duration_s) -> list[tuple[float, dict]]:
+    """(segundo virtual, item) de eventos o cortes, repitiendo los que tienen `every_h`"""
+    schedule = []
+    for item in items:
+        at = item.get('at_h', 0) * 3600
+        every = item.get('every_h', 0) * 3600
+        while at < duration_s:
+            schedule.append((at, item))
+            if not every:
+                break
+            at += every
+    return sorted(schedule, key=lambda entry: entry[0])
+
+
+class VirtualClock:
+    """
+    Reloj virtual: avanza a saltos hasta el próximo suceso. Con `speed` > 0 cada
+    salto espera el tiempo real equivalente; si el destino no da abasto el
+    reloj se atrasa y `max_lag_s` registra el atraso (en segundos virtuales).
+    Se llama como time.monotonic, así lo usan FieldGateway y SimulatedLink.
+    """
+
+    def __init__(self, speed=0):
+        self.speed = speed
+        self.now = 0.0
+        self.max_lag_s = 0.0
+        self.start()
+
+    def start(self):
+        """El segundo virtual actual corresponde a este instante real"""
+        self._real_start = time.monotonic() - self.now / self.speed if self.speed else time.monotonic()
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance_to(self, t: float):
+        self.now = max(self.now, t)
+        if not self.speed:
+            return
+        delay = self._real_start + t / self.speed - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            self.max_lag_s = max(self.max_lag_s, -delay * self.speed)
+
+
+class ScenarioLink(SimulatedLink):
+    """Enlace con los cortes del perfil: caído en cada ventana [inicio, fin) de tiempo virtual"""
+
+    def __init__(self, windows, clock):
+        super().__init__(sleep=False, clock=clock)
+        self.windows = []
+        for start, end in sorted(windows):
+            # Cortes superpuestos (uno periódico y otro puntual) se unen en una sola ventana
+            if self.windows and start <= self.windows[-1][1]:
+                self.windows[-1] = (self.windows[-1][0], max(self.windows[-1][1], end))
+            else:
+                self.windows.append((start, end))
+        self._starts = [start for start, _ in self.windows]
+
+    def is_up(self) -> bool:
+        i = bisect_right(self._starts, self.clock()) - 1
+        return i < 0 or self.clock() >= self.windows[i][1]
+
+
+class DirectSink:
+    """
+    Una lectura por request (`send(lectura)` devuelve el dict de
+    send_sensor_data). Con el enlace caído o la API sin responder las
+    lecturas esperan en una cola local y se reenvían en orden al volver; un
+    4xx (salvo 429) descarta la lectura como rechazada.
+    """
+
+    def __init__(self, send, link, max_buffer=GATEWAY_MAX_BUFFER):
+        self.send = send
+        self.link = link
+        self._buffer = deque(maxlen=max_buffer)
+        self.readings = 0
+        self.delivered = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.alerts = 0
+        self.failed_sends = 0
+        self.last_error = None
+
+    @property
+    def backlog(self) -> int:
+        return len(self._buffer)
+
+    def add(self, reading: dict):
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(reading)
+        self.readings += 1
+
+    def pump(self) -> int:
+        sent = 0
+        while self._buffer and self.link.is_up():
+            result = self.send(self._buffer[0])
+            if not result['success']:
+                status = result.get('status_code')
+                self.last_error = result.get('error') or result.get('message')
+                if status is not None and 400 <= status < 500 and status != 429:
+                    self._buffer.popleft()
+                    self.rejected += 1
+                    continue
+                self.failed_sends += 1
+                break
+            self._buffer.popleft()
+            self.delivered += 1
+            if is_alert(result['data']):
+                self.alerts += 1
+            sent += 1
+        return sent
+
+    def flush(self) -> bool:
+        """Enviar todo el buffer; False si quedaron lecturas sin entregar"""
+        self.pump()
+        return not self._buffer
+
+    def stats(self) -> dict:
+        return {
+            'readings': self.readings, 'delivered': self.delivered, 'rejected': self.rejected,
+            'dropped': self.dropped, 'backlog': self.backlog, 'alerts': self.alerts,
+            'failed_sends': self.failed_sends, 'last_error': self.last_error
+        }
+
+    def close(self):
+        pass
+
+
+def _dry_send(reading: dict) -> dict:
+    """Destino sin red: toda lectura se entrega al instante (planificación y tests)"""
+    return {'success': True, 'data': {}}
+
+
+class ScenarioEngine:
+    """
+    Reproduce un perfil sobre un destino (`sink`): DirectSink o FieldGateway.
+
+    Las llegadas de cada poza se generan por thinning de un proceso de
+    Poisson a la tasa máxima, así la misma semilla da los mismos instantes
+    con o sin ráfagas. Llegadas, ráfagas y valores de las lecturas usan
+    generadores separados: cambiar el clima no mueve las llegadas.
+    """
+
+    def __init__(self, profile: dict, sink=None, clock=None, verbose=True):
+        self.profile = profile
+        self.clock = clock or VirtualClock(profile['speed'])
+        self.duration_s = profile['duration_h'] * 3600
+        self.start = datetime.fromisoformat(profile['start'])
+        self.verbose = verbose
+
+        seed = profile['seed']
+        self._arrival_rng = random.Random(f"{seed}:arrivals")
+        self._value_rng = random.Random(f"{seed}:values")
+
+        self.outage_windows = [(at, at + item['duration_min'] * 60)
+                               for at, item in expand_schedule(profile['outages'], self.duration_s)]
+        self.link = ScenarioLink(self.outage_windows, self.clock)
+        self.sink = sink or DirectSink(_dry_send, self.link)
+
+        arrivals = profile['arrivals']
+        self.base_rate = 1 / arrivals['interval_s']
+        self.bursts = self._burst_windows(random.Random(f"{seed}:bursts")) if arrivals['process'] == 'bursty' else []
+        self._burst_starts = [start for start, _ in self.bursts]
+        self.max_rate = self.base_rate * (arrivals['burst_factor'] if self.bursts else 1)
+
+        self.pozas = {}
+        low, high = profile['evaporation']['start_days']
+        for i in range(profile['pozas']):
+            self.pozas[f"POZA_{i+1}"] = {'days0': self._value_rng.uniform(low, high), 't0': 0.0}
+
+    # --- Modelo del escenario ------------------------------------------------
+
+    def _burst_windows(self, rng) -> list[tuple[float, float]]:
+        arrivals = self.profile['arrivals']
+        windows, t = [], rng.expovariate(1 / arrivals['gap_s'])
+        while t < self.duration_s:
+            length = rng.expovariate(1 / arrivals['burst_s'])
+            windows.append((t, t + length))
+            t += length + rng.expovariate(1 / arrivals['gap_s'])
+        return windows
+
+    def rate(self, t: float) -> float:
+        """Lecturas por segundo virtual de cada poza en `t`"""
+        i = bisect_right(self._burst_starts, t) - 1
+        if i >= 0 and t < self.bursts[i][1]:
+            return self.base_rate * self.profile['arrivals']['burst_factor']
+        return self.base_rate
+
+    def next_arrival(self, t: float) -> float:
+        rng = self._arrival_rng
+        if self.profile['arrivals']['process'] == 'fixed':
+            return t + 1 / self.base_rate
+        while True:
+            t += rng.expovariate(self.max_rate)
+            if self.max_rate == self.base_rate or rng.random() * self.max_rate < self.rate(t):
+                return t
+
+    def weather(self, t: float) -> dict:
+        """Temperatura y humedad con ciclo diario (coseno con máximo en peak_hour) y ruido"""
+        hour = (self.start.hour + self.start.minute / 60 + t / 3600) % 24
+        values = {}
+        for name, spec in self.profile['weather'].items():
+            value = spec['mean'] + spec['amplitude'] * math.cos(2 * math.pi * (hour - spec['peak_hour']) / 24)
+            value += self._value_rng.gauss(0, spec['noise'])
+            values[name] = min(max(value, spec['min']), spec['max'])
+        return values
+
+    def days(self, poza_id: str, t: float) -> float:
+        state = self.pozas[poza_id]
+        return state['days0'] + (t - state['t0']) / 86400 * self.profile['evaporation']['days_per_day']
+
+    def reset(self, poza_id: str, t: float, days: float, kind: str, events: list):
+        events.append({'at_h': round(t / 3600, 3), 'type': kind, 'poza': poza_id,
+                       'days_before': round(self.days(poza_id, t), 1), 'days': round(days, 1)})
+        self.pozas[poza_id] = {'days0': days, 't0': t}
+        if self.verbose:
+            label = '💧 Bombeo' if kind == 'pump' else '🧂 Cosecha'
+            print(f"   {label} en {poza_id} a las {self.timestamp(t):%d/%m %H:%M}: "
+                  f"{events[-1]['days_before']} → {events[-1]['days']} días")
+
+    def reading(self, poza_id: str, t: float, events: list) -> dict:
+        if self.days(poza_id, t) >= HARVEST_AT_DAYS:
+            self.reset(poza_id, t, self._value_rng.uniform(30, 60), 'harvest', events)
+        return generate_sensor_reading(
+            poza_id, self.days(poza_id, t), rng=self._value_rng,
+            timestamp=self.timestamp(t), weather=self.weather(t)
+        )
+
+    def timestamp(self, t: float) -> datetime:
+        return self.start + timedelta(seconds=t)
+
+    # --- Reproducción --------------------------------------------------------
+
+    def run(self) -> dict:
+        heap = []
+        for n, poza_id in enumerate(self.pozas):
+            # Cadencia fija: cada poza con su propia fase
+            first = (self._arrival_rng.uniform(0, 1 / self.base_rate) if self.profile['arrivals']['process'] == 'fixed'
+                     else self.next_arrival(0.0))
+            heap.append((first, 1, n, 'reading', poza_id))
+        for n, (at, event) in enumerate(expand_schedule(self.profile['events'], self.duration_s)):
+            heap.append((at, 0, n, 'event', event))
+        heap.append((0.0, 2, 0, 'tick', None))
+        heapq.heapify(heap)
+
+        digest = hashlib.sha256()
+        offered, delivered = Counter(), Counter()
+        backlog_max = Counter()
+        events, outages = [], []
+        replay = None
+        link_up = True
+        last_delivered = self.sink.delivered
+        self.clock.start()
+        real_start = time.perf_counter()
+
+        while heap and heap[0][0] <= self.duration_s:
+            t, order, n, kind, data = heapq.heappop(heap)
+            self.clock.advance_to(t)
+            minute = int(t // 60)
+
+            if kind == 'reading':
+                reading = self.reading(data, t, events)
+                digest.update(json.dumps(reading, sort_keys=True).encode())
+                self.sink.add(reading)
+                offered[minute] += 1
+                heapq.heappush(heap, (self.next_arrival(t), order, n, kind, data))
+            elif kind == 'event':
+                targets = list(self.pozas) if data.get('poza', '*') == '*' else [data['poza']]
+                for poza_id in targets:
+                    self.reset(poza_id, t, data.get('days', 30), data['type'], events)
+            else:
+                heapq.heappush(heap, (t + self.profile['tick_s'], order, n, kind, data))
+
+            # Cortes: backlog acumulado y cuánto tarda en reenviarse al volver el enlace
+            if self.link.is_up() != link_up:
+                link_up = not link_up
+                if not link_up:
+                    outages.append({'start_h': round(t / 3600, 3), 'backlog': 0, 'replay_s': None,
+                                    'replay_real_s': None})
+                    if self.verbose:
+                        print(f"   📴 Enlace caído a las {self.timestamp(t):%d/%m %H:%M}")
+                else:
+                    outages[-1].update(duration_min=round((t - outages[-1]['start_h'] * 3600) / 60, 1),
+                                       backlog=self.sink.backlog)
+                    replay = {'t': t, 'real': time.perf_counter()}
+                    if self.verbose:
+                        print(f"   📶 Enlace restablecido a las {self.timestamp(t):%d/%m %H:%M} | "
+                              f"backlog: {self.sink.backlog} lecturas")
+
+            self.sink.pump()
+            delivered[minute] += self.sink.delivered - last_delivered
+            last_delivered = self.sink.delivered
+            backlog_max[minute] = max(backlog_max[minute], self.sink.backlog)
+            if replay is not None and not self.sink.backlog:
+                outages[-1].update(replay_s=round(self.clock() - replay['t'], 1),
+                                   replay_real_s=round(time.perf_counter() - replay['real'], 3))
+                replay = None
+
+        # Fin del escenario: lo que quedó en el buffer sale aunque no complete un lote
+        self.clock.advance_to(self.duration_s)
+        while self.sink.backlog and self.link.is_up() and self.sink.flush():
+            pass
+        minute = int(self.duration_s // 60)
+        delivered[minute] += self.sink.delivered - last_delivered
+        real_s = time.perf_counter() - real_start
+        return self.report(offered, delivered, backlog_max, events, outages, digest.hexdigest()[:16], real_s)
+
+    def report(self, offered, delivered, backlog_max, events, outages, fingerprint, real_s) -> dict:
+        bucket_min = self.profile['report_every_min']
+        buckets = []
+        for start in range(0, math.ceil(self.duration_s / 60) + 1, bucket_min):
+            minutes = range(start, start + bucket_min)
+            buckets.append({
+                'start': self.timestamp(start * 60).isoformat(timespec='minutes'),
+                'offered': sum(offered[m] for m in minutes),
+                'delivered': sum(delivered[m] for m in minutes),
+                'backlog_max': max(backlog_max[m] for m in minutes)
+            })
+        if buckets and not any(buckets[-1][key] for key in ('offered', 'delivered', 'backlog_max')):
+            buckets.pop()
+
+        total_offered = sum(offered.values())
+        stats = self.sink.stats()
+        return {
+            'scenario': self.profile['name'],
+            'seed': self.profile['seed'],
+            'fingerprint': fingerprint,
+            'sink': type(self.sink).__name__,
+            'process': self.profile['arrivals']['process'],
+            'duration_h': self.profile['duration_h'],
+            'speed': self.profile['speed'],
+            'real_s': round(real_s, 3),
+            'achieved_speed': round(self.duration_s / real_s, 1) if real_s else None,
+            'max_lag_s': round(self.clock.max_lag_s, 1),
+            'offered': total_offered,
+            'delivered': stats['delivered'],
+            'rejected': stats['rejected'],
+            'dropped': stats['dropped'],
+            'backlog': stats['backlog'],
+            'alerts': stats['alerts'],
+            'offered_per_min': {'mean': round(total_offered / max(self.duration_s / 60, 1), 2),
+                                'peak': max(offered.values(), default=0)},
+            'delivered_per_min': {'mean': round(sum(delivered.values()) / max(self.duration_s / 60, 1), 2),
+                                  'peak': max(delivered.values(), default=0)},
+            'offered_rps_real': round(total_offered / real_s, 1) if real_s else None,
+            'delivered_rps_real': round(stats['delivered'] / real_s, 1) if real_s else None,
+            'bursts': len(self.bursts),
+            'events': events,
+            'outages': outages,
+            'buckets': buckets,
+            'sink_stats': stats
+        }
+
+
+def speed_label(speed) -> str:
+    return f"x{speed:g}" if speed else "x∞ (sin esperar)"
+
+
+def print_scenario_report(report: dict):
+    """Carga ofrecida vs entregada por intervalo, cortes y reenvíos"""
+    print(f"\n{'Desde':<17} {'Ofrecidas':>10} {'Entregadas':>11} {'Backlog máx':>12}")
+    print("-" * 54)
+    for bucket in report['buckets']:
+        print(f"{bucket['start']:<17} {bucket['offered']:>10,} {bucket['delivered']:>11,} {bucket['backlog_max']:>12,}")
+    print("-" * 54)
+    print(f"{'Total':<17} {report['offered']:>10,} {report['delivered']:>11,}")
+    print(f"\n   📈 Por minuto virtual: ofrecidas media {report['offered_per_min']['mean']} / pico "
+          f"{report['offered_per_min']['peak']} | entregadas media {report['delivered_per_min']['mean']} / pico "
+          f"{report['delivered_per_min']['peak']}")
+    print(f"   ⏱️  {report['duration_h']} h virtuales en {report['real_s']:.1f} s reales "
+          f"(x{report['achieved_speed']:,.0f}; pedido {speed_label(report['speed'])}, atraso máx {report['max_lag_s']} s) | "
+          f"real: {report['offered_rps_real']} ofrecidas/s, {report['delivered_rps_real']} entregadas/s")
+    print(f"   📦 Rechazadas: {report['rejected']} | Descartadas: {report['dropped']} | "
+          f"En buffer al final: {report['backlog']} | Alertas: {report['alerts']} | Ráfagas: {report['bursts']}")
+    for outage in report['outages']:
+        replay = (f"reenviado en {outage['replay_s']} s virtuales ({outage['replay_real_s']} s reales)"
+                  if outage['replay_s'] is not None else "sin terminar de reenviar")
+        print(f"   🔁 Corte de {outage.get('duration_min', '?')} min desde h {outage['start_h']}: "
+              f"backlog {outage['backlog']} lecturas, {replay}")
+    print(f"   🔑 Semilla {report['seed']} → fingerprint {report['fingerprint']}")
+
+
+def run_scenario(profile: dict, sink='dry', send=None, url=GATEWAY_URL, encoding='gzip', verbose=True) -> dict:
+    """
+    Reproducir `profile` contra un destino:
+      dry      sin red, cada lectura se entrega al instante
+      direct   una lectura por request con `send` (webhook de n8n o /ingest)
+      gateway  lotes NDJSON comprimidos a /ingest/batch (FieldGateway)
+    """
+    if sink not in SINKS:
+        raise ValueError(f"Destino desconocido: {sink}. Opciones: {', '.join(SINKS)}")
+    clock = VirtualClock(profile['speed'])
+    engine = ScenarioEngine(profile, clock=clock, verbose=verbose)
+    if sink == 'gateway':
+        engine.sink = FieldGateway(url=url, encoding=encoding, batch_size=profile['gateway']['batch_size'],
+                                   max_delay_s=profile['gateway']['max_delay_s'], link=engine.link, clock=clock)
+    elif sink == 'direct':
+        engine.sink = DirectSink(send, engine.link)
+
+    if verbose:
+        arrivals = profile['arrivals']
+        print("=" * 80)
+        print(f"🎬 ESCENARIO '{profile['name']}' - semilla {profile['seed']}")
+        print("=" * 80)
+        print(f"🏊 Pozas: {profile['pozas']} | ⏱️  {profile['duration_h']} h virtuales a "
+              f"{speed_label(profile['speed'])} | Destino: {sink}")
+        print(f"📊 Llegadas: {arrivals['process']}, una lectura cada {arrivals['interval_s']} s por poza"
+              + (f" (ráfagas x{arrivals['burst_factor']})" if arrivals['process'] == 'bursty' else ""))
+        print(f"📅 Eventos: {len(profile['events'])} | 📴 Cortes: {len(engine.outage_windows)}")
+        print("=" * 80)
+    try:
+        report = engine.run()
+    finally:
+        engine.sink.close()
+    if verbose:
+        print_scenario_report(report)
+        if sink == 'gateway':
+            print_gateway_stats(report['sink_stats'])
+        print("=" * 80)
+    return report
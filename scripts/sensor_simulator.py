@@ -3,9 +3,11 @@ Simulador de Sensores IoT para Pozas de Evaporación
 Envía datos sintéticos al webhook de n8n cada X segundos
 """
 
-import requests
+import contextlib
+import gzip
 import time
 import random
+from collections import deque
 from datetime import datetime
 import json
 import sys
@@ -19,6 +21,18 @@ WEBHOOK_URLS = {
     'production': "http://localhost:5678/webhook/sensor-reading",
     'test': "http://localhost:5678/webhook-test/sensor-reading"
 }
+LOCAL_LABEL = "local (workflow en proceso, sin n8n)"
+
+# Ingesta directa a la API (un solo salto; la API avisa a n8n solo las alertas)
+DIRECT_INGEST_URL = "http://localhost:8000/ingest"
+USE_DIRECT_INGEST = False
+
+# Modo gateway: buffer local y lotes NDJSON comprimidos a /ingest/batch
+GATEWAY_URL = "http://localhost:8000/ingest/batch"
+GATEWAY_ENCODINGS = ('identity', 'gzip', 'zstd')
+GATEWAY_BATCH_SIZE = 500        # Lecturas por lote
+GATEWAY_MAX_DELAY_S = 60        # Edad máxima de la lectura más vieja antes de enviar
+GATEWAY_MAX_BUFFER = 100_000    # Con el buffer lleno se descarta la lectura más vieja
 
 # Rangos realistas basados en el modelo
 SENSOR_RANGES = {
@@ -35,36 +49,47 @@ SENSOR_RANGES = {
 
 def get_webhook_url(use_test_mode=True):
     """Retorna la URL del webhook según el modo"""
+    if USE_DIRECT_INGEST:
+        return DIRECT_INGEST_URL
     return WEBHOOK_URLS['test'] if use_test_mode else WEBHOOK_URLS['production']
 
 
-def generate_sensor_reading(poza_id: str, days: float) -> dict:
-    """Genera una lectura sintética de sensores"""
+def generate_sensor_reading(poza_id: str, days: float, rng=random, timestamp=None, weather=None) -> dict:
+    """
+    Genera una lectura sintética de sensores
+    
+    `rng` (un random.Random con semilla) y `timestamp` hacen la lectura
+    reproducible; `weather` fija temperatura y humedad (ciclo diario de los
+    escenarios) en lugar de sortearlas.
+    """
     
     # Generar valores con algo de correlación natural
     # (a más días, más concentración esperada)
     progress = (days - 30) / (180 - 30)  # 0 a 1
     
-    # Temperatura: más calor acelera evaporación
-    temp = random.uniform(15, 30) if progress > 0.5 else random.uniform(5, 20)
-    
-    # Humedad: inversamente proporcional a evaporación
-    humidity = random.uniform(5, 20) if progress > 0.5 else random.uniform(15, 40)
+    if weather is not None:
+        temp, humidity = weather['temperature_c'], weather['humidity_percent']
+    else:
+        # Temperatura: más calor acelera evaporación
+        temp = rng.uniform(15, 30) if progress > 0.5 else rng.uniform(5, 20)
+        
+        # Humedad: inversamente proporcional a evaporación
+        humidity = rng.uniform(5, 20) if progress > 0.5 else rng.uniform(15, 40)
     
     # Conductividad y densidad aumentan con concentración
-    conductivity = random.uniform(80, 150) if progress > 0.5 else random.uniform(50, 100)
-    density = random.uniform(1.15, 1.25) if progress > 0.5 else random.uniform(1.10, 1.18)
+    conductivity = rng.uniform(80, 150) if progress > 0.5 else rng.uniform(50, 100)
+    density = rng.uniform(1.15, 1.25) if progress > 0.5 else rng.uniform(1.10, 1.18)
     
     # pH relativamente estable
-    ph = random.uniform(7.0, 8.5)
+    ph = rng.uniform(7.0, 8.5)
     
     # Ratios de impurezas (mejor si son bajos)
-    mg_li = random.uniform(3, 8) if progress > 0.5 else random.uniform(5, 15)
-    ca_li = random.uniform(0.5, 2) if progress > 0.5 else random.uniform(1, 3)
+    mg_li = rng.uniform(3, 8) if progress > 0.5 else rng.uniform(5, 15)
+    ca_li = rng.uniform(0.5, 2) if progress > 0.5 else rng.uniform(1, 3)
     
     return {
         "poza_id": poza_id,
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": (timestamp or datetime.now()).isoformat(),
         "days_evaporation": round(days, 1),
         "temperature_c": round(temp, 1),
         "humidity_percent": round(humidity, 1),
@@ -76,8 +101,24 @@ def generate_sensor_reading(poza_id: str, days: float) -> dict:
     }
 
 
-def send_sensor_data(data: dict, webhook_url: str) -> dict:
+def is_alert(prediction: dict) -> bool:
+    """
+    Alerta = transición ALERT_START del motor de alertas de la API.
+    Con respuestas sin campo `alert` (API anterior) se usa el umbral crudo.
+    """
+    alert = prediction.get('alert')
+    if alert is not None:
+        return alert.get('transition') == 'ALERT_START'
+    return prediction.get('predicted_concentration_mg_l', 0) > 4500
+
+
+def send_sensor_data(data: dict, webhook_url: str, executor=None) -> dict:
     """Envía datos al webhook de n8n y retorna resultado completo"""
+    if executor is not None:
+        return send_sensor_data_local(data, executor)
+    
+    # requests solo hace falta en modo HTTP (no con --local)
+    import requests
     try:
         response = requests.post(
             webhook_url,
@@ -113,6 +154,274 @@ def send_sensor_data(data: dict, webhook_url: str) -> dict:
         }
 
 
+def send_sensor_data_local(data: dict, executor) -> dict:
+    """Ejecuta el workflow en proceso (LocalWorkflowExecutor) en lugar de n8n"""
+    result = executor.execute(dict(data))
+    if result.status_code == 200:
+        return {
+            'success': True,
+            'status_code': result.status_code,
+            'data': result.body,
+            'node_timings': result.node_timings
+        }
+    return {
+        'success': False,
+        'status_code': result.status_code,
+        'error': json.dumps(result.body, ensure_ascii=False)
+    }
+
+
+def encode_batch(readings: list[dict], encoding: str = 'gzip') -> tuple[bytes, int]:
+    """Lote NDJSON (una lectura por línea) comprimido; devuelve (cuerpo, bytes sin comprimir)"""
+    raw = b''.join(json.dumps(r, separators=(',', ':')).encode('utf-8') + b'\n' for r in readings)
+    if encoding == 'gzip':
+        return gzip.compress(raw, compresslevel=6), len(raw)
+    if encoding == 'zstd':
+        # zstandard es opcional: solo hace falta con --encoding=zstd
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).compress(raw), len(raw)
+    return raw, len(raw)
+
+
+def http_bytes(response) -> tuple[int, int]:
+    """Bytes HTTP de un request y su respuesta (líneas de estado, headers y cuerpos; sin TCP/TLS)"""
+    request = response.request
+    host = request.url.split('/')[2]
+    up = (len(f"{request.method} {request.path_url} HTTP/1.1\r\nHost: {host}\r\n")
+          + sum(len(k) + len(v) + 4 for k, v in request.headers.items()) + 2 + len(request.body or b''))
+    down = (len(f"HTTP/1.1 {response.status_code} {response.reason}\r\n")
+            + sum(len(k) + len(v) + 4 for k, v in response.headers.items()) + 2 + len(response.content))
+    return up, down
+
+
+class SimulatedLink:
+    """
+    Enlace satelital/celular simulado: cortes periódicos y costo por request.
+
+    El enlace cae los últimos `outage_s` segundos de cada período de
+    `outage_every_s`. Cada envío cuesta `rtt_s` más los bytes a `bandwidth_bps`;
+    con `sleep=False` ese costo solo se suma a la latencia informada (para
+    simular horas de operación en segundos).
+    """
+
+    def __init__(self, outage_every_s=0, outage_s=0, bandwidth_bps=None, rtt_s=0.0,
+                 sleep=True, clock=time.monotonic):
+        self.outage_every_s = outage_every_s
+        self.outage_s = outage_s
+        self.bandwidth_bps = bandwidth_bps
+        self.rtt_s = rtt_s
+        self.sleep = sleep
+        self.clock = clock
+        self._start = clock()
+
+    def is_up(self) -> bool:
+        if not self.outage_every_s or not self.outage_s:
+            return True
+        return (self.clock() - self._start) % self.outage_every_s < self.outage_every_s - self.outage_s
+
+    def transfer(self, up_bytes: int, down_bytes: int) -> float:
+        """Segundos de enlace de un request (se duermen si sleep=True)"""
+        seconds = self.rtt_s
+        if self.bandwidth_bps:
+            seconds += (up_bytes + down_bytes) * 8 / self.bandwidth_bps
+        if self.sleep and seconds:
+            time.sleep(seconds)
+        return seconds
+
+
+class FieldGateway:
+    """
+    Gateway de campo: junta lecturas en un buffer local y las envía en lotes
+    NDJSON comprimidos a /ingest/batch.
+
+    Un lote sale cuando se juntan `batch_size` lecturas o la más vieja supera
+    `max_delay_s`. Con el enlace caído (simulado o error de red / HTTP >= 500)
+    las lecturas quedan en el buffer y se reenvían al volver; el backlog se
+    drena con lotes seguidos, marcados como backfill (X-Priority) para que
+    la API los descarte antes que el tráfico en vivo; un 429 deja el lote en
+    el buffer hasta el Retry-After. Con el buffer lleno se descarta la
+    lectura más vieja y se cuenta. `stats()` informa bytes en el cable, latencia de cada
+    envío, demora de entrega por lectura y tiempo de drenado tras cada corte.
+    """
+
+    def __init__(self, url=GATEWAY_URL, encoding='gzip', batch_size=GATEWAY_BATCH_SIZE,
+                 max_delay_s=GATEWAY_MAX_DELAY_S, max_buffer=GATEWAY_MAX_BUFFER,
+                 link=None, clock=time.monotonic, timeout=30):
+        if encoding not in GATEWAY_ENCODINGS:
+            raise ValueError(f"Encoding desconocido: {encoding}. Opciones: {', '.join(GATEWAY_ENCODINGS)}")
+        self.url = url
+        self.encoding = encoding
+        self.batch_size = batch_size
+        self.max_delay_s = max_delay_s
+        self.link = link or SimulatedLink(clock=clock)
+        self.clock = clock
+        self.timeout = timeout
+
+        self._buffer = deque(maxlen=max_buffer)
+        self._session = None
+        self._outage = None  # {'started', 'recovered', 'backlog'} mientras dura un corte y su drenado
+        self._retry_at = None  # Retry-After de un 429 de la API
+
+        self.readings = 0
+        self.delivered = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.alerts = 0
+        self.batches = 0
+        self.failed_flushes = 0
+        self.throttled = 0
+        self.raw_bytes = 0
+        self.body_bytes = 0
+        self.wire_up_bytes = 0
+        self.wire_down_bytes = 0
+        self.flush_ms = []
+        self.delivery_delay_s = []
+        self.drains = []
+        self.last_error = None
+
+    @property
+    def backlog(self) -> int:
+        return len(self._buffer)
+
+    def add(self, reading: dict):
+        """Encolar una lectura (sin red)"""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append((self.clock(), reading))
+        self.readings += 1
+
+    def due(self) -> bool:
+        if not self._buffer:
+            return False
+        return len(self._buffer) >= self.batch_size or self.clock() - self._buffer[0][0] >= self.max_delay_s
+
+    def pump(self) -> int:
+        """Enviar los lotes que correspondan; con backlog de un corte, drenar todo. Devuelve lotes enviados"""
+        sent = 0
+        while self.due() or (self._buffer and self._outage is not None):
+            if not self.flush():
+                break
+            sent += 1
+        return sent
+
+    def flush(self) -> bool:
+        """Enviar un lote con las lecturas más viejas del buffer; False si el enlace no está disponible"""
+        if not self._buffer:
+            return True
+        if not self.link.is_up():
+            self._mark_outage()
+            return False
+        if self._retry_at is not None and self.clock() < self._retry_at:
+            return False
+
+        entries = [self._buffer[i] for i in range(min(self.batch_size, len(self._buffer)))]
+        body, raw_len = encode_batch([reading for _, reading in entries], self.encoding)
+        headers = {'Content-Type': 'application/x-ndjson'}
+        if self.encoding != 'identity':
+            headers['Content-Encoding'] = self.encoding
+        if self._outage is not None:
+            headers['X-Priority'] = 'backfill'
+
+        import requests
+        if self._session is None:
+            self._session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = self._session.post(self.url, data=body, headers=headers, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            self.last_error = str(e)
+            self._mark_outage()
+            return False
+        up, down = http_bytes(response)
+        elapsed = time.perf_counter() - start + self.link.transfer(up, down)
+        self.wire_up_bytes += up
+        self.wire_down_bytes += down
+        if response.status_code >= 500:
+            self.last_error = f"HTTP {response.status_code}"
+            self._mark_outage()
+            return False
+        if response.status_code == 429:
+            # API sobrecargada o límite del cliente: reintentar después del Retry-After
+            self.last_error = f"HTTP 429: {response.text[:200]}"
+            self.throttled += 1
+            self._retry_at = self.clock() + float(response.headers.get('Retry-After', 1))
+            return False
+        self._retry_at = None
+        if response.status_code != 200:
+            # 4xx del lote completo (encoding no soportado, lote muy grande): error de
+            # configuración, las lecturas quedan en el buffer
+            self.last_error = f"HTTP {response.status_code}: {response.text[:200]}"
+            raise RuntimeError(f"El servidor rechazó el lote: {self.last_error}")
+
+        # Lote entregado (las lecturas inválidas se informan y no se reintentan)
+        result = response.json()
+        for _ in entries:
+            self._buffer.popleft()
+        self.batches += 1
+        self.raw_bytes += raw_len
+        self.body_bytes += len(body)
+        self.flush_ms.append(elapsed * 1000)
+        self.delivered += result['accepted']
+        self.rejected += result['rejected']
+        self.alerts += len(result['alerts'])
+        now = self.clock()
+        self.delivery_delay_s.extend(now - enqueued for enqueued, _ in entries)
+
+        if self._outage is not None:
+            outage = self._outage
+            if outage['recovered'] is None:
+                outage.update(recovered=now, backlog=len(entries) + len(self._buffer), drain_s=0.0, batches=0)
+            outage['drain_s'] += elapsed
+            outage['batches'] += 1
+            if not self._buffer:
+                self.drains.append({
+                    'outage_s': outage['recovered'] - outage['started'],
+                    'backlog': outage['backlog'],
+                    'batches': outage['batches'],
+                    'drain_s': outage['drain_s']
+                })
+                self._outage = None
+        return True
+
+    def _mark_outage(self):
+        self.failed_flushes += 1
+        if self._outage is None:
+            self._outage = {'started': self.clock(), 'recovered': None}
+
+    def stats(self) -> dict:
+        def quantiles(values):
+            if not values:
+                return {'p50': None, 'p99': None}
+            ordered = sorted(values)
+            return {'p50': ordered[len(ordered) // 2], 'p99': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]}
+
+        return {
+            'encoding': self.encoding,
+            'readings': self.readings,
+            'delivered': self.delivered,
+            'rejected': self.rejected,
+            'dropped': self.dropped,
+            'backlog': self.backlog,
+            'alerts': self.alerts,
+            'batches': self.batches,
+            'failed_flushes': self.failed_flushes,
+            'throttled': self.throttled,
+            'raw_bytes': self.raw_bytes,
+            'body_bytes': self.body_bytes,
+            'wire_up_bytes': self.wire_up_bytes,
+            'wire_down_bytes': self.wire_down_bytes,
+            'compression_ratio': self.raw_bytes / self.body_bytes if self.body_bytes else None,
+            'flush_ms': quantiles(self.flush_ms),
+            'delivery_delay_s': quantiles(self.delivery_delay_s),
+            'drains': list(self.drains),
+            'last_error': self.last_error
+        }
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
 def print_detailed_result(sensor_data: dict, result: dict):
     """Imprime resultado detallado y formateado"""
     poza = sensor_data['poza_id']
@@ -145,6 +454,11 @@ def print_detailed_result(sensor_data: dict, result: dict):
         
         print(f"   {conc_icon} Predicción: {conc:.1f} mg/L | Estado: {quality} | Confianza: {confidence}")
         
+        # Estado del motor de alertas (si la API lo informa)
+        if pred.get('alert'):
+            print(f"   🔔 Alerta: {pred['alert']['state']}"
+                  + (f" → {pred['alert']['transition']}" if pred['alert'].get('transition') else ""))
+        
         # Recomendación
         print(f"   💡 {pred['recommendation']}")
         
@@ -154,10 +468,17 @@ def print_detailed_result(sensor_data: dict, result: dict):
             for warning in pred['warnings']:
                 print(f"      - {warning}")
         
-        # Alerta especial si es alta concentración
-        if conc > 4500:
+        # Alerta especial solo al iniciar una alerta (no en cada lectura alta)
+        if is_alert(pred):
             print(f"   🚨 ¡ALERTA! Concentración óptima para bombeo a siguiente etapa")
         
+        # Timing por nodo (solo en modo --local)
+        if result.get('node_timings'):
+            total = sum(ms for _, ms in result['node_timings'])
+            slowest = max(result['node_timings'], key=lambda t: t[1])
+            print(f"   ⏱️  Workflow: {total:.2f} ms ({len(result['node_timings'])} nodos, "
+                  f"más lento: {slowest[0]} {slowest[1]:.2f} ms)")
+        
     else:
         # Error
         print(f"\n❌ {poza} | Días: {days} | ERROR")
@@ -167,9 +488,9 @@ def print_detailed_result(sensor_data: dict, result: dict):
             print(f"   {result.get('message', 'Connection error')}")
 
 
-def continuous_monitoring(use_test_mode=True):
+def continuous_monitoring(use_test_mode=True, executor=None):
     """Monitoreo continuo de múltiples pozas en paralelo"""
-    webhook_url = get_webhook_url(use_test_mode)
+    webhook_url = get_webhook_url(use_test_mode) if executor is None else LOCAL_LABEL
     mode_label = "TEST" if use_test_mode else "PRODUCCIÓN"
     
     print("=" * 80)
@@ -203,13 +524,13 @@ def continuous_monitoring(use_test_mode=True):
             for poza_id, current_days in pozas_state.items():
                 # Generar y enviar lectura
                 reading = generate_sensor_reading(poza_id, current_days)
-                result = send_sensor_data(reading, webhook_url)
+                result = send_sensor_data(reading, webhook_url, executor)
                 
                 # Mostrar resultado detallado
                 print_detailed_result(reading, result)
                 
-                # Contar alertas
-                if result['success'] and result['data'].get('predicted_concentration_mg_l', 0) > 4500:
+                # Contar alertas (transiciones, no lecturas sobre el umbral)
+                if result['success'] and is_alert(result['data']):
                     iteration_alerts += 1
                     total_alerts += 1
                 
@@ -240,9 +561,80 @@ def continuous_monitoring(use_test_mode=True):
         print("=" * 80)
 
 
-def test_single_reading(use_test_mode=True):
+def print_gateway_stats(stats: dict):
+    """Resumen de bytes, latencias y drenados del gateway"""
+    readings = max(stats['delivered'] + stats['rejected'], 1)
+    print(f"   📦 Lotes: {stats['batches']} | Entregadas: {stats['delivered']} | Rechazadas: {stats['rejected']} "
+          f"| Descartadas: {stats['dropped']} | En buffer: {stats['backlog']}")
+    if stats['throttled']:
+        print(f"   🚦 Lotes demorados por 429 de la API: {stats['throttled']}")
+    print(f"   📡 Cable: {stats['wire_up_bytes']:,} B subida / {stats['wire_down_bytes']:,} B bajada "
+          f"({(stats['wire_up_bytes'] + stats['wire_down_bytes']) / readings:.0f} B por lectura)")
+    if stats['compression_ratio']:
+        print(f"   🗜️  {stats['encoding']}: {stats['raw_bytes']:,} → {stats['body_bytes']:,} B "
+              f"(x{stats['compression_ratio']:.1f})")
+    if stats['flush_ms']['p50'] is not None:
+        print(f"   ⏱️  Envío: p50 {stats['flush_ms']['p50']:.0f} ms, p99 {stats['flush_ms']['p99']:.0f} ms | "
+              f"Demora de entrega: p50 {stats['delivery_delay_s']['p50']:.0f} s, "
+              f"p99 {stats['delivery_delay_s']['p99']:.0f} s")
+    for drain in stats['drains']:
+        print(f"   🔁 Corte de {drain['outage_s']:.0f} s: backlog {drain['backlog']} lecturas drenado en "
+              f"{drain['drain_s']:.1f} s ({drain['batches']} lotes)")
+
+
+def gateway_monitoring(gateway: FieldGateway):
+    """Modo gateway: las lecturas de todas las pozas pasan por el buffer local y salen en lotes"""
+    print("=" * 80)
+    print("🛰️  SIMULADOR DE SENSORES - GATEWAY DE CAMPO")
+    print("=" * 80)
+    print(f"📡 Destino: {gateway.url}")
+    print(f"🗜️  Encoding: {gateway.encoding} | Lote: {gateway.batch_size} lecturas o {gateway.max_delay_s} s")
+    if gateway.link.outage_s:
+        print(f"📴 Cortes simulados: {gateway.link.outage_s} s cada {gateway.link.outage_every_s} s")
+    print(f"⏱️  Intervalo: {INTERVAL_SECONDS} segundos | 🏊 Pozas: {NUM_POZAS}")
+    print("=" * 80)
+
+    pozas_state = {f"POZA_{i+1}": random.uniform(30, 150) for i in range(NUM_POZAS)}
+    link_up = True
+
+    try:
+        while True:
+            for poza_id, current_days in pozas_state.items():
+                gateway.add(generate_sensor_reading(poza_id, current_days))
+                pozas_state[poza_id] = current_days + random.uniform(0.5, 2)
+                if pozas_state[poza_id] >= 179:
+                    pozas_state[poza_id] = random.uniform(30, 60)
+
+            drains = len(gateway.drains)
+            sent = gateway.pump()
+            if gateway.link.is_up() != link_up:
+                link_up = not link_up
+                print(f"\n{'📶 Enlace restablecido' if link_up else '📴 Enlace caído'} - "
+                      f"{datetime.now().strftime('%H:%M:%S')} | buffer: {gateway.backlog} lecturas")
+            if sent:
+                stats = gateway.stats()
+                print(f"\n📤 {datetime.now().strftime('%H:%M:%S')} - {sent} lote(s) enviados | "
+                      f"último envío {gateway.flush_ms[-1]:.0f} ms | alertas acumuladas: {stats['alerts']}")
+                for drain in gateway.drains[drains:]:
+                    print(f"   🔁 Backlog de {drain['backlog']} lecturas drenado en {drain['drain_s']:.1f} s")
+            time.sleep(INTERVAL_SECONDS)
+
+    except KeyboardInterrupt:
+        print("\n\n🛑 Simulación detenida por el usuario, enviando buffer pendiente...")
+        if gateway.link.is_up():
+            while gateway.backlog and gateway.flush():
+                pass
+        print("=" * 80)
+        print("📊 Estadísticas del gateway:")
+        print_gateway_stats(gateway.stats())
+        print("=" * 80)
+    finally:
+        gateway.close()
+
+
+def test_single_reading(use_test_mode=True, executor=None):
     """Envía una sola lectura de prueba"""
-    webhook_url = get_webhook_url(use_test_mode)
+    webhook_url = get_webhook_url(use_test_mode) if executor is None else LOCAL_LABEL
     
     print("=" * 80)
     print("🧪 TEST - Enviando lectura única")
@@ -255,7 +647,7 @@ def test_single_reading(use_test_mode=True):
     print(json.dumps(test_data, indent=2))
     print()
     
-    result = send_sensor_data(test_data, webhook_url)
+    result = send_sensor_data(test_data, webhook_url, executor)
     print_detailed_result(test_data, result)
     
     if result['success']:
@@ -266,9 +658,9 @@ def test_single_reading(use_test_mode=True):
     print("=" * 80)
 
 
-def test_high_concentration(use_test_mode=True):
+def test_high_concentration(use_test_mode=True, executor=None):
     """Envía datos que deberían generar alerta de alta concentración"""
-    webhook_url = get_webhook_url(use_test_mode)
+    webhook_url = get_webhook_url(use_test_mode) if executor is None else LOCAL_LABEL
     
     print("=" * 80)
     print("🚨 TEST - Datos para generar ALERTA")
@@ -293,7 +685,7 @@ def test_high_concentration(use_test_mode=True):
     print(json.dumps(test_data, indent=2))
     print()
     
-    result = send_sensor_data(test_data, webhook_url)
+    result = send_sensor_data(test_data, webhook_url, executor)
     print_detailed_result(test_data, result)
     
     if result['success']:
@@ -327,22 +719,88 @@ if __name__ == "__main__":
         else:
             print("🔧 Modo: TEST (webhook-test)")
         
-        if mode == "test":
-            test_single_reading(use_test_mode)
-        elif mode == "alert":
-            test_high_concentration(use_test_mode)
-        elif mode == "continuous":
-            continuous_monitoring(use_test_mode)
-        else:
-            print("❌ Modo desconocido. Usa: test, alert, o continuous")
+        # Flag opcional: --direct envía a /ingest de la API en lugar del webhook
+        if '--direct' in sys.argv:
+            USE_DIRECT_INGEST = True
+            print("🔧 Destino: API /ingest (directo, sin n8n)")
+        
+        if mode not in ("test", "alert", "continuous", "gateway", "scenario"):
+            print("❌ Modo desconocido. Usa: test, alert, continuous, gateway o scenario")
+            sys.exit(1)
+        
+        # Modo escenario: carga reproducible según un perfil, con reloj virtual (scenario_engine.py)
+        if mode == "scenario":
+            from scenario_engine import SINKS, load_profile, run_scenario
+            options = {'profile': None, 'seed': None, 'speed': None, 'hours': None, 'sink': 'dry', 'encoding': 'gzip'}
+            for arg in sys.argv[2:]:
+                name, _, value = arg[2:].partition('=')
+                if arg.startswith('--') and name in options and value:
+                    options[name] = float(value) if name in ('speed', 'hours') else value
+            if options['sink'] not in SINKS:
+                print(f"❌ Destino desconocido. Usa: {', '.join(SINKS)}")
+                sys.exit(1)
+            profile = load_profile(
+                options['profile'], speed=options['speed'], duration_h=options['hours'],
+                seed=int(options['seed']) if options['seed'] is not None else None
+            )
+            url = get_webhook_url(use_test_mode)
+            run_scenario(profile, sink=options['sink'], send=lambda reading: send_sensor_data(reading, url),
+                         encoding=options['encoding'])
+            sys.exit(0)
+        
+        # Modo gateway: lotes NDJSON comprimidos a /ingest/batch de la API
+        if mode == "gateway":
+            options = {'encoding': 'gzip', 'batch-size': GATEWAY_BATCH_SIZE, 'max-delay': GATEWAY_MAX_DELAY_S,
+                       'outage-every': 0, 'outage-seconds': 0}
+            for arg in sys.argv[2:]:
+                name, _, value = arg[2:].partition('=')
+                if arg.startswith('--') and name in options and value:
+                    options[name] = value if name == 'encoding' else float(value)
+            gateway = FieldGateway(
+                encoding=options['encoding'],
+                batch_size=int(options['batch-size']),
+                max_delay_s=options['max-delay'],
+                link=SimulatedLink(options['outage-every'], options['outage-seconds'])
+            )
+            gateway_monitoring(gateway)
+            sys.exit(0)
+        
+        # Flag opcional: --local ejecuta el workflow en proceso (sin n8n ni API en :8000)
+        runner = contextlib.nullcontext()
+        if '--local' in sys.argv:
+            from n8n_local_executor import LocalWorkflowExecutor
+            runner = LocalWorkflowExecutor(api_mode='inprocess')
+            print("🔧 Workflow: LOCAL (en proceso)")
+        
+        with runner as executor:
+            for warning in getattr(executor, 'drift', []):
+                print(f"⚠️  {warning}")
+            if mode == "test":
+                test_single_reading(use_test_mode, executor)
+            elif mode == "alert":
+                test_high_concentration(use_test_mode, executor)
+            else:
+                continuous_monitoring(use_test_mode, executor)
     else:
         print("Modos disponibles:")
         print("  python sensor_simulator.py test        - Una lectura de prueba")
         print("  python sensor_simulator.py alert       - Generar alerta de prueba")
         print("  python sensor_simulator.py continuous  - Monitoreo continuo")
+        print("  python sensor_simulator.py gateway     - Gateway de campo: lotes comprimidos a /ingest/batch")
+        print("  python sensor_simulator.py scenario    - Escenario reproducible (ráfagas, ciclo diario, cortes)")
         print("\nOpciones:")
         print("  --prod                                 - Usar webhook de producción (/webhook/)")
         print("                                          (Por defecto usa /webhook-test/)")
+        print("  --local                                - Ejecutar el workflow en proceso (sin n8n)")
+        print("  --direct                               - Enviar directo a la API (/ingest)")
+        print("\nOpciones del modo gateway:")
+        print("  --encoding=gzip|zstd|identity          - Compresión del lote (zstd requiere zstandard)")
+        print("  --batch-size=N --max-delay=S           - Lecturas por lote / edad máxima antes de enviar")
+        print("  --outage-every=S --outage-seconds=S    - Simular cortes del enlace")
+        print("\nOpciones del modo scenario:")
+        print("  --profile=scenario.example.json        - Perfil declarativo (JSON; sin él, el perfil por defecto)")
+        print("  --sink=dry|direct|gateway              - Sin red / una lectura por request / lotes (--encoding=)")
+        print("  --seed=N --speed=X --hours=H           - Semilla, segundos virtuales por segundo real, duración")
         print()
         
         # Por defecto, modo continuo